@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Convert admin_logs to a monthly range-partitioned table with JSONB event details
+Renames the existing table to admin_logs_legacy, creates the partitioned admin_logs, copies rows
+in batches (parsing JSON and legacy dict-repr details into JSONB) and builds the search indexes.
+Safe to re-run: an interrupted copy resumes after the last copied id.
+Run during a maintenance window; audit entries written mid-conversion may fail.
+"""
+
+import json
+from datetime import datetime
+
+from app import app, db
+from sqlalchemy import text
+from admin_log_storage import ADMIN_LOG_INDEXES, ensure_partitions, is_partitioned
+from models import AdminLog
+
+BATCH_SIZE = 5000
+
+
+def convert_to_partitioned_table():
+    """Swap the plain admin_logs table for a partitioned one, keeping its id sequence"""
+    print("Renaming admin_logs to admin_logs_legacy...")
+    db.session.execute(text("ALTER TABLE admin_logs RENAME TO admin_logs_legacy"))
+
+    # Free the canonical index names for the new table
+    index_names = db.session.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'admin_logs_legacy'"
+    )).scalars().all()
+    for index_name in index_names:
+        db.session.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name[:55]}_legacy"'))
+
+    # Keep issuing ids from the same sequence so copied and new rows never collide
+    db.session.execute(text("ALTER SEQUENCE admin_logs_id_seq OWNED BY NONE"))
+
+    print("Creating partitioned admin_logs...")
+    db.session.execute(text("""
+        CREATE TABLE admin_logs (
+            id INTEGER NOT NULL DEFAULT nextval('admin_logs_id_seq'),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id INTEGER REFERENCES "user" (id),
+            event_type VARCHAR(50) NOT NULL,
+            event_details JSONB,
+            request_id VARCHAR(36),
+            ip_address VARCHAR(45),
+            user_agent VARCHAR(500),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """))
+    db.session.execute(text("ALTER SEQUENCE admin_logs_id_seq OWNED BY admin_logs.id"))
+    db.session.commit()
+
+
+def copy_legacy_rows():
+    """Copy rows from admin_logs_legacy in id order, converting details to JSONB"""
+    legacy_max_id = db.session.execute(text("SELECT COALESCE(MAX(id), 0) FROM admin_logs_legacy")).scalar()
+    last_id = db.session.execute(
+        text("SELECT COALESCE(MAX(id), 0) FROM admin_logs WHERE id <= :legacy_max_id"),
+        {"legacy_max_id": legacy_max_id}
+    ).scalar()
+    copied = 0
+
+    while True:
+        rows = db.session.execute(text("""
+            SELECT id, timestamp, user_id, event_type, event_details::text, request_id, ip_address, user_agent
+            FROM admin_logs_legacy
+            WHERE id > :last_id
+            ORDER BY id
+            LIMIT :batch_size
+        """), {"last_id": last_id, "batch_size": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        db.session.execute(text("""
+            INSERT INTO admin_logs (id, timestamp, user_id, event_type, event_details, request_id, ip_address, user_agent)
+            VALUES (:id, :timestamp, :user_id, :event_type, CAST(:event_details AS JSONB), :request_id, :ip_address, :user_agent)
+        """), [
+            {
+                "id": row.id,
+                "timestamp": row.timestamp,
+                "user_id": row.user_id,
+                "event_type": row.event_type,
+                "event_details": (
+                    json.dumps(AdminLog.parse_event_details(row.event_details))
+                    if row.event_details is not None else None
+                ),
+                "request_id": row.request_id,
+                "ip_address": row.ip_address,
+                "user_agent": row.user_agent,
+            }
+            for row in rows
+        ])
+        db.session.commit()
+
+        last_id = rows[-1].id
+        copied += len(rows)
+        print(f"  Copied {copied} admin log entries (through id {last_id})")
+
+    return copied
+
+
+def add_admin_logs_partitioning():
+    """Run the admin_logs partitioning migration"""
+
+    with app.app_context():
+        try:
+            if db.engine.dialect.name != "postgresql":
+                print("❌ admin_logs partitioning requires PostgreSQL")
+                return
+
+            db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            db.session.commit()
+
+            if not is_partitioned():
+                convert_to_partitioned_table()
+
+            legacy_exists = db.session.execute(
+                text("SELECT to_regclass('admin_logs_legacy') IS NOT NULL")
+            ).scalar()
+
+            oldest = None
+            if legacy_exists:
+                oldest = db.session.execute(text("SELECT MIN(timestamp) FROM admin_logs_legacy")).scalar()
+            partitions = ensure_partitions(months_ahead=2, start=oldest or datetime.utcnow())
+            print(f"✓ {len(partitions)} monthly partitions in place")
+
+            if legacy_exists:
+                copied = copy_legacy_rows()
+                print(f"✓ Copied {copied} admin log entries into the partitioned table")
+
+            for index_sql in ADMIN_LOG_INDEXES:
+                print(f"Creating index: {index_sql}")
+                db.session.execute(text(index_sql))
+            db.session.commit()
+
+            print("✓ admin_logs is partitioned by month with JSONB details and search indexes")
+            if legacy_exists:
+                print("  Verify the copy, then DROP TABLE admin_logs_legacy")
+
+        except Exception as e:
+            print(f"❌ Error partitioning admin_logs: {str(e)}")
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    add_admin_logs_partitioning()
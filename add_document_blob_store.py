@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Move medical document binary content out of the database into the document blob store
+Adds blob_hash/blob_size columns, copies existing binary_content bytes into the blob store in
+batches and clears the in-row copy. Safe to re-run: migrated rows are skipped.
+"""
+
+from app import app, db
+from sqlalchemy import text
+from document_blob_store import get_blob_store
+
+BATCH_SIZE = 50
+
+
+def add_document_blob_columns():
+    """Add blob reference columns to medical_document"""
+    statements = [
+        "ALTER TABLE medical_document ADD COLUMN IF NOT EXISTS blob_hash VARCHAR(64);",
+        "ALTER TABLE medical_document ADD COLUMN IF NOT EXISTS blob_size INTEGER;",
+        "CREATE INDEX IF NOT EXISTS idx_medical_document_blob_hash ON medical_document(blob_hash);",
+    ]
+    for statement in statements:
+        print(f"Executing: {statement}")
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def migrate_binary_content_to_blob_store():
+    """Copy in-row binary content to the blob store, one batch of documents per transaction"""
+    store = get_blob_store()
+    migrated = 0
+    total_bytes = 0
+
+    while True:
+        rows = db.session.execute(text("""
+            SELECT id, binary_content FROM medical_document
+            WHERE binary_content IS NOT NULL AND blob_hash IS NULL
+            ORDER BY id
+            LIMIT :batch_size
+        """), {'batch_size': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        for doc_id, data in rows:
+            data = bytes(data)
+            blob_hash, size = store.put(data)
+            # Verify the blob before dropping the database copy
+            if store.size(blob_hash) != size:
+                raise RuntimeError(f"Blob for document {doc_id} failed verification")
+            db.session.execute(text("""
+                UPDATE medical_document
+                SET blob_hash = :blob_hash, blob_size = :blob_size, binary_content = NULL
+                WHERE id = :id
+            """), {'blob_hash': blob_hash, 'blob_size': size, 'id': doc_id})
+            total_bytes += size
+
+        db.session.commit()
+        migrated += len(rows)
+        print(f"  Migrated {migrated} documents ({total_bytes / (1024 * 1024):.1f} MB)")
+
+    return migrated
+
+
+def add_document_blob_store():
+    """Run the blob store migration"""
+
+    with app.app_context():
+        try:
+            add_document_blob_columns()
+            migrated = migrate_binary_content_to_blob_store()
+
+            print(f"✓ Moved binary content of {migrated} documents to the document blob store")
+            print("  Run VACUUM FULL medical_document during a maintenance window to reclaim table space")
+
+        except Exception as e:
+            print(f"❌ Error migrating document binary content: {str(e)}")
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    add_document_blob_store()
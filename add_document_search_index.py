@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Add the document search index: medical_document.search_text, rebuilt for existing documents,
+with a pg_trgm GIN index on PostgreSQL or an FTS5 trigram table on SQLite
+"""
+
+from app import app, db
+from sqlalchemy import text
+from document_search_index import create_document_search_index, reindex_document_search
+
+
+def add_document_search_index():
+    """Create the search column, rebuild every document's search text, then build the index"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('medical_document')]
+            if 'search_text' not in columns:
+                db.session.execute(text("ALTER TABLE medical_document ADD COLUMN search_text TEXT"))
+                print("✓ Added medical_document.search_text")
+            db.session.commit()
+
+            # All documents, so search text written in an earlier format is rebuilt too
+            reindexed = reindex_document_search(only_missing=False)
+            print(f"✓ Rebuilt search text for {reindexed} documents")
+
+            # Built after the backfill so the index is written once
+            create_document_search_index()
+            print(f"✓ Document search index created ({db.engine.dialect.name})")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error adding document search index: {str(e)}")
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    add_document_search_index()
@@ -0,0 +1,34 @@
+"""
+Database Migration: Add chart_version column to the patient table
+Cached patient charts are keyed by the version; every write to the chart bumps it
+"""
+
+from sqlalchemy import text
+from app import app, db
+
+
+def add_patient_chart_version():
+    """Add patient.chart_version"""
+
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('patient')]
+
+            if 'chart_version' not in columns:
+                print("Adding chart_version column...")
+                db.session.execute(text(
+                    "ALTER TABLE patient ADD COLUMN chart_version INTEGER NOT NULL DEFAULT 0"
+                ))
+
+            db.session.commit()
+            print("Successfully added patient chart version!")
+
+        except Exception as e:
+            print(f"Error adding chart version: {e}")
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    add_patient_chart_version()
+    print("Database migration complete!")
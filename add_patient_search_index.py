@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Add the patient search index: normalized patient.search_text, the patient_search_gram postings
+table, the pg_trgm GIN index on PostgreSQL and the keyset sort indexes; then backfill
+"""
+
+from app import app, db
+from sqlalchemy import text
+from models import PatientSearchGram
+from patient_search import reindex_patient_search
+
+# Composite indexes matching patient_search.SORT_COLUMNS
+SORT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_patient_last_name_sort ON patient (last_name, first_name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_patient_first_name_sort ON patient (first_name, last_name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_patient_mrn_sort ON patient (mrn, id)",
+    "CREATE INDEX IF NOT EXISTS ix_patient_dob_sort ON patient (date_of_birth, id)",
+]
+
+
+def add_patient_search_index():
+    """Create the search column, postings table and indexes, then backfill existing patients"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('patient')]
+            if 'search_text' not in columns:
+                db.session.execute(text("ALTER TABLE patient ADD COLUMN search_text VARCHAR(512)"))
+                print("✓ Added patient.search_text")
+            db.session.commit()
+
+            PatientSearchGram.__table__.create(db.engine, checkfirst=True)
+            print("✓ patient_search_gram table ready")
+
+            if db.engine.dialect.name == "postgresql":
+                db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                db.session.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_patient_search_text_trgm "
+                    "ON patient USING GIN (search_text gin_trgm_ops)"
+                ))
+                print("✓ Trigram index ix_patient_search_text_trgm created")
+            for statement in SORT_INDEXES:
+                db.session.execute(text(statement))
+            db.session.commit()
+            print("✓ Sort indexes created")
+
+            reindexed = reindex_patient_search()
+            print(f"✓ Backfilled search index for {reindexed} patients")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error adding patient search index: {str(e)}")
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    add_patient_search_index()
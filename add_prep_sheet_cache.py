@@ -0,0 +1,25 @@
+"""
+Database Migration: Create the prep_sheet_cache table
+Stores rendered prep sheet content per patient and prep date under a fingerprint of its inputs
+"""
+
+from app import app, db
+from models import PrepSheetCache
+
+
+def add_prep_sheet_cache():
+    """Create prep_sheet_cache"""
+
+    with app.app_context():
+        try:
+            PrepSheetCache.__table__.create(db.engine, checkfirst=True)
+            print("Successfully created prep sheet cache table!")
+
+        except Exception as e:
+            print(f"Error creating prep sheet cache table: {e}")
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    add_prep_sheet_cache()
+    print("Database migration complete!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Add the (patient_id, screening_type_id) unique index used by the bulk screening upsert
+Backfills screening_type_id where the screening type name is unambiguous; screenings that
+cannot be resolved or that conflict are reported for review, never deleted
+"""
+
+from app import app, db
+from sqlalchemy import text
+
+
+def add_screening_upsert_constraint():
+    """Backfill screening_type_id, report conflicts and create the unique index"""
+    with app.app_context():
+        try:
+            # Gender variants share a name, so only names with a single screening type are backfilled
+            backfilled = db.session.execute(text("""
+                UPDATE screening s
+                SET screening_type_id = st.id
+                FROM screening_type st
+                WHERE s.screening_type_id IS NULL
+                  AND st.name = s.screening_type
+                  AND (SELECT COUNT(*) FROM screening_type same_name WHERE same_name.name = st.name) = 1
+            """)).rowcount
+            print(f"✓ Backfilled screening_type_id on {backfilled} screenings")
+
+            ambiguous = db.session.execute(text("""
+                SELECT id, patient_id, screening_type FROM screening
+                WHERE screening_type_id IS NULL
+                ORDER BY id
+            """)).fetchall()
+            for row in ambiguous:
+                print(f"⚠️ Screening {row.id} (patient {row.patient_id}, '{row.screening_type}') "
+                      f"has no unambiguous screening type; set screening_type_id manually")
+
+            conflicts = db.session.execute(text("""
+                SELECT patient_id, screening_type_id, ARRAY_AGG(id ORDER BY id) AS screening_ids
+                FROM screening
+                WHERE screening_type_id IS NOT NULL
+                GROUP BY patient_id, screening_type_id
+                HAVING COUNT(*) > 1
+            """)).fetchall()
+            for row in conflicts:
+                print(f"❌ Patient {row.patient_id} has screenings {row.screening_ids} "
+                      f"for screening type {row.screening_type_id}")
+
+            if conflicts:
+                # Commit the backfill; the index waits until the conflicts are resolved
+                db.session.commit()
+                print(f"❌ {len(conflicts)} conflicting screening groups must be merged before "
+                      f"uq_screening_patient_screening_type can be created")
+                return False
+
+            db.session.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS uq_screening_patient_screening_type
+                ON screening (patient_id, screening_type_id)
+            """))
+
+            db.session.commit()
+            print("✓ Unique index uq_screening_patient_screening_type created successfully!")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error adding screening upsert constraint: {str(e)}")
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    add_screening_upsert_constraint()
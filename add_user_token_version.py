@@ -0,0 +1,36 @@
+"""
+Database Migration: Add token_version column to the user table
+Issued JWTs carry the version; bumping it on logout, password change or delete revokes them
+"""
+
+from sqlalchemy import text
+from app import app, db
+from models import UserAuthChange
+
+
+def add_user_token_version():
+    """Add user.token_version and create the user_auth_change feed table"""
+
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('user')]
+
+            if 'token_version' not in columns:
+                print("Adding token_version column...")
+                db.session.execute(text(
+                    'ALTER TABLE "user" ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0'
+                ))
+
+            db.session.commit()
+            UserAuthChange.__table__.create(db.engine, checkfirst=True)
+            print("Successfully added user token version!")
+
+        except Exception as e:
+            print(f"Error adding token version: {e}")
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    add_user_token_version()
+    print("Database migration complete!")
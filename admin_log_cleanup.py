@@ -1,10 +1,13 @@
 """
 Admin Log Cleanup Script
-Automatically removes admin log entries older than 10 days
+Automatically removes admin log entries older than 10 days.
+On a partitioned admin_logs table whole expired months are dropped as partitions, so only the
+expired rows of the oldest remaining month are deleted row by row.
 """
 
 from datetime import datetime, timedelta
 from models import AdminLog, db
+from admin_log_storage import drop_partitions_before, ensure_partitions, is_partitioned
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,6 +27,23 @@ def cleanup_old_admin_logs(days_to_keep=10):
         # Calculate cutoff date
         cutoff_date = datetime.now() - timedelta(days=days_to_keep)
 
+        if is_partitioned():
+            # Keep partitions ahead of incoming rows, then drop expired months
+            ensure_partitions()
+            dropped_count = drop_partitions_before(cutoff_date)
+
+            # Expired rows left in the boundary month (partition pruning limits this to one partition)
+            deleted_count = AdminLog.query.filter(AdminLog.timestamp < cutoff_date).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+
+            logger.info(
+                f"Cleaned up admin logs older than {days_to_keep} days: ~{dropped_count} in dropped "
+                f"partitions, {deleted_count} deleted"
+            )
+            return dropped_count + deleted_count
+
         # Find old records
         old_logs = AdminLog.query.filter(AdminLog.timestamp < cutoff_date)
         count_to_delete = old_logs.count()
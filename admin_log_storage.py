@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Admin Log Storage
+PostgreSQL storage helpers for admin_logs: monthly range partitions (created ahead of time and
+dropped for retention) and the indexed search expressions used by the admin log viewer.
+On other databases admin_logs is a plain table and the viewer falls back to LIKE filters.
+"""
+
+import logging
+import re
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import literal_column, text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "admin_logs_p"
+DEFAULT_PARTITION = "admin_logs_default"
+
+# Full-text document over event type and details. Queries must use this exact expression for
+# the ix_admin_logs_search GIN index to apply.
+SEARCH_DOCUMENT_SQL = (
+    "to_tsvector('simple', coalesce(admin_logs.event_type, '') || ' ' || "
+    "coalesce(admin_logs.event_details::text, ''))"
+)
+
+# Indexes on the partitioned parent (created on every partition)
+ADMIN_LOG_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_admin_logs_timestamp ON admin_logs (timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_admin_logs_user_id ON admin_logs (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_admin_logs_event_type ON admin_logs (event_type)",
+    "CREATE INDEX IF NOT EXISTS ix_admin_logs_request_id ON admin_logs (request_id)",
+    f"CREATE INDEX IF NOT EXISTS ix_admin_logs_search ON admin_logs USING GIN ({SEARCH_DOCUMENT_SQL.replace('admin_logs.', '')})",
+    "CREATE INDEX IF NOT EXISTS ix_admin_logs_event_type_trgm ON admin_logs USING GIN (event_type gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_admin_logs_ip_address_trgm ON admin_logs USING GIN (ip_address gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_admin_logs_details_trgm ON admin_logs USING GIN ((event_details::text) gin_trgm_ops)",
+]
+
+
+class AdminLogPartition(NamedTuple):
+    name: str
+    start: Optional[datetime]  # None for the default partition
+    end: Optional[datetime]
+
+
+def is_postgresql() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+def is_partitioned() -> bool:
+    """Whether admin_logs is a partitioned table"""
+    if not is_postgresql():
+        return False
+    return bool(db.session.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = 'admin_logs'
+        )
+    """)).scalar())
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def create_month_partition(month: date) -> str:
+    """Create the partition holding one calendar month of admin logs"""
+    month = month_start(month)
+    name = partition_name(month)
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF admin_logs "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return name
+
+
+def ensure_partitions(months_ahead: int = 2, start: Optional[date] = None) -> List[str]:
+    """Create monthly partitions from start (default: this month) through months_ahead"""
+    if not is_partitioned():
+        return []
+
+    first = month_start(start or datetime.utcnow())
+    last = add_months(month_start(datetime.utcnow()), months_ahead)
+    created = []
+    month = first
+    while month <= last:
+        created.append(create_month_partition(month))
+        month = add_months(month, 1)
+    db.session.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF admin_logs DEFAULT"))
+    db.session.commit()
+    return created
+
+
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def list_partitions() -> List[AdminLogPartition]:
+    """Partitions of admin_logs ordered by range start (default partition last)"""
+    rows = db.session.execute(text("""
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'admin_logs'
+    """)).fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_PATTERN.search(bound or "")
+        if match:
+            partitions.append(AdminLogPartition(
+                name, datetime.fromisoformat(match.group(1)), datetime.fromisoformat(match.group(2))
+            ))
+        else:
+            partitions.append(AdminLogPartition(name, None, None))
+    return sorted(partitions, key=lambda partition: (partition.start is None, partition.start or datetime.min))
+
+
+def drop_partitions_before(cutoff: datetime) -> int:
+    """
+    Detach and drop every monthly partition that ends at or before the cutoff
+
+    Returns:
+        Estimated number of rows removed (from planner statistics)
+    """
+    removed = 0
+    for partition in list_partitions():
+        if partition.end is None or partition.end > cutoff:
+            continue
+        estimate = db.session.execute(
+            text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = :name"),
+            {"name": partition.name}
+        ).scalar() or 0
+        db.session.execute(text(f"ALTER TABLE admin_logs DETACH PARTITION {partition.name}"))
+        db.session.execute(text(f"DROP TABLE {partition.name}"))
+        db.session.commit()
+        removed += estimate
+        logger.info(f"Dropped admin log partition {partition.name} (~{estimate} rows)")
+    return removed
+
+
+def search_document():
+    """Indexed full-text document of an admin log row"""
+    return literal_column(SEARCH_DOCUMENT_SQL)
+
+
+def full_text_match(query_text: str):
+    """Condition matching rows whose event type/details contain the search terms"""
+    return search_document().op("@@")(db.func.websearch_to_tsquery("simple", query_text))
+
+
+def any_term_prefix_match(terms: List[str]):
+    """Condition matching rows containing any word starting with one of the terms"""
+    tsquery = " | ".join(f"{re.sub(r'[^A-Za-z0-9_]', '', term)}:*" for term in terms)
+    return search_document().op("@@")(db.func.to_tsquery("simple", tsquery))
@@ -6,7 +6,7 @@ Analysis: The provided code updates the admin log viewer to display more detaile
 Admin Log Viewer - Comprehensive view of all system activities
 """
 
-from flask import render_template, request, jsonify, session, make_response
+from flask import render_template, request, jsonify, session, Response, stream_with_context
 from app import app, db
 from models import AdminLog, User, Patient
 from admin_middleware import admin_required
@@ -14,6 +14,7 @@ from datetime import datetime, timedelta
 import json
 import logging
 from sqlalchemy import desc, and_, or_, func
+from admin_log_storage import any_term_prefix_match, full_text_match, is_postgresql
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,8 @@ def admin_logs():
         search_term = request.args.get("search", "")
         ip_filter = request.args.get("ip_address", "")
         sort_order = request.args.get("sort", "desc")  # desc or asc
+        search_mode = request.args.get("search_mode", "text")  # text (full-text) or contains (substring)
+        indexed_search = is_postgresql()
 
         # Date range shortcuts
         date_range = request.args.get("date_range", "")
@@ -97,10 +100,16 @@ def admin_logs():
                 error_conditions = [
                     AdminLog.event_type.in_(["error", "validation_error", "error_response"]),
                     AdminLog.event_type.like("%error%"),
-                    AdminLog.event_details.like("%error%"),
-                    AdminLog.event_details.like("%exception%"),
-                    AdminLog.event_details.like("%traceback%")
                 ]
+                if indexed_search:
+                    error_conditions.append(any_term_prefix_match(["error", "exception", "traceback"]))
+                else:
+                    details_text = db.cast(AdminLog.event_data, db.Text)
+                    error_conditions.extend([
+                        details_text.like("%error%"),
+                        details_text.like("%exception%"),
+                        details_text.like("%traceback%")
+                    ])
                 query = query.filter(or_(*error_conditions))
             else:
                 query = query.filter(AdminLog.event_type.like(f"%{event_type}%"))
@@ -126,14 +135,24 @@ def admin_logs():
                 pass
 
         if search_term:
-            # Search in event_details JSON and other fields
             search_pattern = f"%{search_term}%"
-            search_conditions = [
-                AdminLog.event_details.ilike(search_pattern),
-                AdminLog.event_type.ilike(search_pattern),
-                AdminLog.ip_address.ilike(search_pattern),
-                User.username.ilike(search_pattern)
+            # Resolve matching users first so the log conditions stay index-friendly
+            matching_user_ids = [
+                user_id for (user_id,) in
+                db.session.query(User.id).filter(User.username.ilike(search_pattern)).all()
             ]
+            search_conditions = [AdminLog.user_id.in_(matching_user_ids)] if matching_user_ids else []
+
+            if indexed_search and search_mode == "text":
+                # Word search over event type and details (GIN full-text index)
+                search_conditions.append(full_text_match(search_term))
+            else:
+                # Substring search (trigram indexes on PostgreSQL)
+                search_conditions.extend([
+                    db.cast(AdminLog.event_data, db.Text).ilike(search_pattern),
+                    AdminLog.event_type.ilike(search_pattern),
+                    AdminLog.ip_address.ilike(search_pattern)
+                ])
             query = query.filter(or_(*search_conditions))
 
         # Apply sorting
@@ -229,6 +248,7 @@ def admin_logs():
                 "date_from": date_from,
                 "date_to": date_to,
                 "search": search_term,
+                "search_mode": search_mode,
                 "ip_address": ip_filter,
                 "per_page": per_page,
                 "sort": sort_order,
@@ -335,54 +355,48 @@ def admin_logs():
             )
 
 
-@app.route("/admin/logs/export")
-@admin_required
-def export_admin_logs():
-    """
-    Export admin logs as JSON or CSV
-    """
-    try:
-        format_type = request.args.get("format", "json")
-        days = request.args.get("days", 30, type=int)
-
-        # Get logs from the last N days
-        cutoff_date = datetime.now() - timedelta(days=days)
-        logs = (
-            AdminLog.query.filter(AdminLog.timestamp >= cutoff_date)
-            .order_by(desc(AdminLog.timestamp))
-            .all()
-        )
-
-        export_data = []
-        for log in logs:
-            log_data = {
-                "id": log.id,
-                "timestamp": log.timestamp.isoformat(),
-                "event_type": log.event_type,
-                "user_id": log.user_id,
-                "username": log.user.username if log.user else "Anonymous",
-                "ip_address": log.ip_address,
-                "user_agent": log.user_agent,
-                "request_id": log.request_id,
-                "event_details": log.event_details_dict,
-            }
-            export_data.append(log_data)
-
-        if format_type == "csv":
-            # Convert to CSV format
-            import csv
-            import io
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-
-            # Write header
-            writer.writerow(
-                ["Timestamp", "Event Type", "Username", "IP Address", "Details"]
-            )
-
-            # Write data
-            for log in export_data:
+EXPORT_YIELD_PER = 1000  # Rows fetched per server-side cursor round trip
+EXPORT_CHUNK_ROWS = 500  # Rows serialized per response chunk
+
+
+def _export_rows(query):
+    """Yield export dicts for (AdminLog, username) rows streamed from a server-side cursor"""
+    for log, username in query.yield_per(EXPORT_YIELD_PER):
+        yield {
+            "id": log.id,
+            "timestamp": log.timestamp.isoformat(),
+            "event_type": log.event_type,
+            "user_id": log.user_id,
+            "username": username or "Anonymous",
+            "ip_address": log.ip_address,
+            "user_agent": log.user_agent,
+            "request_id": log.request_id,
+            "event_details": log.event_details_dict,
+        }
+
+
+def _chunked(rows, size=EXPORT_CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _serialize_export(rows, format_type):
+    """Yield export text chunks in CSV, NDJSON or JSON array form"""
+    if format_type == "csv":
+        import csv
+        import io
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["Timestamp", "Event Type", "Username", "IP Address", "Details", "ID"])
+        for chunk in _chunked(rows):
+            for log in chunk:
                 writer.writerow(
                     [
                         log["timestamp"],
@@ -390,25 +404,115 @@ def export_admin_logs():
                         log["username"],
                         log["ip_address"],
                         json.dumps(log["event_details"]),
+                        log["id"],
                     ]
                 )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue()
 
-            response = make_response(output.getvalue())
-            response.headers["Content-Type"] = "text/csv"
-            response.headers["Content-Disposition"] = (
-                f"attachment; filename=admin_logs_{days}days.csv"
-            )
-            return response
+    elif format_type == "ndjson":
+        for chunk in _chunked(rows):
+            yield "".join(json.dumps(log, default=str) + "\n" for log in chunk)
 
-        else:  # JSON format
-            from flask import make_response
+    else:  # JSON array
+        yield "["
+        first = True
+        for chunk in _chunked(rows):
+            yield ("" if first else ",") + ",".join(json.dumps(log, default=str) for log in chunk)
+            first = False
+        yield "]"
 
-            response = make_response(json.dumps(export_data, indent=2))
-            response.headers["Content-Type"] = "application/json"
-            response.headers["Content-Disposition"] = (
-                f"attachment; filename=admin_logs_{days}days.json"
-            )
-            return response
+
+def _gzip_stream(chunks):
+    """Compress a text stream on the fly"""
+    import zlib
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@app.route("/admin/logs/export")
+@admin_required
+def export_admin_logs():
+    """
+    Stream admin logs as JSON, NDJSON or CSV
+
+    Query Parameters:
+        format: json (default), ndjson or csv
+        days: Export the last N days (default: 30) unless date_from/date_to are given
+        date_from, date_to: ISO date/datetime window [date_from, date_to)
+        sort: desc (default) or asc by timestamp
+        after: Resume after the row with this "timestamp,id" (from the last row received)
+        gzip: true to compress the file on the fly
+    """
+    try:
+        format_type = request.args.get("format", "json")
+        if format_type not in ("json", "ndjson", "csv"):
+            return jsonify({"error": f"Unsupported export format: {format_type}"}), 400
+        days = request.args.get("days", 30, type=int)
+        sort_order = request.args.get("sort", "desc")
+        use_gzip = request.args.get("gzip", "false").lower() == "true"
+
+        try:
+            date_from = request.args.get("date_from")
+            date_to = request.args.get("date_to")
+            start = datetime.fromisoformat(date_from) if date_from else datetime.now() - timedelta(days=days)
+            end = datetime.fromisoformat(date_to) if date_to else None
+
+            after = request.args.get("after")
+            after_timestamp, after_id = None, None
+            if after:
+                after_value, after_id_value = after.rsplit(",", 1)
+                after_timestamp, after_id = datetime.fromisoformat(after_value), int(after_id_value)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid export range: {str(e)}"}), 400
+
+        # Usernames come from the same query instead of a lazy load per row
+        query = (
+            db.session.query(AdminLog, User.username)
+            .outerjoin(User, AdminLog.user_id == User.id)
+            .filter(AdminLog.timestamp >= start)
+        )
+        if end is not None:
+            query = query.filter(AdminLog.timestamp < end)
+
+        if sort_order == "asc":
+            if after_timestamp is not None:
+                query = query.filter(
+                    db.tuple_(AdminLog.timestamp, AdminLog.id) > db.tuple_(after_timestamp, after_id)
+                )
+            query = query.order_by(AdminLog.timestamp.asc(), AdminLog.id.asc())
+        else:
+            if after_timestamp is not None:
+                query = query.filter(
+                    db.tuple_(AdminLog.timestamp, AdminLog.id) < db.tuple_(after_timestamp, after_id)
+                )
+            query = query.order_by(AdminLog.timestamp.desc(), AdminLog.id.desc())
+
+        chunks = _serialize_export(_export_rows(query), format_type)
+        filename = f"admin_logs_{start:%Y%m%d}_{end:%Y%m%d}" if end else f"admin_logs_{days}days"
+        filename += ".json" if format_type == "json" else f".{format_type}"
+        mimetype = {
+            "csv": "text/csv",
+            "ndjson": "application/x-ndjson",
+            "json": "application/json",
+        }[format_type]
+
+        if use_gzip:
+            chunks = _gzip_stream(chunks)
+            filename += ".gz"
+            mimetype = "application/gzip"
+
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
 
     except Exception as e:
         return jsonify({"error": f"Export failed: {str(e)}"}), 500
@@ -477,14 +581,9 @@ def format_log_details(log):
     Show Patient ID, Patient Name, Appointment ID, and form changes
     """
     # Parse event details if it's JSON
-    if log.event_details:
+    if log.event_data:
         try:
-            # Try parsing as JSON first
-            if log.event_details.startswith("{"):
-                event_data = json.loads(log.event_details)
-            else:
-                # If not JSON, try to evaluate as Python dict
-                event_data = eval(log.event_details)
+            event_data = log.event_details_dict
 
             if isinstance(event_data, dict):
                 # Get standardized action from event_data or event_type
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Admin Log Writer
+Takes audit logging off the request path: AdminLog.log_event enqueues entries into a bounded
+in-process queue and a background thread writes them in multi-row INSERT batches every
+ADMIN_LOG_FLUSH_MS milliseconds or ADMIN_LOG_BATCH_SIZE entries. Security events (and all events
+when ADMIN_LOG_ASYNC=false, or when the queue is full) are written synchronously in their own
+transaction. Queued entries are flushed on shutdown.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Events that must be on disk before the request continues
+DEFAULT_SYNC_EVENT_TYPES = "login_fail,admin_access_attempt"
+
+
+class AdminLogWriter:
+    """Bounded queue + background batch writer for admin_logs rows"""
+
+    def __init__(self, max_queue_size: int = None, batch_size: int = None, flush_interval_ms: int = None):
+        self.async_enabled = os.environ.get('ADMIN_LOG_ASYNC', 'true').lower() != 'false'
+        self.max_queue_size = max_queue_size or int(os.environ.get('ADMIN_LOG_QUEUE_SIZE', 10000))
+        self.batch_size = batch_size or int(os.environ.get('ADMIN_LOG_BATCH_SIZE', 200))
+        self.flush_interval = (flush_interval_ms or int(os.environ.get('ADMIN_LOG_FLUSH_MS', 250))) / 1000.0
+        self.sync_event_types = {
+            event_type.strip()
+            for event_type in os.environ.get('ADMIN_LOG_SYNC_EVENTS', DEFAULT_SYNC_EVENT_TYPES).split(',')
+            if event_type.strip()
+        }
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=self.max_queue_size)
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'sync_writes': 0, 'overflow_sync_writes': 0, 'dropped': 0}
+
+    def write(self, row: Dict[str, Any]):
+        """Persist an admin_logs row, asynchronously unless its event type requires durability"""
+        if not self.async_enabled or row.get('event_type') in self.sync_event_types or self._stopping.is_set():
+            self.stats['sync_writes'] += 1
+            self._write_sync([row])
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+            self.stats['queued'] += 1
+        except queue.Full:
+            # Never drop audit entries: apply backpressure to the request instead
+            self.stats['overflow_sync_writes'] += 1
+            self._write_sync([row])
+
+    def _ensure_started(self):
+        """Start the writer thread on first use (and again in forked worker processes)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # A forked child inherits the parent's queue contents but not its thread
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+                atexit.register(self.shutdown)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="admin-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Background thread: collect rows until the batch is full or the flush interval passes"""
+        from app import app
+
+        with app.app_context():
+            while not self._stopping.is_set():
+                batch = self._collect_batch()
+                if batch:
+                    self._write_batch(batch)
+
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        try:
+            self._insert(batch)
+            self.stats['batches'] += 1
+        except Exception as e:
+            logger.error(f"❌ Admin log batch of {len(batch)} failed, retrying rows individually: {e}")
+            for row in batch:
+                try:
+                    self._insert([row])
+                except Exception as row_error:
+                    self.stats['dropped'] += 1
+                    logger.error(f"❌ Dropped admin log entry {row.get('event_type')}: {row_error}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_sync(self, rows: List[Dict[str, Any]]):
+        """Write rows in their own transaction, independent of the caller's session"""
+        from app import app
+
+        if self._has_app_context():
+            self._insert(rows)
+        else:
+            with app.app_context():
+                self._insert(rows)
+
+    @staticmethod
+    def _has_app_context() -> bool:
+        from flask import has_app_context
+        return has_app_context()
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        """Multi-row INSERT of admin_logs rows"""
+        from app import db
+        from models import AdminLog
+
+        with db.engine.begin() as connection:
+            connection.execute(AdminLog.__table__.insert(), rows)
+        self.stats['written'] += len(rows)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every queued entry is written; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline or not (self._thread and self._thread.is_alive()):
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop the writer and write whatever is still queued"""
+        self.flush(timeout)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        if remaining:
+            try:
+                self._write_sync(remaining)
+            except Exception as e:
+                self.stats['dropped'] += len(remaining)
+                logger.error(f"❌ Could not write {len(remaining)} admin log entries on shutdown: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['async_enabled'] = self.async_enabled
+        return stats
+
+
+# Global instance
+admin_log_writer = AdminLogWriter()
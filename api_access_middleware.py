@@ -7,7 +7,6 @@ import logging
 from datetime import datetime
 from flask import request, session, g
 from models import AdminLog, User
-from app import db
 from datetime import datetime, timedelta
 import uuid
 import threading
@@ -239,8 +238,8 @@ class APIAccessLogger:
 
                 event_details_json = json.dumps(request_details, default=str)
 
-                # Create admin log entry with proper JSON formatting
-                admin_log = AdminLog(
+                # Queue admin log entry with proper JSON formatting
+                AdminLog.log_event(
                     user_id=user_id,
                     event_type="data_access",
                     event_details=event_details_json,
@@ -253,16 +252,9 @@ class APIAccessLogger:
                     ),
                 )
 
-                db.session.add(admin_log)
-                db.session.commit()
-
         except Exception as e:
             logger.error(f"Error logging API access: {str(e)}")
             # Don't let logging errors break the application
-            try:
-                db.session.rollback()
-            except:
-                pass
 
     @staticmethod
     def should_log_route(route_path):
@@ -12,7 +12,6 @@ from models import (
     Screening,
     MedicalDocument,
     Appointment,
-    PatientAlert,
     ScreeningType, # Import ScreeningType model
     Keyword, # Import Keyword model
     ScreeningKeyword, # Import ScreeningKeyword model
@@ -21,12 +20,10 @@ from models import (
 from jwt_utils import jwt_required, optional_jwt, admin_required
 from cache_manager import cache_route, invalidate_cache_pattern, cache_manager
 from db_utils import (
-    get_patient_by_id_or_404,
     search_patients,
     get_appointments_for_date,
     get_patient_recent_vitals,
     get_patient_recent_visits,
-    get_patient_screenings,
     serialize_patient_basic,
     serialize_appointment,
 )
@@ -36,6 +33,7 @@ import time
 from sqlalchemy import func, or_
 from comprehensive_logging import log_patient_operation, log_data_modification
 import json
+from patient_chart_loader import get_patient_chart
 
 logger = logging.getLogger(__name__)
 
@@ -43,17 +41,24 @@ logger = logging.getLogger(__name__)
 @app.route("/api/patients", methods=["GET"])
 @csrf.exempt
 @jwt_required
-@cache_route(timeout=300, vary_on=["page", "per_page", "search", "sort", "order"])
+@cache_route(
+    timeout=300,
+    vary_on=["page", "cursor", "per_page", "search", "sort", "order", "include_total"],
+)
 def api_patients():
     """
     Get paginated list of patients (JWT protected)
 
     Query parameters:
+    - cursor: pagination.next_cursor of the previous page (preferred over page)
     - page: Page number (default: 1)
     - per_page: Items per page (default: 20, max: 100)
-    - search: Search term for name or MRN
-    - sort: Sort field (name, mrn, age, created_at)
+    - search: Search term for name, MRN or email
+    - sort: Sort field (relevance, name, mrn, age, created_at; default relevance
+      when searching, otherwise created_at)
     - order: Sort order (asc, desc)
+    - include_total: true to count all matches on every page (default: first page only;
+      total and pages are null when not counted)
     """
     try:
         # Get and validate query parameters
@@ -75,8 +80,10 @@ def api_patients():
         if len(search_term) > 100:
             return jsonify({"error": "search term must be maximum 100 characters"}), 400
 
-        sort_field = request.args.get("sort", "created_at")
-        valid_sort_fields = ["name", "mrn", "age", "created_at"]
+        cursor = request.args.get("cursor") or None
+
+        sort_field = request.args.get("sort", "relevance" if search_term else "created_at")
+        valid_sort_fields = ["relevance", "name", "mrn", "age", "created_at"]
         if sort_field not in valid_sort_fields:
             return (
                 jsonify(
@@ -91,9 +98,25 @@ def api_patients():
         if sort_order not in ["asc", "desc"]:
             return jsonify({"error": 'order must be either "asc" or "desc"'}), 400
 
+        include_total = request.args.get("include_total", "").lower() in ["1", "true"]
+
         # Use shared search function
-        pagination = search_patients(
-            search_term, page, per_page, sort_field, sort_order
+        try:
+            results = search_patients(
+                search_term,
+                page,
+                per_page,
+                sort_field,
+                sort_order,
+                cursor=cursor,
+                with_total=include_total or None,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        pages = (
+            (results.total + per_page - 1) // per_page
+            if results.total is not None
+            else None
         )
 
         # Serialize patients with minimal fields for list view
@@ -116,7 +139,7 @@ def api_patients():
                     else None
                 ),  # Date only, not full timestamp
             }
-            for patient in pagination.items
+            for patient in results.patients
         ]
 
         return (
@@ -124,14 +147,15 @@ def api_patients():
                 {
                     "patients": patients_data,
                     "pagination": {
-                        "page": pagination.page,
-                        "per_page": pagination.per_page,
-                        "total": pagination.total,
-                        "pages": pagination.pages,
-                        "has_next": pagination.has_next,
-                        "has_prev": pagination.has_prev,
-                        "next_num": pagination.next_num,
-                        "prev_num": pagination.prev_num,
+                        "page": None if cursor else page,
+                        "per_page": per_page,
+                        "total": results.total,
+                        "pages": pages,
+                        "has_next": results.next_cursor is not None,
+                        "has_prev": bool(cursor) or page > 1,
+                        "next_num": page + 1 if not cursor and results.next_cursor else None,
+                        "prev_num": page - 1 if not cursor and page > 1 else None,
+                        "next_cursor": results.next_cursor,
                     },
                     "search": search_term,
                     "sort": {"field": sort_field, "order": sort_order},
@@ -148,15 +172,16 @@ def api_patients():
 @app.route("/api/patients/<patient_id>", methods=["GET"])
 @csrf.exempt
 @jwt_required
-@cache_route(timeout=600, vary_on=["patient_id"])
 def api_patient_detail(patient_id):
     """
     Get detailed information for a specific patient (JWT protected)
     """
     try:
-        patient = get_patient_by_id_or_404(patient_id)
-        if not patient:
+        # Cached chart read-model; its key changes with every write to the chart
+        chart = get_patient_chart(int(patient_id)) if str(patient_id).isdigit() else None
+        if chart is None:
             return jsonify({"error": "Patient not found"}), 404
+        patient = chart.patient
 
         # Get query parameters for lazy loading
         include_vitals = request.args.get("include_vitals", "false").lower() == "true"
@@ -166,59 +191,12 @@ def api_patient_detail(patient_id):
         )
         include_alerts = request.args.get("include_alerts", "false").lower() == "true"
 
-        # Load only essential condition data
-        conditions = (
-            Condition.query.filter_by(patient_id=patient.id, is_active=True)
-            .with_entities(Condition.id, Condition.name, Condition.code)
-            .limit(5)
-            .all()
-        )
-
-        # Conditionally load heavy data with minimal fields
-        recent_vitals = []
-        if include_vitals:
-            vitals = (
-                Vital.query.filter_by(patient_id=patient.id)
-                .with_entities(
-                    Vital.id,
-                    Vital.date,
-                    Vital.weight,
-                    Vital.height,
-                    Vital.blood_pressure_systolic,
-                    Vital.blood_pressure_diastolic,
-                )
-                .order_by(Vital.date.desc())
-                .limit(3)
-                .all()
-            )
-            recent_vitals = vitals
-
-        recent_visits = []
-        if include_visits:
-            visits = (
-                Visit.query.filter_by(patient_id=patient.id)
-                .with_entities(
-                    Visit.id, Visit.visit_date, Visit.visit_type, Visit.provider
-                )
-                .order_by(Visit.visit_date.desc())
-                .limit(3)
-                .all()
-            )
-            recent_visits = visits
-
-        screenings = get_patient_screenings(patient.id) if include_screenings else []
+        conditions = chart.conditions[:5]
+        recent_vitals = chart.vitals[:3] if include_vitals else []
+        recent_visits = chart.visits[:3] if include_visits else []
+        screenings = chart.screenings[:20] if include_screenings else []
         alerts = (
-            PatientAlert.query.filter_by(patient_id=patient.id, is_active=True)
-            .with_entities(
-                PatientAlert.id,
-                PatientAlert.alert_type,
-                PatientAlert.description,
-                PatientAlert.severity,
-            )
-            .limit(5)
-            .all()
-            if include_alerts
-            else []
+            [a for a in chart.alerts if a.is_active][:5] if include_alerts else []
         )
 
         # Serialize patient data with essential fields only
@@ -272,7 +250,7 @@ def api_patient_detail(patient_id):
                         s.last_completed.isoformat() if s.last_completed else None
                     ),
                     "frequency": s.frequency,
-                    "priority": s.priority,
+                    "status": s.status,
                     "notes": s.notes,
                 }
                 for s in screenings
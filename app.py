@@ -1309,6 +1309,10 @@ with app.app_context():
     from medical_terminology_api_routes import terminology_api
     app.register_blueprint(terminology_api)
 
+    # Register FHIR API routes (token-authenticated, see fhir_api_routes)
+    from fhir_api_routes import register_fhir_routes
+    register_fhir_routes(app)
+
     # Initialize async database manager
     from async_db_utils import init_async_db
 
@@ -1342,6 +1346,10 @@ with app.app_context():
         import time
         from datetime import datetime, timedelta
 
+        # Imported here, not in the thread: these modules import app, which is still importing
+        from admin_log_cleanup import cleanup_old_admin_logs
+        from auth_principal_cache import prune_auth_change_feed
+
         def cleanup_task():
             while True:
                 try:
@@ -1356,14 +1364,14 @@ with app.app_context():
 
                     # Perform cleanup
                     with app.app_context():
-                        from admin_log_cleanup import cleanup_old_admin_logs
-
                         deleted_count = cleanup_old_admin_logs(10)
                         if deleted_count > 0:
                             logger.info(
                                 f"Daily cleanup: Removed {deleted_count} old admin log entries"
                             )
 
+                        prune_auth_change_feed()
+
                 except Exception as e:
                     logger.error(f"Error in admin log cleanup task: {str(e)}")
                     # Sleep for 1 hour before retrying
@@ -1433,6 +1441,16 @@ with app.app_context():
                 else:
                     raise
 
+    # Make sure this month's admin log partitions exist before the first cleanup run. Runs on the
+    # main thread: admin_log_storage imports app, so importing it from a thread started during
+    # this module's import deadlocks on the import locks.
+    try:
+        from admin_log_storage import ensure_partitions
+
+        ensure_partitions()
+    except Exception as e:
+        logger.error(f"Error creating admin log partitions: {str(e)}")
+
 # Log application startup information
 from logging_config import log_application_startup
 
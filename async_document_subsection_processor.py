@@ -16,6 +16,7 @@ from enum import Enum
 from database_access_layer import DatabaseAccessLayer
 from intelligent_cache_manager import get_cache_manager
 from document_screening_matcher import DocumentScreeningMatcher
+from screening_rule_set import get_screening_rule_set
 from cutoff_utils import get_cutoff_date_for_patient
 
 logger = logging.getLogger(__name__)
@@ -447,39 +448,42 @@ class AsyncDocumentSubsectionProcessor:
     
     async def _get_screening_types_for_subsection(self, subsection: MedicalSubsection) -> List[Dict]:
         """Get screening types relevant to subsection"""
-        cache_key = f"screening_types_subsection_{subsection.value}"
-        cached_data = self.cache_manager.get(cache_key)
-        
-        if cached_data:
-            return cached_data
-        
-        # Get screening types from database
+        # The rule set snapshot is already in memory and versioned, so it is not re-cached here
         config = self.subsection_config[subsection]
         screening_types = await asyncio.get_event_loop().run_in_executor(
             self.executor,
-            self.db_layer.get_screening_types_by_relevance,
+            self.get_screening_types_by_relevance,
             config['screening_relevance']
         )
         
-        if screening_types:
-            self.cache_manager.set(cache_key, screening_types, timeout=600)
-        
         return screening_types or []
     
+    def get_screening_types_by_relevance(self, screening_relevance: List[str]) -> List[Dict]:
+        """Active screening types named in a subsection's relevance list, from the compiled rule set"""
+        relevant_names = {name.lower().replace(' ', '_') for name in screening_relevance}
+        rule_set = get_screening_rule_set()
+        return [
+            {
+                'id': rule.id,
+                'name': rule.name,
+                'description': rule.description,
+                'min_age': rule.min_age,
+                'max_age': rule.max_age,
+                'gender_specific': rule.gender_specific,
+                'trigger_conditions': list(rule.trigger_conditions),
+                'rule_set_version': rule_set.version
+            }
+            for rule in rule_set
+            if rule.name.lower().replace(' ', '_') in relevant_names
+        ]
+    
     def _check_demographic_eligibility(self, patient_demographics: Dict, screening_type: Dict) -> bool:
-        """Check demographic eligibility for screening type"""
-        # Age check
-        if screening_type.get('min_age') and patient_demographics.get('age', 0) < screening_type['min_age']:
-            return False
-        
-        if screening_type.get('max_age') and patient_demographics.get('age', 999) > screening_type['max_age']:
-            return False
-        
-        # Gender check
-        if screening_type.get('gender_specific') and patient_demographics.get('gender') != screening_type['gender_specific']:
+        """Check demographic eligibility for screening type using the compiled age/sex predicates"""
+        rule = get_screening_rule_set().get(screening_type.get('id'))
+        if rule is None:
             return False
         
-        return True
+        return rule.demographic_mismatch(patient_demographics.get('age'), patient_demographics.get('gender')) is None
     
     async def _process_document_screening_match(self, document: Dict, screening_type: Dict, subsection: MedicalSubsection, config: Dict) -> Dict[str, Any]:
         """Process document-screening match with subsection context"""
@@ -21,7 +21,7 @@ import traceback
 from database_access_layer import DatabaseAccessLayer
 from intelligent_cache_manager import get_cache_manager
 from document_screening_matcher import DocumentScreeningMatcher
-from automated_edge_case_handler import AutomatedScreeningRefreshManager
+from screening_rule_set import get_screening_rule_set
 from cutoff_utils import get_cutoff_date_for_patient
 
 logger = logging.getLogger(__name__)
@@ -39,7 +39,6 @@ class AsyncScreeningProcessor:
         self.db_layer = DatabaseAccessLayer()
         self.cache_manager = get_cache_manager()
         self.document_matcher = DocumentScreeningMatcher()
-        self.edge_case_handler = AutomatedScreeningRefreshManager()
         
         # Medical data subsections
         self.medical_subsections = {
@@ -84,7 +83,7 @@ class AsyncScreeningProcessor:
                 'first_name': patient.first_name,
                 'last_name': patient.last_name,
                 'date_of_birth': patient.date_of_birth,
-                'gender': patient.gender,
+                'gender': patient.sex,
                 'age': self._calculate_age(patient.date_of_birth) if patient.date_of_birth else None
             }
         except Exception as e:
@@ -113,26 +112,24 @@ class AsyncScreeningProcessor:
             return None
     
     def get_screening_types_for_subsection(self, subsection: str) -> List[Dict[str, Any]]:
-        """Get screening types relevant to a medical subsection"""
+        """Get screening types relevant to a medical subsection from the compiled rule set snapshot"""
         try:
-            from models import ScreeningType
-            screening_types = ScreeningType.query.filter(
-                ScreeningType.is_active == True
-            ).all()
+            rule_set = get_screening_rule_set()
             
             # Filter by subsection relevance
             relevant_types = []
-            for st in screening_types:
+            for rule in rule_set:
                 # Simple heuristic based on screening type name
-                if self._is_screening_type_relevant_to_subsection(st.name, subsection):
+                if self._is_screening_type_relevant_to_subsection(rule.name, subsection):
                     relevant_types.append({
-                        'id': st.id,
-                        'name': st.name,
-                        'description': st.description,
-                        'min_age': st.min_age,
-                        'max_age': st.max_age,
-                        'gender_specific': st.gender_specific,
-                        'trigger_conditions': st.trigger_conditions
+                        'id': rule.id,
+                        'name': rule.name,
+                        'description': rule.description,
+                        'min_age': rule.min_age,
+                        'max_age': rule.max_age,
+                        'gender_specific': rule.gender_specific,
+                        'trigger_conditions': list(rule.trigger_conditions),
+                        'rule_set_version': rule_set.version
                     })
                     
             return relevant_types
@@ -670,68 +667,28 @@ class AsyncScreeningProcessor:
     
     async def _get_screening_types_for_subsection(self, subsection: str) -> List[Dict]:
         """Get screening types relevant to a medical subsection"""
-        cache_key = f"screening_types_subsection_{subsection}"
-        cached_data = self.cache_manager.get(cache_key)
-        
-        if cached_data:
-            self.metrics['cache_hits'] += 1
-            return cached_data
-        
-        # Get from database
+        # The rule set snapshot is already in memory and versioned, so it is not re-cached here
         screening_types = await asyncio.get_event_loop().run_in_executor(
             self.executor,
-            self.db_layer.get_screening_types_for_subsection,
+            self.get_screening_types_for_subsection,
             subsection
         )
-        
-        if screening_types:
-            self.cache_manager.set(cache_key, screening_types, timeout=600)
-            self.metrics['cache_misses'] += 1
-        
         return screening_types or []
     
     def _check_demographic_eligibility(self, patient_demographics: Dict, screening_type: Dict) -> bool:
         """Check if patient demographics match screening type eligibility"""
-        try:
-            # Age check
-            if screening_type.get('min_age') and patient_demographics.get('age', 0) < screening_type['min_age']:
-                return False
-            
-            if screening_type.get('max_age') and patient_demographics.get('age', 999) > screening_type['max_age']:
-                return False
-            
-            # Gender check
-            if screening_type.get('gender_specific') and patient_demographics.get('gender') != screening_type['gender_specific']:
-                return False
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Demographic eligibility check error: {e}")
-            return False
+        return self._check_demographic_eligibility_detailed(patient_demographics, screening_type)['eligible']
     
     def _check_demographic_eligibility_detailed(self, patient_demographics: Dict, screening_type: Dict) -> Dict[str, Any]:
-        """Detailed demographic eligibility check with reasons"""
+        """Detailed demographic eligibility check with reasons, using the compiled age/sex predicates"""
         try:
-            # Age check
-            if screening_type.get('min_age') and patient_demographics.get('age', 0) < screening_type['min_age']:
-                return {
-                    'eligible': False,
-                    'reason': f"Patient age {patient_demographics.get('age')} below minimum {screening_type['min_age']}"
-                }
+            rule = get_screening_rule_set().get(screening_type.get('id'))
+            if rule is None:
+                return {'eligible': False, 'reason': f"Screening type {screening_type.get('name')} is not active"}
             
-            if screening_type.get('max_age') and patient_demographics.get('age', 999) > screening_type['max_age']:
-                return {
-                    'eligible': False,
-                    'reason': f"Patient age {patient_demographics.get('age')} above maximum {screening_type['max_age']}"
-                }
-            
-            # Gender check
-            if screening_type.get('gender_specific') and patient_demographics.get('gender') != screening_type['gender_specific']:
-                return {
-                    'eligible': False,
-                    'reason': f"Patient gender {patient_demographics.get('gender')} does not match required {screening_type['gender_specific']}"
-                }
+            mismatch = rule.demographic_mismatch(patient_demographics.get('age'), patient_demographics.get('gender'))
+            if mismatch:
+                return {'eligible': False, 'reason': mismatch}
             
             return {'eligible': True, 'reason': 'All eligibility criteria met'}
             
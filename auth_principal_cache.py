@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Authenticated Principal Cache
+Per-worker LRU of the user fields JWT-protected routes read (id, username, email, is_admin,
+token_version), so a request with a valid token is authenticated without a user query.
+
+Tokens carry the user's token_version ("tv" claim); a token whose version is older than the
+user's current one is rejected. Logout, password changes and user deletes bump the version or
+remove the user, which writes a user_auth_change row in the same transaction. The worker that
+commits the change evicts the user at once; every other worker polls the feed at most every
+AUTH_REVOCATION_CHECK_SECONDS, and entries never outlive AUTH_PRINCIPAL_CACHE_TTL. Feed rows
+older than AUTH_CHANGE_RETENTION_HOURS are pruned by the daily cleanup task.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from models import User, UserAuthChange
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AuthenticatedPrincipal:
+    """Immutable copy of the User columns used for authentication and authorization"""
+
+    id: int
+    username: str
+    email: str
+    is_admin: bool
+    token_version: int
+
+    is_authenticated = True
+
+    @classmethod
+    def from_user(cls, user: User) -> 'AuthenticatedPrincipal':
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_admin=bool(user.is_admin),
+            token_version=user.token_version or 0,
+        )
+
+    def get_user(self) -> Optional[User]:
+        """ORM row, for routes that need to modify the user"""
+        return db.session.get(User, self.id)
+
+
+class PrincipalCache:
+    """Short-TTL LRU of AuthenticatedPrincipal by user id, invalidated through user_auth_change"""
+
+    def __init__(self, ttl: float = None, max_size: int = None, check_interval: float = None):
+        self.ttl = ttl if ttl is not None else float(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL', 30))
+        self.max_size = max_size if max_size is not None else int(os.environ.get('AUTH_PRINCIPAL_CACHE_SIZE', 4096))
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.environ.get('AUTH_REVOCATION_CHECK_SECONDS', 1)
+        )
+        # Feed rows are re-read for this long so rows from transactions that committed late aren't missed
+        self.feed_overlap = timedelta(seconds=max(5.0, self.check_interval * 2))
+
+        self._entries: 'OrderedDict[int, tuple[AuthenticatedPrincipal, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._checked_at = 0.0
+        self._feed_since: Optional[datetime] = None
+        self.hits = 0
+        self.misses = 0
+
+    def authenticate(self, payload: Dict) -> Optional[AuthenticatedPrincipal]:
+        """Principal for a decoded token payload; None if the user is gone or the token was revoked"""
+        user_id = payload.get("user_id")
+        if user_id is None:
+            return None
+        token_version = payload.get("tv", 0)
+
+        self._poll_feed()
+        principal = self._get(user_id)
+        if principal is None or token_version > principal.token_version:
+            # Unknown user, or a token newer than the cached row: read the user
+            self.misses += 1
+            principal = self._load(user_id)
+            if principal is None:
+                return None
+        else:
+            self.hits += 1
+
+        if token_version != principal.token_version:
+            logger.info(f"Rejected revoked token for user {user_id} (version {token_version})")
+            return None
+        return principal
+
+    def evict(self, user_ids: Iterable[int]):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _get(self, user_id: int) -> Optional[AuthenticatedPrincipal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[0]
+
+    def _load(self, user_id: int) -> Optional[AuthenticatedPrincipal]:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        principal = AuthenticatedPrincipal.from_user(user)
+        with self._lock:
+            self._entries[user_id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return principal
+
+    def _poll_feed(self):
+        """Evict users changed by other workers since the last poll"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if not self._poll_lock.acquire(blocking=False):
+            return  # Another thread is polling
+        try:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return
+            polled_at = datetime.utcnow()
+            if self._feed_since is None:
+                # First poll: nothing is cached yet, start from now
+                self._feed_since = polled_at - self.feed_overlap
+                self._checked_at = time.monotonic()
+                return
+
+            changed = db.session.query(UserAuthChange.user_id).filter(
+                UserAuthChange.created_at >= self._feed_since
+            ).distinct().all()
+            if changed:
+                self.evict(user_id for (user_id,) in changed)
+            self._feed_since = polled_at - self.feed_overlap
+            self._checked_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Could not poll user auth changes, clearing principal cache: {str(e)}")
+            self.clear()
+            self._checked_at = time.monotonic()
+        finally:
+            self._poll_lock.release()
+
+
+# Global instance
+principal_cache = PrincipalCache()
+
+
+def prune_auth_change_feed(retention_hours: float = None) -> int:
+    """
+    Delete user_auth_change rows older than the retention window
+
+    Workers only read rows newer than their last poll, and a principal cached before an older
+    change has expired long before the window ends, so pruned rows are never needed.
+
+    Returns:
+        int: Number of rows deleted
+    """
+    if retention_hours is None:
+        retention_hours = float(os.environ.get('AUTH_CHANGE_RETENTION_HOURS', 24))
+    # Never prune rows a worker can still need
+    min_retention = timedelta(seconds=principal_cache.ttl) + principal_cache.feed_overlap
+    cutoff = datetime.utcnow() - max(timedelta(hours=retention_hours), min_retention)
+
+    deleted = db.session.execute(
+        UserAuthChange.__table__.delete().where(UserAuthChange.created_at < cutoff)
+    ).rowcount
+    db.session.commit()
+    if deleted:
+        logger.info(f"Pruned {deleted} user auth change rows older than {cutoff}")
+    return deleted
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _note_user_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('auth_changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_user_commit(session):
+    user_ids = session.info.pop('auth_changed_user_ids', None)
+    if user_ids:
+        principal_cache.evict(user_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_user_change(session, previous_transaction):
+    session.info.pop('auth_changed_user_ids', None)
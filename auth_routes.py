@@ -2,7 +2,7 @@ from flask import request, jsonify
 from werkzeug.security import check_password_hash
 from app import app, db, csrf
 from models import User
-from jwt_utils import generate_jwt_token, jwt_required, refresh_token
+from jwt_utils import generate_jwt_token, jwt_required, refresh_token, authenticate_token
 import logging
 from datetime import datetime, timedelta
 import jwt
@@ -110,7 +110,9 @@ def jwt_login():
             return jsonify({"error": "Invalid username or password"}), 401
 
         # Generate JWT token with admin role
-        access_token = generate_jwt_token(user.id, user.username, user.is_admin)
+        access_token = generate_jwt_token(
+            user.id, user.username, user.is_admin, user.token_version
+        )
 
         logger.info(f"Successful JWT login for user: {user.username}")
 
@@ -243,7 +245,9 @@ def jwt_register():
         db.session.commit()
 
         # Generate JWT token for the new user
-        access_token = generate_jwt_token(new_user.id, new_user.username)
+        access_token = generate_jwt_token(
+            new_user.id, new_user.username, token_version=new_user.token_version
+        )
 
         logger.info(f"New user registered: {new_user.username}")
 
@@ -421,9 +425,23 @@ def jwt_verify():
 @csrf.exempt
 def jwt_logout():
     """
-    Logout endpoint that clears the HTTP-only cookie
+    Logout endpoint that revokes the user's tokens and clears the HTTP-only cookie
     """
     try:
+        token = request.cookies.get("auth_token")
+        auth_header = request.headers.get("Authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            token = auth_header[7:]
+
+        principal = authenticate_token(token) if token else None
+        if principal:
+            # Bumping token_version invalidates this and every other token of the user
+            user = principal.get_user()
+            if user:
+                user.revoke_tokens()
+                db.session.commit()
+                logger.info(f"Revoked tokens on logout for user: {user.username}")
+
         response = jsonify({"success": True, "message": "Logout successful"})
 
         # Clear the HTTP-only cookie
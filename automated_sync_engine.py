@@ -1,100 +1,319 @@
 """
 Automated Synchronization Engine
 Ensures unified screening engine results are synchronized with database records
+
+Patients are synced in batches: each batch preloads its screenings and screening-document
+links in two queries, diffs them in memory against the unified engine results, and applies
+the inserts, updates and link changes as bulk statements before committing.
 """
 
-from models import Patient, Screening, MedicalDocument, db
-from unified_screening_engine import unified_engine
 import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import defer, selectinload
+
+from models import Patient, Screening, MedicalDocument, bump_patient_chart_versions, db, screening_documents
+from screening_rule_set import get_screening_rule_set
+from unified_screening_engine import unified_engine
 
 logger = logging.getLogger(__name__)
 
+# Fields of a screening row that the unified engine results determine
+SYNCED_FIELDS = ('status', 'due_date', 'last_completed', 'frequency')
+
+
+def _as_date(value):
+    """Screening dates are DATE columns; the engine may report datetimes"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+@dataclass
+class SyncProgress:
+    """Progress of a sync run, reported after every committed batch"""
+    total_patients: int = 0
+    processed_patients: int = 0
+    failed_patients: int = 0
+    screenings_inserted: int = 0
+    screenings_updated: int = 0
+    links_added: int = 0
+    links_removed: int = 0
+    batches_committed: int = 0
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def updates_made(self) -> int:
+        """Screenings inserted or changed (status, dates, frequency or documents)"""
+        return self.screenings_inserted + self.screenings_updated
+
+    @property
+    def percent_complete(self) -> float:
+        if not self.total_patients:
+            return 100.0
+        return round(100.0 * (self.processed_patients + self.failed_patients) / self.total_patients, 1)
+
+    def to_dict(self) -> Dict:
+        progress = asdict(self)
+        progress['updates_made'] = self.updates_made
+        progress['percent_complete'] = self.percent_complete
+        progress['elapsed_seconds'] = round(time.time() - self.started_at, 2)
+        return progress
+
+
+@dataclass
+class _BatchDiff:
+    inserts: List[Dict] = field(default_factory=list)
+    insert_documents: Dict[Tuple[int, int], Set[int]] = field(default_factory=dict)
+    updates: List[Dict] = field(default_factory=list)
+    links_added: List[Tuple[int, int]] = field(default_factory=list)
+    links_removed: List[Tuple[int, int]] = field(default_factory=list)
+    changed_screening_ids: Set[int] = field(default_factory=set)
+    patient_ids: Set[int] = field(default_factory=set)
+
+
 class AutomatedSyncEngine:
     """Synchronizes unified engine results with database records"""
-    
+
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or int(os.environ.get('SCREENING_SYNC_BATCH_SIZE', 100))
+        self.last_progress: Optional[SyncProgress] = None
+
     def sync_patient_screenings(self, patient_id):
         """Synchronize unified engine results with database for a single patient"""
-        try:
-            # Get unified engine results
-            unified_results = unified_engine.generate_patient_screenings(patient_id)
-            
-            updates_made = 0
-            
-            for unified_screening in unified_results:
-                screening_type_name = unified_screening.get('screening_type')
-                
-                # Find corresponding database record
-                db_screening = Screening.query.filter_by(
-                    patient_id=patient_id,
-                    screening_type=screening_type_name
-                ).first()
-                
-                if db_screening:
-                    # Check if update is needed
-                    unified_status = unified_screening.get('status', 'Incomplete')
-                    status_changed = db_screening.status != unified_status
-                    
-                    matched_doc_ids = unified_screening.get('matched_documents', [])
-                    current_doc_ids = [doc.id for doc in db_screening.documents]
-                    docs_changed = set(matched_doc_ids) != set(current_doc_ids)
-                    
-                    if status_changed or docs_changed:
-                        # Update status
-                        db_screening.status = unified_status
-                        
-                        # Update last completed date
-                        if unified_screening.get('last_completed'):
-                            db_screening.last_completed = unified_screening.get('last_completed')
-                        
-                        # Clear and rebuild document relationships
-                        db_screening.documents = []
-                        
-                        # Add new document relationships
-                        for doc_id in matched_doc_ids:
-                            doc = MedicalDocument.query.get(doc_id)
-                            if doc:
-                                db_screening.documents.append(doc)
-                        
-                        updates_made += 1
-                        logger.info(f"Updated {screening_type_name} for patient {patient_id}: {unified_status}")
-                        
-            if updates_made > 0:
+        return self.sync_patients([patient_id]).updates_made
+
+    def sync_patients(self, patient_ids: List[int],
+                      progress_callback: Optional[Callable[[SyncProgress], None]] = None) -> SyncProgress:
+        """
+        Synchronize patients in batches, committing after each batch
+
+        Args:
+            patient_ids: Patients to synchronize
+            progress_callback: Called with the run's SyncProgress after every batch
+
+        Returns:
+            SyncProgress of the finished run
+        """
+        progress = SyncProgress(total_patients=len(patient_ids))
+        self.last_progress = progress
+
+        for start in range(0, len(patient_ids), self.batch_size):
+            batch_ids = patient_ids[start:start + self.batch_size]
+            try:
+                counts = self._sync_batch(batch_ids)
                 db.session.commit()
-                logger.info(f"Synchronized {updates_made} screenings for patient {patient_id}")
-            
-            return updates_made
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error syncing patient {patient_id}: {e}")
-            return 0
-    
-    def sync_all_patients(self):
+                for name, count in counts.items():
+                    setattr(progress, name, getattr(progress, name) + count)
+                progress.processed_patients += len(batch_ids)
+                progress.batches_committed += 1
+            except Exception as e:
+                db.session.rollback()
+                progress.failed_patients += len(batch_ids)
+                logger.error(f"Error syncing patients {batch_ids[0]}-{batch_ids[-1]}: {e}")
+
+            if len(patient_ids) > self.batch_size:
+                logger.info(
+                    f"Screening sync {progress.percent_complete}%: "
+                    f"{progress.processed_patients}/{progress.total_patients} patients, "
+                    f"{progress.updates_made} screenings changed"
+                )
+            if progress_callback:
+                progress_callback(progress)
+
+        if progress.updates_made:
+            logger.info(
+                f"Synchronized {progress.updates_made} screenings for {progress.processed_patients} patients "
+                f"({progress.links_added} document links added, {progress.links_removed} removed)"
+            )
+        return progress
+
+    def sync_all_patients(self, progress_callback: Optional[Callable[[SyncProgress], None]] = None):
         """Synchronize unified engine results for all patients"""
         try:
-            patients = Patient.query.all()
-            total_updates = 0
-            
-            for patient in patients:
-                updates = self.sync_patient_screenings(patient.id)
-                total_updates += updates
-                
-            logger.info(f"Synchronized {total_updates} screenings across {len(patients)} patients")
-            return total_updates
-            
+            patient_ids = [patient_id for (patient_id,) in db.session.query(Patient.id).order_by(Patient.id)]
+            progress = self.sync_patients(patient_ids, progress_callback)
+
+            logger.info(f"Synchronized {progress.updates_made} screenings across {len(patient_ids)} patients")
+            return progress.updates_made
+
         except Exception as e:
             logger.error(f"Error in system-wide sync: {e}")
             return 0
-    
+
     def sync_after_document_upload(self, patient_id, document_id):
         """Sync screenings after a new document is uploaded"""
         logger.info(f"Syncing screenings after document {document_id} uploaded for patient {patient_id}")
         return self.sync_patient_screenings(patient_id)
-    
-    def sync_after_screening_type_change(self, screening_type_id):
+
+    def sync_after_screening_type_change(self, screening_type_id,
+                                         progress_callback: Optional[Callable[[SyncProgress], None]] = None):
         """Sync all patients after a screening type is modified"""
         logger.info(f"Syncing all patients after screening type {screening_type_id} was modified")
-        return self.sync_all_patients()
+        return self.sync_all_patients(progress_callback)
+
+    def get_progress(self) -> Optional[Dict]:
+        """Progress of the current or last sync run"""
+        return self.last_progress.to_dict() if self.last_progress else None
+
+    def _sync_batch(self, patient_ids: List[int]) -> Dict[str, int]:
+        """Generate, diff and apply one batch of patients (the caller commits); returns change counts"""
+        patients = Patient.query.options(selectinload(Patient.conditions)).filter(Patient.id.in_(patient_ids)).all()
+        documents = {patient.id: [] for patient in patients}
+        for document in MedicalDocument.query.options(
+            defer(MedicalDocument.content), defer(MedicalDocument.binary_data)
+        ).filter(MedicalDocument.patient_id.in_(list(documents))):
+            documents[document.patient_id].append(document)
+
+        rules = get_screening_rule_set().rules
+        results = {
+            patient.id: unified_engine.generate_screenings_from_data(patient, rules, documents[patient.id])
+            for patient in patients
+        }
+        existing, links = self._load_current_state(list(results))
+
+        diff = self._diff(results, existing, links, documents)
+        return self._apply(diff)
+
+    @staticmethod
+    def _load_current_state(patient_ids: List[int]):
+        """
+        Screenings and their document ids, in two queries. Screenings are keyed by
+        (patient_id, screening_type_id); rows without a type id by (patient_id, screening type name).
+        """
+        existing = {}
+        for row in db.session.execute(
+            select(Screening.id, Screening.patient_id, Screening.screening_type_id, Screening.screening_type, *[
+                getattr(Screening, name) for name in SYNCED_FIELDS
+            ])
+            .where(Screening.patient_id.in_(patient_ids))
+            .order_by(Screening.id)
+        ):
+            existing.setdefault((row.patient_id, row.screening_type_id or row.screening_type), row)
+
+        links = {}
+        for screening_id, document_id in db.session.execute(
+            select(screening_documents.c.screening_id, screening_documents.c.document_id)
+            .join(Screening, Screening.id == screening_documents.c.screening_id)
+            .where(Screening.patient_id.in_(patient_ids))
+        ):
+            links.setdefault(screening_id, set()).add(document_id)
+        return existing, links
+
+    @staticmethod
+    def _diff(results: Dict[int, List[Dict]], existing: Dict, links: Dict[int, Set[int]],
+              documents: Dict[int, List]) -> _BatchDiff:
+        diff = _BatchDiff()
+        now = datetime.utcnow()
+
+        for patient_id, unified_results in results.items():
+            # Matched documents are linked only while they still exist
+            document_ids = {document.id for document in documents[patient_id]}
+
+            for unified_screening in unified_results:
+                screening_type_name = unified_screening.get('screening_type')
+                # Gender variants share a name, so screenings are matched on the variant's id
+                screening_type_id = unified_screening.get('screening_type_id')
+                desired_docs = set(unified_screening.get('matched_documents') or []) & document_ids
+                values = {
+                    'status': unified_screening.get('status', 'Incomplete'),
+                    'due_date': _as_date(unified_screening.get('due_date')),
+                    'last_completed': _as_date(unified_screening.get('last_completed')),
+                    'frequency': unified_screening.get('frequency'),
+                }
+
+                if screening_type_id is None:
+                    logger.warning(f"Screening '{screening_type_name}' for patient {patient_id} has no screening type id")
+                    continue
+
+                row = existing.get((patient_id, screening_type_id)) or existing.get((patient_id, screening_type_name))
+                if row is None:
+                    diff.inserts.append({
+                        'patient_id': patient_id,
+                        'screening_type': screening_type_name,
+                        'screening_type_id': screening_type_id,
+                        'is_visible': True,
+                        'is_system_generated': True,
+                        'created_at': now,
+                        'updated_at': now,
+                        **values,
+                    })
+                    diff.insert_documents[(patient_id, screening_type_id)] = desired_docs
+                    diff.patient_ids.add(patient_id)
+                    continue
+
+                # Keep the recorded completion date when the engine no longer finds one
+                if not values['last_completed']:
+                    values['last_completed'] = row.last_completed
+                current_docs = links.get(row.id, set())
+
+                if any(getattr(row, name) != values[name] for name in SYNCED_FIELDS):
+                    diff.updates.append({'id': row.id, 'updated_at': now, **values})
+                    diff.changed_screening_ids.add(row.id)
+                if desired_docs != current_docs:
+                    diff.links_added.extend((row.id, doc_id) for doc_id in desired_docs - current_docs)
+                    diff.links_removed.extend((row.id, doc_id) for doc_id in current_docs - desired_docs)
+                    diff.changed_screening_ids.add(row.id)
+                if row.id in diff.changed_screening_ids:
+                    diff.patient_ids.add(patient_id)
+        return diff
+
+    @staticmethod
+    def _apply(diff: _BatchDiff) -> Dict[str, int]:
+        """Apply a batch diff with one bulk statement per kind of change"""
+        links_added = list(diff.links_added)
+
+        if diff.inserts:
+            inserted = db.session.execute(
+                insert(Screening.__table__).returning(
+                    Screening.__table__.c.id, Screening.__table__.c.patient_id, Screening.__table__.c.screening_type_id
+                ),
+                diff.inserts,
+            )
+            for screening_id, patient_id, screening_type_id in inserted:
+                links_added.extend(
+                    (screening_id, doc_id) for doc_id in diff.insert_documents[(patient_id, screening_type_id)]
+                )
+
+        if diff.updates:
+            table = Screening.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('_id')).values(
+                    **{name: bindparam(f'_{name}') for name in SYNCED_FIELDS + ('updated_at',)}
+                ),
+                [{f'_{key}': value for key, value in row.items()} for row in diff.updates],
+            )
+
+        if diff.links_removed:
+            db.session.execute(
+                screening_documents.delete().where(
+                    screening_documents.c.screening_id == bindparam('_screening_id'),
+                    screening_documents.c.document_id == bindparam('_document_id'),
+                ),
+                [{'_screening_id': s, '_document_id': d} for s, d in diff.links_removed],
+            )
+
+        if links_added:
+            now = datetime.utcnow()
+            db.session.execute(screening_documents.insert(), [
+                {'screening_id': s, 'document_id': d, 'confidence_score': 1.0,
+                 'match_source': 'automated', 'created_at': now}
+                for s, d in links_added
+            ])
+
+        # Bulk statements bypass the ORM, so bump cached chart versions here
+        if diff.patient_ids:
+            bump_patient_chart_versions(db.session.connection(), diff.patient_ids)
+
+        return {
+            'screenings_inserted': len(diff.inserts),
+            'screenings_updated': len(diff.changed_screening_ids),
+            'links_added': len(links_added),
+            'links_removed': len(diff.links_removed),
+        }
 
 # Create global instance
-automated_sync_engine = AutomatedSyncEngine()
\ No newline at end of file
+automated_sync_engine = AutomatedSyncEngine()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Background Job Runner
+Shared scaffolding for persistent jobs run in background threads: one thread per job, resume of
+jobs left pending or running by a previous process, and cooperative cancellation that a job's
+_run_job checks between units of work.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Set
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobRunner:
+    """Starts, resumes and cancels jobs of job_model (a model with status and completed_at)"""
+
+    job_model = None
+    job_label = "job"
+    thread_name_prefix = "job"
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._threads: Dict[int, threading.Thread] = {}
+        self._cancel_requested: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def start_job(self, job_id: int) -> bool:
+        """Run (or resume) a job in a background thread; False if it is already running"""
+        with self._lock:
+            thread = self._threads.get(job_id)
+            if thread and thread.is_alive():
+                return False
+
+            self._cancel_requested.discard(job_id)
+            thread = threading.Thread(
+                target=self._run_job,
+                args=(job_id,),
+                name=f"{self.thread_name_prefix}-{job_id}",
+                daemon=True
+            )
+            self._threads[job_id] = thread
+            thread.start()
+
+        logger.info(f"🚀 Started {self.job_label} {job_id} with {self.max_workers} workers")
+        return True
+
+    def resume_incomplete_jobs(self) -> List[int]:
+        """Restart jobs left pending or running by a previous process (called at app start)"""
+        resumed = []
+        model = self.job_model
+        for job in model.query.filter(model.status.in_(['pending', 'running'])).order_by(model.id).all():
+            if self.start_job(job.id):
+                resumed.append(job.id)
+        return resumed
+
+    def cancel_job(self, job_id: int) -> bool:
+        """Request cancellation; a running job stops after its current unit of work"""
+        job = self.job_model.query.get(job_id)
+        if not job or job.status in ('completed', 'failed', 'cancelled'):
+            return False
+
+        if self.is_job_running(job_id):
+            self._cancel_requested.add(job_id)
+        else:
+            job.status = 'cancelled'
+            job.completed_at = datetime.utcnow()
+            db.session.commit()
+        return True
+
+    def is_cancel_requested(self, job_id: int) -> bool:
+        return job_id in self._cancel_requested
+
+    def is_job_running(self, job_id: int) -> bool:
+        thread = self._threads.get(job_id)
+        return bool(thread and thread.is_alive())
+
+    def _run_job(self, job_id: int):
+        """Background thread body"""
+        raise NotImplementedError
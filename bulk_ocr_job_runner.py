@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Bulk OCR Job Runner
+Runs persistent bulk OCR jobs in a background thread with a pool of OCR workers.
+Per-document status rows (ocr_job_items) let an interrupted job resume where it left off, and
+results are committed per batch together with the job's progress counters.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import func
+
+from app import app, db
+from background_job_runner import BackgroundJobRunner
+from models import MedicalDocument, OCRJob, OCRJobItem
+
+logger = logging.getLogger(__name__)
+
+
+class BulkOCRJobRunner(BackgroundJobRunner):
+    """Creates, runs, resumes and cancels bulk OCR jobs"""
+
+    job_model = OCRJob
+    job_label = "OCR job"
+    thread_name_prefix = "ocr-job"
+
+    ITEM_INSERT_CHUNK_SIZE = 1000
+
+    def __init__(self, max_workers: int = None, batch_size: int = 20):
+        # Tesseract runs as a subprocess, so worker threads overlap OCR work outside the GIL
+        super().__init__(max_workers or int(os.environ.get('OCR_JOB_WORKERS', os.cpu_count() or 2)))
+        self.batch_size = batch_size  # Documents per claim/commit cycle
+
+    def pending_ocr_document_ids(self) -> List[int]:
+        """Ids of documents not yet OCR-processed whose name indicates an image-based file"""
+        from ocr_document_processor import ocr_processor
+
+        rows = (
+            db.session.query(MedicalDocument.id, MedicalDocument.document_name)
+            .filter(MedicalDocument.ocr_processed == False)
+            .order_by(MedicalDocument.id)
+            .all()
+        )
+        return [
+            doc_id for doc_id, document_name in rows
+            if document_name and ocr_processor.is_image_based_document(document_name)
+        ]
+
+    def create_job(self, document_ids: List[int], description: str = None,
+                   created_by: Optional[int] = None) -> OCRJob:
+        """Create a job with one pending status row per (distinct) document"""
+        document_ids = list(dict.fromkeys(document_ids))
+
+        job = OCRJob(
+            status='pending',
+            description=description,
+            created_by=created_by,
+            total_documents=len(document_ids),
+        )
+        db.session.add(job)
+        db.session.flush()
+
+        for start in range(0, len(document_ids), self.ITEM_INSERT_CHUNK_SIZE):
+            chunk = document_ids[start:start + self.ITEM_INSERT_CHUNK_SIZE]
+            db.session.execute(
+                OCRJobItem.__table__.insert(),
+                [{'job_id': job.id, 'document_id': doc_id, 'status': 'pending', 'attempts': 0} for doc_id in chunk]
+            )
+
+        db.session.commit()
+        logger.info(f"📋 Created OCR job {job.id} for {len(document_ids)} documents")
+        return job
+
+    def get_job_progress(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Job counters, throughput/ETA and per-status item counts"""
+        job = OCRJob.query.get(job_id)
+        if not job:
+            return None
+
+        progress = job.to_dict()
+        progress['item_status_counts'] = dict(
+            db.session.query(OCRJobItem.status, func.count(OCRJobItem.id))
+            .filter(OCRJobItem.job_id == job_id)
+            .group_by(OCRJobItem.status)
+            .all()
+        )
+        progress['worker_active'] = self.is_job_running(job_id)
+        return progress
+
+    def _run_job(self, job_id: int):
+        """Background thread: claim and process batches of pending items until none remain"""
+        with app.app_context():
+            try:
+                job = OCRJob.query.get(job_id)
+                if not job or job.status in ('completed', 'cancelled'):
+                    return
+
+                # Items claimed by an interrupted run are processed again
+                OCRJobItem.query.filter_by(job_id=job_id, status='running').update(
+                    {'status': 'pending'}, synchronize_session=False
+                )
+                job.status = 'running'
+                job.started_at = datetime.utcnow()
+                job.processed_at_start = job.processed_documents
+                job.completed_at = None
+                job.error_message = None
+                db.session.commit()
+
+                affected_patient_ids = set()
+                cancelled = False
+
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    while True:
+                        if self.is_cancel_requested(job_id):
+                            cancelled = True
+                            break
+
+                        items = (
+                            OCRJobItem.query
+                            .filter_by(job_id=job_id, status='pending')
+                            .order_by(OCRJobItem.id)
+                            .limit(self.batch_size)
+                            .all()
+                        )
+                        if not items:
+                            break
+
+                        for item in items:
+                            item.status = 'running'
+                            item.attempts += 1
+                        db.session.commit()
+
+                        affected_patient_ids |= self._process_batch(job, items, executor)
+
+                job.status = 'cancelled' if cancelled else 'completed'
+                job.completed_at = datetime.utcnow()
+                db.session.commit()
+
+                logger.info(
+                    f"✅ OCR job {job_id} {job.status}: {job.successful_documents} succeeded, "
+                    f"{job.failed_documents} failed, {job.skipped_documents} skipped"
+                )
+
+                if affected_patient_ids:
+                    self._refresh_screenings(job_id, affected_patient_ids)
+
+            except Exception as e:
+                logger.error(f"❌ OCR job {job_id} failed: {e}")
+                db.session.rollback()
+                job = OCRJob.query.get(job_id)
+                if job:
+                    job.status = 'failed'
+                    job.error_message = str(e)
+                    job.completed_at = datetime.utcnow()
+                    db.session.commit()
+
+            finally:
+                self._cancel_requested.discard(job_id)
+
+    def _process_batch(self, job: OCRJob, items: List[OCRJobItem], executor: ThreadPoolExecutor) -> Set[int]:
+        """OCR a batch of claimed items concurrently and commit all results at once"""
+        from ocr_document_processor import ocr_processor
+
+        documents = {
+            doc.id: doc for doc in
+            MedicalDocument.query.filter(MedicalDocument.id.in_([item.document_id for item in items])).all()
+        }
+        processing_date = datetime.now()
+        stats = ocr_processor.quality_metrics.processing_stats
+
+        futures = {}
+        for item in items:
+            document = documents.get(item.document_id)
+            if document is None:
+                self._finish_item(job, item, 'failed', error="Document not found")
+                continue
+
+            filename = document.filename or document.document_name or ""
+            if not ocr_processor.is_image_based_document(filename, None):
+                self._finish_item(job, item, 'skipped', error="text_based_document")
+            elif not document.has_binary_content:
+                self._finish_item(job, item, 'skipped', error="no_binary_content")
+            else:
+                futures[item.id] = executor.submit(
+                    ocr_processor._extract_text_with_ocr, filename, document.binary_content
+                )
+
+        affected_patient_ids = set()
+        for item in items:
+            future = futures.get(item.id)
+            if future is None:
+                continue
+
+            document = documents[item.document_id]
+            stats['total_processed'] += 1
+            try:
+                extracted_text, confidence, quality_flags = future.result()
+            except Exception as e:
+                stats['failed_extractions'] += 1
+                self._finish_item(job, item, 'failed', error=f"OCR processing error: {e}")
+                continue
+
+            if not extracted_text:
+                stats['failed_extractions'] += 1
+                self._finish_item(job, item, 'failed', error="OCR failed to extract any text")
+                continue
+
+            ocr_processor.apply_ocr_result(document, extracted_text, confidence, quality_flags, processing_date)
+            stats['successful_extractions'] += 1
+            if confidence < ocr_processor.quality_metrics.confidence_threshold:
+                stats['low_confidence_results'] += 1
+
+            item.confidence = confidence
+            item.extracted_text_length = len(extracted_text)
+            self._finish_item(job, item, 'succeeded')
+            affected_patient_ids.add(document.patient_id)
+
+        db.session.commit()
+        # Release the batch's binary content before the next batch is loaded
+        db.session.expunge_all()
+        db.session.add(job)
+
+        return affected_patient_ids
+
+    def _finish_item(self, job: OCRJob, item: OCRJobItem, status: str, error: str = None):
+        item.status = status
+        item.error_message = error
+        item.processed_at = datetime.utcnow()
+
+        job.processed_documents += 1
+        if status == 'succeeded':
+            job.successful_documents += 1
+        elif status == 'failed':
+            job.failed_documents += 1
+        else:
+            job.skipped_documents += 1
+
+    def _refresh_screenings(self, job_id: int, patient_ids: Set[int]):
+        """Refresh screenings of patients whose documents gained OCR text"""
+        try:
+            from models import ScreeningType
+            from selective_screening_refresh_manager import selective_refresh_manager, ChangeType
+
+            for screening_type in ScreeningType.query.filter_by(is_active=True).all():
+                selective_refresh_manager.mark_screening_type_dirty(
+                    screening_type.id,
+                    ChangeType.KEYWORDS,
+                    "bulk_no_ocr",
+                    f"ocr_job_{job_id}",
+                    affected_criteria={"patient_ids": list(patient_ids)}
+                )
+
+            refresh_stats = selective_refresh_manager.process_selective_refresh()
+            logger.info(f"🔄 OCR job {job_id}: updated {refresh_stats.screenings_updated} screenings "
+                        f"across {refresh_stats.affected_patients} patients")
+        except Exception as e:
+            logger.error(f"❌ Screening refresh after OCR job {job_id} failed: {e}")
+
+
+# Global instance
+bulk_ocr_job_runner = BulkOCRJobRunner()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Compiled Keyword Matcher
+Precompiles screening-type keywords once and matches them against a document text that is
+lowercased and tokenized a single time, instead of building a regex per keyword per document.
+This is the only keyword matcher; its match semantics and confidence values are pinned by
+test_compiled_keyword_matcher.py.
+"""
+
+import re
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Word boundaries: only ASCII letters/digits count as word characters
+_LEFT_BOUNDARY = r'(?<![a-zA-Z0-9])'
+_RIGHT_BOUNDARY = r'(?![a-zA-Z0-9])'
+_PHRASE_SEPARATOR = r'[\s\-_\.]*'
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+_ALNUM_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Bump whenever matching semantics change so persisted match results are recomputed
+MATCHER_VERSION = 2
+
+# Confidence of each kind of match
+PHRASE_CONFIDENCE = 0.9
+EXACT_CONFIDENCE = 0.95
+FUZZY_CASE_CONFIDENCE = 0.8
+FUZZY_VARIANT_CONFIDENCE = 0.7
+PARTIAL_CONFIDENCE = 0.6
+
+_CHAR_VARIANTS = {
+    'a': '[aA@]',
+    '1': '[1lI]',
+    'c': '[cC]',
+    'o': '[o0O]',
+    'i': '[iI1l]',
+    's': '[sS5]'
+}
+
+
+class PreparedText:
+    """Lowercased text and its alphanumeric token set, computed once and shared by all keywords"""
+
+    __slots__ = ('lower', 'is_ascii', 'tokens', 'short_tokens')
+
+    def __init__(self, text: str):
+        self.lower = text.lower()
+        # Token shortcuts are only exact for ASCII text; anything else falls back to regex
+        self.is_ascii = self.lower.isascii()
+        self.tokens: Set[str] = set(_TOKEN_PATTERN.findall(self.lower)) if self.is_ascii else set()
+        self.short_tokens = [token for token in self.tokens if len(token) <= 4]
+
+
+class _CompiledKeyword:
+    """
+    One lowercased keyword with its precompiled variants, evaluated in precedence order;
+    the first variant that matches gives the keyword's confidence.
+    """
+
+    __slots__ = ('keyword', 'is_phrase', 'first_word', 'variants')
+
+    def __init__(self, keyword_lower: str):
+        self.keyword = keyword_lower
+        self.is_phrase = ' ' in keyword_lower
+        self.first_word = keyword_lower.split()[0]
+        # Each variant: (kind, compiled pattern, confidence, exact via token set)
+        self.variants: List[Tuple[str, Optional[re.Pattern], float, bool]] = []
+
+        if self.is_phrase:
+            pattern = _PHRASE_SEPARATOR.join(re.escape(word) for word in keyword_lower.split())
+            self.variants.append(('phrase', re.compile(_LEFT_BOUNDARY + pattern + _RIGHT_BOUNDARY, re.IGNORECASE),
+                                  PHRASE_CONFIDENCE, False))
+            return
+
+        is_alnum = bool(_ALNUM_PATTERN.fullmatch(keyword_lower))
+        self.variants.append(('exact', re.compile(_LEFT_BOUNDARY + re.escape(keyword_lower) + _RIGHT_BOUNDARY, re.IGNORECASE),
+                              EXACT_CONFIDENCE, is_alnum))
+
+        if len(keyword_lower) <= 4:
+            case_pattern = re.escape(keyword_lower).replace('a', '[aA]').replace('1', '[1lI]').replace('c', '[cC]')
+            self.variants.append(('fuzzy', re.compile(_LEFT_BOUNDARY + case_pattern + _RIGHT_BOUNDARY),
+                                  FUZZY_CASE_CONFIDENCE, is_alnum))
+
+            if len(keyword_lower) == 3:
+                fuzzy_pattern = ''.join(_CHAR_VARIANTS.get(char, re.escape(char)) for char in keyword_lower)
+                # '@' is not a word character, so 'a' variants cannot be resolved from tokens
+                self.variants.append(('fuzzy', re.compile(_LEFT_BOUNDARY + fuzzy_pattern + _RIGHT_BOUNDARY),
+                                      FUZZY_VARIANT_CONFIDENCE, is_alnum and 'a' not in keyword_lower))
+
+        if len(keyword_lower) > 3:
+            self.variants.append(('partial', None, PARTIAL_CONFIDENCE, False))
+
+    def confidence(self, prepared: PreparedText) -> float:
+        """Return the confidence of the best-matching variant, 0.0 if none match"""
+        text = prepared.lower
+
+        for kind, pattern, confidence, token_exact in self.variants:
+            if kind == 'partial':
+                if self.keyword in text:
+                    return confidence
+            elif kind == 'phrase':
+                if prepared.is_ascii and self.first_word not in text:
+                    continue
+                if pattern.search(text):
+                    return confidence
+            elif prepared.is_ascii and token_exact:
+                # Bounded all-alphanumeric matches always span exactly one token
+                if kind == 'exact':
+                    if self.keyword in prepared.tokens:
+                        return confidence
+                elif any(len(token) == len(self.keyword) and pattern.fullmatch(token)
+                         for token in prepared.short_tokens):
+                    return confidence
+            elif kind == 'exact' and prepared.is_ascii and self.keyword not in text:
+                continue
+            elif pattern.search(text):
+                return confidence
+
+        return 0.0
+
+
+class CompiledKeywordSet:
+    """A list of keywords compiled once and matched against prepared texts"""
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = [kw for kw in keywords if kw and kw.strip()]
+        self._compiled: Dict[str, _CompiledKeyword] = {}
+        for keyword in self.keywords:
+            keyword_lower = keyword.lower().strip()
+            if keyword_lower not in self._compiled:
+                self._compiled[keyword_lower] = _CompiledKeyword(keyword_lower)
+
+    def keyword_confidences(self, prepared: PreparedText) -> Dict[str, float]:
+        """Return {lowercased keyword: confidence} for every keyword that matches"""
+        confidences = {}
+        for keyword_lower, compiled in self._compiled.items():
+            confidence = compiled.confidence(prepared)
+            if confidence > 0:
+                confidences[keyword_lower] = confidence
+        return confidences
+
+    def build_result(self, confidences: Dict[str, float], match_type: str) -> Dict:
+        """
+        Build the engine's match result for this keyword list from keyword confidences
+
+        Returns:
+            Dict with 'matched', 'matches' and 'confidence' (average of keyword confidences)
+        """
+        matches = []
+        for keyword in self.keywords:
+            keyword_lower = keyword.lower().strip()
+            confidence = confidences.get(keyword_lower, 0.0)
+            if confidence > 0:
+                matches.append({
+                    'keyword': keyword,
+                    'type': match_type,
+                    'match_method': 'phrase' if ' ' in keyword_lower else 'word_flexible',
+                    'confidence': confidence
+                })
+
+        confidence = sum(m['confidence'] for m in matches) / len(matches) if matches else 0.0
+
+        return {
+            'matched': len(matches) > 0,
+            'matches': matches,
+            'confidence': confidence
+        }
+
+    def match(self, text: str, match_type: str) -> Dict:
+        """Match all keywords against text"""
+        if not text or not self._compiled:
+            return {'matched': False, 'matches': [], 'confidence': 0.0}
+        return self.build_result(self.keyword_confidences(PreparedText(text)), match_type)
+
+
+def document_match_texts(document) -> Tuple[str, str, str]:
+    """Return the (content, filename, document type) texts a document is matched on"""
+    content_text = ""
+    if document.content:
+        content_text += document.content + " "
+    if getattr(document, 'ocr_text', None):
+        content_text += document.ocr_text
+
+    filename_text = document.filename or document.document_name or ""
+    return content_text, filename_text, document.document_type or ""
+
+
+def document_content_fingerprint(document) -> str:
+    """SHA-256 over every text a document is matched on"""
+    digest = hashlib.sha256()
+    for text in document_match_texts(document):
+        digest.update(text.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ScreeningKeywordMatcher:
+    """Compiled content and document-type keyword sets for one screening type"""
+
+    def __init__(self, content_keywords: List[str], document_keywords: List[str]):
+        self.content_keywords = [kw.strip() for kw in content_keywords if kw and kw.strip()]
+        self.document_keywords = [kw.strip() for kw in document_keywords if kw and kw.strip()]
+        self.content = CompiledKeywordSet(self.content_keywords)
+        self.document = CompiledKeywordSet(self.document_keywords)
+
+    @classmethod
+    def from_screening_type(cls, screening_type) -> 'ScreeningKeywordMatcher':
+        """Build a matcher from a ScreeningType's configured keywords"""
+        content_keywords, document_keywords = [], []
+        try:
+            content_keywords = screening_type.get_content_keywords() or []
+            document_keywords = screening_type.get_document_keywords() or []
+        except Exception as e:
+            logger.warning(f"Error getting keywords for {screening_type.name}: {e}")
+        return cls(content_keywords, document_keywords)
+
+    @property
+    def has_keywords(self) -> bool:
+        return bool(self.content_keywords or self.document_keywords)
+
+    @property
+    def fingerprint(self) -> str:
+        """SHA-256 of the keyword configuration and matcher version"""
+        config = json.dumps({
+            'version': MATCHER_VERSION,
+            'content': self.content_keywords,
+            'document': self.document_keywords
+        }, sort_keys=True)
+        return hashlib.sha256(config.encode('utf-8')).hexdigest()
+
+    def field_confidences(self, document) -> Dict[str, Dict[str, float]]:
+        """Keyword confidences per matched field, using this screening type's keywords only"""
+        content_text, filename_text, document_type = document_match_texts(document)
+        return {
+            'content': self.content.keyword_confidences(PreparedText(content_text))
+            if self.content_keywords and content_text.strip() else {},
+            'filename': self.content.keyword_confidences(PreparedText(filename_text))
+            if self.content_keywords and filename_text else {},
+            'document_type': self.document.keyword_confidences(PreparedText(document_type))
+            if self.document_keywords and document_type else {},
+        }
+
+    def score_document(self, document, field_confidences: Optional[Dict[str, Dict[str, float]]] = None) -> Tuple[List[Dict], float]:
+        """
+        Score a document against this screening type's keywords
+
+        Args:
+            document: MedicalDocument to score
+            field_confidences: Precomputed keyword confidences per field (e.g. from a
+                ScreeningKeywordIndex); computed from the document when omitted
+
+        Returns:
+            (matched keywords, highest per-field confidence)
+        """
+        if field_confidences is None:
+            field_confidences = self.field_confidences(document)
+
+        matches = []
+        match_types_confidence = []
+        fields = (
+            ('content', self.content, 'content'),
+            ('filename', self.content, 'filename'),  # Content keywords double as filename keywords
+            ('document_type', self.document, 'document_type'),
+        )
+        for field, keyword_set, match_type in fields:
+            confidences = field_confidences.get(field)
+            if not confidences:
+                continue
+            field_match = keyword_set.build_result(confidences, match_type)
+            if field_match['matched']:
+                matches.extend(field_match['matches'])
+                match_types_confidence.append(field_match['confidence'])
+
+        return matches, max(match_types_confidence) if match_types_confidence else 0.0
+
+
+# Compiled matchers keyed by screening type id, validated against updated_at
+_matcher_cache: Dict[int, Tuple[object, ScreeningKeywordMatcher]] = {}
+_matcher_cache_lock = threading.Lock()
+
+
+def get_screening_keyword_matcher(screening_type) -> ScreeningKeywordMatcher:
+    """
+    Get the compiled keyword matcher for a screening type, rebuilding it only when
+    the screening type has been edited since it was compiled
+    """
+    compiled = getattr(screening_type, 'keyword_matcher', None)
+    if isinstance(compiled, ScreeningKeywordMatcher):
+        # Compiled screening rules (screening_rule_set.ScreeningRule) carry their matcher
+        return compiled
+
+    type_id = getattr(screening_type, 'id', None)
+    if type_id is None:
+        return ScreeningKeywordMatcher.from_screening_type(screening_type)
+
+    updated_at = getattr(screening_type, 'updated_at', None)
+    cached = _matcher_cache.get(type_id)
+    if cached and cached[0] == updated_at:
+        return cached[1]
+
+    matcher = ScreeningKeywordMatcher.from_screening_type(screening_type)
+    with _matcher_cache_lock:
+        _matcher_cache[type_id] = (updated_at, matcher)
+    return matcher
+
+
+def clear_keyword_matcher_cache(screening_type_id: Optional[int] = None):
+    """Drop compiled matchers for one screening type, or all of them"""
+    with _matcher_cache_lock:
+        if screening_type_id is None:
+            _matcher_cache.clear()
+        else:
+            _matcher_cache.pop(screening_type_id, None)
+
+
+def keyword_config_version(screening_types) -> Tuple:
+    """Version of the keyword configuration: changes whenever a screening type is added, removed or edited"""
+    return tuple(sorted((st.id, st.updated_at) for st in screening_types))
+
+
+class ScreeningKeywordIndex:
+    """
+    Inverted keyword index across screening types.
+
+    Maps every configured keyword to the screening types that use it, so a document is
+    tokenized once and yields its full set of matching screening types in one pass.
+    Results are memoized per (document id, document updated_at, keyword config version).
+    """
+
+    MAX_MEMOIZED_DOCUMENTS = 10000
+
+    def __init__(self, screening_types, min_confidence: float = 0.5):
+        self.min_confidence = min_confidence
+        self.version = keyword_config_version(screening_types)
+        self.screening_type_names: Dict[int, str] = {}
+        self.matchers: Dict[int, ScreeningKeywordMatcher] = {}
+        self.content_index: Dict[str, Set[int]] = {}
+        self.document_index: Dict[str, Set[int]] = {}
+
+        content_keywords, document_keywords = [], []
+        for screening_type in screening_types:
+            matcher = get_screening_keyword_matcher(screening_type)
+            if not matcher.has_keywords:
+                continue
+            self.matchers[screening_type.id] = matcher
+            self.screening_type_names[screening_type.id] = screening_type.name
+            for keyword in matcher.content_keywords:
+                self.content_index.setdefault(keyword.lower(), set()).add(screening_type.id)
+                content_keywords.append(keyword)
+            for keyword in matcher.document_keywords:
+                self.document_index.setdefault(keyword.lower(), set()).add(screening_type.id)
+                document_keywords.append(keyword)
+
+        self.fingerprints = {type_id: matcher.fingerprint for type_id, matcher in self.matchers.items()}
+        self.content = CompiledKeywordSet(content_keywords)
+        self.document = CompiledKeywordSet(document_keywords)
+        self._results: 'OrderedDict[Tuple, Dict[int, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match_document(self, document) -> Dict[int, Dict]:
+        """
+        Match a document against every indexed screening type
+
+        Returns:
+            {screening_type_id: match result} for matching screening types only
+        """
+        key = (document.id, getattr(document, 'updated_at', None), self.version)
+        if document.id is not None:
+            with self._lock:
+                cached = self._results.get(key)
+                if cached is not None:
+                    self._results.move_to_end(key)
+                    return cached
+
+        results = {}
+        for type_id, (matches, confidence) in self.score_document(document).items():
+            if confidence >= self.min_confidence:
+                results[type_id] = self.match_result(type_id, document.id, matches, confidence)
+
+        if document.id is not None:
+            with self._lock:
+                self._results[key] = results
+                if len(self._results) > self.MAX_MEMOIZED_DOCUMENTS:
+                    self._results.popitem(last=False)
+        return results
+
+    def match_result(self, type_id: int, document_id: Optional[int], matches: List[Dict], confidence: float) -> Dict:
+        """Build the engine's positive match result for one screening type"""
+        return {
+            'is_match': True,
+            'confidence': confidence,
+            'matched_keywords': matches,
+            'match_source': f"Keywords matched with {confidence:.2f} confidence",
+            'screening_type': self.screening_type_names[type_id],
+            'document_id': document_id
+        }
+
+    def score_document(self, document) -> Dict[int, Tuple[List[Dict], float]]:
+        """
+        Tokenize the document once and score it against every indexed screening type
+
+        Returns:
+            {screening_type_id: (matched keywords, confidence)} for types with any keyword hit
+        """
+        content_text, filename_text, document_type = document_match_texts(document)
+        field_confidences = {
+            'content': self.content.keyword_confidences(PreparedText(content_text)) if content_text.strip() else {},
+            'filename': self.content.keyword_confidences(PreparedText(filename_text)) if filename_text else {},
+            'document_type': self.document.keyword_confidences(PreparedText(document_type)) if document_type else {},
+        }
+
+        candidates = set()
+        for field, index in (('content', self.content_index), ('filename', self.content_index),
+                             ('document_type', self.document_index)):
+            for keyword_lower in field_confidences[field]:
+                candidates.update(index.get(keyword_lower, ()))
+
+        scores = {}
+        for type_id in candidates:
+            matches, confidence = self.matchers[type_id].score_document(document, field_confidences)
+            if matches:
+                scores[type_id] = (matches, confidence)
+        return scores
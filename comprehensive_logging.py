@@ -418,11 +418,13 @@ def log_patient_operation(operation_type):
                     user_agent=request.headers.get("User-Agent", ""),
                 )
 
-                try:
-                    db.session.commit()
-                except Exception as commit_error:
-                    logger.warning(f"Failed to commit admin log: {str(commit_error)}")
-                    db.session.rollback()
+                # The log entry is written by the admin log writer; views have nothing to commit
+                if standardized_operation != "view":
+                    try:
+                        db.session.commit()
+                    except Exception as commit_error:
+                        logger.warning(f"Failed to commit after {standardized_operation}: {str(commit_error)}")
+                        db.session.rollback()
 
                 return result
 
@@ -1023,8 +1025,6 @@ def log_page_access(page_type):
                         user_agent=request.headers.get("User-Agent", ""),
                     )
 
-                    db.session.commit()
-
                 return result
 
             except Exception as e:
@@ -201,9 +201,16 @@ class DatabaseAccessLayer:
                     
                     # Update screening type status
                     await conn.execute("""
-                        UPDATE screening_type SET is_active = $1 WHERE id = $2
-                    """, new_status, screening_type_id)
-                    
+                        UPDATE screening_type SET is_active = $1, updated_at = $3 WHERE id = $2
+                    """, new_status, screening_type_id, datetime.utcnow())
+
+                    # Bypasses the ORM, so bump the screening rule set version explicitly
+                    await conn.execute("""
+                        INSERT INTO screening_rule_version (id, version, updated_at) VALUES (1, 1, $1)
+                        ON CONFLICT (id) DO UPDATE
+                        SET version = screening_rule_version.version + 1, updated_at = EXCLUDED.updated_at
+                    """, datetime.utcnow())
+
                     result.records_updated += 1
                     
                     # Handle deactivation cascading - hide instead of delete to preserve data
@@ -161,7 +161,7 @@ from models import (
     PatientAlert,
 )
 from app import db
-from sqlalchemy import func, or_
+from sqlalchemy import func
 from datetime import date, datetime
 import logging
 
@@ -200,39 +200,35 @@ def get_patient_with_basic_data(patient_id):
 
 
 def search_patients(
-    search_term, page=1, per_page=20, sort_field="created_at", sort_order="desc"
+    search_term,
+    page=1,
+    per_page=20,
+    sort_field="created_at",
+    sort_order="desc",
+    cursor=None,
+    with_total=None,
 ):
-    """Shared patient search functionality"""
-    query = Patient.query
-
-    if search_term:
-        search_filter = or_(
-            Patient.first_name.ilike(f"%{search_term}%"),
-            Patient.last_name.ilike(f"%{search_term}%"),
-            Patient.mrn.ilike(f"%{search_term}%"),
-            func.concat(Patient.first_name, " ", Patient.last_name).ilike(
-                f"%{search_term}%"
-            ),
-        )
-        query = query.filter(search_filter)
-
-    # Apply sorting
-    if sort_field == "name":
-        sort_column = Patient.first_name
-    elif sort_field == "mrn":
-        sort_column = Patient.mrn
-    elif sort_field == "age":
-        sort_column = Patient.date_of_birth
-        sort_order = "asc" if sort_order == "desc" else "desc"
-    else:
-        sort_column = Patient.created_at
-
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
-
-    return query.paginate(page=page, per_page=per_page, error_out=False)
+    """
+    Shared patient search functionality (indexed search, keyset pages)
+
+    Pass the previous page's next_cursor to continue; page is only used without a cursor.
+    Returns a PatientSearchPage; its total match count is only computed for the first page
+    unless with_total says otherwise (total is None when not counted).
+    """
+    import patient_search
+
+    if with_total is None:
+        with_total = not cursor and page == 1
+
+    return patient_search.search_patients(
+        search_term,
+        limit=per_page,
+        sort=sort_field,
+        order=sort_order,
+        cursor=cursor,
+        offset=0 if cursor else (page - 1) * per_page,
+        with_total=with_total,
+    )
 
 
 def get_appointments_for_date(target_date):
@@ -8,6 +8,8 @@ from flask import (
     send_file,
     jsonify,
     make_response,
+    Response,
+    stream_with_context,
 )
 import time as time_module  # Rename to avoid conflicts
 import json
@@ -39,6 +41,7 @@ from input_validator import (
     validate_bulk_delete_input,
     log_validation_error,
 )
+from patient_chart_loader import get_patient_chart
 
 
 # Define a context processor for global template functions
@@ -116,7 +119,6 @@ from models import (
 )
 from utils import (
     process_csv_upload,
-    generate_prep_sheet,
     evaluate_screening_needs,
     process_document_upload,
     get_patient_documents_summary,
@@ -418,50 +420,37 @@ def index(date_str=None):
     )
 
 
+# Patients per page in the web patient list
+PATIENT_LIST_PAGE_SIZE = 100
+
+
 @app.route("/patients")
 def patient_list():
-    """Display all patients with search functionality"""
+    """Display patients with search functionality, one keyset page at a time"""
+    import patient_search
+
     search_query = request.args.get("search", "").strip()
-    sort_field = request.args.get("sort", "last_name")
+    sort_field = request.args.get("sort") or ("relevance" if search_query else "last_name")
     sort_order = request.args.get("order", "asc")
+    cursor = request.args.get("cursor") or None
 
-    # Build the query
-    query = Patient.query
-
-    # Apply search filter if provided
-    if search_query:
-        query = query.filter(
-            db.or_(
-                Patient.first_name.ilike(f"%{search_query}%"),
-                Patient.last_name.ilike(f"%{search_query}%"),
-                Patient.mrn.ilike(f"%{search_query}%"),
-            )
-        )
-
-    # Apply sorting
-    if sort_field == "first_name":
-        order_by = (
-            Patient.first_name.asc()
-            if sort_order == "asc"
-            else Patient.first_name.desc()
-        )
-    elif sort_field == "dob":
-        order_by = (
-            Patient.date_of_birth.asc()
-            if sort_order == "asc"
-            else Patient.date_of_birth.desc()
+    try:
+        results = patient_search.search_patients(
+            search_query, limit=PATIENT_LIST_PAGE_SIZE, sort=sort_field, order=sort_order, cursor=cursor
         )
-    elif sort_field == "mrn":
-        order_by = Patient.mrn.asc() if sort_order == "asc" else Patient.mrn.desc()
-    else:  # default to last_name
-        order_by = (
-            Patient.last_name.asc() if sort_order == "asc" else Patient.last_name.desc()
+    except ValueError:
+        # Stale cursor or unknown sort: start over from the first page
+        sort_field = "relevance" if search_query else "last_name"
+        results = patient_search.search_patients(
+            search_query, limit=PATIENT_LIST_PAGE_SIZE, sort=sort_field, order=sort_order
         )
 
-    patients = query.order_by(order_by).all()
-
     return render_template(
-        "patient_list.html", patients=patients, search_query=search_query
+        "patient_list.html",
+        patients=results.patients,
+        search_query=search_query,
+        next_cursor=results.next_cursor,
+        is_first_page=not cursor,
     )
 
 
@@ -558,140 +547,23 @@ def patient_detail(patient_id):
     """Display patient details"""
     app.logger.info(f"Viewing patient details for ID: {patient_id}")
     try:
-        patient = Patient.query.get_or_404(patient_id)
-        app.logger.info(f"Found patient: {patient.full_name}")
+        # Cached chart read-model, keyed by the patient's chart version
+        chart = get_patient_chart(patient_id)
     except Exception as e:
         app.logger.error(f"Error retrieving patient: {str(e)}")
         flash(f"Error retrieving patient information: {str(e)}", "danger")
         return redirect(url_for("index"))
+    if chart is None:
+        abort(404)
+    patient = chart.patient
+    app.logger.info(f"Found patient: {patient.full_name}")
 
-    # Get the most recent vital signs
-    recent_vitals = (
-        Vital.query.filter_by(patient_id=patient_id).order_by(Vital.date.desc()).first()
-    )
-
-    # Get all vital signs for history
-    all_vitals = (
-        Vital.query.filter_by(patient_id=patient_id).order_by(Vital.date.desc()).all()
-    )
-
-    # Get the most recent lab results
-    recent_labs = (
-        LabResult.query.filter_by(patient_id=patient_id)
-        .order_by(LabResult.test_date.desc())
-        .limit(5)
-        .all()
-    )
-
-    # Get the active conditions
-    active_conditions = Condition.query.filter_by(
-        patient_id=patient_id, is_active=True
-    ).all()
-
-    # Get past visits
-    past_visits = (
-        Visit.query.filter_by(patient_id=patient_id)
-        .order_by(Visit.visit_date.desc())
-        .all()
-    )
-
-    # Get screening recommendations with optimized query
-    screenings = (
-        Screening.query
-        .filter_by(patient_id=patient_id)
-        .join(ScreeningType, Screening.screening_type == ScreeningType.name)
-        .filter(ScreeningType.is_active == True)
-        .order_by(Screening.due_date)
-        .all()
-    )
-
-    # Get immunization records
-    immunizations = (
-        Immunization.query.filter_by(patient_id=patient_id)
-        .order_by(Immunization.administration_date.desc())
-        .all()
-    )
-
-    # Get upcoming visit if any
-    upcoming_visit = (
-        Visit.query.filter(
-            Visit.patient_id == patient_id, Visit.visit_date > datetime.now()
-        )
-        .order_by(Visit.visit_date)
-        .first()
-    )
-
-    # Get past appointments (already occurred)
-    current_date = datetime.now().date()
-    past_appointments = (
-        Appointment.query.filter(
-            Appointment.patient_id == patient_id,
-            db.or_(
-                Appointment.appointment_date < current_date,
-                db.and_(
-                    Appointment.appointment_date == current_date,
-                    Appointment.appointment_time < datetime.now().time(),
-                ),
-            ),
-        )
-        .order_by(
-            Appointment.appointment_date.desc(), Appointment.appointment_time.desc()
-        )
-        .all()
-    )
-
-    # Get upcoming appointments (scheduled but not yet occurred)
-    upcoming_appointments = (
-        Appointment.query.filter(
-            Appointment.patient_id == patient_id,
-            db.or_(
-                Appointment.appointment_date > current_date,
-                db.and_(
-                    Appointment.appointment_date == current_date,
-                    Appointment.appointment_time >= datetime.now().time(),
-                ),
-            ),
-        )
-        .order_by(Appointment.appointment_date, Appointment.appointment_time)
-        .all()
-    )
-
-    # Get patient documents
-    documents = (
-        MedicalDocument.query.filter_by(patient_id=patient_id)
-        .order_by(MedicalDocument.document_date.desc())
-        .all()
-    )
+    # Past (most recent first) and upcoming appointments, split at request time
+    past_appointments, upcoming_appointments = chart.split_appointments()
 
     # Organize documents by type - support both legacy and new document types
-    lab_documents = [
-        doc for doc in documents if doc.document_type in ["LAB_REPORT", "LABORATORIES"]
-    ]
-    imaging_documents = [
-        doc
-        for doc in documents
-        if doc.document_type in ["RADIOLOGY_REPORT", "IMAGING"]
-    ]
-    consult_documents = [
-        doc for doc in documents if doc.document_type in ["CONSULTATION", "CONSULTS"]
-    ]
-    hospital_documents = [
-        doc
-        for doc in documents
-        if doc.document_type in ["DISCHARGE_SUMMARY", "HOSPITAL_RECORDS"]
-    ]
-    
-    # Other documents (not categorized as lab, imaging, consult, or hospital)
-    categorized_types = {
-        "LAB_REPORT", "LABORATORIES",
-        "RADIOLOGY_REPORT", "IMAGING",
-        "CONSULTATION", "CONSULTS",
-        "DISCHARGE_SUMMARY", "HOSPITAL_RECORDS"
-    }
-    other_documents = [
-        doc for doc in documents 
-        if doc.document_type not in categorized_types or doc.document_type is None
-    ]
+    documents = chart.documents
+    document_groups = chart.documents_by_category()
 
     # Helper function for templates to access current date
     def now():
@@ -707,21 +579,21 @@ def patient_detail(patient_id):
         render_template(
             "patient_detail.html",
             patient=patient,
-            recent_vitals=recent_vitals,
-            all_vitals=all_vitals,
-            recent_labs=recent_labs,
-            active_conditions=active_conditions,
-            past_visits=past_visits,
-            screenings=screenings,
-            immunizations=immunizations,
-            upcoming_visit=upcoming_visit,
+            recent_vitals=chart.recent_vitals,
+            all_vitals=chart.vitals,
+            recent_labs=chart.labs,
+            active_conditions=chart.conditions,
+            past_visits=chart.visits,
+            screenings=chart.screenings,
+            immunizations=chart.immunizations,
+            upcoming_visit=chart.upcoming_visit(),
             documents=documents,
             cache_timestamp=cache_timestamp,
-            lab_documents=lab_documents,
-            imaging_documents=imaging_documents,
-            consult_documents=consult_documents,
-            hospital_documents=hospital_documents,
-            other_documents=other_documents,
+            lab_documents=document_groups["lab"],
+            imaging_documents=document_groups["imaging"],
+            consult_documents=document_groups["consult"],
+            hospital_documents=document_groups["hospital"],
+            other_documents=document_groups["other"],
             past_appointments=past_appointments,
             upcoming_appointments=upcoming_appointments,
             now=now,
@@ -831,263 +703,30 @@ def edit_patient(patient_id):
 @app.route("/patients/<int:patient_id>/prep_sheet/<int:cache_buster>")
 def generate_patient_prep_sheet(patient_id, cache_buster=None):
     """Generate a preparation sheet for the patient"""
+    from checklist_routes import get_or_create_settings
+    from prep_sheet_precompute import prep_sheet_precomputer
 
     def now():
         return datetime.now()
 
-    patient = Patient.query.get_or_404(patient_id)
-
-    # Get the date of the last visit
-    last_visit = (
-        Visit.query.filter_by(patient_id=patient_id)
-        .order_by(Visit.visit_date.desc())
-        .first()
-    )
-    last_visit_date = last_visit.visit_date if last_visit else None
-
-    # Get data since the last visit or in the last 90 days if no previous visit
-    cutoff_date = (
-        last_visit_date if last_visit_date else datetime.now() - timedelta(days=90)
-    )
-
-    # Get past 3 appointments for the patient
-    past_appointments = (
-        Appointment.query.filter(
-            Appointment.patient_id == patient_id,
-            Appointment.appointment_date < datetime.now(),
-        )
-        .order_by(Appointment.appointment_date.desc())
-        .limit(3)
-        .all()
-    )
-
-    # Get recent data for the prep sheet using enhanced medical data parser
-    from medical_data_parser import MedicalDataParser
-    
-    # Get checklist settings for cutoff dates
-    from checklist_routes import get_or_create_settings
+    # Content precomputed for today's appointments while its inputs are unchanged,
+    # otherwise rendered from batch-loaded data and stored
     checklist_settings = get_or_create_settings()
-    
-    # Initialize medical data parser with patient-specific settings
-    data_parser = MedicalDataParser(patient_id, checklist_settings)
-    filtered_medical_data = data_parser.get_all_filtered_data()
-    
-    # Extract filtered data for template compatibility
-    recent_labs = filtered_medical_data['labs']['data']
-    recent_imaging = filtered_medical_data['imaging']['data']
-    recent_consults = filtered_medical_data['consults']['data']
-    recent_hospital = filtered_medical_data['hospital_visits']['data']
-    
-    # Get recent vitals (using original cutoff logic for now)
-    recent_vitals = (
-        Vital.query.filter(Vital.patient_id == patient_id, Vital.date > cutoff_date)
-        .order_by(Vital.date.desc())
-        .all()
-    )
-
-    active_conditions = Condition.query.filter_by(
-        patient_id=patient_id, is_active=True
-    ).all()
-
-    screenings = (
-        Screening.query
-        .filter_by(patient_id=patient_id)
-        .join(ScreeningType, Screening.screening_type_id == ScreeningType.id)
-        .filter(ScreeningType.is_active == True)
-        .options(
-            db.joinedload(Screening.screening_type_obj),
-            db.selectinload(Screening.documents)
-        )
-        .all()
-    )
-
-    # Get immunizations
-    immunizations = (
-        Immunization.query.filter_by(patient_id=patient_id)
-        .order_by(Immunization.administration_date.desc())
-        .all()
-    )
-    
-    # Get all patient documents for categorization using optimized query
-    from performance_optimizer import performance_optimizer
-    documents = performance_optimizer.get_optimized_patient_documents(patient_id, limit=200)
-    
-    # Categorize documents for "other" section (documents not in main categories)
-    categorized_types = {
-        "LAB_REPORT", "LABORATORIES",
-        "RADIOLOGY_REPORT", "IMAGING",
-        "CONSULTATION", "CONSULTS", 
-        "DISCHARGE_SUMMARY", "HOSPITAL_RECORDS"
-    }
-    other_documents = [
-        doc for doc in documents 
-        if doc.document_type not in categorized_types or doc.document_type is None
-    ]
-
-    # Get past 3 appointments for the patient
-    past_appointments = (
-        Appointment.query.filter(
-            Appointment.patient_id == patient_id,
-            Appointment.appointment_date < datetime.now(),
-        )
-        .order_by(Appointment.appointment_date.desc())
-        .limit(3)
-        .all()
-    )
-
-    # 🎯 SINGLE SOURCE OF TRUTH: Use the EXACT same screening data as /screenings route
-    # This ensures complete consistency between prep sheet and /screenings page
-    from screening_performance_optimizer import screening_optimizer
-    
-    # Get screenings using the same method as /screenings route
-    query_result = screening_optimizer.get_optimized_screenings(
-        page=1,
-        page_size=100,  # Get all screenings for the patient
-        search_query=f"{patient.first_name} {patient.last_name}"
-    )
-    
-    # Extract screenings from the optimized result - this is the EXACT same data /screenings shows
-    screenings = query_result.get('screenings', [])
-    
-    print(f"✅ Using /screenings data: {len(screenings)} screenings for {patient.first_name} {patient.last_name}")
-    
-    # Get checklist settings for filtering (if still needed for prep sheet display)
-    from checklist_routes import get_or_create_settings
-    checklist_settings = get_or_create_settings()
-
-    # Generate a prep sheet summary with decoupled filtering
-    prep_sheet_data = generate_prep_sheet(
-        patient,
-        recent_vitals,
-        recent_labs,
-        recent_imaging,
-        recent_consults,
-        recent_hospital,
-        active_conditions,
-        screenings,
-        last_visit_date,
-        past_appointments,
-    )
-    
-    # Prep sheet content is now controlled by screening engine, not default items
-    # No filtering needed - all active screenings from screening engine appear in prep sheet
-
-    # Get enhanced screening recommendations with document relationships using new system
-    try:
-        # Use the same screenings data from the screening optimizer for consistency
-        patient_screenings = screenings
-        
-        # Create mapping of screening names to document match data for template
-        screening_document_matches = {}
-        document_screening_data = {
-            'screening_recommendations': [],
-            'summary': {
-                'total_matches': 0,
-                'unique_screenings': len(patient_screenings),
-                'high_confidence_count': 0,
-                'medium_confidence_count': 0,
-                'low_confidence_count': 0
-            }
-        }
-        
-        for screening in patient_screenings:
-            matched_docs = screening.matched_documents
-            if matched_docs:
-                # For each screening, create entry with document data
-                document_screening_data['screening_recommendations'].append({
-                    'screening_name': screening.screening_type,
-                    'status': screening.status,
-                    'last_completed': getattr(screening, 'last_completed_date', None) or getattr(screening, 'last_completed', None),
-                    'frequency': screening.frequency,
-                    'notes': screening.notes,
-                    'matched_documents': matched_docs,
-                    'document_count': len(matched_docs)
-                })
-                
-                # Create template mapping for backward compatibility
-                if matched_docs:
-                    best_doc = matched_docs[0]  # Use first document as "best match"
-                    confidence = 0.85  # Default high confidence for automated matches
-                    
-                    screening_document_matches[screening.screening_type] = {
-                        'status_notes': f"Status: {screening.status}",
-                        'confidence': confidence,
-                        'confidence_percent': int(confidence * 100),
-                        'document_name': best_doc.filename,
-                        'document_id': best_doc.id,
-                        'match_source': 'automated_screening_engine',
-                        'recommendation_status': screening.status,
-                        'matched_documents': matched_docs,
-                        'all_documents': [
-                            {
-                                'id': doc.id,
-                                'filename': doc.filename,
-                                'document_name': doc.document_name,
-                                'confidence': 0.85  # Default confidence
-                            } for doc in matched_docs
-                        ]
-                    }
-                    
-                    # Update summary counts
-                    document_screening_data['summary']['total_matches'] += len(matched_docs)
-                    if confidence >= 0.8:
-                        document_screening_data['summary']['high_confidence_count'] += 1
-                    elif confidence >= 0.6:
-                        document_screening_data['summary']['medium_confidence_count'] += 1
-                    else:
-                        document_screening_data['summary']['low_confidence_count'] += 1
-        
-        print(f"Found {len(patient_screenings)} screenings with {document_screening_data['summary']['total_matches']} total document matches")
-        
-    except Exception as e:
-        # Fallback - don't break prep sheet if document matching fails
-        print(f"Document matching error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        document_screening_data = {
-            'screening_recommendations': [],
-            'summary': {'total_matches': 0, 'unique_screenings': 0}
-        }
-        screening_document_matches = {}
+    sheet = prep_sheet_precomputer.get_sheet(patient_id, checklist_settings)
+    if sheet is None:
+        abort(404)
 
     # Generate timestamp for cache busting
     cache_timestamp = int(time_module.time())
 
-    # Get checklist settings for display options (if not already loaded)
-    if not "checklist_settings" in locals():
-        from checklist_routes import get_or_create_settings
-
-        checklist_settings = get_or_create_settings()
-
     # Response with cache-control headers to prevent caching
     response = make_response(
         render_template(
-            "prep_sheet.html",
-            patient=patient,
-            prep_sheet=prep_sheet_data,
-            recent_vitals=recent_vitals[0] if recent_vitals else None,
-            recent_labs=recent_labs,
-            recent_imaging=recent_imaging,
-            recent_consults=recent_consults,
-            recent_hospital=recent_hospital,
-            settings=checklist_settings,
-            active_conditions=active_conditions,
-            screenings=screenings,
-            immunizations=immunizations,
-
-            last_visit_date=last_visit_date,
-            past_appointments=past_appointments,
-            today=datetime.now(),
+            "prep_sheet_cached.html",
+            patient=sheet.patient,
+            prep_sheet_content=sheet.content,
             cache_timestamp=cache_timestamp,
-            checklist_settings=checklist_settings,
-            # Prep sheet content is now controlled by screening engine, no filtering needed
-            # Enhanced document matching data
-            document_screening_data=document_screening_data,
-            screening_document_matches=screening_document_matches,
-            # Enhanced medical data with documents and cutoff filtering
-            filtered_medical_data=filtered_medical_data,
-            # Other documents for miscellaneous section
-            other_documents=other_documents,
+            now=now,
         )
     )
 
@@ -1959,123 +1598,48 @@ def delete_screening_type(screening_type_id):
 @app.route("/patients/<int:patient_id>/download_prep_sheet")
 def download_patient_prep_sheet(patient_id):
     """Generate and download a Word document prep sheet for the patient"""
-    patient = Patient.query.get_or_404(patient_id)
-
-    # Get the date of the last visit
-    last_visit = (
-        Visit.query.filter_by(patient_id=patient_id)
-        .order_by(Visit.visit_date.desc())
-        .first()
-    )
-    last_visit_date = last_visit.visit_date if last_visit else None
-
-    # Get all conditions regardless of date
-    conditions = Condition.query.filter_by(patient_id=patient_id).all()
-
-    # Get all screenings with optimized query
-    screenings = (
-        Screening.query
-        .filter_by(patient_id=patient_id)
-        .join(ScreeningType, Screening.screening_type_id == ScreeningType.id)
-        .filter(ScreeningType.is_active == True)
-        .options(
-            db.joinedload(Screening.screening_type_obj),
-            db.selectinload(Screening.documents)
-        )
-        .all()
-    )
-
-    # Get the most recent vitals
-    vitals = (
-        Vital.query.filter_by(patient_id=patient_id).order_by(Vital.date.desc()).all()
-    )
-
-    # Get recent data (last 6 months)
-    six_months_ago = datetime.now() - timedelta(days=180)
-
-    labs = (
-        LabResult.query.filter(
-            LabResult.patient_id == patient_id, LabResult.test_date >= six_months_ago
-        )
-        .order_by(LabResult.test_date.desc())
-        .all()
-    )
-
-    imaging = (
-        ImagingStudy.query.filter(
-            ImagingStudy.patient_id == patient_id,
-            ImagingStudy.study_date >= six_months_ago,
-        )
-        .order_by(ImagingStudy.study_date.desc())
-        .all()
-    )
-
-    consults = (
-        ConsultReport.query.filter(
-            ConsultReport.patient_id == patient_id,
-            ConsultReport.report_date >= six_months_ago,
-        )
-        .order_by(ConsultReport.report_date.desc())
-        .all()
-    )
-
-    hospital = (
-        HospitalSummary.query.filter(
-            HospitalSummary.patient_id == patient_id,
-            HospitalSummary.admission_date >= six_months_ago,
-        )
-        .order_by(HospitalSummary.admission_date.desc())
-        .all()
-    )
-
-    # Get immunizations
-    immunizations = (
-        Immunization.query.filter_by(patient_id=patient_id)
-        .order_by(Immunization.administration_date.desc())
-        .all()
-    )
+    from prep_sheet_docx_bulk import DOCX_MIMETYPE, load_prep_doc_jobs
 
-    # Get past 3 appointments for the patient
-    past_appointments = (
-        Appointment.query.filter(
-            Appointment.patient_id == patient_id,
-            Appointment.appointment_date < datetime.now(),
-        )
-        .order_by(Appointment.appointment_date.desc())
-        .limit(3)
-        .all()
-    )
+    jobs = load_prep_doc_jobs([patient_id], date.today())
+    if not jobs:
+        abort(404)
+    job = jobs[0]
 
     # Generate the Word document
-    doc_bytes = generate_prep_sheet_doc(
-        patient,
-        conditions=conditions,
-        screenings=screenings,
-        vitals=vitals,
-        labs=labs,
-        imaging=imaging,
-        past_appointments=past_appointments,
-        consults=consults,
-        hospital=hospital,
-        immunizations=immunizations,
-        last_visit_date=last_visit_date,
-    )
+    doc_bytes = generate_prep_sheet_doc(job["patient"], **job["records"])
 
     # Create a response with the document
     from io import BytesIO
 
-    doc_io = BytesIO(doc_bytes)
-
-    filename = f"PrepSheet_{patient.last_name}_{patient.first_name}_{datetime.now().strftime('%Y%m%d')}.docx"
-
     return send_file(
-        doc_io,
+        BytesIO(doc_bytes),
         as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        download_name=job["filename"],
+        mimetype=DOCX_MIMETYPE,
     )
 
 
+@app.route("/prep_sheets/download")
+def download_prep_sheets():
+    """Download the Word prep sheets of a day's appointments as one ZIP, streamed as they render"""
+    from prep_sheet_docx_bulk import prep_sheet_doc_renderer
+
+    date_str = request.args.get("date")
+    try:
+        prep_date = datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else date.today()
+    except ValueError:
+        flash("Invalid date format. Please use YYYY-MM-DD.", "danger")
+        return redirect(url_for("index"))
+
+    filename = f"PrepSheets_{prep_date.strftime('%Y%m%d')}.zip"
+    response = Response(
+        stream_with_context(prep_sheet_doc_renderer.stream_zip(prep_date)),
+        mimetype="application/zip",
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
+
+
 @app.route("/patients/<int:patient_id>/save_prep_sheet", methods=["POST"])
 @safe_db_operation
 def save_prep_sheet(patient_id):
@@ -2965,19 +2529,30 @@ def view_document(document_id):
 
 @app.route("/documents/<int:document_id>/image")
 def document_image(document_id):
-    """Serve a document's binary content as an image"""
+    """Stream a document's binary content with ETag and Range support"""
+    from flask import Response
+    from werkzeug.wsgi import wrap_file
+    from document_blob_store import open_document_content
+
     document = MedicalDocument.query.get_or_404(document_id)
 
-    if not document.binary_content:
+    opened = open_document_content(document)
+    if opened is None:
         abort(404)
+    blob, size, content_hash = opened
 
     # Determine mime type for the response
     mime_type = document.mime_type or "application/octet-stream"
 
-    # Create a response with the binary content
-    response = make_response(document.binary_content)
-    response.headers.set("Content-Type", mime_type)
-    return response
+    response = Response(
+        wrap_file(request.environ, blob), mimetype=mime_type, direct_passthrough=True
+    )
+    response.content_length = size
+    # Content-addressed hash is a strong validator; PHI must be revalidated, never shared
+    response.set_etag(content_hash)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request.environ, accept_ranges=True, complete_length=size)
 
 
 @app.route("/documents/repository")
@@ -6399,7 +5974,7 @@ def delete_patient(patient_id):
             ImagingStudy.query.filter_by(patient_id=pid).delete()
             ConsultReport.query.filter_by(patient_id=pid).delete()
             HospitalSummary.query.filter_by(patient_id=pid).delete()
-            MedicalDocument.query.filter_by(patient_id=pid).delete()
+            MedicalDocument.delete_for_patient(pid)
 
             # Delete the patient
             db.session.delete(patient)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Document Blob Store
+Pluggable storage for MedicalDocument binary content. Bytes live outside the database in a
+content-addressed store; the document row keeps only the SHA-256 hash, size and mime type.
+The legacy medical_document.binary_content column is still read for rows not yet migrated.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from typing import BinaryIO, Dict, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """Interface for content-addressed blob backends"""
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """Store bytes and return (sha256 hex digest, size)"""
+        raise NotImplementedError
+
+    def open(self, blob_hash: str) -> Optional[BinaryIO]:
+        """Open a blob for streaming reads, or None if it does not exist"""
+        raise NotImplementedError
+
+    def size(self, blob_hash: str) -> Optional[int]:
+        raise NotImplementedError
+
+    def delete(self, blob_hash: str) -> bool:
+        raise NotImplementedError
+
+    def get(self, blob_hash: str) -> Optional[bytes]:
+        """Read a whole blob into memory"""
+        blob = self.open(blob_hash)
+        if blob is None:
+            return None
+        with blob:
+            return blob.read()
+
+    def exists(self, blob_hash: str) -> bool:
+        return self.size(blob_hash) is not None
+
+
+class LocalFilesystemBlobStore(BlobStore):
+    """Content-addressed blobs on local disk, sharded as <root>/ab/cd/<sha256>"""
+
+    def __init__(self, root: str = None):
+        self.root = root or os.environ.get(
+            'DOCUMENT_BLOB_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'document_blobs')
+        )
+
+    def _path(self, blob_hash: str) -> str:
+        if len(blob_hash) != 64 or any(c not in '0123456789abcdef' for c in blob_hash):
+            raise ValueError(f"Invalid blob hash: {blob_hash!r}")
+        return os.path.join(self.root, blob_hash[:2], blob_hash[2:4], blob_hash)
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        blob_hash = hashlib.sha256(data).hexdigest()
+        path = self._path(blob_hash)
+
+        # Identical content is stored once
+        if not os.path.exists(path):
+            # Documents are PHI: blobs are readable by the application user only
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as temp_file:
+                    temp_file.write(data)
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+        return blob_hash, len(data)
+
+    def open(self, blob_hash: str) -> Optional[BinaryIO]:
+        try:
+            return open(self._path(blob_hash), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def size(self, blob_hash: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self._path(blob_hash))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, blob_hash: str) -> bool:
+        try:
+            os.remove(self._path(blob_hash))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+# Available backends, selected with DOCUMENT_BLOB_BACKEND
+BLOB_BACKENDS: Dict[str, Type[BlobStore]] = {
+    'local': LocalFilesystemBlobStore,
+}
+
+_blob_store: Optional[BlobStore] = None
+
+
+def register_blob_backend(name: str, backend: Type[BlobStore]):
+    """Register an additional blob backend (e.g. object storage)"""
+    BLOB_BACKENDS[name] = backend
+
+
+def get_blob_store() -> BlobStore:
+    """Get the configured blob store"""
+    global _blob_store
+    if _blob_store is None:
+        backend = os.environ.get('DOCUMENT_BLOB_BACKEND', 'local')
+        if backend not in BLOB_BACKENDS:
+            raise ValueError(f"Unknown document blob backend: {backend}")
+        _blob_store = BLOB_BACKENDS[backend]()
+        logger.info(f"Document blob store: {backend}")
+    return _blob_store
+
+
+def blob_storage_enabled() -> bool:
+    """New content goes to the blob store unless DOCUMENT_BLOB_BACKEND=database"""
+    return os.environ.get('DOCUMENT_BLOB_BACKEND', 'local') != 'database'
+
+
+def open_document_content(document) -> Optional[Tuple[BinaryIO, int, str]]:
+    """
+    Open a document's binary content for streaming
+
+    Returns:
+        (file object, size, sha256 hex digest), or None if the document has no binary content
+    """
+    if document.blob_hash:
+        store = get_blob_store()
+        blob = store.open(document.blob_hash)
+        if blob is not None:
+            size = document.blob_size if document.blob_size is not None else store.size(document.blob_hash)
+            return blob, size, document.blob_hash
+        logger.warning(f"Blob {document.blob_hash[:12]} for document {document.id} is missing, using legacy column")
+
+    # Rows not yet migrated still hold the bytes in the database
+    data = document.binary_data
+    if not data:
+        return None
+    return io.BytesIO(data), len(data), hashlib.sha256(data).hexdigest()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Document Match Store
+Persists keyword match results per (document, screening type) in document_screening_match so
+every refresh path reuses them, and only rescans documents whose matched text changed or whose
+screening types had their keywords edited.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_
+
+from app import db
+from models import DocumentScreeningMatch
+from compiled_keyword_matcher import ScreeningKeywordIndex, document_content_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentMatchStore:
+    """
+    Read-through store for persisted document/screening-type match results.
+
+    A stored row is reused while its keyword fingerprint equals the screening type's current
+    fingerprint and either the document's updated_at is unchanged or its content fingerprint
+    still matches. Everything else is recomputed in one pass over the document and written back.
+    """
+
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self):
+        self.stats = {'rows_reused': 0, 'rows_recomputed': 0, 'documents_scanned': 0, 'write_errors': 0}
+
+    def get_document_matches(self, documents: List, keyword_index: ScreeningKeywordIndex) -> Dict[int, Dict[int, Dict]]:
+        """
+        Get match results for documents against every screening type in the index
+
+        Args:
+            documents: MedicalDocument objects (content may be deferred; it is only loaded when stale)
+            keyword_index: Index over the active screening types
+
+        Returns:
+            {document_id: {screening_type_id: match result}} containing matches only
+        """
+        stored_rows = self._load_rows([doc.id for doc in documents if doc.id is not None])
+
+        results = {}
+        replacements = []  # (document_id, stale type ids, new row dicts)
+        touches = []  # (document_id, type ids, document updated_at)
+
+        for document in documents:
+            if document.id is None:
+                results[document.id] = keyword_index.match_document(document)
+                continue
+
+            matches, stale_type_ids, new_rows, touched_type_ids = self._match_document(
+                document, keyword_index, stored_rows
+            )
+            results[document.id] = matches
+            if stale_type_ids:
+                replacements.append((document.id, stale_type_ids, new_rows))
+            if touched_type_ids:
+                touches.append((document.id, touched_type_ids, document.updated_at))
+
+        if replacements or touches:
+            self._write(replacements, touches)
+
+        return results
+
+    def _load_rows(self, document_ids: List[int]) -> Dict[Tuple[int, int], DocumentScreeningMatch]:
+        """Load stored rows for the documents, keyed by (document_id, screening_type_id)"""
+        rows = {}
+        try:
+            for start in range(0, len(document_ids), self.QUERY_CHUNK_SIZE):
+                chunk = document_ids[start:start + self.QUERY_CHUNK_SIZE]
+                for row in DocumentScreeningMatch.query.filter(DocumentScreeningMatch.document_id.in_(chunk)).all():
+                    rows[(row.document_id, row.screening_type_id)] = row
+        except Exception as e:
+            logger.warning(f"Could not load stored document matches, recomputing: {e}")
+            db.session.rollback()
+        return rows
+
+    def _match_document(self, document, keyword_index: ScreeningKeywordIndex,
+                        stored_rows: Dict[Tuple[int, int], DocumentScreeningMatch]):
+        """Resolve one document's matches from stored rows, rescanning it only if any row is stale"""
+        content_fingerprint = None
+        fresh_rows = {}
+        stale_type_ids = []
+        touched_type_ids = []
+
+        for type_id, keyword_fingerprint in keyword_index.fingerprints.items():
+            row = stored_rows.get((document.id, type_id))
+            if row is None or row.keyword_fingerprint != keyword_fingerprint:
+                stale_type_ids.append(type_id)
+                continue
+
+            if row.document_updated_at == document.updated_at:
+                fresh_rows[type_id] = row
+                continue
+
+            # Document row was touched; only its matched text decides whether the result still holds
+            if content_fingerprint is None:
+                content_fingerprint = document_content_fingerprint(document)
+            if row.content_fingerprint == content_fingerprint:
+                fresh_rows[type_id] = row
+                touched_type_ids.append(type_id)
+            else:
+                stale_type_ids.append(type_id)
+
+        matches = {}
+        for type_id, row in fresh_rows.items():
+            if row.confidence >= keyword_index.min_confidence:
+                matches[type_id] = keyword_index.match_result(
+                    type_id, document.id, row.matched_keywords_list, row.confidence
+                )
+        self.stats['rows_reused'] += len(fresh_rows)
+
+        new_rows = []
+        if stale_type_ids:
+            if content_fingerprint is None:
+                content_fingerprint = document_content_fingerprint(document)
+            scores = keyword_index.score_document(document)
+            self.stats['documents_scanned'] += 1
+            self.stats['rows_recomputed'] += len(stale_type_ids)
+
+            computed_at = datetime.utcnow()
+            for type_id in stale_type_ids:
+                keyword_matches, confidence = scores.get(type_id, ([], 0.0))
+                new_rows.append({
+                    'document_id': document.id,
+                    'screening_type_id': type_id,
+                    'confidence': confidence,
+                    'matched_keywords': json.dumps(keyword_matches) if keyword_matches else None,
+                    'keyword_fingerprint': keyword_index.fingerprints[type_id],
+                    'content_fingerprint': content_fingerprint,
+                    'document_updated_at': document.updated_at,
+                    'computed_at': computed_at,
+                })
+                if confidence >= keyword_index.min_confidence:
+                    matches[type_id] = keyword_index.match_result(type_id, document.id, keyword_matches, confidence)
+
+        return matches, stale_type_ids, new_rows, touched_type_ids
+
+    def _write(self, replacements: List[Tuple[int, List[int], List[Dict]]],
+               touches: List[Tuple[int, List[int], Optional[datetime]]]):
+        """
+        Write recomputed rows in their own transaction so callers' sessions are unaffected;
+        a failed write only means the rows are recomputed next time
+        """
+        table = DocumentScreeningMatch.__table__
+        try:
+            with db.engine.begin() as connection:
+                for document_id, stale_type_ids, new_rows in replacements:
+                    connection.execute(table.delete().where(and_(
+                        table.c.document_id == document_id,
+                        table.c.screening_type_id.in_(stale_type_ids)
+                    )))
+                    connection.execute(table.insert(), new_rows)
+
+                for document_id, type_ids, document_updated_at in touches:
+                    connection.execute(table.update().where(and_(
+                        table.c.document_id == document_id,
+                        table.c.screening_type_id.in_(type_ids)
+                    )).values(document_updated_at=document_updated_at))
+        except Exception as e:
+            self.stats['write_errors'] += 1
+            logger.warning(f"Could not persist document match results: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get reuse/recompute counters"""
+        return dict(self.stats)
+
+
+# Global instance
+document_match_store = DocumentMatchStore()
@@ -5,22 +5,26 @@ Uses ScreeningType rules from /screenings?tab=types
 """
 
 from datetime import datetime, date
+from types import SimpleNamespace
 from typing import Dict, Any, Optional, List, Tuple
 import re
-import json
 from models import ScreeningType, Patient, MedicalDocument, Screening
 from app import db
 
 # Import shared utilities to eliminate duplicate logic
-from shared_screening_utilities import PatientDemographicsMixin, DocumentMatchingMixin, ScreeningUtilities
+from shared_screening_utilities import PatientDemographicsMixin, DocumentMatchingMixin
+from screening_rule_set import ScreeningRule, get_screening_rule_set
 
 
 class DocumentScreeningMatcher(PatientDemographicsMixin, DocumentMatchingMixin):
     """Matches documents to screening types based on content, keywords, and patient criteria"""
     
-    def __init__(self):
-        # Use shared utility function instead of duplicate logic
-        self.screening_types = ScreeningUtilities.get_active_screening_types()
+    MIN_KEYWORD_CONFIDENCE = 0.5  # Same threshold as the unified engine
+    
+    @property
+    def screening_types(self) -> List[ScreeningRule]:
+        """Compiled rules of the active screening types from the shared rule set snapshot"""
+        return get_screening_rule_set().with_status('active')
     
     def match_document_to_screening(
         self, 
@@ -75,6 +79,32 @@ class DocumentScreeningMatcher(PatientDemographicsMixin, DocumentMatchingMixin):
         result['status'] = 'no_keyword_match'
         return result
     
+    def check_document_match(self, document: Dict[str, Any], screening_type: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keyword match for the async processors, which pass document and screening type dicts
+    
+        Returns:
+            Dict with 'matches', 'confidence', 'match_source' and 'matched_keywords'
+        """
+        rule = get_screening_rule_set().get(screening_type.get('id'))
+        if rule is None or not rule.keyword_matcher.has_keywords:
+            return {'matches': False, 'confidence': 0.0, 'match_source': 'no_keywords', 'matched_keywords': []}
+    
+        document_view = SimpleNamespace(
+            content=document.get('content'),
+            ocr_text=document.get('ocr_text') or document.get('extracted_text'),
+            filename=document.get('filename'),
+            document_name=document.get('document_name'),
+            document_type=document.get('document_type'),
+        )
+        matched_keywords, confidence = rule.keyword_matcher.score_document(document_view)
+        return {
+            'matches': confidence >= self.MIN_KEYWORD_CONFIDENCE,
+            'confidence': confidence,
+            'match_source': 'keywords',
+            'matched_keywords': matched_keywords
+        }
+    
     def find_matching_screenings(
         self, 
         document: MedicalDocument, 
@@ -266,8 +296,8 @@ class DocumentScreeningMatcher(PatientDemographicsMixin, DocumentMatchingMixin):
                 
                 for match in matches:
                     if match['matched']:
-                        # Get the screening type
-                        screening_type = ScreeningType.query.get(match['screening_id'])
+                        # Get the screening type's compiled rule
+                        screening_type = get_screening_rule_set().get(match['screening_id'])
                         if not screening_type:
                             continue
                         
@@ -462,50 +492,35 @@ def generate_prep_sheet_screening_recommendations(
         return _empty_screening_recommendations_response(f"Error generating recommendations: {str(e)}")
 
 
-def _get_active_screening_types_for_prep_sheet(patient: Patient, content_sources: List[str]) -> List[ScreeningType]:
+def _get_active_screening_types_for_prep_sheet(patient: Patient, content_sources: List[str]) -> List[ScreeningRule]:
     """Get active screening types based on prep sheet settings and patient criteria"""
-    from models import ScreeningType, Screening
+    from models import Screening
     
-    screening_types = set()
+    rule_set = get_screening_rule_set()
+    screening_types = {}
     
     # Age-based screenings
     if 'age_based' in content_sources:
-        age_based = ScreeningType.query.filter(
-            ScreeningType.is_active == True,
-            ScreeningType.status == 'active'
-        ).all()
-        
-        for st in age_based:
-            # Check age criteria
-            if st.min_age and patient.age < st.min_age:
-                continue
-            if st.max_age and patient.age > st.max_age:
-                continue
-            
-            # Check gender criteria
-            if st.gender_specific and patient.sex.lower() != st.gender_specific.lower():
-                continue
-                
-            screening_types.add(st)
+        for rule in rule_set.with_status('active'):
+            # Check age and gender criteria
+            if rule.demographic_mismatch(patient.age, patient.sex) is None:
+                screening_types[rule.id] = rule
     
     # Existing screenings in database
     if 'existing_screenings' in content_sources:
+        rules_by_name = {rule.name: rule for rule in rule_set}
         existing_screenings = Screening.query.filter_by(patient_id=patient.id).all()
         for screening in existing_screenings:
-            screening_type = ScreeningType.query.filter_by(
-                name=screening.screening_type, 
-                is_active=True
-            ).first()
-            if screening_type:
-                screening_types.add(screening_type)
+            rule = rules_by_name.get(screening.screening_type)
+            if rule:
+                screening_types[rule.id] = rule
     
     # Gender-based screenings (additional logic)
     if 'gender_based' in content_sources:
-        gender_specific = ScreeningType.query.filter(
-            ScreeningType.is_active == True,
-            ScreeningType.gender_specific == patient.sex.lower()
-        ).all()
-        screening_types.update(gender_specific)
+        patient_sex = patient.sex.lower() if patient.sex else ""
+        for rule in rule_set:
+            if rule.required_sex == patient_sex:
+                screening_types[rule.id] = rule
     
     # Condition-based screenings (if conditions exist)
     if 'condition_based' in content_sources:
@@ -513,39 +528,11 @@ def _get_active_screening_types_for_prep_sheet(patient: Patient, content_sources
         patient_conditions = Condition.query.filter_by(patient_id=patient.id).all()
         if patient_conditions:
             # Add screening types that match patient conditions
-            condition_triggered = ScreeningType.query.filter(
-                ScreeningType.is_active == True,
-                ScreeningType.trigger_conditions.isnot(None)
-            ).all()
-            
-            for st in condition_triggered:
-                if _patient_matches_trigger_conditions(patient_conditions, st):
-                    screening_types.add(st)
-    
-    return list(screening_types)
-
-
-def _patient_matches_trigger_conditions(patient_conditions: List, screening_type: ScreeningType) -> bool:
-    """Check if patient conditions match screening type trigger conditions"""
-    if not screening_type.trigger_conditions:
-        return False
+            for rule in rule_set:
+                if rule.has_trigger_conditions and rule.matches_conditions(patient_conditions):
+                    screening_types[rule.id] = rule
     
-    try:
-        trigger_conditions = json.loads(screening_type.trigger_conditions) if isinstance(screening_type.trigger_conditions, str) else screening_type.trigger_conditions
-        if not trigger_conditions:
-            return False
-        
-        patient_condition_names = [c.name.lower() for c in patient_conditions]
-        
-        for trigger in trigger_conditions:
-            trigger_name = trigger.get('condition', '').lower()
-            if any(trigger_name in condition for condition in patient_condition_names):
-                return True
-        
-        return False
-        
-    except (json.JSONDecodeError, AttributeError):
-        return False
+    return list(screening_types.values())
 
 
 def _analyze_screening_with_documents(
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Document Search Index
+Indexed lookup of the patients whose documents a screening keyword change can affect.
+
+Every medical document carries a search_text, maintained on write: the words of its content
+(which includes OCR text), filename, document name and type, split exactly where the keyword
+matcher puts word boundaries (runs of ASCII letters and digits in the lowercased text). Each
+keyword becomes substring and whole-word search terms over those words that together cover
+every match the compiled keyword matcher can make, including its fuzzy and separator variants,
+so the lookup may return extra patients but never misses one. On PostgreSQL the terms are LIKE
+patterns served by a pg_trgm GIN index; on SQLite an FTS5 trigram table, kept in sync by
+triggers, answers them. Either way a keyword change costs one query that returns patient ids only.
+"""
+
+import itertools
+import logging
+import re
+from typing import Iterable, List, Set, Tuple
+
+from sqlalchemy import bindparam, or_, select, text
+
+logger = logging.getLogger(__name__)
+
+# The keyword matcher's word characters (its boundaries are lookarounds on [a-zA-Z0-9])
+_MATCH_WORD = re.compile(r'[a-z0-9]+')
+# Case-insensitive matching also treats these lowercase letters as i and s
+_CASE_FOLDS = str.maketrans({'ı': 'i', 'ſ': 's'})
+
+# Keywords up to this long only match whole words (the matcher's partial match needs more)
+MAX_WORD_KEYWORD_LENGTH = 3
+# Keywords up to this long also match with the matcher's case variants
+MAX_CASE_VARIANT_KEYWORD_LENGTH = 4
+
+# Characters the matcher's variants accept, as they can appear in lowercased text
+CASE_CHARACTER_VARIANTS = {'1': '1l'}
+FUZZY_CHARACTER_VARIANTS = {'a': 'a@', '1': '1l', 'o': 'o0', 'i': 'i1l', 's': 's5'}
+
+# Phrases with more words than this are looked up by their longest word
+MAX_ENUMERATED_PHRASE_WORDS = 5
+# Shortest term the FTS5 trigram tokenizer can match
+MIN_FTS_TERM_LENGTH = 3
+
+FTS_TABLE = "medical_document_fts"
+
+POSTGRESQL_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Whole words are matched as space-delimited LIKE patterns, which the trigram index serves
+    "DROP INDEX IF EXISTS ix_medical_document_search_vector",
+    "CREATE INDEX IF NOT EXISTS ix_medical_document_search_text_trgm ON medical_document "
+    "USING GIN (search_text gin_trgm_ops)",
+]
+
+# External-content FTS5 table over search_text with triggers keeping it in step with medical_document
+SQLITE_FTS_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "search_text, content='medical_document', content_rowid='id', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON medical_document BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON medical_document BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_text ON medical_document BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+]
+
+
+def _match_words(value: str) -> List[str]:
+    """Words of a text as the matcher's boundaries delimit them in its lowercased form"""
+    lowered = str(value).lower()
+    words = _MATCH_WORD.findall(lowered)
+    folded = lowered.translate(_CASE_FOLDS)
+    if folded != lowered:
+        # Case-insensitive patterns read these letters as word characters, the others as boundaries
+        words.extend(_MATCH_WORD.findall(folded))
+    return words
+
+
+def build_document_search_text(content, filename, document_name, document_type) -> str:
+    """Space-delimited match words (with a leading and trailing space for whole-word matches)"""
+    words = []
+    for value in (content, filename, document_name, document_type):
+        if value:
+            words.extend(_match_words(value))
+    return f" {' '.join(words)} "
+
+
+def changed_keywords(old_keywords: Iterable[str], new_keywords: Iterable[str]) -> List[str]:
+    """Keywords added or removed; documents matching only unchanged keywords keep their matches"""
+    old = {keyword.lower().strip() for keyword in old_keywords or [] if keyword and keyword.strip()}
+    new = {keyword.lower().strip() for keyword in new_keywords or [] if keyword and keyword.strip()}
+    return sorted(old ^ new)
+
+
+def _search_forms(raw_keyword: str) -> Set[str]:
+    """Search text forms of a keyword as it would appear in a document's text"""
+    return {' '.join(_MATCH_WORD.findall(form)) for form in (raw_keyword, raw_keyword.translate(_CASE_FOLDS))}
+
+
+def _character_variants(keyword: str, variants: dict) -> Set[str]:
+    return {''.join(chars) for chars in itertools.product(*[variants.get(char, char) for char in keyword])}
+
+
+def keyword_search_terms(keywords: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    (substrings, whole words) of search_text that together find every document the keywords
+    can match. An empty substring (a keyword without letters or digits) matches every document.
+    """
+    substrings, words = set(), set()
+    for keyword in keywords:
+        keyword = keyword.lower().strip()
+        if not keyword:
+            continue
+
+        if ' ' in keyword:
+            # Phrase words may be separated by any run of whitespace, '-', '_' and '.', or by nothing
+            phrase_words = keyword.split()
+            if len(phrase_words) > MAX_ENUMERATED_PHRASE_WORDS:
+                substrings.add(max(_MATCH_WORD.findall(keyword) or [''], key=len))
+                continue
+            for separators in itertools.product(('', ' '), repeat=len(phrase_words) - 1):
+                form = phrase_words[0] + ''.join(
+                    separator + word for separator, word in zip(separators, phrase_words[1:])
+                )
+                words.update(_search_forms(form))
+            continue
+
+        if len(keyword) > MAX_WORD_KEYWORD_LENGTH:
+            # Partial match: the keyword anywhere in the text
+            substrings.update(_search_forms(keyword))
+        else:
+            words.update(_search_forms(keyword))
+
+        if len(keyword) <= MAX_CASE_VARIANT_KEYWORD_LENGTH:
+            for variant in _character_variants(keyword, CASE_CHARACTER_VARIANTS):
+                words.update(_search_forms(variant))
+        if len(keyword) == MAX_WORD_KEYWORD_LENGTH:
+            for variant in _character_variants(keyword, FUZZY_CHARACTER_VARIANTS):
+                words.update(_search_forms(variant))
+
+    # A keyword of separators only matches wherever the matcher finds it; look at every document
+    if '' in words:
+        words.discard('')
+        substrings.add('')
+    return sorted(substrings), sorted(words)
+
+
+def has_sqlite_fts_index() -> bool:
+    from app import db
+
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    return db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def patients_matching_keywords(keywords: Iterable[str]) -> Set[int]:
+    """Ids of patients with a document that may match any of the keywords, in one query"""
+    from app import db
+    from models import MedicalDocument
+
+    substrings, words = keyword_search_terms(keywords)
+    terms = substrings + [f' {word} ' for word in words]
+    if not terms:
+        return set()
+
+    if min(len(term) for term in terms) >= MIN_FTS_TERM_LENGTH and has_sqlite_fts_index():
+        # Quoted FTS5 strings are substring matches under the trigram tokenizer
+        query = ' OR '.join(f'"{term}"' for term in terms)
+        statement = text(
+            f"SELECT DISTINCT medical_document.patient_id FROM {FTS_TABLE} "
+            f"JOIN medical_document ON medical_document.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :query"
+        ).bindparams(bindparam('query', query))
+    else:
+        # Terms are letters, digits and spaces only, so they need no LIKE escaping
+        statement = select(MedicalDocument.patient_id).distinct().where(
+            or_(*[MedicalDocument.search_text.like(f'%{term}%') for term in terms])
+        )
+
+    return {patient_id for (patient_id,) in db.session.execute(statement) if patient_id}
+
+
+def create_document_search_index():
+    """Create the database's search index over medical_document.search_text (idempotent)"""
+    from app import db
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        for statement in POSTGRESQL_INDEXES:
+            db.session.execute(text(statement))
+    elif dialect == 'sqlite':
+        created = not has_sqlite_fts_index()
+        for statement in SQLITE_FTS_STATEMENTS:
+            db.session.execute(text(statement))
+        if created:
+            db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def reindex_document_search(batch_size: int = 500, only_missing: bool = True) -> int:
+    """Rebuild search_text (documents written before the column existed), leaving updated_at alone"""
+    from app import db
+    from models import MedicalDocument
+
+    table = MedicalDocument.__table__
+    update = (
+        table.update()
+        .where(table.c.id == bindparam('_id'))
+        .values(search_text=bindparam('_search_text'), updated_at=table.c.updated_at)
+    )
+    reindexed = 0
+    last_id = 0
+    while True:
+        query = select(
+            table.c.id, table.c.content, table.c.filename, table.c.document_name, table.c.document_type
+        ).where(table.c.id > last_id)
+        if only_missing:
+            query = query.where(table.c.search_text.is_(None))
+        rows = db.session.execute(query.order_by(table.c.id).limit(batch_size)).all()
+        if not rows:
+            return reindexed
+
+        db.session.execute(update, [
+            {'_id': row.id, '_search_text': build_document_search_text(
+                row.content, row.filename, row.document_name, row.document_type
+            )}
+            for row in rows
+        ])
+        db.session.commit()
+        reindexed += len(rows)
+        last_id = rows[-1].id
+        logger.info(f"Reindexed document search for {reindexed} documents")
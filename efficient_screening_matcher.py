@@ -6,60 +6,61 @@ Eliminates redundant API calls and old system references
 """
 
 from typing import Dict, List, Optional, Set
-from models import ScreeningType, Patient, MedicalDocument
-from app import db
+from models import Patient, MedicalDocument
+from screening_rule_set import ScreeningRule, get_screening_rule_set, screening_rule_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
 class EfficientScreeningMatcher:
     """
-    Efficient screening matcher that caches screening types and eliminates redundant calls
+    Efficient screening matcher backed by the shared compiled screening rule set snapshot
     """
     
     def __init__(self):
-        self._screening_cache = {}
         self._keywords_cache = {}
+        self._keywords_version = None
         
-    def get_all_active_screenings(self) -> List[ScreeningType]:
-        """Get all active screening types with caching"""
-        if not self._screening_cache:
-            screenings = ScreeningType.query.filter_by(is_active=True, status='active').all()
-            self._screening_cache = {s.id: s for s in screenings}
-        
-        return list(self._screening_cache.values())
+    def get_all_active_screenings(self) -> List[ScreeningRule]:
+        """Get compiled rules of all active screening types from the shared snapshot"""
+        return get_screening_rule_set().with_status('active')
     
     def get_screening_keywords(self, screening_id: int) -> Dict[str, List[str]]:
         """
-        Get all keywords for a screening type with caching
+        Get all keywords for a screening type, lowercased once per rule set version
         Returns dict with 'filename', 'content', 'document' keyword lists
         """
+        rule_set = get_screening_rule_set()
+        if self._keywords_version != rule_set.version:
+            self._keywords_cache = {}
+            self._keywords_version = rule_set.version
+        
         if screening_id in self._keywords_cache:
             return self._keywords_cache[screening_id]
         
-        screening = self._screening_cache.get(screening_id)
-        if not screening:
-            screening = ScreeningType.query.get(screening_id)
-            if screening:
-                self._screening_cache[screening_id] = screening
-        
-        if not screening:
+        rule = rule_set.get(screening_id)
+        if not rule:
             return {'filename': [], 'content': [], 'document': []}
         
         # Get keywords only from user-defined fields - no auto-generation
+        keyword_matcher = rule.keyword_matcher
+        all_keywords = list(dict.fromkeys(
+            keyword.lower() for keyword in keyword_matcher.content_keywords + keyword_matcher.document_keywords
+        ))
         keywords = {
-            'filename': screening.get_all_keywords() or [],
-            'content': screening.get_all_keywords() or [],
-            'document': screening.get_all_keywords() or []
+            'filename': all_keywords,
+            'content': all_keywords,
+            'document': all_keywords
         }
         
         self._keywords_cache[screening_id] = keywords
         return keywords
     
     def clear_cache(self):
-        """Clear the internal cache"""
-        self._screening_cache.clear()
+        """Clear the internal cache and re-check the rule set version on next use"""
         self._keywords_cache.clear()
+        self._keywords_version = None
+        screening_rule_cache.expire()
     
     def match_document_bulk(self, document: MedicalDocument, patient: Patient) -> List[Dict]:
         """
@@ -94,21 +95,9 @@ class EfficientScreeningMatcher:
         matches.sort(key=lambda x: x['match_score'], reverse=True)
         return matches
     
-    def _check_demographics_quick(self, screening: ScreeningType, patient: Patient) -> bool:
-        """Quick demographic check"""
-        # Age check
-        patient_age = patient.age
-        if screening.min_age is not None and patient_age < screening.min_age:
-            return False
-        if screening.max_age is not None and patient_age > screening.max_age:
-            return False
-        
-        # Gender check
-        if screening.gender_specific:
-            if patient.sex.lower() != screening.gender_specific.lower():
-                return False
-        
-        return True
+    def _check_demographics_quick(self, screening: ScreeningRule, patient: Patient) -> bool:
+        """Quick demographic check using the compiled age/sex predicates"""
+        return screening.demographic_mismatch(patient.age, patient.sex) is None
     
     def _calculate_match_score(self, document: MedicalDocument, keywords: Dict[str, List[str]]) -> float:
         """Calculate match score for a document against keywords"""
@@ -120,17 +109,17 @@ class EfficientScreeningMatcher:
         
         # Filename matches (weight: 3.0)
         for keyword in keywords['filename']:
-            if keyword.lower() in filename_text:
+            if keyword in filename_text:
                 score += 3.0
         
         # Content matches (weight: 2.0)
         for keyword in keywords['content']:
-            if keyword.lower() in content_text:
+            if keyword in content_text:
                 score += 2.0
         
         # Document type matches (weight: 1.0)
         for keyword in keywords['document']:
-            if keyword.lower() in content_text or keyword.lower() in filename_text:
+            if keyword in content_text or keyword in filename_text:
                 score += 1.0
         
         return score
@@ -145,7 +134,7 @@ class EfficientScreeningMatcher:
         # Check all keyword types
         for keyword_type, keyword_list in keywords.items():
             for keyword in keyword_list:
-                if keyword.lower() in filename_text or keyword.lower() in content_text:
+                if keyword in filename_text or keyword in content_text:
                     matched.append(f"{keyword} ({keyword_type})")
         
         return matched
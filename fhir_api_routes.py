@@ -5,9 +5,10 @@ Flask routes that expose FHIR-compliant resources for external API compatibility
 and enhanced prep sheet functionality using standardized healthcare data formats.
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, abort, g, jsonify, request, send_file, stream_with_context, url_for
 from datetime import datetime, date
 import json
+import os
 from fhir_object_mappers import (
     patient_to_fhir,
     appointment_to_fhir_encounter,
@@ -16,15 +17,40 @@ from fhir_object_mappers import (
 )
 from fhir_prep_sheet_integration import (
     generate_fhir_prep_sheet,
-    export_patient_as_fhir_bundle,
     search_patients_as_fhir
 )
-from models import Patient, Appointment, MedicalDocument
+from fhir_bundle_streamer import fhir_bundle_streamer, parse_fhir_instant, decode_cursor
+from fhir_bulk_export import fhir_bulk_export_runner
+from models import Patient, Appointment, MedicalDocument, FHIRExportJob
 from app import db
+from jwt_utils import jwt_required
 
 # Create FHIR API blueprint
 fhir_api = Blueprint('fhir_api', __name__, url_prefix='/fhir')
 
+# System-level bulk export covers every patient's records
+BULK_EXPORT_ENDPOINTS = {
+    'fhir_api.bulk_export_kickoff',
+    'fhir_api.bulk_export_status',
+    'fhir_api.bulk_export_delete',
+    'fhir_api.bulk_export_resume',
+    'fhir_api.bulk_export_file',
+}
+
+@fhir_api.before_request
+@jwt_required
+def require_fhir_authentication():
+    """Every FHIR endpoint serves PHI: require a valid token, and an admin for bulk export"""
+    if request.endpoint in BULK_EXPORT_ENDPOINTS and not g.current_user.is_admin:
+        return jsonify({
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "forbidden",
+                "details": {"text": "Bulk export requires administrator privileges"}
+            }]
+        }), 403
+
 @fhir_api.route('/Patient/<int:patient_id>', methods=['GET'])
 def get_patient_fhir(patient_id):
     """
@@ -53,27 +79,62 @@ def get_patient_everything(patient_id):
     """
     Get comprehensive patient data as FHIR Bundle (implements $everything operation)
     
+    The Bundle is streamed one entry at a time from server-side cursors.
+    
     Query Parameters:
         include_documents: Include document content (default: false)
+        _count: Maximum entries per page; the Bundle carries a "next" link while more remain
+        _since: Only include resources updated at or after this instant
+        _cursor: Page position from a previous "next" link
     
     Returns:
-        FHIR Bundle with all patient-related resources
+        FHIR searchset Bundle with all patient-related resources
     """
     try:
         include_docs = request.args.get('include_documents', 'false').lower() == 'true'
-        bundle = export_patient_as_fhir_bundle(patient_id, include_documents=include_docs)
+        cursor = request.args.get('_cursor')
+        try:
+            count = request.args.get('_count', type=int)
+            if count is not None and count < 1:
+                raise ValueError("_count must be a positive integer")
+            since = parse_fhir_instant(request.args['_since']) if request.args.get('_since') else None
+            if cursor:
+                decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({
+                "resourceType": "OperationOutcome",
+                "issue": [{
+                    "severity": "error",
+                    "code": "invalid",
+                    "details": {"text": str(e)}
+                }]
+            }), 400
         
-        if 'error' in bundle:
+        if db.session.query(Patient.id).filter(Patient.id == patient_id).first() is None:
             return jsonify({
                 "resourceType": "OperationOutcome",
                 "issue": [{
                     "severity": "error",
                     "code": "not-found",
-                    "details": {"text": bundle['error']}
+                    "details": {"text": "Patient not found"}
                 }]
             }), 404
         
-        return jsonify(bundle), 200
+        base_params = {key: value for key, value in request.args.items() if key != '_cursor'}
+        
+        def page_url(page_cursor):
+            params = dict(base_params, _cursor=page_cursor) if page_cursor else base_params
+            return url_for('fhir_api.get_patient_everything', patient_id=patient_id, _external=True, **params)
+        
+        chunks = fhir_bundle_streamer.stream_bundle(
+            patient_id,
+            count=count,
+            since=since,
+            cursor=cursor,
+            include_documents=include_docs,
+            link_builder=page_url
+        )
+        return Response(stream_with_context(chunks), mimetype='application/fhir+json')
     except Exception as e:
         return jsonify({
             "resourceType": "OperationOutcome",
@@ -90,10 +151,11 @@ def search_patients_fhir():
     Search patients using FHIR search parameters
     
     Query Parameters:
-        name: Patient name (partial match)
+        name: Patient name, MRN or email words (best matches first)
         birthdate: Birth date (YYYY-MM-DD)
         identifier: Medical Record Number
-        _count: Maximum results (default: 20)
+        _count: Maximum results per page (default: 50, max: 100)
+        _cursor: Page position from a previous "next" link
     
     Returns:
         FHIR Bundle with search results
@@ -108,6 +170,20 @@ def search_patients_fhir():
         # Remove None values
         search_params = {k: v for k, v in search_params.items() if v is not None}
         
+        try:
+            count = request.args.get('_count', type=int)
+            if count is not None and count < 1:
+                raise ValueError("_count must be a positive integer")
+        except ValueError as e:
+            return jsonify({
+                "resourceType": "OperationOutcome",
+                "issue": [{
+                    "severity": "error",
+                    "code": "invalid",
+                    "details": {"text": str(e)}
+                }]
+            }), 400
+        
         if not search_params:
             return jsonify({
                 "resourceType": "OperationOutcome",
@@ -118,17 +194,28 @@ def search_patients_fhir():
                 }]
             }), 400
         
-        bundle = search_patients_as_fhir(search_params)
+        paging_params = {'_count': count, '_cursor': request.args.get('_cursor')}
+        base_params = {key: value for key, value in request.args.items() if key != '_cursor'}
+        
+        def page_url(page_cursor):
+            params = dict(base_params, _cursor=page_cursor) if page_cursor else base_params
+            return url_for('fhir_api.search_patients_fhir', _external=True, **params)
+        
+        bundle = search_patients_as_fhir(
+            dict(search_params, **{k: v for k, v in paging_params.items() if v is not None}),
+            link_builder=page_url
+        )
         
         if 'error' in bundle:
+            invalid = bundle.get('code') == 'invalid'
             return jsonify({
                 "resourceType": "OperationOutcome",
                 "issue": [{
                     "severity": "error",
-                    "code": "exception",
+                    "code": "invalid" if invalid else "exception",
                     "details": {"text": bundle['error']}
                 }]
-            }), 500
+            }), 400 if invalid else 500
         
         return jsonify(bundle), 200
     except Exception as e:
@@ -177,14 +264,10 @@ def get_document_fhir_reference(document_id):
     """
     try:
         document = MedicalDocument.query.get_or_404(document_id)
-        fhir_doc_ref = document_to_fhir_document_reference(document)
         
-        # Remove content if not requested
+        # Only inline content if requested
         include_content = request.args.get('include_content', 'false').lower() == 'true'
-        if not include_content and "content" in fhir_doc_ref:
-            for content in fhir_doc_ref["content"]:
-                if "attachment" in content and "data" in content["attachment"]:
-                    del content["attachment"]["data"]
+        fhir_doc_ref = document_to_fhir_document_reference(document, include_data=include_content)
         
         return jsonify(fhir_doc_ref), 200
     except Exception as e:
@@ -273,6 +356,9 @@ def get_capability_statement():
         "rest": [{
             "mode": "server",
             "documentation": "Healthcare App FHIR API",
+            "operation": [
+                {"name": "export", "definition": "http://hl7.org/fhir/uv/bulkdata/OperationDefinition/export"}
+            ],
             "security": {
                 "description": "OAuth2 Bearer Token or API Key authentication"
             },
@@ -334,6 +420,143 @@ def get_capability_statement():
     
     return jsonify(capability_statement), 200
 
+@fhir_api.route('/$export', methods=['GET'])
+def bulk_export_kickoff():
+    """
+    Start a system-level bulk data export (implements $export)
+    
+    Query Parameters:
+        _type: Comma-separated resource types (default: all supported types)
+        _since: Only include resources updated at or after this instant
+        _outputFormat: Only application/fhir+ndjson (or ndjson) is supported
+    
+    Returns:
+        202 Accepted with the status URL in Content-Location
+    """
+    try:
+        output_format = request.args.get('_outputFormat', 'application/fhir+ndjson')
+        if output_format not in ('application/fhir+ndjson', 'application/ndjson', 'ndjson'):
+            raise ValueError(f"Unsupported _outputFormat: {output_format}")
+        resource_types = [t.strip() for t in request.args.get('_type', '').split(',') if t.strip()]
+        since = parse_fhir_instant(request.args['_since']) if request.args.get('_since') else None
+        
+        job = fhir_bulk_export_runner.create_job(resource_types, since=since, request_url=request.url)
+    except ValueError as e:
+        return jsonify({
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "invalid",
+                "details": {"text": str(e)}
+            }]
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "exception",
+                "details": {"text": str(e)}
+            }]
+        }), 500
+    
+    fhir_bulk_export_runner.start_job(job.id)
+    response = Response(status=202)
+    response.headers['Content-Location'] = url_for('fhir_api.bulk_export_status', job_id=job.id, _external=True)
+    return response
+
+@fhir_api.route('/$export-status/<int:job_id>', methods=['GET'])
+def bulk_export_status(job_id):
+    """
+    Poll a bulk export job
+    
+    Returns:
+        202 with X-Progress while running, 200 with the completion manifest when done
+    """
+    job = FHIRExportJob.query.get(job_id)
+    if not job:
+        return jsonify({
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "not-found",
+                "details": {"text": f"Export job {job_id} not found"}
+            }]
+        }), 404
+    
+    if job.status == 'completed':
+        manifest = fhir_bulk_export_runner.build_manifest(
+            job,
+            lambda resource_type: url_for(
+                'fhir_api.bulk_export_file', job_id=job.id, resource_type=resource_type, _external=True
+            )
+        )
+        return jsonify(manifest), 200
+    
+    if job.status == 'cancelled':
+        # Bulk Data: a cancelled (deleted) export is no longer available to poll
+        return jsonify({
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "not-found",
+                "details": {"text": f"Export job {job_id} was cancelled"}
+            }]
+        }), 404
+    
+    if job.status == 'failed':
+        return jsonify({
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "exception",
+                "details": {"text": job.error_message or "Export job failed"}
+            }]
+        }), 500
+    
+    # Per-resource counters and throughput for polling clients
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['X-Progress'] = f"{job.progress_percent:.1f}% complete"
+    response.headers['Retry-After'] = '5'
+    return response
+
+@fhir_api.route('/$export-status/<int:job_id>', methods=['DELETE'])
+def bulk_export_delete(job_id):
+    """Cancel a bulk export job and delete its output files"""
+    if not fhir_bulk_export_runner.delete_job(job_id):
+        return jsonify({
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "not-found",
+                "details": {"text": f"Export job {job_id} not found"}
+            }]
+        }), 404
+    return Response(status=202)
+
+@fhir_api.route('/$export-status/<int:job_id>/resume', methods=['POST'])
+def bulk_export_resume(job_id):
+    """Resume an interrupted or failed bulk export job from its last checkpoints"""
+    job = FHIRExportJob.query.get_or_404(job_id)
+    if job.status in ('completed', 'cancelled'):
+        return jsonify({"success": False, "error": f"Export job {job_id} is {job.status}"}), 400
+    
+    started = fhir_bulk_export_runner.start_job(job_id)
+    return jsonify({"success": started, "already_running": not started})
+
+@fhir_api.route('/$export-files/<int:job_id>/<resource_type>.ndjson', methods=['GET'])
+def bulk_export_file(job_id, resource_type):
+    """Download one NDJSON output file of a completed bulk export job"""
+    job = FHIRExportJob.query.get_or_404(job_id)
+    if job.status != 'completed' or resource_type not in job.resource_type_list:
+        abort(404)
+    
+    path = fhir_bulk_export_runner.output_path(job, resource_type)
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='application/fhir+ndjson', conditional=True)
+
 # Register blueprint with main app
 def register_fhir_routes(app):
     """Register FHIR API routes with Flask app"""
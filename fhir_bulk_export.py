@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+FHIR Bulk Export
+System-level $export: a background job writes one NDJSON file per resource type. Resource types
+are exported in parallel by a worker pool, each reading its table in keyset-paginated pages and
+checkpointing (last id, file offset, counters) after every page so an interrupted export resumes
+where it stopped instead of starting over.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app import app, db
+from background_job_runner import BackgroundJobRunner
+from fhir_object_mappers import fhir_mapper
+from models import (
+    Appointment, Condition, FHIRExportJob, FHIRExportJobResource, Immunization,
+    MedicalDocument, Patient, Vital
+)
+
+logger = logging.getLogger(__name__)
+
+
+# FHIR resource type -> (source model, last-modified column, row -> resources)
+EXPORT_RESOURCE_SOURCES: Dict[str, tuple] = {
+    "Patient": (
+        Patient, db.func.coalesce(Patient.updated_at, Patient.created_at),
+        lambda row: [fhir_mapper.map_patient_to_fhir(row)]
+    ),
+    "Condition": (
+        Condition, db.func.coalesce(Condition.updated_at, Condition.created_at),
+        lambda row: [fhir_mapper.map_condition_to_fhir(row)]
+    ),
+    "Observation": (
+        Vital, Vital.created_at,
+        fhir_mapper.map_vital_to_fhir_observation
+    ),
+    "Immunization": (
+        Immunization, db.func.coalesce(Immunization.updated_at, Immunization.created_at),
+        lambda row: [fhir_mapper.map_immunization_to_fhir(row)]
+    ),
+    "Encounter": (
+        Appointment, db.func.coalesce(Appointment.updated_at, Appointment.created_at),
+        lambda row: [fhir_mapper.map_appointment_to_fhir_encounter(row)]
+    ),
+    "DocumentReference": (
+        MedicalDocument, db.func.coalesce(MedicalDocument.updated_at, MedicalDocument.created_at),
+        lambda row: [fhir_mapper.map_document_to_fhir_document_reference(row, include_data=False)]
+    ),
+}
+
+
+class FHIRBulkExportRunner(BackgroundJobRunner):
+    """Creates, runs, resumes and cancels $export jobs"""
+
+    job_model = FHIRExportJob
+    job_label = "FHIR export job"
+    thread_name_prefix = "fhir-export"
+
+    def __init__(self, max_workers: int = None, page_size: int = 1000, export_root: str = None):
+        super().__init__(max_workers or int(os.environ.get('FHIR_EXPORT_WORKERS', 4)))
+        self.page_size = page_size  # Rows per keyset page and checkpoint
+        self.export_root = export_root or os.environ.get(
+            'FHIR_EXPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'fhir_exports')
+        )
+
+    def create_job(self, resource_types: List[str] = None, since: Optional[datetime] = None,
+                   request_url: str = None, created_by: Optional[int] = None) -> FHIRExportJob:
+        """Create an export job with one checkpoint row per resource type"""
+        resource_types = list(dict.fromkeys(resource_types or EXPORT_RESOURCE_SOURCES))
+        unsupported = [resource_type for resource_type in resource_types if resource_type not in EXPORT_RESOURCE_SOURCES]
+        if unsupported:
+            raise ValueError(f"Unsupported resource types: {', '.join(unsupported)}")
+
+        job = FHIRExportJob(
+            status='pending',
+            resource_types=",".join(resource_types),
+            since=since,
+            request_url=request_url,
+            created_by=created_by,
+        )
+        db.session.add(job)
+        db.session.flush()
+
+        job.output_dir = os.path.join(self.export_root, str(job.id))
+        for resource_type in resource_types:
+            db.session.add(FHIRExportJobResource(job_id=job.id, resource_type=resource_type))
+
+        db.session.commit()
+        logger.info(f"📋 Created FHIR export job {job.id} for {', '.join(resource_types)}")
+        return job
+
+    def delete_job(self, job_id: int) -> bool:
+        """Cancel a job if needed and remove its job record and output files"""
+        job = FHIRExportJob.query.get(job_id)
+        if not job:
+            return False
+        if self.is_job_running(job_id):
+            self.cancel_job(job_id)
+            self._threads[job_id].join()
+            job = FHIRExportJob.query.get(job_id)
+
+        if job.output_dir:
+            shutil.rmtree(job.output_dir, ignore_errors=True)
+        db.session.delete(job)
+        db.session.commit()
+        return True
+
+    def output_path(self, job: FHIRExportJob, resource_type: str) -> str:
+        return os.path.join(job.output_dir, f"{resource_type}.ndjson")
+
+    def build_manifest(self, job: FHIRExportJob, file_url: Callable[[str], str]) -> Dict[str, Any]:
+        """Bulk Data completion manifest; file_url maps a resource type to its download URL"""
+        return {
+            "transactionTime": fhir_mapper.format_fhir_datetime(job.created_at),
+            "request": job.request_url,
+            "requiresAccessToken": False,
+            "output": [
+                {"type": resource.resource_type, "url": file_url(resource.resource_type), "count": resource.resource_count}
+                for resource in job.resources if resource.resource_count
+            ],
+            "error": [],
+        }
+
+    def _run_job(self, job_id: int):
+        """Background thread: export every unfinished resource type on the worker pool"""
+        with app.app_context():
+            try:
+                job = FHIRExportJob.query.get(job_id)
+                if not job or job.status in ('completed', 'cancelled'):
+                    return
+
+                job.status = 'running'
+                job.started_at = datetime.utcnow()
+                job.completed_at = None
+                job.error_message = None
+                db.session.commit()
+                os.makedirs(job.output_dir, mode=0o700, exist_ok=True)
+
+                pending = [resource.id for resource in job.resources if resource.status != 'completed']
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = [executor.submit(self._export_resource, job_id, resource_id) for resource_id in pending]
+                    errors = [str(e) for e in (future.exception() for future in futures) if e is not None]
+
+                db.session.expire_all()
+                if errors:
+                    job.status = 'failed'
+                    job.error_message = "; ".join(errors)
+                else:
+                    job.status = 'cancelled' if self.is_cancel_requested(job_id) else 'completed'
+                job.completed_at = datetime.utcnow()
+                db.session.commit()
+
+                logger.info(
+                    f"✅ FHIR export job {job_id} {job.status}: "
+                    + ", ".join(f"{resource.resource_type}={resource.resource_count}" for resource in job.resources)
+                )
+
+            except Exception as e:
+                logger.error(f"❌ FHIR export job {job_id} failed: {e}")
+                db.session.rollback()
+                job = FHIRExportJob.query.get(job_id)
+                if job:
+                    job.status = 'failed'
+                    job.error_message = str(e)
+                    job.completed_at = datetime.utcnow()
+                    db.session.commit()
+
+            finally:
+                self._cancel_requested.discard(job_id)
+
+    def _export_resource(self, job_id: int, resource_id: int):
+        """Worker: append one resource type's NDJSON file page by page from its last checkpoint"""
+        with app.app_context():
+            try:
+                checkpoint = FHIRExportJobResource.query.get(resource_id)
+                job = checkpoint.job
+                model, modified_column, to_resources = EXPORT_RESOURCE_SOURCES[checkpoint.resource_type]
+
+                base_query = model.query
+                if job.since is not None:
+                    base_query = base_query.filter(modified_column >= job.since)
+
+                checkpoint.status = 'running'
+                checkpoint.error_message = None
+                if checkpoint.total_rows is None:
+                    checkpoint.total_rows = base_query.order_by(None).count()
+                db.session.commit()
+
+                path = self.output_path(job, checkpoint.resource_type)
+                with open(path, 'ab') as output:
+                    # Lines written after the last checkpoint belong to a page that will be re-read
+                    output.truncate(checkpoint.bytes_written)
+
+                    while not self.is_cancel_requested(job_id):
+                        page_started = time.monotonic()
+                        rows = (
+                            base_query.filter(model.id > checkpoint.last_id)
+                            .order_by(model.id)
+                            .limit(self.page_size)
+                            .all()
+                        )
+                        if not rows:
+                            checkpoint.status = 'completed'
+                            checkpoint.completed_at = datetime.utcnow()
+                            db.session.commit()
+                            break
+
+                        lines = [
+                            json.dumps(resource, default=str, separators=(',', ':'))
+                            for row in rows for resource in to_resources(row)
+                        ]
+                        if lines:
+                            output.write(("\n".join(lines) + "\n").encode('utf-8'))
+                        output.flush()
+                        os.fsync(output.fileno())
+
+                        checkpoint.last_id = rows[-1].id
+                        checkpoint.exported_rows += len(rows)
+                        checkpoint.resource_count += len(lines)
+                        checkpoint.bytes_written = output.tell()
+                        checkpoint.elapsed_seconds += time.monotonic() - page_started
+                        db.session.commit()
+                        # Release the page before reading the next one
+                        db.session.expunge_all()
+                        db.session.add(checkpoint)
+                        db.session.add(job)
+
+            except Exception as e:
+                logger.error(f"❌ FHIR export job {job_id} failed exporting resource {resource_id}: {e}")
+                db.session.rollback()
+                checkpoint = FHIRExportJobResource.query.get(resource_id)
+                if checkpoint:
+                    checkpoint.status = 'failed'
+                    checkpoint.error_message = str(e)
+                    db.session.commit()
+                raise
+
+
+# Global instance
+fhir_bulk_export_runner = FHIRBulkExportRunner()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+FHIR Bundle Streamer
+Serializes a patient's $everything Bundle incrementally: resources are read section by section
+(Patient, Condition, Observation, Immunization, DocumentReference) from server-side cursors and
+written out one entry at a time, so memory stays flat regardless of chart size.
+Supports FHIR _count paging through opaque next-link cursors and _since filtering.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app import db
+from fhir_object_mappers import fhir_mapper
+from models import Condition, Immunization, MedicalDocument, Patient, Vital
+
+logger = logging.getLogger(__name__)
+
+
+def parse_fhir_instant(value: str) -> datetime:
+    """Parse a FHIR instant/dateTime/date into a naive UTC datetime (as stored in the database)"""
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def encode_cursor(section_index: int, last_id: int) -> str:
+    return f"{section_index}.{last_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a next-link cursor into (section index, last emitted row id)"""
+    try:
+        section_index, last_id = (int(part) for part in cursor.split('.'))
+    except ValueError:
+        raise ValueError(f"Invalid _cursor: {cursor!r}")
+    return section_index, last_id
+
+
+class FHIRBundleStreamer:
+    """Streams a patient's $everything Bundle as JSON text chunks"""
+
+    # Rows fetched per server-side cursor round trip
+    YIELD_PER = 200
+
+    def __init__(self, mapper=None):
+        self.mapper = mapper or fhir_mapper
+        # (model, FHIR resource type, row -> resources, last-modified column)
+        self.sections: List[Tuple[Any, str, Callable[..., List[Dict[str, Any]]], Any]] = [
+            (Patient, "Patient", lambda row, include_documents: [self.mapper.map_patient_to_fhir(row)],
+             db.func.coalesce(Patient.updated_at, Patient.created_at)),
+            (Condition, "Condition", lambda row, include_documents: [self.mapper.map_condition_to_fhir(row)],
+             db.func.coalesce(Condition.updated_at, Condition.created_at)),
+            (Vital, "Observation", lambda row, include_documents: self.mapper.map_vital_to_fhir_observation(row),
+             Vital.created_at),
+            (Immunization, "Immunization", lambda row, include_documents: [self.mapper.map_immunization_to_fhir(row)],
+             db.func.coalesce(Immunization.updated_at, Immunization.created_at)),
+            (MedicalDocument, "DocumentReference",
+             lambda row, include_documents: [self.mapper.map_document_to_fhir_document_reference(row, include_documents)],
+             db.func.coalesce(MedicalDocument.updated_at, MedicalDocument.created_at)),
+        ]
+
+    def _section_query(self, section_index: int, patient_id: int, since: Optional[datetime],
+                       after_id: int = 0, include_documents: bool = False):
+        """Rows of one section for the patient, in id order, after a cursor position"""
+        model, _, _, modified_column = self.sections[section_index]
+        id_column = model.id
+        query = model.query.filter(id_column > after_id)
+        if model is Patient:
+            query = query.filter(Patient.id == patient_id)
+        else:
+            query = query.filter(model.patient_id == patient_id)
+        if since is not None:
+            query = query.filter(modified_column >= since)
+        if model is MedicalDocument and not include_documents:
+            query = query.options(db.defer(MedicalDocument.content))
+        return query.order_by(id_column)
+
+    def _has_rows_after(self, section_index: int, last_id: int, patient_id: int,
+                        since: Optional[datetime]) -> bool:
+        """Whether any section at or after section_index has rows past the cursor"""
+        for index in range(section_index, len(self.sections)):
+            after_id = last_id if index == section_index else 0
+            model = self.sections[index][0]
+            query = self._section_query(index, patient_id, since, after_id, include_documents=True)
+            query = query.with_entities(model.id)
+            if query.first() is not None:
+                return True
+        return False
+
+    def iter_entries(self, patient_id: int, count: Optional[int] = None, since: Optional[datetime] = None,
+                     cursor: Optional[str] = None, include_documents: bool = False,
+                     page_state: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield Bundle entries for one page
+
+        Args:
+            patient_id: Patient ID
+            count: Maximum entries per page (a vital's Observations are never split across pages);
+                None streams everything in one page
+            since: Only include resources modified at or after this time
+            cursor: Next-link cursor from the previous page
+            include_documents: Inline document text as attachment data
+            page_state: Filled with 'next_cursor' (or None) once the page is exhausted
+        """
+        page_state = page_state if page_state is not None else {}
+        page_state['next_cursor'] = None
+        start_section, last_id = decode_cursor(cursor) if cursor else (0, 0)
+        emitted = 0
+
+        for section_index in range(start_section, len(self.sections)):
+            _, resource_type, to_resources, _ = self.sections[section_index]
+            after_id = last_id if section_index == start_section else 0
+            rows = self._section_query(
+                section_index, patient_id, since, after_id, include_documents
+            ).yield_per(self.YIELD_PER)
+
+            for row in rows:
+                if count is not None and emitted >= count:
+                    # Another row exists here, so the next page resumes after the last emitted one
+                    page_state['next_cursor'] = encode_cursor(section_index, after_id)
+                    return
+
+                for resource in to_resources(row, include_documents):
+                    emitted += 1
+                    yield {
+                        "fullUrl": f"{self.mapper.base_url}/{resource_type}/{resource['id']}",
+                        "resource": resource,
+                        "search": {"mode": "match"}
+                    }
+                after_id = row.id
+
+            if count is not None and emitted >= count:
+                if self._has_rows_after(section_index, after_id, patient_id, since):
+                    page_state['next_cursor'] = encode_cursor(section_index, after_id)
+                return
+
+    def stream_bundle(self, patient_id: int, count: Optional[int] = None, since: Optional[datetime] = None,
+                      cursor: Optional[str] = None, include_documents: bool = False,
+                      link_builder: Callable[[Optional[str]], str] = None) -> Iterator[str]:
+        """
+        Yield the Bundle JSON text in chunks, one entry at a time
+
+        Args:
+            link_builder: Maps a cursor (None for the current page) to an absolute page URL
+        """
+        header = {
+            "resourceType": "Bundle",
+            "id": f"patient-{patient_id}-everything",
+            "meta": {"lastUpdated": self.mapper.format_fhir_datetime(datetime.utcnow())},
+            "type": "searchset",
+        }
+        # Open the entry array inside the header object
+        yield json.dumps(header)[:-1] + ', "entry": ['
+
+        page_state = {}
+        first = True
+        try:
+            for entry in self.iter_entries(patient_id, count, since, cursor, include_documents, page_state):
+                yield ("" if first else ",") + json.dumps(entry, default=str)
+                first = False
+        except Exception as e:
+            # Headers are already sent; stop with truncated JSON so clients see the failure
+            logger.error(f"❌ $everything stream for patient {patient_id} failed: {e}")
+            raise
+
+        links = []
+        if link_builder:
+            links.append({"relation": "self", "url": link_builder(cursor)})
+            if page_state.get('next_cursor'):
+                links.append({"relation": "next", "url": link_builder(page_state['next_cursor'])})
+        yield '], "link": ' + json.dumps(links) + '}'
+
+
+# Global instance
+fhir_bundle_streamer = FHIRBundleStreamer()
@@ -7,6 +7,8 @@ import json
 from typing import List, Dict, Any
 from flask import jsonify
 
+from term_search_index import TermSearchIndex
+
 class FHIRConditionAutocomplete:
     """Handles autocomplete for FHIR condition codes"""
     
@@ -125,31 +127,20 @@ class FHIRConditionAutocomplete:
         # Create search index for faster lookups
         self.search_index = self._build_search_index()
     
-    def _build_search_index(self) -> Dict[str, List[str]]:
-        """Build a search index for faster condition lookups"""
-        index = {}
-        
+    def _build_search_index(self) -> TermSearchIndex:
+        """Build a prefix/trigram search index over condition names and code display names"""
+        index = TermSearchIndex()
         for condition_name, codes in self.condition_database.items():
-            # Add the exact condition name
-            words = condition_name.lower().split()
-            for word in words:
-                if word not in index:
-                    index[word] = []
-                if condition_name not in index[word]:
-                    index[word].append(condition_name)
-            
-            # Add individual words from display names
-            for code_info in codes:
-                display_words = code_info["display"].lower().split()
-                for word in display_words:
-                    if len(word) > 2:  # Skip very short words
-                        if word not in index:
-                            index[word] = []
-                        if condition_name not in index[word]:
-                            index[word].append(condition_name)
-        
+            self._index_condition(index, condition_name, codes)
         return index
     
+    @staticmethod
+    def _index_condition(index: TermSearchIndex, condition_name: str, codes: List[Dict[str, Any]]):
+        index.add(condition_name, condition_name)
+        for code_info in codes:
+            if code_info.get("display"):
+                index.add(code_info["display"], condition_name)
+    
     def search_conditions(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Search for conditions based on query string
@@ -159,35 +150,17 @@ class FHIRConditionAutocomplete:
             limit: Maximum number of results to return
             
         Returns:
-            List of matching conditions with their codes
+            List of matching conditions with their codes, ranked exact, prefix, word prefix,
+            substring, then fuzzy (trigram similarity) matches on names and code displays
         """
         if not query or len(query) < 2:
             return []
         
-        query = query.lower().strip()
-        matching_conditions = set()
-        
-        # Direct match
-        if query in self.condition_database:
-            matching_conditions.add(query)
-        
-        # Partial matches
-        for condition_name in self.condition_database.keys():
-            if query in condition_name.lower():
-                matching_conditions.add(condition_name)
-        
-        # Word-based search using index
-        query_words = query.split()
-        for word in query_words:
-            if word in self.search_index:
-                matching_conditions.update(self.search_index[word])
-        
-        # Build results
         results = []
-        for condition_name in list(matching_conditions)[:limit]:
-            codes = self.condition_database[condition_name]
+        for hit in self.search_index.search(query, limit):
+            codes = self.condition_database[hit.key]
             results.append({
-                "condition_name": condition_name,
+                "condition_name": hit.key,
                 "codes": codes,
                 "primary_code": codes[0] if codes else None
             })
@@ -214,9 +187,11 @@ class FHIRConditionAutocomplete:
             condition_name: Name of the condition
             codes: List of code dictionaries with system, code, display
         """
-        self.condition_database[condition_name.lower()] = codes
-        # Rebuild search index
-        self.search_index = self._build_search_index()
+        condition_name = condition_name.lower()
+        self.condition_database[condition_name] = codes
+        # Re-index only this condition
+        self.search_index.remove(condition_name)
+        self._index_condition(self.search_index, condition_name, codes)
 
 # Global instance
 autocomplete_service = FHIRConditionAutocomplete()
\ No newline at end of file
@@ -162,8 +162,8 @@ class DocumentReferenceMapper(BaseFHIRMapper):
             attachment["url"] = f"http://your-organization.com/documents/{document.id}"
         
         # Set size if available
-        if hasattr(document, 'binary_content') and document.binary_content:
-            attachment["size"] = len(document.binary_content)
+        if getattr(document, 'binary_size', 0):
+            attachment["size"] = document.binary_size
         elif hasattr(document, 'content') and document.content:
             attachment["size"] = len(document.content.encode('utf-8'))
         
@@ -11,6 +11,7 @@ Supports:
 - Complete metadata preservation and bidirectional conversion
 """
 
+import base64
 import json
 from datetime import datetime, date, time
 from typing import Dict, List, Any, Optional, Union
@@ -183,12 +184,13 @@ class FHIRObjectMapper:
         
         return fhir_encounter
     
-    def map_document_to_fhir_document_reference(self, document) -> Dict[str, Any]:
+    def map_document_to_fhir_document_reference(self, document, include_data: bool = True) -> Dict[str, Any]:
         """
         Convert internal MedicalDocument object to FHIR DocumentReference resource
         
         Args:
             document: Internal MedicalDocument model instance
+            include_data: Whether to inline text content as attachment data
             
         Returns:
             FHIR DocumentReference resource as dictionary
@@ -208,7 +210,7 @@ class FHIRObjectMapper:
             "date": self.format_fhir_datetime(document.document_date or document.created_at),
             "author": self._get_document_author(document),
             "description": document.document_name or document.filename,
-            "content": self._map_document_content(document)
+            "content": self._map_document_content(document, include_data)
         }
         
         # Add source system information
@@ -656,29 +658,34 @@ class FHIRObjectMapper:
             "display": document.source_system or "Unknown System"
         }]
     
-    def _map_document_content(self, document) -> List[Dict[str, Any]]:
+    def _map_document_content(self, document, include_data: bool = True) -> List[Dict[str, Any]]:
         """Map document content for FHIR"""
         content = []
         
-        if document.is_binary and document.binary_content:
+        # Stored documents know their size without loading the bytes
+        binary_size = getattr(document, 'binary_size', None)
+        if binary_size is None:
+            binary_size = len(document.binary_content) if document.binary_content else 0
+        
+        if document.is_binary and binary_size:
             # Binary content (images, PDFs, etc.)
             content.append({
                 "attachment": {
                     "contentType": document.mime_type or "application/octet-stream",
-                    "size": len(document.binary_content) if document.binary_content else 0,
+                    "size": binary_size,
                     "title": document.document_name or document.filename,
                     "url": f"{self.base_url}/Binary/{self.generate_fhir_id('Binary', document.id)}"
                 }
             })
         elif document.content:
-            # Text content
-            content.append({
-                "attachment": {
-                    "contentType": "text/plain",
-                    "data": document.content.encode('utf-8').hex() if document.content else "",
-                    "title": document.document_name or document.filename
-                }
-            })
+            # Text content (attachment data is base64Binary)
+            attachment = {
+                "contentType": "text/plain",
+                "title": document.document_name or document.filename
+            }
+            if include_data:
+                attachment["data"] = base64.b64encode(document.content.encode('utf-8')).decode('ascii')
+            content.append({"attachment": attachment})
         
         return content
     
@@ -742,9 +749,9 @@ def appointment_to_fhir_encounter(appointment) -> Dict[str, Any]:
     """Convert Appointment to FHIR Encounter resource"""
     return fhir_mapper.map_appointment_to_fhir_encounter(appointment)
 
-def document_to_fhir_document_reference(document) -> Dict[str, Any]:
+def document_to_fhir_document_reference(document, include_data: bool = True) -> Dict[str, Any]:
     """Convert MedicalDocument to FHIR DocumentReference resource"""
-    return fhir_mapper.map_document_to_fhir_document_reference(document)
+    return fhir_mapper.map_document_to_fhir_document_reference(document, include_data)
 
 def create_patient_fhir_bundle(patient, include_related: bool = True) -> Dict[str, Any]:
     """Create comprehensive FHIR Bundle for patient"""
@@ -457,45 +457,54 @@ class FHIRExternalAPIAdapter:
         except Exception as e:
             return {"error": f"Failed to get document: {str(e)}"}
     
-    def search_patients_fhir(self, search_params: Dict[str, str]) -> Dict[str, Any]:
+    def search_patients_fhir(self, search_params: Dict[str, str], link_builder=None) -> Dict[str, Any]:
         """
         Search patients and return FHIR Bundle
         
         Args:
-            search_params: Search parameters (name, birthdate, identifier, etc.)
+            search_params: Search parameters (name, birthdate, identifier, _count, _cursor)
+            link_builder: Callable mapping a page cursor (None for the first page) to a URL,
+                used for the Bundle's self and next links
             
         Returns:
-            FHIR Bundle with search results
+            FHIR Bundle with search results, best name matches first
         """
+        import patient_search
+        
         try:
             # Build query based on search parameters
             query = Patient.query
             
-            if 'name' in search_params:
-                name = search_params['name'].lower()
-                query = query.filter(
-                    db.or_(
-                        Patient.first_name.ilike(f'%{name}%'),
-                        Patient.last_name.ilike(f'%{name}%')
-                    )
-                )
-            
             if 'birthdate' in search_params:
                 query = query.filter(Patient.date_of_birth == search_params['birthdate'])
             
             if 'identifier' in search_params:
                 query = query.filter(Patient.mrn == search_params['identifier'])
             
-            patients = query.limit(50).all()  # Limit results
+            count = min(int(search_params.get('_count') or 50), 100)
+            cursor = search_params.get('_cursor')
+            results = patient_search.search_patients(
+                search_params.get('name', ''),
+                limit=count,
+                cursor=cursor,
+                query=query,
+                with_total=not cursor
+            )
+            patients = results.patients
             
             # Create search results bundle
             bundle = {
                 "resourceType": "Bundle",
                 "id": f"patient-search-{datetime.now().isoformat()}",
                 "type": "searchset",
-                "total": len(patients),
                 "entry": []
             }
+            if results.total is not None:
+                bundle["total"] = results.total
+            if link_builder:
+                bundle["link"] = [{"relation": "self", "url": link_builder(cursor)}]
+                if results.next_cursor:
+                    bundle["link"].append({"relation": "next", "url": link_builder(results.next_cursor)})
             
             for patient in patients:
                 fhir_patient = patient_to_fhir(patient)
@@ -507,6 +516,8 @@ class FHIRExternalAPIAdapter:
             
             return bundle
             
+        except ValueError as e:
+            return {"error": str(e), "code": "invalid"}
         except Exception as e:
             return {"error": f"Failed to search patients: {str(e)}"}
 
@@ -524,6 +535,6 @@ def export_patient_as_fhir_bundle(patient_id: int, include_documents: bool = Tru
     """Export patient data as FHIR Bundle for external APIs"""
     return fhir_external_api_adapter.export_patient_fhir_bundle(patient_id, include_documents)
 
-def search_patients_as_fhir(search_params: Dict[str, str]) -> Dict[str, Any]:
+def search_patients_as_fhir(search_params: Dict[str, str], link_builder=None) -> Dict[str, Any]:
     """Search patients and return FHIR Bundle"""
-    return fhir_external_api_adapter.search_patients_fhir(search_params)
\ No newline at end of file
+    return fhir_external_api_adapter.search_patients_fhir(search_params, link_builder)
\ No newline at end of file
@@ -125,7 +125,7 @@ def fix_admin_logs():
                 AdminLog.user_id.isnot(None)
             ).count()
             logs_with_details = AdminLog.query.filter(
-                AdminLog.event_details.isnot(None)
+                AdminLog.event_data.isnot(None)
             ).count()
 
             print(f"Summary:")
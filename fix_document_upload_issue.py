@@ -31,8 +31,8 @@ def analyze_document_upload_issue():
         print(f"   - Is Binary: {doc.is_binary}")
         print(f"   - Has Text Content: {doc.content is not None}")
         print(f"   - Text Content Length: {len(doc.content) if doc.content else 0}")
-        print(f"   - Has Binary Content: {doc.binary_content is not None}")
-        print(f"   - Binary Content Length: {len(doc.binary_content) if doc.binary_content else 0}")
+        print(f"   - Has Binary Content: {doc.has_binary_content}")
+        print(f"   - Binary Content Length: {doc.binary_size}")
         print(f"   - OCR Processed: {doc.ocr_processed}")
         print(f"   - Created: {doc.created_at}")
         
@@ -78,7 +78,7 @@ def analyze_document_upload_issue():
         
         # Diagnosis
         print(f"\n🩺 DIAGNOSIS:")
-        if not doc.binary_content or len(doc.binary_content) == 0:
+        if not doc.has_binary_content:
             print("   ❌ CRITICAL: Zero-length binary content")
             print("   ❌ This prevents OCR processing")
             print("   ❌ This prevents document preview")
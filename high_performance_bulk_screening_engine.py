@@ -2,7 +2,6 @@
 """
 High-Performance Bulk Screening Processing Engine
 Handles 1000+ patients with async/await, connection pooling, and circuit breakers
-Integrates with automated_edge_case_handler.py for reactive updates
 """
 
 import asyncio
@@ -14,15 +13,15 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple, Set
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from functools import wraps
 import psutil
 import os
 
 from app import app, db
 from models import Patient, ScreeningType, Screening, MedicalDocument
-from automated_edge_case_handler import AutomatedScreeningRefreshManager
 from database_access_layer import get_database_access_layer
+from screening_process_pool import init_screening_worker, generate_screenings_for_snapshots
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -40,6 +39,15 @@ class ProcessingMetrics:
     processing_time: float = 0.0
     database_operations: int = 0
     timeout_recoveries: int = 0
+    rows_written: int = 0  # Screening + screening_documents rows inserted, updated or deleted
+    database_round_trips: int = 0  # Statements sent by the batched write path
+    
+    @property
+    def rows_per_round_trip(self) -> float:
+        """Rows written per database round trip on the batched write path"""
+        if not self.database_round_trips:
+            return 0.0
+        return self.rows_written / self.database_round_trips
 
 @dataclass
 class CircuitBreakerState:
@@ -156,6 +164,13 @@ class PatientCircuitBreaker:
                 blocked.add(patient_id)
         return blocked
 
+def _as_date(value):
+    """Normalize datetime values to dates for date columns"""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
 class HighPerformanceBulkScreeningEngine:
     """
     High-performance bulk screening processing engine with:
@@ -170,16 +185,22 @@ class HighPerformanceBulkScreeningEngine:
         self.database_url = database_url or os.environ.get('DATABASE_URL')
         self.connection_pool = DatabaseConnectionPool(self.database_url)
         self.circuit_breaker = PatientCircuitBreaker()
-        self.edge_case_handler = AutomatedScreeningRefreshManager()
         self.processing_active = False
         self.metrics = ProcessingMetrics()
         
         # Performance tuning parameters
         self.max_concurrent_patients = 20  # Process up to 20 patients concurrently
         self.batch_size = 100  # Documents per batch operation
+        self.write_batch_size = 50  # Patients whose screenings are written per set-based upsert
         self.patient_timeout = 30  # Max seconds per patient
         self.total_timeout = 1800  # Max total processing time (30 minutes)
         
+        # Opt-in process pool: keyword matching runs in worker processes instead of under the GIL
+        self.use_process_pool = os.environ.get('SCREENING_PROCESS_POOL', '').lower() in ('1', 'true', 'yes')
+        self.process_pool_workers = int(os.environ.get('SCREENING_PROCESS_WORKERS', os.cpu_count() or 1))
+        self.process_batch_size = 10  # Patient snapshots sent to a worker per task
+        self._process_pool = None
+        
         # Reactive trigger handlers
         self.reactive_triggers = {
             'screening_type_activation': self._handle_screening_type_change,
@@ -250,34 +271,15 @@ class HighPerformanceBulkScreeningEngine:
                 if cleanup_result.records_deleted > 0:
                     logger.info(f"🧹 Cleaned up {cleanup_result.records_deleted} orphaned relationships")
             
-            # Process patients in batches using async semaphore for concurrency control
-            semaphore = asyncio.Semaphore(self.max_concurrent_patients)
-            
-            async def process_patient_with_semaphore(patient_data):
-                async with semaphore:
-                    return await self._process_single_patient_async(patient_data)
-            
-            # Create processing tasks
-            tasks = [process_patient_with_semaphore(patient) for patient in patients]
-            
-            # Process with overall timeout protection
+            # Process patients with an async semaphore (or the worker process pool) for
+            # generation concurrency and write their screenings in set-based batches
             try:
-                results = await asyncio.wait_for(
-                    asyncio.gather(*tasks, return_exceptions=True),
-                    timeout=self.total_timeout
-                )
+                if self.use_process_pool:
+                    processing = self._process_patients_with_pool(patients)
+                else:
+                    processing = self._process_patients_in_batches(patients)
+                await asyncio.wait_for(processing, timeout=self.total_timeout)
                 
-                # Aggregate results
-                for result in results:
-                    if isinstance(result, Exception):
-                        self.metrics.failed_patients += 1
-                        logger.error(f"❌ Patient processing error: {result}")
-                    else:
-                        self.metrics.processed_patients += 1
-                        if result:
-                            self.metrics.total_screenings_updated += result.get('screenings_updated', 0)
-                            self.metrics.total_documents_linked += result.get('documents_linked', 0)
-                            
             except asyncio.TimeoutError:
                 logger.error(f"⏱️ Bulk processing timeout after {self.total_timeout} seconds")
                 self.metrics.timeout_recoveries += 1
@@ -289,6 +291,8 @@ class HighPerformanceBulkScreeningEngine:
             logger.info(f"✅ Bulk processing complete: {self.metrics.processed_patients}/{self.metrics.total_patients} patients processed")
             logger.info(f"📈 Results: {self.metrics.total_screenings_updated} screenings, {self.metrics.total_documents_linked} documents linked")
             logger.info(f"⏱️ Processing time: {self.metrics.processing_time:.2f} seconds")
+            logger.info(f"💾 Writes: {self.metrics.rows_written} rows in {self.metrics.database_round_trips} round trips "
+                        f"({self.metrics.rows_per_round_trip:.1f} rows/round trip)")
             logger.info(f"🔴 Circuit breaker trips: {self.metrics.circuit_breaker_trips}")
             
             return self.metrics
@@ -301,6 +305,156 @@ class HighPerformanceBulkScreeningEngine:
         finally:
             self.processing_active = False
             
+    async def _process_patients_in_batches(self, patients: List[Dict[str, Any]]):
+        """Generate screenings concurrently and write each batch of patients with one upsert"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_patients)
+        
+        async def process_patient_with_semaphore(patient_data):
+            async with semaphore:
+                return await self._process_single_patient_async(patient_data)
+        
+        for start in range(0, len(patients), self.write_batch_size):
+            batch_patients = patients[start:start + self.write_batch_size]
+            results = await asyncio.gather(
+                *[process_patient_with_semaphore(patient) for patient in batch_patients],
+                return_exceptions=True
+            )
+            
+            batch_screenings = {}
+            for patient, result in zip(batch_patients, results):
+                if isinstance(result, Exception):
+                    self.metrics.failed_patients += 1
+                    logger.error(f"❌ Patient processing error: {result}")
+                elif result:
+                    batch_screenings[patient['id']] = result
+                else:
+                    self.metrics.processed_patients += 1
+            
+            await self._write_batch_with_metrics(batch_screenings)
+            
+    async def _write_batch_with_metrics(self, batch_screenings: Dict[int, List[Dict]]):
+        """Write one batch of generated screenings and record the outcome in the metrics"""
+        if not batch_screenings:
+            return
+            
+        try:
+            write_result = await self._write_screenings_batch_async(batch_screenings)
+            self.metrics.processed_patients += len(batch_screenings)
+            self.metrics.total_screenings_updated += write_result['screenings_updated']
+            self.metrics.total_documents_linked += write_result['documents_linked']
+        except Exception as e:
+            self.metrics.failed_patients += len(batch_screenings)
+            logger.error(f"❌ Batch write failed for {len(batch_screenings)} patients: {e}")
+            
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Create the worker process pool on first use"""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_pool_workers,
+                initializer=init_screening_worker
+            )
+            logger.info(f"🧵 Started screening process pool with {self.process_pool_workers} workers")
+        return self._process_pool
+        
+    async def _process_patients_with_pool(self, patients: List[Dict[str, Any]]):
+        """
+        Generate screenings in worker processes from patient snapshots and write them in batches.
+        
+        Each write batch is snapshotted with three queries, split into worker tasks, and written
+        while the next batch is being generated.
+        """
+        loop = asyncio.get_event_loop()
+        pool = self._get_process_pool()
+        config_version = await self._get_screening_config_version()
+        pending_write = None
+        # Large enough to give every worker at least one task per batch
+        batch_size = max(self.write_batch_size, self.process_pool_workers * self.process_batch_size)
+        
+        try:
+            for start in range(0, len(patients), batch_size):
+                batch_ids = [
+                    patient['id'] for patient in patients[start:start + batch_size]
+                    if self.circuit_breaker.should_process_patient(patient['id'])
+                ]
+                if not batch_ids:
+                    continue
+                    
+                snapshots = await self._load_patient_snapshots(batch_ids)
+                chunks = [
+                    snapshots[offset:offset + self.process_batch_size]
+                    for offset in range(0, len(snapshots), self.process_batch_size)
+                ]
+                results = await asyncio.gather(
+                    *[loop.run_in_executor(pool, generate_screenings_for_snapshots, chunk, config_version)
+                      for chunk in chunks],
+                    return_exceptions=True
+                )
+                
+                batch_screenings = {}
+                for task_snapshots, result in zip(chunks, results):
+                    task_ids = [snapshot['patient']['id'] for snapshot in task_snapshots]
+                    if isinstance(result, Exception):
+                        self.metrics.failed_patients += len(task_ids)
+                        logger.error(f"❌ Screening worker failed for {len(task_ids)} patients: {result}")
+                        continue
+                        
+                    for patient_id in task_ids:
+                        screenings = result.get(patient_id)
+                        if screenings is None:
+                            error = Exception(f"Patient {patient_id} screening generation failed in worker")
+                            self.circuit_breaker.record_failure(patient_id, error)
+                            self.metrics.circuit_breaker_trips += 1
+                        else:
+                            self.circuit_breaker.record_success(patient_id)
+                            if screenings:
+                                batch_screenings[patient_id] = screenings
+                            else:
+                                self.metrics.processed_patients += 1
+                
+                if pending_write is not None:
+                    await pending_write
+                pending_write = asyncio.ensure_future(self._write_batch_with_metrics(batch_screenings))
+        finally:
+            if pending_write is not None:
+                await pending_write
+            
+    async def _get_screening_config_version(self) -> int:
+        """Screening rule set version; workers reload their compiled rules when this changes"""
+        async with self.connection_pool.get_connection() as conn:
+            version = await conn.fetchval("SELECT version FROM screening_rule_version WHERE id = 1")
+        return version or 0
+        
+    async def _load_patient_snapshots(self, patient_ids: List[int]) -> List[Dict[str, Any]]:
+        """Snapshot patients with their conditions and documents (without binary content)"""
+        async with self.connection_pool.get_connection() as conn:
+            patients = await conn.fetch("""
+                SELECT id, first_name, last_name, mrn, date_of_birth, sex
+                FROM patient
+                WHERE id = ANY($1::int[])
+                ORDER BY id
+            """, patient_ids)
+            conditions = await conn.fetch("""
+                SELECT id, patient_id, name, code, is_active, diagnosed_date
+                FROM condition
+                WHERE patient_id = ANY($1::int[])
+            """, patient_ids)
+            documents = await conn.fetch("""
+                SELECT id, patient_id, filename, document_name, document_type, content,
+                       document_date, created_at, updated_at
+                FROM medical_document
+                WHERE patient_id = ANY($1::int[])
+            """, patient_ids)
+            
+        snapshots = {
+            row['id']: {'patient': dict(row), 'conditions': [], 'documents': []}
+            for row in patients
+        }
+        for row in conditions:
+            snapshots[row['patient_id']]['conditions'].append(dict(row))
+        for row in documents:
+            snapshots[row['patient_id']]['documents'].append(dict(row))
+        return list(snapshots.values())
+        
     async def trigger_reactive_update(self, trigger_type: str, context: Dict[str, Any]) -> bool:
         """
         Handle reactive updates for various trigger types
@@ -357,7 +511,7 @@ class HighPerformanceBulkScreeningEngine:
             # Return empty list instead of failing completely
             return []
             
-    async def _process_single_patient_async(self, patient_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def _process_single_patient_async(self, patient_data: Dict[str, Any]) -> Optional[List[Dict]]:
         """Process a single patient with async operations and circuit breaker protection"""
         patient_id = patient_data['id']
         
@@ -386,8 +540,8 @@ class HighPerformanceBulkScreeningEngine:
             logger.error(f"❌ Patient {patient_id} processing error: {e}")
             return None
             
-    async def _do_patient_processing(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Actual patient processing logic"""
+    async def _do_patient_processing(self, patient_data: Dict[str, Any]) -> List[Dict]:
+        """Actual patient processing logic - returns generated screenings for the batch writer"""
         patient_id = patient_data['id']
         
         try:
@@ -402,16 +556,10 @@ class HighPerformanceBulkScreeningEngine:
                     patient_id
                 )
                 
-            if not screening_data:
-                return {'screenings_updated': 0, 'documents_linked': 0}
-                
-            # Update screenings using bulk async operations
-            result = await self._update_patient_screenings_async(patient_id, screening_data)
-            
             # Record success in circuit breaker
             self.circuit_breaker.record_success(patient_id)
             
-            return result
+            return screening_data or []
             
         except Exception as e:
             logger.error(f"❌ Error processing patient {patient_id}: {e}")
@@ -420,109 +568,165 @@ class HighPerformanceBulkScreeningEngine:
     def _generate_patient_screenings_sync(self, patient_id: int) -> List[Dict]:
         """Generate patient screenings using existing synchronous engine"""
         try:
-            from automated_screening_engine import ScreeningStatusEngine
+            # Unified engine resolves keyword matches from the persisted document match store
+            from unified_screening_engine import unified_engine
             
             with app.app_context():
-                engine = ScreeningStatusEngine()
-                return engine.generate_patient_screenings(patient_id)
+                return unified_engine.generate_patient_screenings(patient_id)
                 
         except Exception as e:
             logger.error(f"❌ Error generating screenings for patient {patient_id}: {e}")
             return []
             
     async def _update_patient_screenings_async(self, patient_id: int, screening_data: List[Dict]) -> Dict[str, Any]:
-        """Update patient screenings using async bulk operations"""
-        screenings_updated = 0
-        documents_linked = 0
-        
+        """Update one patient's screenings through the batched write path"""
         try:
-            async with self.connection_pool.get_connection() as conn:
-                # Start transaction
-                async with conn.transaction():
-                    # Get existing screenings for this patient
-                    existing_screenings = await conn.fetch("""
-                        SELECT id, screening_type, status 
-                        FROM screening 
-                        WHERE patient_id = $1
-                    """, patient_id)
-                    
-                    existing_map = {row['screening_type']: row for row in existing_screenings}
-                    
-                    # Process each screening
-                    for screening in screening_data:
-                        screening_type = screening['screening_type']
-                        status = screening['status']
-                        
-                        if screening_type in existing_map:
-                            # Update existing screening
-                            await conn.execute("""
-                                UPDATE screening 
-                                SET status = $1, last_completed = $2
-                                WHERE id = $3
-                            """, status, screening.get('last_completed'), existing_map[screening_type]['id'])
-                            
-                            screening_id = existing_map[screening_type]['id']
-                        else:
-                            # Create new screening
-                            screening_id = await conn.fetchval("""
-                                INSERT INTO screening (patient_id, screening_type, status, last_completed)
-                                VALUES ($1, $2, $3, $4)
-                                RETURNING id
-                            """, patient_id, screening_type, status, screening.get('last_completed'))
-                            
-                        screenings_updated += 1
-                        
-                        # Handle document relationships
-                        if 'matched_documents' in screening and screening['matched_documents']:
-                            docs_linked = await self._link_documents_bulk_async(
-                                conn, screening_id, screening['matched_documents']
-                            )
-                            documents_linked += docs_linked
-                            
-                    self.metrics.database_operations += 1
-                    
+            return await self._write_screenings_batch_async({patient_id: screening_data})
         except Exception as e:
             logger.error(f"❌ Error updating screenings for patient {patient_id}: {e}")
             raise
             
-        return {
-            'screenings_updated': screenings_updated,
-            'documents_linked': documents_linked
-        }
+    async def _write_screenings_batch_async(self, batch: Dict[int, List[Dict]]) -> Dict[str, Any]:
+        """
+        Write screenings for a batch of patients with set-based statements:
+        COPY into a temp table, one INSERT ... ON CONFLICT upsert, and one
+        statement that diff-applies screening_documents
         
-    async def _link_documents_bulk_async(self, conn, screening_id: int, documents: List) -> int:
-        """Link documents to screening using bulk async operations"""
-        try:
-            # Clear existing relationships
-            await conn.execute("DELETE FROM screening_documents WHERE screening_id = $1", screening_id)
+        Args:
+            batch: {patient_id: [screening dicts from the unified engine]}
             
-            # Prepare bulk insert data
-            if documents:
-                # Get valid document IDs
-                doc_ids = [doc.id if hasattr(doc, 'id') else doc for doc in documents]
-                
-                # Validate documents exist
-                valid_docs = await conn.fetch("""
-                    SELECT id FROM medical_document WHERE id = ANY($1)
-                """, doc_ids)
+        Returns:
+            Dict with screenings_updated and documents_linked counts
+        """
+        async with self.connection_pool.get_connection() as conn:
+            records = []
+            for patient_id, screenings in batch.items():
+                for screening in screenings:
+                    # Gender variants share a name, so screenings are keyed by the variant's id
+                    screening_type_id = screening.get('screening_type_id')
+                    if screening_type_id is None:
+                        logger.warning(f"⚠️ Screening '{screening['screening_type']}' for patient {patient_id} has no screening type id")
+                        continue
+                    doc_ids = [doc.id if hasattr(doc, 'id') else doc for doc in screening.get('matched_documents') or []]
+                    records.append((
+                        patient_id,
+                        screening_type_id,
+                        screening['screening_type'],
+                        screening['status'],
+                        _as_date(screening.get('due_date')),
+                        _as_date(screening.get('last_completed')),
+                        screening.get('frequency'),
+                        doc_ids
+                    ))
+            
+            if not records:
+                return {'screenings_updated': 0, 'documents_linked': 0}
+            
+            async with conn.transaction():
+                await conn.execute("""
+                    CREATE TEMP TABLE screening_stage (
+                        patient_id integer NOT NULL,
+                        screening_type_id integer NOT NULL,
+                        screening_type varchar(100) NOT NULL,
+                        status varchar(20),
+                        due_date date,
+                        last_completed date,
+                        frequency varchar(50),
+                        matched_documents integer[]
+                    ) ON COMMIT DROP
+                """)
                 
-                valid_doc_ids = [row['id'] for row in valid_docs]
+                await conn.copy_records_to_table(
+                    'screening_stage',
+                    records=records,
+                    columns=['patient_id', 'screening_type_id', 'screening_type', 'status',
+                             'due_date', 'last_completed', 'frequency', 'matched_documents']
+                )
                 
-                # Bulk insert relationships
-                if valid_doc_ids:
-                    values = [(screening_id, doc_id, 1.0, 'automated') for doc_id in valid_doc_ids]
-                    await conn.executemany("""
-                        INSERT INTO screening_documents (screening_id, document_id, confidence_score, match_source)
-                        VALUES ($1, $2, $3, $4)
-                    """, values)
-                    
-                return len(valid_doc_ids)
+                # Upsert screenings (unchanged rows are not rewritten) and bump the chart
+                # version of every patient whose screenings changed, so cached charts refresh
+                screenings_written = await conn.fetchval("""
+                    WITH upserted AS (
+                        INSERT INTO screening (patient_id, screening_type_id, screening_type, status, due_date,
+                                               last_completed, frequency, is_visible, is_system_generated,
+                                               created_at, updated_at)
+                        SELECT patient_id, screening_type_id, screening_type, status, due_date,
+                               last_completed, frequency, TRUE, TRUE, now(), now()
+                        FROM screening_stage
+                        ON CONFLICT (patient_id, screening_type_id) DO UPDATE
+                        SET status = EXCLUDED.status,
+                            due_date = EXCLUDED.due_date,
+                            last_completed = EXCLUDED.last_completed,
+                            frequency = EXCLUDED.frequency,
+                            updated_at = now()
+                        WHERE (screening.status, screening.due_date, screening.last_completed, screening.frequency)
+                              IS DISTINCT FROM
+                              (EXCLUDED.status, EXCLUDED.due_date, EXCLUDED.last_completed, EXCLUDED.frequency)
+                        RETURNING patient_id
+                    ),
+                    bumped AS (
+                        UPDATE patient SET chart_version = chart_version + 1
+                        WHERE id IN (SELECT patient_id FROM upserted)
+                        RETURNING id
+                    )
+                    SELECT count(*) FROM upserted
+                """)
                 
-        except Exception as e:
-            logger.error(f"❌ Error linking documents for screening {screening_id}: {e}")
-            return 0
+                # Diff-apply document links: drop links no longer matched, add new ones,
+                # skipping document ids that no longer exist; bump the chart version of
+                # patients whose links changed
+                link_counts = await conn.fetchrow("""
+                    WITH staged AS (
+                        SELECT s.id AS screening_id, st.matched_documents
+                        FROM screening_stage st
+                        JOIN screening s
+                          ON s.patient_id = st.patient_id AND s.screening_type_id = st.screening_type_id
+                    ),
+                    desired AS (
+                        SELECT DISTINCT staged.screening_id, md.id AS document_id
+                        FROM staged
+                        CROSS JOIN LATERAL unnest(staged.matched_documents) AS matched(document_id)
+                        JOIN medical_document md ON md.id = matched.document_id
+                    ),
+                    removed AS (
+                        DELETE FROM screening_documents sd
+                        USING staged
+                        WHERE sd.screening_id = staged.screening_id
+                          AND NOT EXISTS (
+                              SELECT 1 FROM desired
+                              WHERE desired.screening_id = sd.screening_id
+                                AND desired.document_id = sd.document_id
+                          )
+                        RETURNING sd.screening_id
+                    ),
+                    added AS (
+                        INSERT INTO screening_documents (screening_id, document_id, confidence_score, match_source, created_at)
+                        SELECT screening_id, document_id, 1.0, 'automated', now() FROM desired
+                        ON CONFLICT (screening_id, document_id) DO NOTHING
+                        RETURNING screening_id
+                    ),
+                    bumped AS (
+                        UPDATE patient SET chart_version = chart_version + 1
+                        WHERE id IN (
+                            SELECT s.patient_id FROM screening s
+                            WHERE s.id IN (SELECT screening_id FROM removed UNION SELECT screening_id FROM added)
+                        )
+                        RETURNING id
+                    )
+                    SELECT (SELECT count(*) FROM removed) AS removed,
+                           (SELECT count(*) FROM added) AS added,
+                           (SELECT count(*) FROM desired) AS linked
+                """)
+            
+            # BEGIN, CREATE TEMP TABLE, COPY, upsert, link diff, COMMIT
+            self.metrics.database_round_trips += 6
+            self.metrics.rows_written += screenings_written + link_counts['removed'] + link_counts['added']
+            self.metrics.database_operations += 1
             
-        return 0
+        return {
+            'screenings_updated': len(records),
+            'documents_linked': link_counts['linked']
+        }
         
     async def _test_database_performance(self) -> bool:
         """Test database performance to determine optimal settings"""
@@ -615,8 +819,9 @@ class HighPerformanceBulkScreeningEngine:
                     """, patient_id)
                     
                     if patient_data:
-                        result = await self._process_single_patient_async(dict(patient_data))
-                        if result:
+                        screening_data = await self._process_single_patient_async(dict(patient_data))
+                        if screening_data:
+                            result = await self._update_patient_screenings_async(patient_id, screening_data)
                             logger.info(f"✅ Reactive update: Patient {patient_id} - {result['screenings_updated']} screenings updated")
                             return True
                             
@@ -628,6 +833,9 @@ class HighPerformanceBulkScreeningEngine:
     async def shutdown(self):
         """Shutdown the engine and clean up resources"""
         logger.info("🔄 Shutting down high-performance bulk screening engine")
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+            self._process_pool = None
         await self.connection_pool.close()
 
 # Global engine instance
@@ -679,7 +887,10 @@ def process_all_patients_sync(trigger_source: str = "manual_refresh") -> Dict[st
                 'total_screenings_updated': metrics.total_screenings_updated,
                 'total_documents_linked': metrics.total_documents_linked,
                 'processing_time': metrics.processing_time,
-                'circuit_breaker_trips': metrics.circuit_breaker_trips
+                'circuit_breaker_trips': metrics.circuit_breaker_trips,
+                'rows_written': metrics.rows_written,
+                'database_round_trips': metrics.database_round_trips,
+                'rows_per_round_trip': metrics.rows_per_round_trip
             }
             
         return loop.run_until_complete(run_bulk())
@@ -695,7 +906,10 @@ def process_all_patients_sync(trigger_source: str = "manual_refresh") -> Dict[st
             'total_screenings_updated': 0,
             'total_documents_linked': 0,
             'processing_time': 0.0,
-            'circuit_breaker_trips': 0
+            'circuit_breaker_trips': 0,
+            'rows_written': 0,
+            'database_round_trips': 0,
+            'rows_per_round_trip': 0.0
         }
     finally:
         loop.close()
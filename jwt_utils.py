@@ -3,7 +3,7 @@ import os
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app, g
-from models import User
+from auth_principal_cache import principal_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,7 +16,7 @@ JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_DELTA = timedelta(hours=24)
 
 
-def generate_jwt_token(user_id, username, is_admin=False):
+def generate_jwt_token(user_id, username, is_admin=False, token_version=0):
     """
     Generate a JWT token for a user
 
@@ -24,6 +24,7 @@ def generate_jwt_token(user_id, username, is_admin=False):
         user_id: User's database ID
         username: User's username
         is_admin: Whether the user has admin privileges
+        token_version: User's current token_version (bumping it revokes the token)
 
     Returns:
         str: JWT token
@@ -35,6 +36,7 @@ def generate_jwt_token(user_id, username, is_admin=False):
         "exp": datetime.utcnow() + JWT_EXPIRATION_DELTA,
         "iat": datetime.utcnow(),
         "iss": "healthprep-app",
+        "tv": token_version,
     }
 
     token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
@@ -62,6 +64,22 @@ def decode_jwt_token(token):
         return None
 
 
+def authenticate_token(token):
+    """
+    Resolve a JWT to the authenticated principal (cached per worker)
+
+    Args:
+        token: JWT token string
+
+    Returns:
+        AuthenticatedPrincipal or None if the token is invalid, revoked or its user is gone
+    """
+    payload = decode_jwt_token(token)
+    if not payload:
+        return None
+    return principal_cache.authenticate(payload)
+
+
 def jwt_required(f):
     """
     Decorator to require valid JWT token for route access
@@ -111,10 +129,10 @@ def jwt_required(f):
         if not payload:
             return jsonify({"error": "Invalid or expired token"}), 401
 
-        # Get the user from the database
-        user = User.query.get(payload.get("user_id"))
+        # Resolve the user from the principal cache
+        user = principal_cache.authenticate(payload)
         if not user:
-            return jsonify({"error": "User not found"}), 401
+            return jsonify({"error": "User not found or token revoked"}), 401
 
         # Make user available in the request context
         g.current_user = user
@@ -140,12 +158,7 @@ def optional_jwt(f):
             try:
                 parts = auth_header.split(" ")
                 if len(parts) == 2 and parts[0].lower() == "bearer":
-                    token = parts[1]
-                    payload = decode_jwt_token(token)
-                    if payload:
-                        user = User.query.get(payload.get("user_id"))
-                        if user:
-                            g.current_user = user
+                    g.current_user = authenticate_token(parts[1])
             except Exception as e:
                 logger.warning(f"Error processing optional JWT: {str(e)}")
 
@@ -156,12 +169,18 @@ def optional_jwt(f):
 
 def admin_required(f):
     """
-    Decorator to require admin privileges (must be used with jwt_required)
+    Decorator to require admin privileges (normally used with jwt_required; on its
+    own it authenticates the bearer token or auth_token cookie)
     """
 
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not hasattr(g, "current_user") or not g.current_user:
+        if not getattr(g, "current_user", None):
+            auth_header = request.headers.get("Authorization", "")
+            token = auth_header[7:] if auth_header.startswith("Bearer ") else request.cookies.get("auth_token")
+            g.current_user = authenticate_token(token) if token else None
+
+        if not g.current_user:
             return jsonify({"error": "Authentication required"}), 401
 
         if not g.current_user.is_admin:
@@ -182,12 +201,8 @@ def refresh_token(current_token):
     Returns:
         str: New JWT token or None if current token is invalid
     """
-    payload = decode_jwt_token(current_token)
-    if not payload:
-        return None
-
-    user = User.query.get(payload.get("user_id"))
+    user = authenticate_token(current_token)
     if not user:
         return None
 
-    return generate_jwt_token(user.id, user.username)
+    return generate_jwt_token(user.id, user.username, user.is_admin, user.token_version)
@@ -31,6 +31,28 @@ if __name__ != "__main__":
     except Exception as e:
         print(f"Error initializing EHR connections: {e}")
 
+    # Precompute prep sheets for today's and tomorrow's appointments
+    if os.environ.get("PREP_SHEET_PRECOMPUTE_ENABLED", "false").lower() == "true":
+        try:
+            from prep_sheet_precompute import prep_sheet_precomputer
+
+            prep_sheet_precomputer.start_scheduler()
+        except Exception as e:
+            print(f"Error starting prep sheet precompute: {e}")
+
+    # Resume background jobs interrupted by a restart (the app runs a single worker process)
+    with app.app_context():
+        try:
+            from bulk_ocr_job_runner import bulk_ocr_job_runner
+            from fhir_bulk_export import fhir_bulk_export_runner
+
+            for job_runner in (bulk_ocr_job_runner, fhir_bulk_export_runner):
+                resumed_jobs = job_runner.resume_incomplete_jobs()
+                if resumed_jobs:
+                    logging.info(f"Resumed {job_runner.job_label}s {resumed_jobs}")
+        except Exception as e:
+            logging.error(f"Error resuming background jobs: {e}")
+
     # Add sample data for today's appointments
     with app.app_context():
         try:
@@ -16,12 +16,46 @@ from app import db
 import json
 
 
+# Section key -> (record model, record date attribute, settings cutoff attribute, document types, display name)
+SECTIONS = {
+    'labs': (
+        LabResult, 'test_date', 'labs_cutoff_months',
+        {'LAB_REPORT', 'LABORATORIES', 'Lab Report', 'lab_result', 'laboratory'},
+        'Laboratories',
+    ),
+    'imaging': (
+        ImagingStudy, 'study_date', 'imaging_cutoff_months',
+        {'RADIOLOGY_REPORT', 'IMAGING', 'Radiology Report', 'imaging', 'radiology', 'xray', 'mri', 'ct_scan'},
+        'Imaging',
+    ),
+    'consults': (
+        ConsultReport, 'report_date', 'consults_cutoff_months',
+        {'CONSULTATION', 'CONSULTS', 'Consultation', 'consult', 'consultation', 'specialist_report'},
+        'Consults',
+    ),
+    'hospital_visits': (
+        HospitalSummary, 'admission_date', 'hospital_cutoff_months',
+        {'DISCHARGE_SUMMARY', 'HOSPITAL_RECORDS', 'Discharge Summary', 'hospital_summary', 'discharge_summary', 'admission_note'},
+        'Hospital Visits',
+    ),
+}
+SECTION_DOCUMENT_TYPES = set().union(*(section[3] for section in SECTIONS.values()))
+
+# Medical date of a document: document_date if available, otherwise created_at
+DOCUMENT_DATE = db.func.coalesce(MedicalDocument.document_date, MedicalDocument.created_at)
+
+
 class MedicalDataParser:
     """Parse and filter medical data with time-based cutoffs"""
     
-    def __init__(self, patient_id: int, settings: Optional[ChecklistSettings] = None):
+    def __init__(self, patient_id: int, settings: Optional[ChecklistSettings] = None,
+                 as_of: Optional[datetime] = None, preloaded: Optional[Dict[str, List]] = None):
         self.patient_id = patient_id
         self.settings = settings or self._get_default_settings()
+        self.as_of = as_of or datetime.now()
+        # Section records and documents already loaded by load_batch (newest first, within cutoffs)
+        self._preloaded = preloaded
+        self._documents = preloaded.get('documents') if preloaded else None
         
     def _get_default_settings(self) -> ChecklistSettings:
         """Get checklist settings or create default"""
@@ -36,160 +70,94 @@ class MedicalDataParser:
         return settings
     
     def _calculate_cutoff_date(self, months: int) -> datetime:
-        """Calculate cutoff date based on months from now"""
-        return datetime.now() - timedelta(days=months * 30)
-    
-    def get_filtered_labs(self) -> Dict[str, Any]:
-        """Get lab results within cutoff period and their associated documents"""
-        cutoff_date = self._calculate_cutoff_date(self.settings.labs_cutoff_months)
-        
-        # Get lab results within cutoff
-        labs = LabResult.query.filter(
-            and_(
-                LabResult.patient_id == self.patient_id,
-                LabResult.test_date >= cutoff_date
-            )
-        ).order_by(LabResult.test_date.desc()).all()
-        
-        # Get associated documents using optimized query with document_date filtering
-        from performance_optimizer import performance_optimizer
-        all_patient_docs = performance_optimizer.get_optimized_patient_documents(self.patient_id, limit=100)
-        
-        # Filter documents by type and cutoff date
-        lab_documents = []
-        lab_types = {'LAB_REPORT', 'LABORATORIES', 'Lab Report', 'lab_result', 'laboratory'}
-        
-        for doc in all_patient_docs:
-            if doc.document_type in lab_types:
-                # Use document_date if available, otherwise fall back to created_at
-                doc_date = doc.document_date if doc.document_date else doc.created_at
-                if doc_date and doc_date >= cutoff_date:
-                    lab_documents.append(doc)
-        
+        """Calculate cutoff date based on months before the as-of time"""
+        return self.as_of - timedelta(days=months * 30)
+
+    @classmethod
+    def load_batch(cls, patient_ids: List[int], settings: Optional[ChecklistSettings] = None,
+                   as_of: Optional[datetime] = None) -> Dict[int, 'MedicalDataParser']:
+        """Parsers for many patients, loaded with one IN (...) query per section plus one for documents"""
+        parser = cls(None, settings, as_of)
+        preloaded = {patient_id: {'documents': []} for patient_id in patient_ids}
+
+        for key, (model, date_attribute, cutoff_attribute, _, _) in SECTIONS.items():
+            date_column = getattr(model, date_attribute)
+            cutoff_date = parser._calculate_cutoff_date(getattr(parser.settings, cutoff_attribute))
+            for patient_id in patient_ids:
+                preloaded[patient_id][key] = []
+            records = model.query.filter(
+                model.patient_id.in_(patient_ids), date_column >= cutoff_date
+            ).order_by(date_column.desc()).all()
+            for record in records:
+                preloaded[record.patient_id][key].append(record)
+
+        for document in parser._document_query(MedicalDocument.patient_id.in_(patient_ids)).all():
+            preloaded[document.patient_id]['documents'].append(document)
+
         return {
-            'data': labs,
-            'documents': lab_documents,
-            'cutoff_date': cutoff_date,
-            'section_name': 'Laboratories',
-            'cutoff_months': self.settings.labs_cutoff_months
+            patient_id: cls(patient_id, parser.settings, parser.as_of, preloaded[patient_id])
+            for patient_id in patient_ids
         }
-    
-    def get_filtered_imaging(self) -> Dict[str, Any]:
-        """Get imaging studies within cutoff period and their associated documents"""
-        cutoff_date = self._calculate_cutoff_date(self.settings.imaging_cutoff_months)
-        
-        # Get imaging studies within cutoff
-        imaging = ImagingStudy.query.filter(
-            and_(
-                ImagingStudy.patient_id == self.patient_id,
-                ImagingStudy.study_date >= cutoff_date
-            )
-        ).order_by(ImagingStudy.study_date.desc()).all()
-        
-        # Get associated documents using document_date (actual medical date) for cutoff filtering
-        imaging_documents = MedicalDocument.query.filter(
-            and_(
-                MedicalDocument.patient_id == self.patient_id,
-                MedicalDocument.document_type.in_(['RADIOLOGY_REPORT', 'IMAGING', 'Radiology Report', 'imaging', 'radiology', 'xray', 'mri', 'ct_scan']),
-                # Use document_date if available, otherwise fall back to created_at
-                db.or_(
-                    and_(MedicalDocument.document_date.isnot(None), MedicalDocument.document_date >= cutoff_date),
-                    and_(MedicalDocument.document_date.is_(None), MedicalDocument.created_at >= cutoff_date)
+
+    def _document_query(self, patient_filter):
+        """Section documents within the widest cutoff, newest medical date first"""
+        oldest_cutoff = self._calculate_cutoff_date(
+            max(getattr(self.settings, section[2]) for section in SECTIONS.values())
+        )
+        return MedicalDocument.query.filter(
+            patient_filter,
+            MedicalDocument.document_type.in_(SECTION_DOCUMENT_TYPES),
+            DOCUMENT_DATE >= oldest_cutoff
+        ).order_by(DOCUMENT_DATE.desc())
+
+    def _section_documents(self, document_types: set, cutoff_date: datetime) -> List[MedicalDocument]:
+        """Documents of the given types within the cutoff, from one query per patient"""
+        if self._documents is None:
+            self._documents = self._document_query(MedicalDocument.patient_id == self.patient_id).all()
+        return [
+            doc for doc in self._documents
+            if doc.document_type in document_types and (doc.document_date or doc.created_at) >= cutoff_date
+        ]
+
+    def _get_section(self, key: str) -> Dict[str, Any]:
+        model, date_attribute, cutoff_attribute, document_types, section_name = SECTIONS[key]
+        cutoff_months = getattr(self.settings, cutoff_attribute)
+        cutoff_date = self._calculate_cutoff_date(cutoff_months)
+
+        if self._preloaded is not None:
+            data = self._preloaded[key]
+        else:
+            date_column = getattr(model, date_attribute)
+            data = model.query.filter(
+                and_(
+                    model.patient_id == self.patient_id,
+                    date_column >= cutoff_date
                 )
-            )
-        ).order_by(
-            # Order by document_date if available, otherwise created_at
-            db.case(
-                (MedicalDocument.document_date.isnot(None), MedicalDocument.document_date),
-                else_=MedicalDocument.created_at
-            ).desc()
-        ).all()
-        
+            ).order_by(date_column.desc()).all()
+
         return {
-            'data': imaging,
-            'documents': imaging_documents,
+            'data': data,
+            'documents': self._section_documents(document_types, cutoff_date),
             'cutoff_date': cutoff_date,
-            'section_name': 'Imaging',
-            'cutoff_months': self.settings.imaging_cutoff_months
+            'section_name': section_name,
+            'cutoff_months': cutoff_months
         }
+
+    def get_filtered_labs(self) -> Dict[str, Any]:
+        """Get lab results within cutoff period and their associated documents"""
+        return self._get_section('labs')
+    
+    def get_filtered_imaging(self) -> Dict[str, Any]:
+        """Get imaging studies within cutoff period and their associated documents"""
+        return self._get_section('imaging')
     
     def get_filtered_consults(self) -> Dict[str, Any]:
         """Get consult reports within cutoff period and their associated documents"""
-        cutoff_date = self._calculate_cutoff_date(self.settings.consults_cutoff_months)
-        
-        # Get consult reports within cutoff
-        consults = ConsultReport.query.filter(
-            and_(
-                ConsultReport.patient_id == self.patient_id,
-                ConsultReport.report_date >= cutoff_date
-            )
-        ).order_by(ConsultReport.report_date.desc()).all()
-        
-        # Get associated documents using document_date (actual medical date) for cutoff filtering
-        consult_documents = MedicalDocument.query.filter(
-            and_(
-                MedicalDocument.patient_id == self.patient_id,
-                MedicalDocument.document_type.in_(['CONSULTATION', 'CONSULTS', 'Consultation', 'consult', 'consultation', 'specialist_report']),
-                # Use document_date if available, otherwise fall back to created_at
-                db.or_(
-                    and_(MedicalDocument.document_date.isnot(None), MedicalDocument.document_date >= cutoff_date),
-                    and_(MedicalDocument.document_date.is_(None), MedicalDocument.created_at >= cutoff_date)
-                )
-            )
-        ).order_by(
-            # Order by document_date if available, otherwise created_at
-            db.case(
-                (MedicalDocument.document_date.isnot(None), MedicalDocument.document_date),
-                else_=MedicalDocument.created_at
-            ).desc()
-        ).all()
-        
-        return {
-            'data': consults,
-            'documents': consult_documents,
-            'cutoff_date': cutoff_date,
-            'section_name': 'Consults',
-            'cutoff_months': self.settings.consults_cutoff_months
-        }
+        return self._get_section('consults')
     
     def get_filtered_hospital_visits(self) -> Dict[str, Any]:
         """Get hospital visits within cutoff period and their associated documents"""
-        cutoff_date = self._calculate_cutoff_date(self.settings.hospital_cutoff_months)
-        
-        # Get hospital summaries within cutoff
-        hospital_visits = HospitalSummary.query.filter(
-            and_(
-                HospitalSummary.patient_id == self.patient_id,
-                HospitalSummary.admission_date >= cutoff_date
-            )
-        ).order_by(HospitalSummary.admission_date.desc()).all()
-        
-        # Get associated documents using document_date (actual medical date) for cutoff filtering
-        hospital_documents = MedicalDocument.query.filter(
-            and_(
-                MedicalDocument.patient_id == self.patient_id,
-                MedicalDocument.document_type.in_(['DISCHARGE_SUMMARY', 'HOSPITAL_RECORDS', 'Discharge Summary', 'hospital_summary', 'discharge_summary', 'admission_note']),
-                # Use document_date if available, otherwise fall back to created_at
-                db.or_(
-                    and_(MedicalDocument.document_date.isnot(None), MedicalDocument.document_date >= cutoff_date),
-                    and_(MedicalDocument.document_date.is_(None), MedicalDocument.created_at >= cutoff_date)
-                )
-            )
-        ).order_by(
-            # Order by document_date if available, otherwise created_at
-            db.case(
-                (MedicalDocument.document_date.isnot(None), MedicalDocument.document_date),
-                else_=MedicalDocument.created_at
-            ).desc()
-        ).all()
-        
-        return {
-            'data': hospital_visits,
-            'documents': hospital_documents,
-            'cutoff_date': cutoff_date,
-            'section_name': 'Hospital Visits',
-            'cutoff_months': self.settings.hospital_cutoff_months
-        }
+        return self._get_section('hospital_visits')
     
     def get_all_filtered_data(self) -> Dict[str, Any]:
         """Get all filtered medical data and documents"""
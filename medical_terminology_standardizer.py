@@ -6,9 +6,10 @@ to prevent variant detection issues caused by inconsistent naming.
 
 import json
 from typing import Dict, List, Tuple, Optional
-from difflib import SequenceMatcher
 import re
 
+from term_search_index import TermSearchIndex
+
 class MedicalTerminologyStandardizer:
     """
     Standardizes medical terminology for screening types and conditions
@@ -19,6 +20,7 @@ class MedicalTerminologyStandardizer:
         self.screening_standards = self._load_screening_standards()
         self.condition_standards = self._load_condition_standards()
         self.synonym_mappings = self._load_synonym_mappings()
+        self._build_search_indexes()
     
     def _load_screening_standards(self) -> Dict[str, Dict]:
         """Load standardized screening type definitions"""
@@ -155,6 +157,18 @@ class MedicalTerminologyStandardizer:
                 
         return mappings
     
+    def _build_search_indexes(self):
+        """Trie/trigram indexes so lookups only score candidate terms"""
+        self.synonym_index = TermSearchIndex(self.synonym_mappings.items())
+        self.screening_index = TermSearchIndex()
+        for key, data in self.screening_standards.items():
+            for term in [data["canonical_name"]] + data["aliases"]:
+                self.screening_index.add(term, key)
+        self.condition_index = TermSearchIndex()
+        for key, data in self.condition_standards.items():
+            for term in [data["canonical_name"]] + data["aliases"]:
+                self.condition_index.add(term, data["canonical_name"])
+    
     def normalize_screening_name(self, input_name: str) -> Tuple[str, float]:
         """
         Normalize a screening name to its canonical form
@@ -174,17 +188,9 @@ class MedicalTerminologyStandardizer:
         if input_clean in self.synonym_mappings:
             return self.synonym_mappings[input_clean], 1.0
         
-        # Fuzzy matching against all known terms
-        best_match = ""
-        best_score = 0.0
-        
-        for term, canonical in self.synonym_mappings.items():
-            similarity = SequenceMatcher(None, input_clean, term).ratio()
-            if similarity > best_score and similarity >= 0.8:  # 80% similarity threshold
-                best_match = canonical
-                best_score = similarity
-        
-        return best_match, best_score
+        # Fuzzy matching against known terms sharing a trigram with the input
+        match = self.synonym_index.best_match(input_clean, 0.8)  # 80% similarity threshold
+        return (match.key, match.similarity) if match else ("", 0.0)
     
     def normalize_condition_name(self, input_name: str) -> Tuple[str, float]:
         """
@@ -205,27 +211,9 @@ class MedicalTerminologyStandardizer:
         if input_clean in self.synonym_mappings:
             return self.synonym_mappings[input_clean], 1.0
         
-        # Fuzzy matching against condition terms
-        best_match = ""
-        best_score = 0.0
-        
-        for key, data in self.condition_standards.items():
-            canonical = data["canonical_name"]
-            
-            # Check canonical name
-            similarity = SequenceMatcher(None, input_clean, canonical.lower()).ratio()
-            if similarity > best_score and similarity >= 0.7:  # 70% similarity for conditions
-                best_match = canonical
-                best_score = similarity
-            
-            # Check aliases
-            for alias in data["aliases"]:
-                similarity = SequenceMatcher(None, input_clean, alias.lower()).ratio()
-                if similarity > best_score and similarity >= 0.7:
-                    best_match = canonical
-                    best_score = similarity
-        
-        return best_match, best_score
+        # Fuzzy matching against condition names and aliases sharing a trigram with the input
+        match = self.condition_index.best_match(input_clean, 0.7)  # 70% similarity for conditions
+        return (match.key, match.similarity) if match else ("", 0.0)
     
     def get_screening_suggestions(self, partial_input: str, limit: int = 10) -> List[Dict]:
         """
@@ -244,21 +232,16 @@ class MedicalTerminologyStandardizer:
         input_clean = partial_input.strip().lower()
         suggestions = []
         
-        for key, data in self.screening_standards.items():
-            canonical = data["canonical_name"]
-            
-            # Check if canonical name or any alias contains the input
-            matches = [canonical] + data["aliases"]
-            for match in matches:
-                if input_clean in match.lower():
-                    suggestions.append({
-                        "canonical_name": canonical,
-                        "display_text": canonical,
-                        "category": data["category"],
-                        "description": data["description"],
-                        "typical_frequency": data["typical_frequency"]
-                    })
-                    break  # Only add each canonical once
+        # Canonical names or aliases containing the input (one hit per canonical)
+        for hit in self.screening_index.search(input_clean, len(self.screening_standards), fuzzy_threshold=0):
+            data = self.screening_standards[hit.key]
+            suggestions.append({
+                "canonical_name": data["canonical_name"],
+                "display_text": data["canonical_name"],
+                "category": data["category"],
+                "description": data["description"],
+                "typical_frequency": data["typical_frequency"]
+            })
         
         # Sort by relevance (exact matches first, then by length)
         suggestions.sort(key=lambda x: (
@@ -284,22 +267,18 @@ class MedicalTerminologyStandardizer:
         
         input_clean = partial_input.strip().lower()
         suggestions = []
+        standards_by_name = {data["canonical_name"]: data for data in self.condition_standards.values()}
         
-        for key, data in self.condition_standards.items():
-            canonical = data["canonical_name"]
-            
-            # Check if canonical name or any alias contains the input
-            matches = [canonical] + data["aliases"]
-            for match in matches:
-                if input_clean in match.lower():
-                    suggestions.append({
-                        "canonical_name": canonical,
-                        "display_text": canonical,
-                        "category": data["category"],
-                        "snomed_codes": data["snomed_codes"],
-                        "icd10_codes": data["icd10_codes"]
-                    })
-                    break  # Only add each canonical once
+        # Canonical names or aliases containing the input (one hit per canonical)
+        for hit in self.condition_index.search(input_clean, len(standards_by_name), fuzzy_threshold=0):
+            data = standards_by_name[hit.key]
+            suggestions.append({
+                "canonical_name": hit.key,
+                "display_text": hit.key,
+                "category": data["category"],
+                "snomed_codes": data["snomed_codes"],
+                "icd10_codes": data["icd10_codes"]
+            })
         
         # Sort by relevance
         suggestions.sort(key=lambda x: (
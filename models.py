@@ -1,10 +1,16 @@
 from datetime import datetime
 import enum
 import json
+import logging
 from app import db
 from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.dialects.postgresql import JSONB
 from werkzeug.security import generate_password_hash, check_password_hash
 
+logger = logging.getLogger(__name__)
+
 # Association table for many-to-many relationship between Screening and MedicalDocument
 screening_documents = db.Table('screening_documents',
     db.Column('screening_id', db.Integer, db.ForeignKey('screening.id'), primary_key=True),
@@ -36,8 +42,13 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256))
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Embedded in issued JWTs; bumping it revokes every outstanding token
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     def set_password(self, password):
+        # Changing an existing password revokes outstanding tokens
+        if self.password_hash:
+            self.revoke_tokens()
         # Use stronger hashing with higher iteration count and salt rounds
         self.password_hash = generate_password_hash(
             password, method="pbkdf2:sha256:600000", salt_length=32
@@ -46,10 +57,48 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def revoke_tokens(self):
+        """Invalidate every JWT issued to this user (takes effect on commit)"""
+        self.token_version = (self.token_version or 0) + 1
+
     def __repr__(self):
         return f"<User {self.username}>"
 
 
+class UserAuthChange(db.Model):
+    """Append-only feed of user changes that affect authentication
+
+    Written in the same transaction as a token_version bump, an is_admin/username/email change or
+    a user delete. Each worker polls it to evict cached principals (auth_principal_cache.py).
+    """
+
+    __tablename__ = "user_auth_change"
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)  # No FK: deleted users are recorded too
+    token_version = db.Column(db.Integer)  # None when the user was deleted
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+_AUTH_ATTRIBUTES = ("token_version", "is_admin", "username", "email")
+
+
+@event.listens_for(User, "after_update")
+def _record_user_auth_change(mapper, connection, target):
+    state = db.inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _AUTH_ATTRIBUTES):
+        connection.execute(UserAuthChange.__table__.insert().values(
+            user_id=target.id, token_version=target.token_version, created_at=datetime.utcnow()
+        ))
+
+
+@event.listens_for(User, "after_delete")
+def _record_user_delete(mapper, connection, target):
+    connection.execute(UserAuthChange.__table__.insert().values(
+        user_id=target.id, token_version=None, created_at=datetime.utcnow()
+    ))
+
+
 class Patient(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
@@ -65,6 +114,11 @@ class Patient(db.Model):
     updated_at = db.Column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    # Normalized name/MRN/email words, maintained on write (see patient_search.py)
+    search_text = db.Column(db.String(512))
+    # Bumped by every write to the patient or a chart section (see patient_chart_loader.py
+    # and prep_sheet_precompute.py)
+    chart_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     conditions = db.relationship("Condition", backref="patient", lazy=True)
@@ -118,6 +172,54 @@ class Patient(db.Model):
         return f"<Patient {self.full_name} (MRN: {self.mrn})>"
 
 
+class PatientSearchGram(db.Model):
+    """Word ('w') and, outside PostgreSQL, trigram ('t') postings of Patient.search_text
+
+    Word rows serve short prefix queries on every database; trigram rows stand in for the
+    pg_trgm index on SQLite.
+    """
+
+    __tablename__ = "patient_search_gram"
+
+    kind = db.Column(db.String(1), primary_key=True)
+    gram = db.Column(db.String(64), primary_key=True)
+    patient_id = db.Column(
+        db.Integer, db.ForeignKey("patient.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
+@event.listens_for(Patient, "before_insert")
+@event.listens_for(Patient, "before_update")
+def _set_patient_search_text(mapper, connection, target):
+    from patient_search import build_search_text
+
+    target.search_text = build_search_text(
+        target.first_name, target.last_name, target.mrn, target.email
+    )
+
+
+@event.listens_for(Patient, "before_update")
+def _bump_own_chart_version(mapper, connection, target):
+    # SQL-side increment, so concurrent section writes are never lost
+    target.chart_version = Patient.chart_version + 1
+
+
+@event.listens_for(Patient, "after_insert")
+@event.listens_for(Patient, "after_update")
+def _write_patient_search_grams(mapper, connection, target):
+    if not db.inspect(target).attrs.search_text.history.has_changes():
+        return
+    from patient_search import write_search_grams
+
+    write_search_grams(connection, target.id, target.search_text)
+
+
+@event.listens_for(Patient, "after_delete")
+def _delete_patient_search_grams(mapper, connection, target):
+    table = PatientSearchGram.__table__
+    connection.execute(table.delete().where(table.c.patient_id == target.id))
+
+
 class Condition(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("patient.id"), nullable=False)
@@ -261,6 +363,11 @@ class HospitalSummary(db.Model):
 class Screening(db.Model):
     """Individual screening assignments for specific patients with automated status determination"""
 
+    # One screening per patient and screening type; target of the bulk engine's ON CONFLICT upsert
+    __table_args__ = (
+        db.Index("uq_screening_patient_screening_type", "patient_id", "screening_type_id", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey("patient.id"), nullable=False)
     
@@ -520,9 +627,12 @@ class MedicalDocument(db.Model):
     content = db.Column(
         db.Text, nullable=True
     )  # Text content (nullable to allow binary-only files)
-    binary_content = db.Column(
-        db.LargeBinary, nullable=True
-    )  # Binary content for images
+    binary_data = db.deferred(db.Column(
+        "binary_content", db.LargeBinary, nullable=True
+    ))  # Legacy in-row binary content; new content lives in the document blob store
+    # SHA-256 of the content in the blob store; the replaced hash is loaded on set so its blob can be released
+    blob_hash = db.column_property(db.Column(db.String(64), nullable=True, index=True), active_history=True)
+    blob_size = db.Column(db.Integer, nullable=True)  # Size in bytes of the binary content
     is_binary = db.Column(db.Boolean, default=False)  # Flag to indicate binary content
     mime_type = db.Column(db.String(100), nullable=True)  # MIME type for binary content
     source_system = db.Column(db.String(100))  # EMR system name or source
@@ -537,6 +647,9 @@ class MedicalDocument(db.Model):
     ocr_processing_date = db.Column(db.DateTime)
     ocr_text_length = db.Column(db.Integer)
     ocr_quality_flags = db.Column(db.Text)  # JSON array of quality flags
+
+    # Keyword-matcher words of content (with OCR text), filename, name and type; see document_search_index
+    search_text = db.deferred(db.Column(db.Text))
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(
@@ -546,6 +659,53 @@ class MedicalDocument(db.Model):
     # Relationship with Patient is already defined in the Patient model
     # Note: screenings relationship is defined in the Screening model via the association table
 
+    @property
+    def binary_content(self):
+        """Binary content from the blob store, falling back to the legacy column"""
+        if self.blob_hash:
+            from document_blob_store import get_blob_store
+            data = get_blob_store().get(self.blob_hash)
+            if data is not None:
+                return data
+        return self.binary_data
+
+    @binary_content.setter
+    def binary_content(self, data):
+        """Store binary content in the blob store (or the legacy column if blob storage is off)"""
+        from document_blob_store import blob_storage_enabled, get_blob_store
+
+        if not data:
+            self.blob_hash = None
+            self.blob_size = None
+            self.binary_data = data
+        elif blob_storage_enabled():
+            self.blob_hash, self.blob_size = get_blob_store().put(data)
+            self.binary_data = None
+        else:
+            self.blob_hash = None
+            self.blob_size = len(data)
+            self.binary_data = data
+
+    @property
+    def binary_size(self):
+        """Size of the binary content, without loading it once sizes are recorded"""
+        if self.blob_size is not None:
+            return self.blob_size
+        return len(self.binary_data) if self.binary_data else 0
+
+    @property
+    def has_binary_content(self):
+        return self.binary_size > 0
+
+    @classmethod
+    def delete_for_patient(cls, patient_id):
+        """Bulk delete a patient's documents, releasing their blobs once the transaction commits"""
+        release_document_blobs(db.session, [
+            blob_hash for (blob_hash,) in
+            db.session.query(cls.blob_hash).filter(cls.patient_id == patient_id, cls.blob_hash.isnot(None))
+        ])
+        return cls.query.filter_by(patient_id=patient_id).delete()
+
     @property
     def matched_screenings(self):
         """Get list of screenings that reference this document"""
@@ -669,6 +829,72 @@ class MedicalDocument(db.Model):
         return f'<MedicalDocument "{display_name}" ({self.document_type}) for Patient {self.patient_id}>'
 
 
+# Fields search_text is built from
+DOCUMENT_SEARCH_FIELDS = ("content", "filename", "document_name", "document_type")
+
+
+@event.listens_for(MedicalDocument, "before_insert")
+@event.listens_for(MedicalDocument, "before_update")
+def _set_document_search_text(mapper, connection, target):
+    state = db.inspect(target)
+    if state.persistent and not any(
+        state.attrs[name].history.has_changes() for name in DOCUMENT_SEARCH_FIELDS
+    ):
+        return
+    from document_search_index import build_document_search_text
+
+    target.search_text = build_document_search_text(
+        target.content, target.filename, target.document_name, target.document_type
+    )
+
+
+def release_document_blobs(session, blob_hashes):
+    """Delete these blobs after the session commits, unless another document still references them"""
+    blob_hashes = {blob_hash for blob_hash in blob_hashes if blob_hash}
+    if blob_hashes:
+        session.info.setdefault("released_blob_hashes", set()).update(blob_hashes)
+
+
+@event.listens_for(MedicalDocument, "after_delete")
+def _release_deleted_document_blob(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        release_document_blobs(session, [target.blob_hash])
+
+
+@event.listens_for(MedicalDocument, "after_update")
+def _release_replaced_document_blob(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        release_document_blobs(session, db.inspect(target).attrs.blob_hash.history.deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_released_document_blobs(session):
+    blob_hashes = session.info.pop("released_blob_hashes", None)
+    if not blob_hashes:
+        return
+    from document_blob_store import get_blob_store
+
+    try:
+        # Content-addressed blobs are shared by documents with identical content
+        table = MedicalDocument.__table__
+        with db.engine.connect() as connection:
+            referenced = set(connection.execute(
+                select(table.c.blob_hash).where(table.c.blob_hash.in_(sorted(blob_hashes)))
+            ).scalars())
+        store = get_blob_store()
+        for blob_hash in blob_hashes - referenced:
+            store.delete(blob_hash)
+    except Exception as e:
+        logger.error(f"Could not delete {len(blob_hashes)} released document blobs: {e}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_released_document_blobs(session, previous_transaction):
+    session.info.pop("released_blob_hashes", None)
+
+
 class PrepSheet(db.Model):
     """Preparation sheet documents with dual storage for internal and FHIR keys"""
 
@@ -1181,6 +1407,38 @@ class ScreeningType(db.Model):
         return f"<ScreeningType {self.name}>"
 
 
+class ScreeningRuleVersion(db.Model):
+    """Single-row counter bumped in the same transaction as any ScreeningType insert, update or delete
+
+    Compiled screening rule snapshots (screening_rule_set.py) are rebuilt whenever it changes.
+    """
+
+    __tablename__ = "screening_rule_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def bump(cls, connection):
+        """Increment the counter on the flushing connection, creating the row on first use"""
+        table = cls.__table__
+        result = connection.execute(
+            table.update()
+            .where(table.c.id == 1)
+            .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(id=1, version=1, updated_at=datetime.utcnow()))
+
+
+@event.listens_for(ScreeningType, "after_insert")
+@event.listens_for(ScreeningType, "after_update")
+@event.listens_for(ScreeningType, "after_delete")
+def _bump_screening_rule_version(mapper, connection, target):
+    ScreeningRuleVersion.bump(connection)
+
+
 class PatientAlert(db.Model):
     """Patient-specific alerts that appear on prep sheets"""
 
@@ -1297,6 +1555,24 @@ class ChecklistSettings(db.Model):
         return f"<ChecklistSettings id={self.id}>"
 
 
+class PrepSheetCache(db.Model):
+    """Rendered prep sheet content for a patient and prep date (see prep_sheet_precompute.py)
+
+    The fingerprint covers every input of the sheet; a row whose fingerprint no longer
+    matches is re-rendered instead of served.
+    """
+
+    __tablename__ = "prep_sheet_cache"
+
+    patient_id = db.Column(
+        db.Integer, db.ForeignKey("patient.id", ondelete="CASCADE"), primary_key=True
+    )
+    prep_date = db.Column(db.Date, primary_key=True, index=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    rendered_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class AdminLog(db.Model):
     """Admin activity and system event logging"""
 
@@ -1310,9 +1586,9 @@ class AdminLog(db.Model):
     event_type = db.Column(
         db.String(50), nullable=False, index=True
     )  # login_fail, validation_error, admin_action, etc.
-    event_details = db.Column(
-        db.Text, nullable=True
-    )  # JSON string with additional details
+    event_data = db.Column(
+        "event_details", db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True
+    )  # Structured event details (JSONB on PostgreSQL)
     request_id = db.Column(
         db.String(36), nullable=True, index=True
     )  # UUID for request tracking
@@ -1325,36 +1601,46 @@ class AdminLog(db.Model):
     def __repr__(self):
         return f"<AdminLog {self.event_type} at {self.timestamp}>"
 
+    @staticmethod
+    def parse_event_details(details):
+        """Structured form of event details given as a dict, JSON string or legacy dict repr"""
+        if details is None or isinstance(details, (dict, list)):
+            return details
+        try:
+            return json.loads(details)
+        except (json.JSONDecodeError, TypeError):
+            pass
+        try:
+            # Older entries were stored as Python dict reprs
+            import ast
+
+            parsed = ast.literal_eval(details)
+            if isinstance(parsed, (dict, list)):
+                return json.loads(json.dumps(parsed, default=str))
+        except (ValueError, SyntaxError):
+            pass
+        return {"raw": details, "parsed": False}
+
+    @property
+    def event_details(self):
+        """Event details as a JSON string"""
+        if self.event_data is None or isinstance(self.event_data, str):
+            return self.event_data
+        return json.dumps(self.event_data)
+
+    @event_details.setter
+    def event_details(self, details):
+        self.event_data = self.parse_event_details(details)
+
     @property
     def event_details_dict(self):
         """Return event details as a dictionary"""
-        if not self.event_details:
+        details = self.parse_event_details(self.event_data)
+        if details is None:
             return {}
-        try:
-            # First try to parse as JSON
-            import json
-
-            return json.loads(self.event_details)
-        except (json.JSONDecodeError, TypeError):
-            # If JSON parsing fails, try to evaluate as Python dict
-            try:
-                import ast
-
-                return ast.literal_eval(self.event_details)
-            except (ValueError, SyntaxError):
-                # If both fail, try to extract basic info from string format
-                try:
-                    # Handle old string format like "{'route': '/path', 'method': 'GET'}"
-                    if self.event_details.strip().startswith(
-                        "{"
-                    ) and self.event_details.strip().endswith("}"):
-                        # Try to fix common formatting issues
-                        fixed_details = self.event_details.replace("'", '"')
-                        return json.loads(fixed_details)
-                except:
-                    pass
-                # Return raw string in a dict if all else fails
-                return {"raw": self.event_details, "parsed": False}
+        if not isinstance(details, dict):
+            return {"raw": details, "parsed": False}
+        return details
 
     @classmethod
     def log_event(
@@ -1369,6 +1655,10 @@ class AdminLog(db.Model):
         """
         Convenience method to create a new admin log entry
 
+        The entry is written by the admin log writer, outside the caller's session: queued for
+        a background batch insert, or written immediately for security events. Callers don't
+        need to commit.
+
         Args:
             event_type: Type of event (required)
             user_id: ID of the user associated with the event
@@ -1376,21 +1666,26 @@ class AdminLog(db.Model):
             request_id: Request tracking ID
             ip_address: IP address of the request
             user_agent: User agent string
+
+        Returns:
+            Transient AdminLog with the logged values
         """
-        if isinstance(event_details, dict):
-            event_details = json.dumps(event_details)
-
-        log_entry = cls(
-            event_type=event_type,
-            user_id=user_id,
-            event_details=event_details,
-            request_id=request_id,
-            ip_address=ip_address,
-            user_agent=user_agent,
-        )
+        from admin_log_writer import admin_log_writer
+
+        # Keyed by column (event_data is stored in the event_details column) for the Core insert
+        row = {
+            "timestamp": datetime.utcnow(),
+            "event_type": event_type,
+            "user_id": user_id,
+            "event_details": cls.parse_event_details(event_details),
+            "request_id": request_id,
+            "ip_address": ip_address,
+            "user_agent": user_agent[:500] if user_agent else user_agent,
+        }
+        admin_log_writer.write(row)
 
-        db.session.add(log_entry)
-        return log_entry
+        values = dict(row)
+        return cls(event_data=values.pop("event_details"), **values)
 
 
 class Keyword(db.Model):
@@ -1469,4 +1764,287 @@ class KeywordConfig(db.Model):
         if config_dict:
             self.config = json.dumps(config_dict)
         else:
-            self.config = None
\ No newline at end of file
+            self.config = None
+
+class DocumentScreeningMatch(db.Model):
+    """Persisted keyword match result for a (document, screening type) pair
+
+    Rows are reused by every refresh path until the document's matched text or the
+    screening type's keyword configuration changes (tracked by the fingerprints).
+    """
+
+    __tablename__ = "document_screening_match"
+
+    document_id = db.Column(
+        db.Integer, db.ForeignKey("medical_document.id", ondelete="CASCADE"), primary_key=True
+    )
+    screening_type_id = db.Column(
+        db.Integer, db.ForeignKey("screening_type.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    confidence = db.Column(db.Float, nullable=False, default=0.0)  # Best per-field keyword confidence
+    matched_keywords = db.Column(db.Text)  # JSON array of keyword match dicts, null when nothing matched
+    keyword_fingerprint = db.Column(db.String(64), nullable=False)  # Hash of the screening type's keyword config
+    content_fingerprint = db.Column(db.String(64), nullable=False)  # Hash of content + OCR text, filename, type
+    document_updated_at = db.Column(db.DateTime)  # Document updated_at when the row was computed
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DocumentScreeningMatch document={self.document_id} screening_type={self.screening_type_id} confidence={self.confidence}>"
+
+    @property
+    def matched_keywords_list(self):
+        """Return matched keywords as a list"""
+        if not self.matched_keywords:
+            return []
+        try:
+            return json.loads(self.matched_keywords)
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+
+class OCRJob(db.Model):
+    """Persistent bulk OCR job; progress counters are updated with each batch commit"""
+
+    __tablename__ = "ocr_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(
+        db.String(20), nullable=False, default="pending", index=True
+    )  # pending, running, completed, failed, cancelled
+    description = db.Column(db.String(255))
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    total_documents = db.Column(db.Integer, nullable=False, default=0)
+    processed_documents = db.Column(db.Integer, nullable=False, default=0)
+    successful_documents = db.Column(db.Integer, nullable=False, default=0)
+    failed_documents = db.Column(db.Integer, nullable=False, default=0)
+    skipped_documents = db.Column(db.Integer, nullable=False, default=0)  # No OCR needed / no binary content
+    error_message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)  # Start of the current run (reset on resume)
+    processed_at_start = db.Column(db.Integer, nullable=False, default=0)  # processed_documents when the run started
+    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    items = db.relationship(
+        "OCRJobItem", backref="job", lazy="dynamic", cascade="all, delete-orphan"
+    )
+
+    def __repr__(self):
+        return f"<OCRJob {self.id} {self.status} {self.processed_documents}/{self.total_documents}>"
+
+    @property
+    def progress_percent(self):
+        """Percentage of documents processed"""
+        if not self.total_documents:
+            return 100.0 if self.status == "completed" else 0.0
+        return self.processed_documents / self.total_documents * 100
+
+    @property
+    def documents_per_second(self):
+        """Throughput of the current run"""
+        if not self.started_at:
+            return 0.0
+        end = self.completed_at or datetime.utcnow()
+        elapsed = (end - self.started_at).total_seconds()
+        processed = self.processed_documents - (self.processed_at_start or 0)
+        return processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds until the job finishes, None until throughput is known"""
+        if self.status != "running":
+            return None
+        rate = self.documents_per_second
+        if rate <= 0:
+            return None
+        return (self.total_documents - self.processed_documents) / rate
+
+    def to_dict(self):
+        """Progress summary for the OCR management API"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "description": self.description,
+            "total_documents": self.total_documents,
+            "processed_documents": self.processed_documents,
+            "successful_documents": self.successful_documents,
+            "failed_documents": self.failed_documents,
+            "skipped_documents": self.skipped_documents,
+            "progress_percent": round(self.progress_percent, 1),
+            "documents_per_second": round(self.documents_per_second, 3),
+            "eta_seconds": round(self.eta_seconds) if self.eta_seconds is not None else None,
+            "error_message": self.error_message,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+
+
+class OCRJobItem(db.Model):
+    """Per-document status row of a bulk OCR job, used to resume after a crash"""
+
+    __tablename__ = "ocr_job_items"
+    __table_args__ = (
+        db.UniqueConstraint("job_id", "document_id", name="uq_ocr_job_item_document"),
+        db.Index("ix_ocr_job_items_job_status", "job_id", "status"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(
+        db.Integer, db.ForeignKey("ocr_jobs.id", ondelete="CASCADE"), nullable=False
+    )
+    document_id = db.Column(
+        db.Integer, db.ForeignKey("medical_document.id", ondelete="CASCADE"), nullable=False
+    )
+    status = db.Column(
+        db.String(20), nullable=False, default="pending"
+    )  # pending, running, succeeded, failed, skipped
+    confidence = db.Column(db.Float)
+    extracted_text_length = db.Column(db.Integer)
+    error_message = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    processed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<OCRJobItem job={self.job_id} document={self.document_id} {self.status}>"
+
+
+class FHIRExportJob(db.Model):
+    """System-level FHIR bulk data export ($export) writing one NDJSON file per resource type"""
+
+    __tablename__ = "fhir_export_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(
+        db.String(20), nullable=False, default="pending", index=True
+    )  # pending, running, completed, failed, cancelled
+    resource_types = db.Column(db.String(255), nullable=False)  # Comma-separated FHIR resource types
+    since = db.Column(db.DateTime)  # _since: only resources modified at or after this time
+    request_url = db.Column(db.Text)  # Kick-off request URL, echoed in the manifest
+    output_dir = db.Column(db.String(500))
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    error_message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Manifest transactionTime
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    resources = db.relationship(
+        "FHIRExportJobResource", backref="job", lazy=True, cascade="all, delete-orphan",
+        order_by="FHIRExportJobResource.id"
+    )
+
+    def __repr__(self):
+        return f"<FHIRExportJob {self.id} {self.status} {self.resource_types}>"
+
+    @property
+    def resource_type_list(self):
+        return [resource_type for resource_type in self.resource_types.split(",") if resource_type]
+
+    @property
+    def progress_percent(self):
+        """Percentage of source rows exported across all resource types"""
+        total = sum(resource.total_rows or 0 for resource in self.resources)
+        if not total:
+            return 100.0 if self.status == "completed" else 0.0
+        return min(sum(resource.exported_rows for resource in self.resources) / total * 100, 100.0)
+
+    def to_dict(self):
+        """Progress summary for the $export status endpoint"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "resource_types": self.resource_type_list,
+            "since": self.since.isoformat() if self.since else None,
+            "progress_percent": round(self.progress_percent, 1),
+            "resources": [resource.to_dict() for resource in self.resources],
+            "error_message": self.error_message,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+
+
+class FHIRExportJobResource(db.Model):
+    """Per-resource-type checkpoint of a FHIR export job, used to resume after a crash"""
+
+    __tablename__ = "fhir_export_job_resources"
+    __table_args__ = (
+        db.UniqueConstraint("job_id", "resource_type", name="uq_fhir_export_job_resource"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(
+        db.Integer, db.ForeignKey("fhir_export_jobs.id", ondelete="CASCADE"), nullable=False
+    )
+    resource_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(
+        db.String(20), nullable=False, default="pending"
+    )  # pending, running, completed, failed
+    total_rows = db.Column(db.Integer)  # Source rows to export, counted when the resource starts
+    last_id = db.Column(db.Integer, nullable=False, default=0)  # Keyset position of the last checkpoint
+    exported_rows = db.Column(db.Integer, nullable=False, default=0)
+    resource_count = db.Column(db.Integer, nullable=False, default=0)  # NDJSON lines (a vital yields several)
+    bytes_written = db.Column(db.BigInteger, nullable=False, default=0)  # File offset of the last checkpoint
+    elapsed_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    error_message = db.Column(db.Text)
+    completed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<FHIRExportJobResource job={self.job_id} {self.resource_type} {self.status}>"
+
+    @property
+    def resources_per_second(self):
+        return self.resource_count / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def to_dict(self):
+        return {
+            "type": self.resource_type,
+            "status": self.status,
+            "total_rows": self.total_rows,
+            "exported_rows": self.exported_rows,
+            "count": self.resource_count,
+            "bytes_written": self.bytes_written,
+            "resources_per_second": round(self.resources_per_second, 1),
+            "error_message": self.error_message,
+        }
+
+
+# Writes to these models change the cached patient chart and prep sheet
+CHART_SECTION_MODELS = (
+    PatientAlert, Vital, LabResult, Condition, Visit, Screening, Immunization, Appointment, MedicalDocument,
+    ImagingStudy, ConsultReport, HospitalSummary,
+)
+
+
+def _note_chart_section_write(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.patient_id:
+        session.info.setdefault("chart_patient_ids", set()).add(target.patient_id)
+
+
+for _model in CHART_SECTION_MODELS:
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _note_chart_section_write)
+
+
+def bump_patient_chart_versions(connection, patient_ids):
+    """Bump chart_version (leaving updated_at alone); bulk statements that bypass the ORM call this directly"""
+    table = Patient.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.id.in_(sorted(patient_ids)))
+        .values(chart_version=table.c.chart_version + 1, updated_at=table.c.updated_at)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_patient_chart_versions(session, flush_context):
+    patient_ids = session.info.pop("chart_patient_ids", None)
+    if patient_ids:
+        bump_patient_chart_versions(session.connection(), patient_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_chart_section_writes(session, previous_transaction):
+    session.info.pop("chart_patient_ids", None)
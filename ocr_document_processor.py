@@ -8,21 +8,26 @@ import io
 import json
 import logging
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 from PIL import Image
 import pytesseract
 import cv2
 import numpy as np
-from pdf2image import convert_from_path, convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_path
 
 from app import db
 from models import MedicalDocument
 from phi_filter import PHIFilter, PHIFilterConfig
+from ocr_result_cache import ocr_result_cache
 
 
 logger = logging.getLogger(__name__)
 
+# Bump when preprocessing or text post-processing changes so cached OCR results are not reused
+OCR_PIPELINE_VERSION = 2
+
 
 class OCRQualityMetrics:
     """Track OCR processing quality and performance"""
@@ -55,6 +60,10 @@ class TesseractOCRProcessor:
         # Medical terminology optimization
         self.medical_preprocessing_enabled = True
         
+        # PDF pages are rasterized and recognized one at a time across a bounded process pool
+        self.pdf_dpi = 300  # High DPI for better OCR
+        self.pdf_page_workers = int(os.environ.get('OCR_PAGE_WORKERS', os.cpu_count() or 1))
+        
         # PHI filtering for HIPAA compliance
         self.phi_filter_enabled = True
         self.phi_filter = PHIFilter() if self.phi_filter_enabled else None
@@ -141,7 +150,7 @@ class TesseractOCRProcessor:
             
             # Process document with OCR
             # Check if binary content exists and has actual data
-            if not document.binary_content or len(document.binary_content) == 0:
+            if not document.has_binary_content:
                 result['error'] = f"Document {document_id} has no binary content to process"
                 result['quality_flags'].append("no_binary_content")
                 return result
@@ -152,28 +161,7 @@ class TesseractOCRProcessor:
             )
             
             if extracted_text:
-                # Combine OCR text with any existing content
-                combined_content = self._combine_content(document.content, extracted_text)
-                
-                # Update document with OCR results
-                document.content = combined_content
-                
-                # Update OCR status fields directly on document
-                document.ocr_processed = True
-                document.ocr_confidence = confidence
-                document.ocr_processing_date = processing_start
-                document.ocr_text_length = len(extracted_text)
-                document.ocr_quality_flags = json.dumps(quality_flags)
-                
-                # Also update metadata for backward compatibility
-                metadata = json.loads(document.doc_metadata) if document.doc_metadata else {}
-                metadata['ocr_processed'] = True
-                metadata['ocr_confidence'] = confidence
-                metadata['ocr_processing_date'] = processing_start.isoformat()
-                metadata['ocr_text_length'] = len(extracted_text)
-                metadata['ocr_quality_flags'] = quality_flags
-                
-                document.doc_metadata = json.dumps(metadata)
+                self.apply_ocr_result(document, extracted_text, confidence, quality_flags, processing_start)
                 db.session.commit()
                 
                 # Update result
@@ -212,15 +200,61 @@ class TesseractOCRProcessor:
             
         return result
     
+    def apply_ocr_result(self, document: MedicalDocument, extracted_text: str, confidence: float,
+                         quality_flags: List[str], processing_date: datetime):
+        """Write OCR text and status fields onto a document (the caller commits)"""
+        # Combine OCR text with any existing content
+        document.content = self._combine_content(document.content, extracted_text)
+        
+        # Update OCR status fields directly on document
+        document.ocr_processed = True
+        document.ocr_confidence = confidence
+        document.ocr_processing_date = processing_date
+        document.ocr_text_length = len(extracted_text)
+        document.ocr_quality_flags = json.dumps(quality_flags)
+        
+        # Also update metadata for backward compatibility
+        metadata = json.loads(document.doc_metadata) if document.doc_metadata else {}
+        metadata['ocr_processed'] = True
+        metadata['ocr_confidence'] = confidence
+        metadata['ocr_processing_date'] = processing_date.isoformat()
+        metadata['ocr_text_length'] = len(extracted_text)
+        metadata['ocr_quality_flags'] = quality_flags
+        
+        document.doc_metadata = json.dumps(metadata)
+    
+    def _preprocessing_version(self, file_extension: str) -> str:
+        """Identifies everything besides the Tesseract config that shapes an OCR result"""
+        preprocessing = 'medical' if self.medical_preprocessing_enabled else 'none'
+        return f"v{OCR_PIPELINE_VERSION}:{preprocessing}:{file_extension}:{self.pdf_dpi}dpi"
+    
     def _extract_text_with_ocr(self, filename: str, file_data: bytes) -> Tuple[str, float, List[str]]:
+        """Extract text using Tesseract OCR, reusing cached results for identical content"""
+        file_extension = os.path.splitext(filename.lower())[1]
+        cache_key = ocr_result_cache.make_key(
+            file_data, self.tesseract_config, self._preprocessing_version(file_extension)
+        )
+        
+        cached = ocr_result_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"♻️ OCR cache hit for {filename}")
+            return cached['text'], cached['confidence'], cached['quality_flags'] + ["ocr_cache_hit"]
+        
+        extracted_text, confidence, quality_flags = self._run_ocr(file_extension, file_data)
+        
+        # Errors may be transient; only successful extractions are cached
+        if extracted_text and not any(flag.endswith('_error') or 'processing_error' in flag for flag in quality_flags):
+            ocr_result_cache.put(cache_key, extracted_text, confidence, quality_flags)
+        
+        return extracted_text, confidence, quality_flags
+    
+    def _run_ocr(self, file_extension: str, file_data: bytes) -> Tuple[str, float, List[str]]:
         """Extract text using Tesseract OCR"""
         extracted_text = ""
         confidence = 0.0
         quality_flags = []
         
         try:
-            file_extension = os.path.splitext(filename.lower())[1]
-            
             if file_extension in self.image_extensions:
                 extracted_text, confidence, quality_flags = self._process_image_ocr(file_data)
                 
@@ -242,59 +276,83 @@ class TesseractOCRProcessor:
             # Load image
             image = Image.open(io.BytesIO(image_data))
             
-            # Preprocess image for better OCR results
-            if self.medical_preprocessing_enabled:
-                image = self._preprocess_medical_image(image)
-            
-            # Extract text with Tesseract using enhanced configuration
-            extracted_text = pytesseract.image_to_string(image, config=self.tesseract_config)
-            
-            # POST-PROCESSING: Enhance word spacing for medical documents
-            processed_text = self._enhance_word_spacing(extracted_text)
-            
-            # Get confidence data
-            confidence_data = pytesseract.image_to_data(image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
-            avg_confidence = self._calculate_average_confidence(confidence_data)
+            processed_text, avg_confidence = self._ocr_image(image)
             
             # Quality assessment
             quality_flags = self._assess_ocr_quality(processed_text, avg_confidence)
             
-            return processed_text.strip(), avg_confidence, quality_flags
+            return processed_text, avg_confidence, quality_flags
             
         except Exception as e:
             logger.error(f"Image OCR processing error: {e}")
             return "", 0.0, ["image_processing_error"]
     
+    def _ocr_image(self, image: Image.Image) -> Tuple[str, float]:
+        """Preprocess an image and run a single Tesseract pass for both text and confidence"""
+        # Preprocess image for better OCR results
+        if self.medical_preprocessing_enabled:
+            image = self._preprocess_medical_image(image)
+        
+        # One pass: word-level data carries both the text layout and per-word confidences
+        ocr_data = pytesseract.image_to_data(image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+        extracted_text = self._text_from_ocr_data(ocr_data)
+        
+        # POST-PROCESSING: Enhance word spacing for medical documents
+        processed_text = self._enhance_word_spacing(extracted_text)
+        
+        return processed_text.strip(), self._calculate_average_confidence(ocr_data)
+    
+    def _text_from_ocr_data(self, ocr_data: Dict) -> str:
+        """Rebuild page text from Tesseract word data: words per line, blank line between paragraphs"""
+        paragraphs = []
+        lines = {}
+        for index, word in enumerate(ocr_data.get('text', [])):
+            if not word or not str(word).strip():
+                continue
+            paragraph_key = (ocr_data['block_num'][index], ocr_data['par_num'][index])
+            line_key = paragraph_key + (ocr_data['line_num'][index],)
+            if paragraph_key not in lines:
+                lines[paragraph_key] = {}
+                paragraphs.append(paragraph_key)
+            lines[paragraph_key].setdefault(line_key, []).append(str(word))
+        
+        return "\n\n".join(
+            "\n".join(" ".join(words) for words in lines[paragraph_key].values())
+            for paragraph_key in paragraphs
+        )
+    
     def _process_pdf_ocr(self, pdf_data: bytes) -> Tuple[str, float, List[str]]:
-        """Process PDF file with OCR"""
+        """
+        Process PDF file with OCR, one page at a time.
+        
+        The PDF is written to a temporary file once; each page is rasterized, preprocessed and
+        recognized by a pool worker, so only one page image per worker is held in memory.
+        """
+        pdf_path = None
         try:
-            # Convert PDF pages to images
-            images = convert_from_bytes(pdf_data, dpi=300)  # High DPI for better OCR
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as pdf_file:
+                pdf_file.write(pdf_data)
+                pdf_path = pdf_file.name
+            
+            page_count = int(pdfinfo_from_path(pdf_path).get('Pages', 0))
+            page_numbers = list(range(1, page_count + 1))
             
-            all_text = []
-            all_confidences = []
             quality_flags = ["pdf_converted_to_images"]
+            page_results = self._ocr_pdf_pages(pdf_path, page_numbers)
             
-            for page_num, image in enumerate(images):
-                # Preprocess each page
-                if self.medical_preprocessing_enabled:
-                    image = self._preprocess_medical_image(image)
-                
-                # Extract text from page
-                page_text = pytesseract.image_to_string(image, config=self.tesseract_config)
-                
-                # POST-PROCESSING: Enhance word spacing for medical documents
-                processed_page_text = self._enhance_word_spacing(page_text)
-                
-                # Get confidence for page
-                confidence_data = pytesseract.image_to_data(image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
-                page_confidence = self._calculate_average_confidence(confidence_data)
+            all_text = []
+            all_confidences = []
+            for page_num, page_text, page_confidence, page_error in page_results:
+                if page_error:
+                    logger.warning(f"PDF OCR failed on page {page_num}: {page_error}")
+                    quality_flags.append(f"page_processing_error_{page_num}")
+                    continue
                 
-                all_text.append(processed_page_text.strip())
+                all_text.append(page_text)
                 all_confidences.append(page_confidence)
                 
                 if page_confidence < 50:  # Low confidence page
-                    quality_flags.append(f"low_confidence_page_{page_num + 1}")
+                    quality_flags.append(f"low_confidence_page_{page_num}")
             
             # Combine all pages
             full_text = "\n\n".join([text for text in all_text if text])
@@ -308,6 +366,37 @@ class TesseractOCRProcessor:
         except Exception as e:
             logger.error(f"PDF OCR processing error: {e}")
             return "", 0.0, ["pdf_processing_error"]
+            
+        finally:
+            if pdf_path:
+                try:
+                    os.unlink(pdf_path)
+                except OSError:
+                    pass
+    
+    def _ocr_pdf_pages(self, pdf_path: str, page_numbers: List[int]) -> List[Tuple[int, str, float, Optional[str]]]:
+        """OCR pages across the page pool, falling back to in-process page-by-page OCR"""
+        if len(page_numbers) > 1 and self.pdf_page_workers > 1:
+            try:
+                pool = _get_page_pool(self.pdf_page_workers)
+                return list(pool.map(_ocr_pdf_page, [pdf_path] * len(page_numbers), page_numbers,
+                                     [self.pdf_dpi] * len(page_numbers)))
+            except Exception as e:
+                logger.warning(f"OCR page pool unavailable, processing pages in-process: {e}")
+                _reset_page_pool()
+        
+        return [self.ocr_pdf_page(pdf_path, page_num, self.pdf_dpi) for page_num in page_numbers]
+    
+    def ocr_pdf_page(self, pdf_path: str, page_num: int, dpi: int) -> Tuple[int, str, float, Optional[str]]:
+        """Rasterize and OCR a single PDF page: (page number, text, confidence, error)"""
+        try:
+            images = convert_from_path(pdf_path, dpi=dpi, first_page=page_num, last_page=page_num)
+            if not images:
+                return page_num, "", 0.0, "page_not_rasterized"
+            page_text, page_confidence = self._ocr_image(images[0])
+            return page_num, page_text, page_confidence, None
+        except Exception as e:
+            return page_num, "", 0.0, str(e)
     
     def _preprocess_medical_image(self, image: Image.Image) -> Image.Image:
         """Preprocess image to improve OCR accuracy for medical documents"""
@@ -462,7 +551,11 @@ class TesseractOCRProcessor:
     def _combine_content(self, original_content: str, ocr_text: str) -> str:
         """Intelligently combine original content with OCR extracted text, filtering PHI"""
         # Apply PHI filtering to OCR text if enabled
-        if self.phi_filter_enabled and self.phi_filter and ocr_text:
+        if self.phi_filter_enabled and self.phi_filter and ocr_text and \
+                len(ocr_text) > self.phi_filter.config.stream_chunk_size:
+            # Large OCR output is filtered in overlapping windows rather than as one string
+            filtered_ocr_text = ''.join(self.phi_filter.filter_text_stream(ocr_text))
+        elif self.phi_filter_enabled and self.phi_filter and ocr_text:
             phi_result = self.phi_filter.filter_text(ocr_text)
             filtered_ocr_text = phi_result['filtered_text']
             
@@ -519,6 +612,7 @@ class TesseractOCRProcessor:
     def get_processing_statistics(self) -> Dict[str, Any]:
         """Get OCR processing statistics"""
         stats = self.quality_metrics.processing_stats.copy()
+        stats['result_cache'] = ocr_result_cache.get_stats()
         
         if stats['total_processed'] > 0:
             stats['success_rate'] = (stats['successful_extractions'] / stats['total_processed']) * 100
@@ -533,6 +627,30 @@ class TesseractOCRProcessor:
 # Global OCR processor instance
 ocr_processor = TesseractOCRProcessor()
 
+# Shared process pool for PDF page OCR (created on first multi-page PDF)
+_page_pool = None
+
+
+def _get_page_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Get or create the bounded PDF page OCR pool"""
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(max_workers=max_workers)
+    return _page_pool
+
+
+def _reset_page_pool():
+    """Discard a broken page pool so the next PDF starts a fresh one"""
+    global _page_pool
+    if _page_pool is not None:
+        _page_pool.shutdown(wait=False)
+        _page_pool = None
+
+
+def _ocr_pdf_page(pdf_path: str, page_num: int, dpi: int) -> Tuple[int, str, float, Optional[str]]:
+    """Page pool task: OCR one page with this process's processor instance"""
+    return ocr_processor.ocr_pdf_page(pdf_path, page_num, dpi)
+
 
 def process_document_with_ocr(document_id: int) -> Dict[str, Any]:
     """Convenience function to process a single document with OCR"""
@@ -10,7 +10,7 @@ import json
 import logging
 
 from app import app, db
-from models import MedicalDocument, Patient, ScreeningType
+from models import MedicalDocument, Patient, ScreeningType, OCRJob
 # Import moved to avoid circular imports - will import when needed
 from selective_screening_refresh_manager import selective_refresh_manager, ChangeType
 
@@ -299,53 +299,20 @@ def ocr_reprocess_low_confidence():
 
 @app.route('/admin/ocr-process-pending', methods=['POST'])
 def ocr_process_pending():
-    """Process all pending OCR documents"""
+    """Start a background bulk OCR job for all pending documents"""
     try:
-        # Find all documents that need OCR processing
-        all_documents = MedicalDocument.query.filter_by(ocr_processed=False).all()
-        pending_doc_ids = []
+        from bulk_ocr_job_runner import bulk_ocr_job_runner
         
-        for doc in all_documents:
-            if doc.document_name and ocr_processor.is_image_based_document(doc.document_name):
-                pending_doc_ids.append(doc.id)
+        pending_doc_ids = bulk_ocr_job_runner.pending_ocr_document_ids()
         
         if not pending_doc_ids:
             flash("No documents pending OCR processing", "info")
             return redirect(url_for('ocr_dashboard'))
         
-        # Limit to prevent overwhelming the system
-        max_batch_size = 50
-        if len(pending_doc_ids) > max_batch_size:
-            flash(f"Processing first {max_batch_size} of {len(pending_doc_ids)} pending documents", "info")
-            pending_doc_ids = pending_doc_ids[:max_batch_size]
-        
-        # Import here to avoid circular imports
-        from ocr_document_processor import ocr_processor
-        
-        # Process pending documents individually
-        successful_ocr = 0
-        failed_ocr = 0
-        no_ocr_needed = 0
+        job = bulk_ocr_job_runner.create_job(pending_doc_ids, description="Pending OCR documents")
+        bulk_ocr_job_runner.start_job(job.id)
         
-        for doc_id in pending_doc_ids:
-            try:
-                result_single = ocr_processor.process_document_ocr(doc_id)
-                if result_single['success']:
-                    successful_ocr += 1
-                else:
-                    failed_ocr += 1
-            except Exception as e:
-                logger.error(f"Error processing pending document {doc_id}: {e}")
-                failed_ocr += 1
-        
-        result = {
-            'successful_ocr': successful_ocr,
-            'failed_ocr': failed_ocr,
-            'no_ocr_needed': no_ocr_needed,
-            'total_processed': len(pending_doc_ids)
-        }
-        
-        flash(f"Processed {result['total_processed']} pending documents. Success: {result['successful_ocr']}, No OCR needed: {result['no_ocr_needed']}, Failed: {result['failed_ocr']}", "success")
+        flash(f"Started OCR job {job.id} for {len(pending_doc_ids)} pending documents. Track progress at /api/ocr-jobs/{job.id}", "success")
         
         return redirect(url_for('ocr_dashboard'))
         
@@ -355,6 +322,94 @@ def ocr_process_pending():
         return redirect(url_for('ocr_dashboard'))
 
 
+@app.route('/admin/ocr-jobs', methods=['POST'])
+def ocr_create_job():
+    """Create and start a bulk OCR job for selected documents or all pending documents"""
+    try:
+        from bulk_ocr_job_runner import bulk_ocr_job_runner
+        
+        data = request.get_json(silent=True) or {}
+        if data.get('scope') == 'pending':
+            document_ids = bulk_ocr_job_runner.pending_ocr_document_ids()
+            description = "Pending OCR documents"
+        else:
+            document_ids = [int(doc_id) for doc_id in data.get('document_ids', [])]
+            description = data.get('description') or "Selected documents"
+        
+        if not document_ids:
+            return jsonify({"success": False, "error": "No documents selected"}), 400
+        
+        job = bulk_ocr_job_runner.create_job(document_ids, description=description)
+        bulk_ocr_job_runner.start_job(job.id)
+        
+        return jsonify({"success": True, "job": job.to_dict()}), 202
+        
+    except Exception as e:
+        logger.error(f"OCR job creation error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/ocr-jobs')
+def list_ocr_jobs():
+    """List recent bulk OCR jobs with their progress"""
+    try:
+        jobs = OCRJob.query.order_by(OCRJob.created_at.desc()).limit(20).all()
+        return jsonify({"jobs": [job.to_dict() for job in jobs]})
+        
+    except Exception as e:
+        logger.error(f"OCR job listing error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/ocr-jobs/<int:job_id>')
+def get_ocr_job_progress(job_id):
+    """Get progress, throughput and ETA of a bulk OCR job"""
+    try:
+        from bulk_ocr_job_runner import bulk_ocr_job_runner
+        
+        progress = bulk_ocr_job_runner.get_job_progress(job_id)
+        if progress is None:
+            return jsonify({"error": f"OCR job {job_id} not found"}), 404
+        
+        return jsonify(progress)
+        
+    except Exception as e:
+        logger.error(f"OCR job progress error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/admin/ocr-jobs/<int:job_id>/resume', methods=['POST'])
+def resume_ocr_job(job_id):
+    """Resume an interrupted or failed bulk OCR job from its remaining pending documents"""
+    try:
+        from bulk_ocr_job_runner import bulk_ocr_job_runner
+        
+        job = OCRJob.query.get_or_404(job_id)
+        if job.status in ('completed', 'cancelled'):
+            return jsonify({"success": False, "error": f"OCR job {job_id} is {job.status}"}), 400
+        
+        started = bulk_ocr_job_runner.start_job(job_id)
+        return jsonify({"success": started, "already_running": not started})
+        
+    except Exception as e:
+        logger.error(f"OCR job resume error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/admin/ocr-jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_ocr_job(job_id):
+    """Cancel a bulk OCR job after its current batch"""
+    try:
+        from bulk_ocr_job_runner import bulk_ocr_job_runner
+        
+        cancelled = bulk_ocr_job_runner.cancel_job(job_id)
+        return jsonify({"success": cancelled})
+        
+    except Exception as e:
+        logger.error(f"OCR job cancel error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route('/api/document/<int:document_id>/ocr-status')
 def get_document_ocr_status(document_id):
     """Get OCR processing status for a specific document"""
@@ -428,9 +483,9 @@ def debug_document_ocr(doc_id):
             'filename': document.filename,
             'document_name': document.document_name,
             'document_type': document.document_type,
-            'has_binary_content': bool(document.binary_content),
+            'has_binary_content': document.has_binary_content,
             'has_file_data': bool(document.file_data),
-            'binary_content_size': len(document.binary_content) if document.binary_content else 0,
+            'binary_content_size': document.binary_size,
             'file_data_size': len(document.file_data) if document.file_data else 0,
             'mime_type': document.mime_type,
             'is_binary': document.is_binary,
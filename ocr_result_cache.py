@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+OCR Result Cache
+Content-addressed, size-bounded disk cache of OCR results. Entries are keyed by the SHA-256 of a
+document's binary content plus the Tesseract config and preprocessing version, so re-uploaded
+copies of the same scan skip Tesseract. Least recently used entries (by file mtime) are evicted
+once the cache exceeds its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """Disk-backed LRU cache of (text, confidence, quality flags) OCR results"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or os.environ.get(
+            'OCR_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ocr_result_cache')
+        )
+        self.max_bytes = max_bytes or int(os.environ.get('OCR_CACHE_MAX_MB', 512)) * 1024 * 1024
+        self.enabled = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() != 'false'
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Measured on first write
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'errors': 0}
+
+    @staticmethod
+    def make_key(binary_content: bytes, tesseract_config: str, preprocessing_version: str) -> str:
+        """Cache key for content processed with a given Tesseract config and preprocessing pipeline"""
+        content_hash = hashlib.sha256(binary_content).hexdigest()
+        return hashlib.sha256(
+            f"{content_hash}\0{tesseract_config}\0{preprocessing_version}".encode('utf-8')
+        ).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached {'text', 'confidence', 'quality_flags'} for a key, or None"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+            # Touch to mark the entry as recently used
+            os.utime(path, None)
+            self.stats['hits'] += 1
+            return entry
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        except (OSError, ValueError) as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Unreadable OCR cache entry {key[:12]}, ignoring: {e}")
+            return None
+
+    def put(self, key: str, text: str, confidence: float, quality_flags: List[str]):
+        """Store an OCR result, evicting least recently used entries past the size limit"""
+        if not self.enabled:
+            return
+
+        payload = json.dumps({
+            'text': text,
+            'confidence': confidence,
+            'quality_flags': quality_flags,
+            'cached_at': time.time(),
+        }).encode('utf-8')
+
+        path = self._path(key)
+        try:
+            # Extracted text is PHI: keep the cache readable by this user only
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(payload)
+            os.replace(temp_path, path)
+            self.stats['writes'] += 1
+        except OSError as e:
+            self.stats['errors'] += 1
+            logger.warning(f"Could not write OCR cache entry {key[:12]}: {e}")
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._measure()
+            else:
+                self._total_bytes += len(payload)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> List[os.DirEntry]:
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                entries.extend(entry for entry in os.scandir(shard.path) if entry.name.endswith('.json'))
+        return entries
+
+    def _measure(self) -> int:
+        total = 0
+        for entry in self._entries():
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _evict(self):
+        """Remove least recently used entries until the cache is at 90% of its limit"""
+        target = int(self.max_bytes * 0.9)
+        files = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                pass
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                self.stats['evictions'] += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        self._total_bytes = total
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            for entry in self._entries():
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] / lookups * 100) if lookups else 0.0
+        stats['size_bytes'] = self._total_bytes if self._total_bytes is not None else self._measure()
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+# Global instance
+ocr_result_cache = OCRResultCache()
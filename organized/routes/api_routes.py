@@ -86,8 +86,11 @@ def api_patients():
             return jsonify({"error": 'order must be either "asc" or "desc"'}), 400
 
         # Use shared search function
-        pagination = search_patients(
-            search_term, page, per_page, sort_field, sort_order
+        results = search_patients(search_term, page, per_page, sort_field, sort_order)
+        pages = (
+            (results.total + per_page - 1) // per_page
+            if results.total is not None
+            else None
         )
 
         # Serialize patients with minimal fields for list view
@@ -110,7 +113,7 @@ def api_patients():
                     else None
                 ),  # Date only, not full timestamp
             }
-            for patient in pagination.items
+            for patient in results.patients
         ]
 
         return (
@@ -118,14 +121,14 @@ def api_patients():
                 {
                     "patients": patients_data,
                     "pagination": {
-                        "page": pagination.page,
-                        "per_page": pagination.per_page,
-                        "total": pagination.total,
-                        "pages": pagination.pages,
-                        "has_next": pagination.has_next,
-                        "has_prev": pagination.has_prev,
-                        "next_num": pagination.next_num,
-                        "prev_num": pagination.prev_num,
+                        "page": page,
+                        "per_page": per_page,
+                        "total": results.total,
+                        "pages": pages,
+                        "has_next": results.next_cursor is not None,
+                        "has_prev": page > 1,
+                        "next_num": page + 1 if results.next_cursor else None,
+                        "prev_num": page - 1 if page > 1 else None,
                     },
                     "search": search_term,
                     "sort": {"field": sort_field, "order": sort_order},
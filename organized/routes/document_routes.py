@@ -171,7 +171,7 @@ def document_image(document_id):
     """Serve document image for preview"""
     document = MedicalDocument.query.get_or_404(document_id)
     
-    if not document.binary_content:
+    if not document.has_binary_content:
         return jsonify({"error": "No image content available"}), 404
     
     # Log document preview access
@@ -147,7 +147,7 @@ class PatientService:
             # Delete associated records first (due to foreign key constraints)
             Condition.query.filter_by(patient_id=patient_id).delete()
             Vital.query.filter_by(patient_id=patient_id).delete()
-            MedicalDocument.query.filter_by(patient_id=patient_id).delete()
+            MedicalDocument.delete_for_patient(patient_id)
             Immunization.query.filter_by(patient_id=patient_id).delete()
             PatientAlert.query.filter_by(patient_id=patient_id).delete()
             Screening.query.filter_by(patient_id=patient_id).delete()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Patient Chart Loader
+Compact, cached read-model of a patient chart (demographics, alerts, vitals, labs, conditions,
+visits, screenings, immunizations, appointments and document metadata) for the patient detail
+page and /api/patients/<id>.
+
+On PostgreSQL a cache miss loads every section in one JSON-aggregated query; other databases run
+one query per section. Snapshots are cached under the patient's chart_version (bumped in the same
+transaction as any ORM write to the patient or a chart section) and the screening rule set version,
+so a request costs one primary-key lookup plus a cache read, and no write can serve a stale chart.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app import db
+from cache_manager import cache_manager
+from models import (
+    Appointment, Condition, Immunization, LabResult, MedicalDocument, Patient, PatientAlert,
+    Screening, ScreeningRuleVersion, ScreeningType, Visit, Vital,
+)
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_TIMEOUT = 600
+
+# Document type -> chart tab (legacy and current type names)
+DOCUMENT_CATEGORIES = {
+    "LAB_REPORT": "lab", "LABORATORIES": "lab",
+    "RADIOLOGY_REPORT": "imaging", "IMAGING": "imaging",
+    "CONSULTATION": "consult", "CONSULTS": "consult",
+    "DISCHARGE_SUMMARY": "hospital", "HOSPITAL_RECORDS": "hospital",
+}
+
+
+@dataclass(frozen=True)
+class ChartSection:
+    """Columns, filters and order of one chart section"""
+
+    model: type
+    columns: Tuple[str, ...]
+    order_by: tuple
+    filters: tuple = ()
+    join: Optional[tuple] = None
+    limit: Optional[int] = None
+
+    def statement(self, patient_id: int):
+        stmt = select(*[getattr(self.model, name) for name in self.columns])
+        if self.join is not None:
+            stmt = stmt.join(*self.join)
+        stmt = stmt.where(self.model.patient_id == patient_id, *self.filters).order_by(*self.order_by)
+        if self.limit:
+            stmt = stmt.limit(self.limit)
+        return stmt
+
+    def field_types(self) -> Dict[str, type]:
+        """Column -> date/datetime/time for the columns that need parsing from cached ISO text"""
+        types = {}
+        for name in self.columns:
+            try:
+                python_type = getattr(self.model, name).type.python_type
+            except NotImplementedError:
+                continue
+            if python_type in (date, datetime, time):
+                types[name] = python_type
+        return types
+
+
+PATIENT_COLUMNS = (
+    "id", "first_name", "last_name", "date_of_birth", "sex", "mrn", "phone", "email",
+    "address", "insurance", "created_at", "updated_at",
+)
+
+CHART_SECTIONS = {
+    "alerts": ChartSection(
+        PatientAlert,
+        ("id", "alert_type", "description", "details", "start_date", "end_date", "is_active", "severity"),
+        (PatientAlert.id,),
+    ),
+    "vitals": ChartSection(
+        Vital,
+        ("id", "date", "weight", "height", "bmi", "temperature", "blood_pressure_systolic",
+         "blood_pressure_diastolic", "pulse", "respiratory_rate", "oxygen_saturation"),
+        (Vital.date.desc(), Vital.id.desc()),
+    ),
+    "labs": ChartSection(
+        LabResult,
+        ("id", "test_name", "test_date", "result_value", "unit", "reference_range", "is_abnormal"),
+        (LabResult.test_date.desc(), LabResult.id.desc()),
+        limit=5,
+    ),
+    "conditions": ChartSection(
+        Condition,
+        ("id", "name", "code", "diagnosed_date", "is_active"),
+        (Condition.id,),
+        filters=(Condition.is_active == True,),
+    ),
+    "visits": ChartSection(
+        Visit,
+        ("id", "visit_date", "visit_type", "provider", "reason"),
+        (Visit.visit_date.desc(), Visit.id.desc()),
+    ),
+    "screenings": ChartSection(
+        Screening,
+        ("id", "screening_type", "due_date", "last_completed", "frequency", "status", "notes"),
+        (Screening.due_date, Screening.id),
+        filters=(ScreeningType.is_active == True,),
+        join=(ScreeningType, Screening.screening_type == ScreeningType.name),
+    ),
+    "immunizations": ChartSection(
+        Immunization,
+        ("id", "vaccine_name", "administration_date", "dose_number", "manufacturer"),
+        (Immunization.administration_date.desc(), Immunization.id.desc()),
+    ),
+    "appointments": ChartSection(
+        Appointment,
+        ("id", "appointment_date", "appointment_time", "note", "status"),
+        (Appointment.appointment_date, Appointment.appointment_time, Appointment.id),
+    ),
+    "documents": ChartSection(
+        MedicalDocument,
+        ("id", "document_name", "document_type", "document_date", "source_system", "filename"),
+        (MedicalDocument.document_date.desc(), MedicalDocument.id.desc()),
+    ),
+}
+
+
+class ChartPatient(SimpleNamespace):
+    """Patient demographics with the computed attributes templates use"""
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+    @property
+    def age(self) -> int:
+        today = datetime.now().date()
+        born = self.date_of_birth
+        return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+
+@dataclass
+class PatientChart:
+    """Read-model of one patient's chart; time-dependent splits are computed per request"""
+
+    patient: ChartPatient
+    version: str
+    alerts: List[SimpleNamespace] = field(default_factory=list)
+    vitals: List[SimpleNamespace] = field(default_factory=list)
+    labs: List[SimpleNamespace] = field(default_factory=list)
+    conditions: List[SimpleNamespace] = field(default_factory=list)
+    visits: List[SimpleNamespace] = field(default_factory=list)
+    screenings: List[SimpleNamespace] = field(default_factory=list)
+    immunizations: List[SimpleNamespace] = field(default_factory=list)
+    appointments: List[SimpleNamespace] = field(default_factory=list)
+    documents: List[SimpleNamespace] = field(default_factory=list)
+
+    @property
+    def recent_vitals(self) -> Optional[SimpleNamespace]:
+        return self.vitals[0] if self.vitals else None
+
+    def upcoming_visit(self, now: Optional[datetime] = None) -> Optional[SimpleNamespace]:
+        now = now or datetime.now()
+        upcoming = [visit for visit in self.visits if visit.visit_date and visit.visit_date > now]
+        return min(upcoming, key=lambda visit: visit.visit_date) if upcoming else None
+
+    def split_appointments(self, now: Optional[datetime] = None) -> Tuple[List, List]:
+        """(past most recent first, upcoming soonest first)"""
+        now = now or datetime.now()
+        today, current_time = now.date(), now.time()
+        past, upcoming = [], []
+        for appointment in self.appointments:
+            appointment_time = appointment.appointment_time or time.min
+            if appointment.appointment_date < today or (
+                appointment.appointment_date == today and appointment_time < current_time
+            ):
+                past.append(appointment)
+            else:
+                upcoming.append(appointment)
+        past.reverse()
+        return past, upcoming
+
+    def documents_by_category(self) -> Dict[str, List[SimpleNamespace]]:
+        """Documents grouped into lab, imaging, consult, hospital and other in one pass"""
+        groups = {"lab": [], "imaging": [], "consult": [], "hospital": [], "other": []}
+        for document in self.documents:
+            groups[DOCUMENT_CATEGORIES.get(document.document_type, "other")].append(document)
+        return groups
+
+
+def _to_json_value(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def _parse_row(row: Dict, types: Dict[str, type]) -> Dict:
+    for name, python_type in types.items():
+        value = row.get(name)
+        if isinstance(value, str):
+            if python_type is datetime:
+                row[name] = datetime.fromisoformat(value)
+            elif python_type is date:
+                row[name] = date.fromisoformat(value[:10])
+            else:
+                row[name] = time.fromisoformat(value)
+    return row
+
+
+_SECTION_TYPES = {name: section.field_types() for name, section in CHART_SECTIONS.items()}
+_PATIENT_TYPES = ChartSection(Patient, PATIENT_COLUMNS, ()).field_types()
+
+
+def _patient_statement(patient_id: int):
+    return select(*[getattr(Patient, name) for name in PATIENT_COLUMNS]).where(Patient.id == patient_id)
+
+
+class PatientChartLoader:
+    """Loads PatientChart read-models, cached per patient chart version"""
+
+    def __init__(self, cache_timeout: int = CHART_CACHE_TIMEOUT):
+        self.cache_timeout = cache_timeout
+
+    def get_chart(self, patient_id: int) -> Optional[PatientChart]:
+        """Chart for a patient, or None if the patient does not exist"""
+        version = self._current_version(patient_id)
+        if version is None:
+            return None
+
+        cache_key = f"patient_chart_{patient_id}_{version}"
+        snapshot = cache_manager.get(cache_key)
+        if snapshot is None:
+            snapshot = self._load_snapshot(patient_id)
+            if snapshot is None:
+                return None
+            cache_manager.set(cache_key, snapshot, self.cache_timeout)
+        return self._hydrate(snapshot, version)
+
+    @staticmethod
+    def _current_version(patient_id: int) -> Optional[str]:
+        """Patient chart version and screening rule set version, in one primary-key lookup"""
+        rule_version = (
+            select(ScreeningRuleVersion.version).where(ScreeningRuleVersion.id == 1).scalar_subquery()
+        )
+        row = db.session.execute(
+            select(Patient.chart_version, rule_version).where(Patient.id == patient_id)
+        ).first()
+        if row is None:
+            return None
+        return f"v{row[0] or 0}.r{row[1] or 0}"
+
+    def _load_snapshot(self, patient_id: int) -> Optional[Dict]:
+        if db.engine.dialect.name == "postgresql":
+            return self._load_snapshot_aggregated(patient_id)
+
+        patient_row = db.session.execute(_patient_statement(patient_id)).first()
+        if patient_row is None:
+            return None
+        snapshot = {"patient": {k: _to_json_value(v) for k, v in patient_row._mapping.items()}}
+        for name, section in CHART_SECTIONS.items():
+            rows = db.session.execute(section.statement(patient_id)).all()
+            snapshot[name] = [{k: _to_json_value(v) for k, v in row._mapping.items()} for row in rows]
+        return snapshot
+
+    @staticmethod
+    def _aggregate(name: str, section: ChartSection, patient_id: int):
+        """json_agg of a section's rows in section order, '[]' when empty"""
+        position = func.row_number().over(order_by=section.order_by).label("_position")
+        rows = section.statement(patient_id).add_columns(position).subquery(name)
+        return (
+            select(func.coalesce(
+                func.json_agg(aggregate_order_by(rows.table_valued(), rows.c._position)),
+                literal_column("'[]'::json"),
+            ))
+            .scalar_subquery()
+            .label(name)
+        )
+
+    def _load_snapshot_aggregated(self, patient_id: int) -> Optional[Dict]:
+        """Every section in one round trip"""
+        patient_row = _patient_statement(patient_id).subquery("chart_patient")
+        patient = select(func.row_to_json(patient_row.table_valued())).scalar_subquery().label("patient")
+        sections = [self._aggregate(name, section, patient_id) for name, section in CHART_SECTIONS.items()]
+        row = db.session.execute(select(patient, *sections)).one()
+        if row.patient is None:
+            return None
+
+        snapshot = {"patient": row.patient}
+        for name in CHART_SECTIONS:
+            snapshot[name] = [
+                {k: v for k, v in item.items() if k != "_position"} for item in getattr(row, name)
+            ]
+        return snapshot
+
+    @staticmethod
+    def _hydrate(snapshot: Dict, version: str) -> PatientChart:
+        patient = ChartPatient(**_parse_row(dict(snapshot["patient"]), _PATIENT_TYPES))
+        sections = {
+            name: [SimpleNamespace(**_parse_row(dict(row), _SECTION_TYPES[name])) for row in snapshot.get(name, [])]
+            for name in CHART_SECTIONS
+        }
+        patient.alerts = sections["alerts"]
+        return PatientChart(patient=patient, version=version, **sections)
+
+
+# Global instance
+patient_chart_loader = PatientChartLoader()
+
+
+def get_patient_chart(patient_id: int) -> Optional[PatientChart]:
+    """Cached chart read-model for a patient"""
+    return patient_chart_loader.get_chart(patient_id)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Patient Search
+Indexed patient search shared by the web patient list, /api/patients and FHIR Patient search.
+
+Every patient carries a normalized search_text (first name, last name, MRN and email words,
+lowercased with accents stripped) that is maintained on write. Query words of three or more
+characters match anywhere in search_text through the pg_trgm GIN index on PostgreSQL (trigram
+rows in patient_search_gram elsewhere); shorter words must prefix a patient word and use the
+word rows. Results are ranked (phrase, leading match, word prefixes, substring) and paged with
+keyset cursors, so each page is an index range scan whatever the roster size.
+"""
+
+import base64
+import json
+import logging
+import re
+import unicodedata
+from datetime import date
+from typing import Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, literal, select, tuple_
+
+from app import db
+from models import Patient, PatientSearchGram
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+# Query words at least this long are matched as substrings, shorter ones as word prefixes
+MIN_SUBSTRING_LENGTH = 3
+MAX_QUERY_WORDS = 8
+MAX_GRAM_LENGTH = 64
+# Upper bound for prefix range scans: sorts after every [a-z0-9] character
+_PREFIX_END = '{'
+
+# Keyset columns per sort (the id is the unique tiebreaker)
+SORT_COLUMNS = {
+    'last_name': (Patient.last_name, Patient.first_name, Patient.id),
+    'first_name': (Patient.first_name, Patient.last_name, Patient.id),
+    'mrn': (Patient.mrn, Patient.id),
+    'dob': (Patient.date_of_birth, Patient.id),
+    'created_at': (Patient.id,),  # Ids are assigned in creation order
+}
+SORT_FIELDS = ('relevance',) + tuple(SORT_COLUMNS) + ('name', 'age')
+
+
+class PatientSearchPage(NamedTuple):
+    patients: List[Patient]
+    next_cursor: Optional[str]
+    total: Optional[int] = None
+
+
+def normalize_search_words(*values) -> List[str]:
+    """Lowercased, accent-stripped alphanumeric words of the given values"""
+    words = []
+    for value in values:
+        if value:
+            text = unicodedata.normalize('NFKD', str(value))
+            text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+            words.extend(_WORD.findall(text))
+    return words
+
+
+def build_search_text(first_name, last_name, mrn, email) -> str:
+    return ' '.join(normalize_search_words(first_name, last_name, mrn, email))[:512]
+
+
+def search_grams(search_text: str, include_trigrams: bool) -> Set[Tuple[str, str]]:
+    """(kind, gram) postings of a search_text: words, plus in-word trigrams if requested"""
+    grams = set()
+    for word in (search_text or '').split():
+        grams.add(('w', word[:MAX_GRAM_LENGTH]))
+        if include_trigrams:
+            grams.update(('t', word[i:i + 3]) for i in range(len(word) - 2))
+    return grams
+
+
+def write_search_grams(connection, patient_id: int, search_text: Optional[str]):
+    """Replace a patient's postings on the flushing connection"""
+    table = PatientSearchGram.__table__
+    connection.execute(table.delete().where(table.c.patient_id == patient_id))
+    grams = search_grams(search_text, include_trigrams=connection.dialect.name != 'postgresql')
+    if grams:
+        connection.execute(table.insert(), [
+            {'kind': kind, 'gram': gram, 'patient_id': patient_id} for kind, gram in grams
+        ])
+
+
+def _is_postgresql() -> bool:
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _word_filter(word: str):
+    """Filter for one query word (index-backed on every database)"""
+    grams = PatientSearchGram
+    if len(word) < MIN_SUBSTRING_LENGTH:
+        return Patient.id.in_(
+            select(grams.patient_id).where(
+                grams.kind == 'w', grams.gram >= word, grams.gram < word + _PREFIX_END
+            )
+        )
+
+    contains = Patient.search_text.like(f'%{word}%')
+    if _is_postgresql():
+        return contains  # ix_patient_search_text_trgm
+
+    trigrams = {word[i:i + 3] for i in range(len(word) - 2)}
+    candidates = (
+        select(grams.patient_id)
+        .where(grams.kind == 't', grams.gram.in_(trigrams))
+        .group_by(grams.patient_id)
+        .having(func.count() == len(trigrams))
+    )
+    return and_(Patient.id.in_(candidates), contains)
+
+
+def _relevance(words: List[str]):
+    """0 whole phrase, 1 search_text starts with the query, 2 every word prefixes a word, 3 substring"""
+    phrase = ' '.join(words)
+    spaced = literal(' ') + Patient.search_text
+    return case(
+        ((spaced + literal(' ')).like(f'% {phrase} %'), 0),
+        (Patient.search_text.like(f'{phrase}%'), 1),
+        (and_(*[spaced.like(f'% {word}%') for word in words]), 2),
+        else_=3,
+    )
+
+
+def encode_search_cursor(sort: str, order: str, key: Iterable) -> str:
+    values = [value.isoformat() if isinstance(value, date) else value for value in key]
+    raw = json.dumps({'s': sort, 'o': order, 'k': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_search_cursor(cursor: str, sort: str, order: str) -> list:
+    """Keyset values of a cursor; ValueError if it is malformed or from another sort"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = list(data['k'])
+        if data['s'] != sort or data['o'] != order:
+            raise ValueError
+        if sort == 'dob':
+            values[0] = date.fromisoformat(values[0])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
+
+
+def search_patients(term: str = '', limit: int = 20, sort: Optional[str] = None, order: str = 'asc',
+                    cursor: Optional[str] = None, offset: int = 0, query=None,
+                    with_total: bool = False) -> PatientSearchPage:
+    """
+    One page of patients matching term (every word must match), in keyset order
+
+    Args:
+        term: Free-text query over name, MRN and email
+        limit: Page size
+        sort: relevance (default with a term), last_name (default without), first_name/name,
+              mrn, dob, age (dob reversed) or created_at
+        order: asc or desc (relevance is always best first)
+        cursor: next_cursor of the previous page
+        offset: Rows to skip when no cursor is given (legacy page-number clients)
+        query: Base Patient query carrying extra filters
+        with_total: Also count all matches
+
+    Raises:
+        ValueError: Unknown sort or invalid cursor
+    """
+    words = normalize_search_words(term)[:MAX_QUERY_WORDS]
+    query = query if query is not None else Patient.query
+    if words:
+        query = query.filter(*[_word_filter(word) for word in words])
+
+    if sort == 'name':
+        sort = 'first_name'
+    elif sort == 'age':
+        sort, order = 'dob', 'asc' if order == 'desc' else 'desc'
+    sort = sort or ('relevance' if words else 'last_name')
+    if sort == 'relevance' and not words:
+        sort = 'last_name'
+
+    if sort == 'relevance':
+        columns = (_relevance(words), Patient.last_name, Patient.first_name, Patient.id)
+        order = 'asc'
+    elif sort in SORT_COLUMNS:
+        columns = SORT_COLUMNS[sort]
+    else:
+        raise ValueError(f"Unknown sort field: {sort}")
+    descending = order == 'desc'
+
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        position = tuple_(*columns)
+        after = tuple_(*[literal(value) for value in decode_search_cursor(cursor, sort, order)])
+        query = query.filter(position < after if descending else position > after)
+        offset = 0
+
+    rows = (
+        query.add_columns(*columns)
+        .order_by(*[column.desc() if descending else column.asc() for column in columns])
+        .offset(offset)
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = encode_search_cursor(sort, order, rows[limit - 1][1:]) if len(rows) > limit else None
+    return PatientSearchPage([row[0] for row in rows[:limit]], next_cursor, total)
+
+
+def reindex_patient_search(batch_size: int = 1000, only_missing: bool = True) -> int:
+    """Rebuild search_text and postings (patients written before the column existed)"""
+    reindexed = 0
+    last_id = 0
+    while True:
+        query = Patient.query.filter(Patient.id > last_id)
+        if only_missing:
+            query = query.filter(Patient.search_text.is_(None))
+        patients = query.order_by(Patient.id).limit(batch_size).all()
+        if not patients:
+            return reindexed
+
+        connection = db.session.connection()
+        for patient in patients:
+            search_text = build_search_text(patient.first_name, patient.last_name, patient.mrn, patient.email)
+            connection.execute(
+                Patient.__table__.update().where(Patient.__table__.c.id == patient.id).values(search_text=search_text)
+            )
+            write_search_grams(connection, patient.id, search_text)
+        db.session.commit()
+        reindexed += len(patients)
+        last_id = patients[-1].id
+        logger.info(f"Reindexed patient search for {reindexed} patients")
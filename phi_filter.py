@@ -5,7 +5,7 @@ Removes or redacts sensitive patient information while preserving medical termin
 
 import re
 import logging
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Set, Union
 from datetime import datetime, date
 import json
 
@@ -36,6 +36,11 @@ class PHIFilterConfig:
         # Global PHI filtering control
         self.phi_filtering_enabled = True
 
+        # Streaming filter windows: each scan covers chunk size + overlap characters, and the
+        # overlap must exceed the longest PHI match so matches never straddle a window unseen
+        self.stream_chunk_size = 64 * 1024
+        self.stream_overlap = 1024
+
         # Medical terms to preserve (never filter these)
         self.medical_terms_whitelist = {
             'glucose', 'cholesterol', 'blood pressure', 'hemoglobin', 'a1c', 'hba1c',
@@ -47,6 +52,126 @@ class PHIFilterConfig:
         }
 
 
+def _is_word_char(char: str) -> bool:
+    """Match the regex \\w definition used for word boundaries"""
+    return char.isalnum() or char == '_'
+
+
+class RosteredNameIndex:
+    """
+    Word-level trie over rostered patient names for single-pass, case-insensitive,
+    word-boundary-aware matching.
+
+    Names are keyed by their first word; the text is scanned once, token by token, and only names
+    sharing the token's first word are compared. Names that do not start and end with a word
+    character (where \\b means something different) fall back to individual regexes.
+    """
+
+    MIN_NAME_LENGTH = 3
+
+    def __init__(self):
+        self.names: Set[str] = set()
+        self._by_first_word: Dict[str, Dict[str, List[str]]] = {}  # first word -> lowered name -> names
+        self._irregular: Dict[str, re.Pattern] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _lower(text: str) -> str:
+        """Lowercase without changing string length, so offsets stay valid"""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        return ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+    @staticmethod
+    def _first_word(lowered_name: str) -> str:
+        end = 0
+        while end < len(lowered_name) and _is_word_char(lowered_name[end]):
+            end += 1
+        return lowered_name[:end]
+
+    def sync(self, names: Set[str]):
+        """Incrementally apply the difference between the indexed names and a new roster"""
+        for name in self.names - names:
+            self.remove(name)
+        for name in names - self.names:
+            self.add(name)
+
+    def add(self, name: str):
+        if name in self.names:
+            return
+        self.names.add(name)
+        if len(name.strip()) < self.MIN_NAME_LENGTH:
+            return
+
+        if not (_is_word_char(name[0]) and _is_word_char(name[-1])):
+            self._irregular[name] = re.compile(r'\b' + re.escape(name) + r'\b', re.IGNORECASE)
+            return
+
+        lowered = self._lower(name)
+        candidates = self._by_first_word.setdefault(self._first_word(lowered), {})
+        candidates.setdefault(lowered, []).append(name)
+
+    def remove(self, name: str):
+        if name not in self.names:
+            return
+        self.names.discard(name)
+        if self._irregular.pop(name, None) is not None:
+            return
+
+        lowered = self._lower(name)
+        first_word = self._first_word(lowered)
+        candidates = self._by_first_word.get(first_word, {})
+        originals = candidates.get(lowered, [])
+        if name in originals:
+            originals.remove(name)
+        if not originals:
+            candidates.pop(lowered, None)
+        if not candidates:
+            self._by_first_word.pop(first_word, None)
+
+    def find(self, text: str) -> List[Tuple[str, int, int]]:
+        """(rostered name, start, end) for every whole-word occurrence of every name"""
+        matches = []
+        lowered_text = self._lower(text)
+        length = len(text)
+        last_end = {}  # Like re.finditer, occurrences of one name do not overlap
+
+        position = 0
+        while position < length:
+            if not _is_word_char(lowered_text[position]):
+                position += 1
+                continue
+
+            token_end = position
+            while token_end < length and _is_word_char(lowered_text[token_end]):
+                token_end += 1
+
+            candidates = self._by_first_word.get(lowered_text[position:token_end])
+            if candidates:
+                for lowered_name, originals in candidates.items():
+                    end = position + len(lowered_name)
+                    if end < length and _is_word_char(lowered_text[end]):
+                        continue
+                    if not lowered_text.startswith(lowered_name, position):
+                        continue
+                    if last_end.get(lowered_name, 0) > position:
+                        continue
+                    last_end[lowered_name] = end
+                    for name in originals:
+                        matches.append((name, position, end))
+
+            position = token_end
+
+        for name, pattern in self._irregular.items():
+            for match in pattern.finditer(text):
+                matches.append((name, match.start(), match.end()))
+
+        return matches
+
+
 class PHIPatternDetector:
     """Detects various PHI patterns in text"""
 
@@ -55,6 +180,8 @@ class PHIPatternDetector:
         self._compile_patterns()
         self._patient_names_cache = None
         self._cache_timestamp = None
+        self._rostered_name_index = RosteredNameIndex()
+        self._indexed_names = None  # Name set the index was last synced to
 
     def _compile_patterns(self):
         """Compile regex patterns for efficient matching"""
@@ -169,9 +296,11 @@ class PHIPatternDetector:
                     if patient.first_name and patient.last_name:
                         patient_names.add(f"{patient.first_name.strip()} {patient.last_name.strip()}")
             
-            # Cache the results
+            # Cache the results and bring the name index up to date
             self._patient_names_cache = patient_names
             self._cache_timestamp = current_time
+            self._rostered_name_index.sync(patient_names)
+            self._indexed_names = patient_names
             
             logger.debug(f"Cached {len(patient_names)} patient names for PHI detection")
             return patient_names
@@ -189,35 +318,32 @@ class PHIPatternDetector:
         if not patient_names:
             return detections
         
-        # Sort by length (longest first) to avoid partial matches
-        sorted_names = sorted(patient_names, key=len, reverse=True)
+        # Sync the index if the cache was populated without it (e.g. assigned directly)
+        if patient_names is not self._indexed_names:
+            self._rostered_name_index.sync(patient_names)
+            self._indexed_names = patient_names
         
-        for name in sorted_names:
-            if len(name.strip()) < 3:  # Skip very short names
+        # Longest names first, then by position
+        matches = sorted(self._rostered_name_index.find(text), key=lambda m: (-len(m[0]), m[1]))
+        
+        for name, start, end in matches:
+            # Additional context check to ensure this is actually a name reference
+            context_start = max(0, start - 20)
+            context_end = min(len(text), end + 20)
+            context = text[context_start:context_end].lower()
+            
+            # Skip if this appears to be part of a medical term
+            if any(med_term in context for med_term in ['panel', 'test', 'screening', 'examination']):
                 continue
-                
-            # Create a regex pattern for this name (case-insensitive, word boundaries)
-            escaped_name = re.escape(name)
-            pattern = re.compile(r'\b' + escaped_name + r'\b', re.IGNORECASE)
             
-            for match in pattern.finditer(text):
-                # Additional context check to ensure this is actually a name reference
-                context_start = max(0, match.start() - 20)
-                context_end = min(len(text), match.end() + 20)
-                context = text[context_start:context_end].lower()
-                
-                # Skip if this appears to be part of a medical term
-                if any(med_term in context for med_term in ['panel', 'test', 'screening', 'examination']):
-                    continue
-                
-                detections.append({
-                    'type': 'rostered_patient_name',
-                    'text': match.group(),
-                    'start': match.start(),
-                    'end': match.end(),
-                    'replacement': self.config.name_token,
-                    'patient_name': name
-                })
+            detections.append({
+                'type': 'rostered_patient_name',
+                'text': text[start:end],
+                'start': start,
+                'end': end,
+                'replacement': self.config.name_token,
+                'patient_name': name
+            })
         
         return detections
 
@@ -407,37 +533,22 @@ class PHIPatternDetector:
         """Direct string-based SSN detection as workaround for regex engine issues"""
         detections = []
         
-        # Look for XXX-XX-XXXX patterns where X is a digit
-        import re
-        
-        # Use a more robust approach - find all digit sequences separated by hyphens
-        potential_ssns = []
-        
-        # Split text into words and check each for SSN pattern  
-        words = text.split()
-        for word in words:
-            # Check for both 10 and 11 character SSN patterns
+        # Check every 10 and 11 character span inside each whitespace-delimited word, at its
+        # actual position, so repeated SSNs are all found (and windows of a stream agree)
+        potential_ssns = set()
+        position = 0
+        for word in text.split():
+            word_start = text.find(word, position)
+            position = word_start + len(word)
             for length in [10, 11]:
-                if len(word) >= length:
-                    for i in range(len(word) - length + 1):
-                        candidate = word[i:i+length]
-                        if self._is_ssn_pattern(candidate):
-                            potential_ssns.append((candidate, text.find(candidate)))
-        
-        # Also check for patterns that might span multiple "words" due to OCR
-        lines = text.split('\n')
-        for line in lines:
-            if ':' in line:  # Common in "Name: [NAME]: 100-20-100" patterns
-                parts = line.split(':')
-                for part in parts:
-                    part = part.strip()
-                    if self._is_ssn_pattern(part):
-                        potential_ssns.append((part, text.find(part)))
+                for i in range(len(word) - length + 1):
+                    candidate = word[i:i+length]
+                    if self._is_ssn_pattern(candidate):
+                        potential_ssns.add((candidate, word_start + i))
         
-        # Process found SSNs - remove duplicates first
-        unique_ssns = list(set(potential_ssns))
-        for ssn_text, start_pos in unique_ssns:
-            if start_pos >= 0 and not self._is_medical_value(ssn_text):
+        # Process found SSNs
+        for ssn_text, start_pos in sorted(potential_ssns, key=lambda x: (x[1], -len(x[0]))):
+            if not self._is_medical_value(ssn_text):
                 logger.debug(f"SSN detected: '{ssn_text}' at position {start_pos}")
                 detections.append({
                     'type': 'ssn',
@@ -560,39 +671,13 @@ class PHIFilter:
                 'filter_applied': False
             }
 
-        # Remove overlapping detections (keep the most specific one)
-        non_overlapping_detections = []
-        sorted_detections = sorted(phi_detections, key=lambda x: (x['start'], -x['end']))
-
-        for detection in sorted_detections:
-            # Check if this detection overlaps with any existing ones
-            is_overlapping = False
-            for existing in non_overlapping_detections:
-                if (detection['start'] < existing['end'] and detection['end'] > existing['start']):
-                    is_overlapping = True
-                    break
-
-            if not is_overlapping:
-                non_overlapping_detections.append(detection)
-
-        # Apply redactions (work backwards to maintain positions)
-        filtered_text = text
-        for detection in reversed(sorted(non_overlapping_detections, key=lambda x: x['start'])):
-            filtered_text = (
-                filtered_text[:detection['start']] +
-                detection['replacement'] +
-                filtered_text[detection['end']:]
-            )
+        # Remove overlapping detections (keep the most specific one) and apply redactions
+        non_overlapping_detections = self._resolve_overlaps(phi_detections)
+        filtered_text = self._redact(text, non_overlapping_detections, 0, len(text))
 
         # Update statistics
         self.filter_stats['documents_processed'] += 1
-        self.filter_stats['phi_instances_found'] += len(phi_detections)
-        self.filter_stats['phi_instances_redacted'] += len(phi_detections)
-
-        for detection in phi_detections:
-            phi_type = detection['type']
-            self.filter_stats['phi_types_detected'][phi_type] = \
-                self.filter_stats['phi_types_detected'].get(phi_type, 0) + 1
+        self._record_detections(phi_detections)
 
         logger.info(f"PHI Filter: Redacted {len(phi_detections)} PHI instances from text")
 
@@ -605,6 +690,131 @@ class PHIFilter:
             'medical_terms_preserved': preserve_medical_terms
         }
 
+    def filter_text_stream(self, source: Union[str, Iterable[str]], chunk_size: Optional[int] = None,
+                           overlap: Optional[int] = None) -> Iterator[str]:
+        """
+        Filter PHI from large text incrementally, yielding redacted output as it is produced
+
+        Text is scanned in windows of chunk_size + overlap characters, with up to overlap characters
+        of already emitted text as left context for boundary and context checks. Only detections
+        starting in the first chunk_size characters are applied; the rest are rescanned with the next
+        window, so output matches filter_text for PHI matches shorter than the overlap.
+
+        Args:
+            source: Text, or an iterable of text pieces (e.g. OCR pages)
+            chunk_size: Characters committed per window (defaults to config.stream_chunk_size)
+            overlap: Lookahead/lookbehind characters per window (defaults to config.stream_overlap)
+
+        Yields:
+            Redacted text pieces; joined, they form the filtered text
+        """
+        chunk_size = chunk_size or self.config.stream_chunk_size
+        overlap = overlap or self.config.stream_overlap
+        pieces = [source] if isinstance(source, str) else source
+
+        if not self.config.phi_filtering_enabled:
+            for piece in pieces:
+                if piece:
+                    yield piece
+            return
+
+        detection_count = 0
+        context = ""
+        buffer = ""
+        for piece in self._split_pieces(pieces, chunk_size):
+            buffer += piece
+            while len(buffer) >= chunk_size + overlap:
+                output, consumed, found = self._filter_window(context, buffer, chunk_size, overlap)
+                detection_count += found
+                yield output
+                context = (context + buffer[:consumed])[-overlap:]
+                buffer = buffer[consumed:]
+
+        if buffer:
+            output, consumed, found = self._filter_window(context, buffer, None)
+            detection_count += found
+            yield output
+
+        if detection_count:
+            self.filter_stats['documents_processed'] += 1
+            logger.info(f"PHI Filter: Redacted {detection_count} PHI instances from streamed text")
+
+    def _filter_window(self, context: str, buffer: str, chunk_size: Optional[int],
+                       overlap: int = 0) -> Tuple[str, int, int]:
+        """
+        Redact the committed part of one streaming window (the whole buffer when chunk_size is None)
+
+        Returns:
+            (redacted output, buffer characters consumed, detections recorded)
+        """
+        window = context + (buffer if chunk_size is None else buffer[:chunk_size + overlap])
+        offset = len(context)
+
+        if chunk_size is None:
+            boundary = len(window)
+        else:
+            boundary = offset + chunk_size
+            # Prefer ending the committed region on a line break
+            line_break = window.rfind('\n', offset + chunk_size // 2, boundary)
+            if line_break != -1:
+                boundary = line_break + 1
+
+        # Detections starting in the context were decided by the previous window
+        detections = [d for d in self.detector.detect_phi_in_text(window) if d['start'] >= offset]
+
+        committed = []
+        for detection in self._resolve_overlaps(detections):
+            if detection['start'] >= boundary:
+                break
+            committed.append(detection)
+            # A committed detection may run past the boundary; commit through its end
+            boundary = max(boundary, detection['end'])
+
+        recorded = [d for d in detections if d['start'] < boundary]
+        self._record_detections(recorded)
+
+        return self._redact(window, committed, offset, boundary), boundary - offset, len(recorded)
+
+    @staticmethod
+    def _split_pieces(pieces: Iterable[str], size: int) -> Iterator[str]:
+        """Re-slice input pieces so the stream buffer never holds more than a few windows"""
+        for piece in pieces:
+            for start in range(0, len(piece), size):
+                yield piece[start:start + size]
+
+    @staticmethod
+    def _resolve_overlaps(detections: List[Dict]) -> List[Dict]:
+        """Keep the earliest-starting (then longest) detection among overlapping ones"""
+        non_overlapping = []
+        for detection in sorted(detections, key=lambda x: (x['start'], -x['end'])):
+            # Kept detections are sorted and disjoint, so only the last one can overlap
+            if non_overlapping and detection['start'] < non_overlapping[-1]['end']:
+                continue
+            non_overlapping.append(detection)
+        return non_overlapping
+
+    @staticmethod
+    def _redact(text: str, detections: List[Dict], start: int, end: int) -> str:
+        """Build text[start:end] with non-overlapping detections replaced, in one pass"""
+        parts = []
+        position = start
+        for detection in detections:
+            parts.append(text[position:detection['start']])
+            parts.append(detection['replacement'])
+            position = detection['end']
+        parts.append(text[position:end])
+        return ''.join(parts)
+
+    def _record_detections(self, detections: List[Dict]):
+        """Add detections to the found/redacted counters and per-type statistics"""
+        self.filter_stats['phi_instances_found'] += len(detections)
+        self.filter_stats['phi_instances_redacted'] += len(detections)
+
+        for detection in detections:
+            phi_type = detection['type']
+            self.filter_stats['phi_types_detected'][phi_type] = \
+                self.filter_stats['phi_types_detected'].get(phi_type, 0) + 1
+
     def get_filter_statistics(self) -> Dict:
         """Get PHI filtering statistics"""
         return {
@@ -1,86 +1,61 @@
 """
 Utility functions for generating patient prep sheet documents
+
+Documents are opened from a base template (default styles plus the title) that is built once
+per process, then filled section by section. Sections take plain records (ORM objects or
+snapshots), so bulk rendering can run in worker processes without a database session.
 """
 
-import os
 import io
+import time
 from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
+
 from docx import Document
-from docx.shared import Inches, Pt
-from models import (
-    Patient,
-    Condition,
-    Screening,
-    Visit,
-    Vital,
-    LabResult,
-    ImagingStudy,
-    ConsultReport,
-    HospitalSummary,
-    Immunization,
-)
 
 
-def generate_prep_sheet_doc(
-    patient,
-    conditions=None,
-    screenings=None,
-    vitals=None,
-    labs=None,
-    imaging=None,
-    consults=None,
-    hospital=None,
-    immunizations=None,
-    past_appointments=None,
-    last_visit_date=None,
-):
-    """
-    Generate a Word document prep sheet with the patient's information
+@lru_cache(maxsize=1)
+def _base_template():
+    """The parts every prep sheet shares, saved once per process"""
+    doc = Document()
+    doc.add_heading("Patient Preparation Sheet", level=1)
 
-    Args:
-        patient: The patient object
-        conditions: List of condition objects
-        screenings: List of screening objects
-        vitals: List of vital sign objects
-        labs: List of lab result objects
-        imaging: List of imaging study objects
-        consults: List of consult report objects
-        hospital: List of hospital summary objects
-        immunizations: List of immunization objects
-        last_visit_date: Date of the last visit
+    f = io.BytesIO()
+    doc.save(f)
+    return f.getvalue()
 
-    Returns:
-        bytes: The generated Word document as bytes
-    """
-    # Create a new Word document
-    doc = Document()
 
-    # Title
-    doc.add_heading("Patient Preparation Sheet", level=1)
+def init_prep_doc_worker():
+    """Process pool initializer: build the base template before the first job arrives"""
+    _base_template()
+
 
+def _add_header(doc, patient, records):
     # Current date section
-    doc.add_paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y')}")
+    doc.add_paragraph(f"Generated on: {records.generated_on.strftime('%B %d, %Y')}")
     # Past Appointments
-    if past_appointments:
+    if records.past_appointments:
         doc.add_paragraph(
-            f"Last visit: {past_appointments[0].appointment_date.strftime('%m/%d/%Y')}"
+            f"Last visit: {records.past_appointments[0].appointment_date.strftime('%m/%d/%Y')}"
         )
         doc.add_heading("Recent Appointments", level=3)
-        for appointment in past_appointments:
+        for appointment in records.past_appointments:
             status_str = f" ({appointment.status})" if appointment.status else ""
             time_str = (
                 appointment.appointment_time.strftime("%I:%M %p")
                 if appointment.appointment_time
                 else ""
             )
-            notes_str = f" - {appointment.notes}" if appointment.notes else ""
+            notes_str = f" - {appointment.note}" if appointment.note else ""
             doc.add_paragraph(
                 f"• {appointment.appointment_date.strftime('%m/%d/%Y')} {time_str}{status_str}{notes_str}"
             )
-    elif last_visit_date:
-        doc.add_paragraph(f"Last visit: {last_visit_date.strftime('%B %d, %Y')}")
+    elif records.last_visit_date:
+        doc.add_paragraph(f"Last visit: {records.last_visit_date.strftime('%B %d, %Y')}")
 
-    # Patient Information
+
+def _add_patient_information(doc, patient, records):
     doc.add_heading("Patient Information", level=2)
     doc.add_paragraph(f"Name: {patient.full_name}")
     doc.add_paragraph(
@@ -91,10 +66,11 @@ def generate_prep_sheet_doc(
     doc.add_paragraph(f"Contact: {patient.phone} / {patient.email}")
     doc.add_paragraph(f"Insurance: {patient.insurance}")
 
-    # Active Conditions
+
+def _add_conditions(doc, patient, records):
     doc.add_heading("Active Medical Conditions", level=2)
-    if conditions:
-        active_conditions = [c for c in conditions if c.is_active]
+    if records.conditions:
+        active_conditions = [c for c in records.conditions if c.is_active]
         if active_conditions:
             for condition in active_conditions:
                 diagnosed_date = (
@@ -108,10 +84,11 @@ def generate_prep_sheet_doc(
     else:
         doc.add_paragraph("No conditions recorded.")
 
-    # Most Recent Vitals
+
+def _add_vitals(doc, patient, records):
     doc.add_heading("Most Recent Vital Signs", level=2)
-    if vitals and len(vitals) > 0:
-        latest_vital = vitals[0]  # Assuming vitals are sorted with most recent first
+    if records.vitals:
+        latest_vital = records.vitals[0]  # Vitals are sorted with most recent first
         vital_table = doc.add_table(rows=1, cols=2)
         vital_table.style = "Table Grid"
 
@@ -183,7 +160,8 @@ def generate_prep_sheet_doc(
     else:
         doc.add_paragraph("No vital signs recorded.")
 
-    # Screening Checklist
+
+def _add_screenings(doc, patient, records):
     doc.add_heading("Screening Checklist", level=2)
 
     # Define standard screenings based on patient demographics
@@ -195,16 +173,16 @@ def generate_prep_sheet_doc(
     ]
 
     # Add sex-specific or age-specific screenings
-    if patient.sex.lower() == "female":
+    if (patient.sex or "").lower() == "female":
         standard_screenings.extend(["Pap Smear", "Mammogram", "DEXA Scan"])
 
     if patient.age >= 45:
         standard_screenings.append("Colonoscopy")
 
-    if conditions:
+    if records.conditions:
         # Check for diabetes and add related screenings
         has_diabetes = any(
-            "diabetes" in c.name.lower() for c in conditions if c.is_active
+            "diabetes" in c.name.lower() for c in records.conditions if c.is_active
         )
         if has_diabetes:
             standard_screenings.extend(
@@ -226,28 +204,27 @@ def generate_prep_sheet_doc(
         row_cells[0].text = screen_name
 
         # Check if we have this screening in the database
-        if screenings:
-            matching_screenings = [
-                s for s in screenings if s.screening_type.lower() in screen_name.lower()
-            ]
-            if matching_screenings:
-                latest_screening = max(matching_screenings, key=lambda s: s.date)
-                row_cells[1].text = "Completed" if latest_screening.completed else "Due"
-                row_cells[2].text = (
-                    latest_screening.date.strftime("%m/%d/%Y")
-                    if latest_screening.date
-                    else "N/A"
-                )
-            else:
-                row_cells[1].text = "Not documented"
-                row_cells[2].text = "N/A"
+        matching_screenings = [
+            s for s in records.screenings or [] if s.screening_type.lower() in screen_name.lower()
+        ]
+        if matching_screenings:
+            latest_screening = max(
+                matching_screenings, key=lambda s: s.last_completed or datetime.min.date()
+            )
+            row_cells[1].text = latest_screening.status or "Due"
+            row_cells[2].text = (
+                latest_screening.last_completed.strftime("%m/%d/%Y")
+                if latest_screening.last_completed
+                else "N/A"
+            )
         else:
             row_cells[1].text = "Not documented"
             row_cells[2].text = "N/A"
 
-    # Recent Labs
+
+def _add_labs(doc, patient, records):
     doc.add_heading("Recent Laboratory Results", level=2)
-    if labs and len(labs) > 0:
+    if records.labs:
         lab_table = doc.add_table(rows=1, cols=3)
         lab_table.style = "Table Grid"
 
@@ -256,11 +233,11 @@ def generate_prep_sheet_doc(
         hdr_cells[1].text = "Result"
         hdr_cells[2].text = "Date"
 
-        for lab in labs[:5]:  # Limit to 5 most recent labs
+        for lab in records.labs[:5]:  # Limit to 5 most recent labs
             row_cells = lab_table.add_row().cells
             row_cells[0].text = lab.test_name
             row_cells[1].text = (
-                f"{lab.result} {lab.units}" if lab.units else str(lab.result)
+                f"{lab.result_value} {lab.unit}" if lab.unit else str(lab.result_value)
             )
             row_cells[2].text = (
                 lab.test_date.strftime("%m/%d/%Y") if lab.test_date else "N/A"
@@ -268,11 +245,13 @@ def generate_prep_sheet_doc(
     else:
         doc.add_paragraph("No recent laboratory results.")
 
-    # Recent Imaging
+
+def _add_imaging(doc, patient, records):
     doc.add_heading("Recent Imaging Studies", level=2)
-    if imaging and len(imaging) > 0:
-        for study in imaging[:3]:  # Limit to 3 most recent studies
-            p = doc.add_paragraph(f"• {study.study_type}: {study.description}")
+    if records.imaging:
+        for study in records.imaging[:3]:  # Limit to 3 most recent studies
+            body_site = f": {study.body_site}" if study.body_site else ""
+            p = doc.add_paragraph(f"• {study.study_type}{body_site}")
             p.add_run(f" ({study.study_date.strftime('%m/%d/%Y')})")
             if study.findings:
                 doc.add_paragraph(
@@ -285,11 +264,12 @@ def generate_prep_sheet_doc(
     else:
         doc.add_paragraph("No recent imaging studies.")
 
-    # Recent Consults
+
+def _add_consults(doc, patient, records):
     doc.add_heading("Recent Consults/Referrals", level=2)
-    if consults and len(consults) > 0:
-        for consult in consults[:3]:  # Limit to 3 most recent consults
-            p = doc.add_paragraph(f"• {consult.provider}: {consult.specialty}")
+    if records.consults:
+        for consult in records.consults[:3]:  # Limit to 3 most recent consults
+            p = doc.add_paragraph(f"• {consult.specialist or 'Specialist'}: {consult.specialty}")
             p.add_run(f" ({consult.report_date.strftime('%m/%d/%Y')})")
             if consult.reason:
                 doc.add_paragraph(f"  Reason: {consult.reason}", style="List Bullet 2")
@@ -301,11 +281,12 @@ def generate_prep_sheet_doc(
     else:
         doc.add_paragraph("No recent consults/referrals.")
 
-    # Recent Hospital Visits
+
+def _add_hospital_visits(doc, patient, records):
     doc.add_heading("Recent Hospital Visits", level=2)
-    if hospital and len(hospital) > 0:
-        for visit in hospital[:3]:  # Limit to 3 most recent hospital visits
-            p = doc.add_paragraph(f"• {visit.facility}: {visit.visit_type}")
+    if records.hospital:
+        for visit in records.hospital[:3]:  # Limit to 3 most recent hospital visits
+            p = doc.add_paragraph(f"• {visit.hospital_name or 'Hospital'}")
             admission_date = (
                 visit.admission_date.strftime("%m/%d/%Y")
                 if visit.admission_date
@@ -317,20 +298,22 @@ def generate_prep_sheet_doc(
                 else "Unknown"
             )
             p.add_run(f" (Admitted: {admission_date}, Discharged: {discharge_date})")
-            if visit.diagnosis:
+            diagnosis = visit.discharge_diagnosis or visit.admitting_diagnosis
+            if diagnosis:
                 doc.add_paragraph(
-                    f"  Diagnosis: {visit.diagnosis}", style="List Bullet 2"
+                    f"  Diagnosis: {diagnosis}", style="List Bullet 2"
                 )
-            if visit.discharge_summary:
+            if visit.followup_instructions:
                 doc.add_paragraph(
-                    f"  Summary: {visit.discharge_summary}", style="List Bullet 2"
+                    f"  Follow-up: {visit.followup_instructions}", style="List Bullet 2"
                 )
     else:
         doc.add_paragraph("No recent hospital visits.")
 
-    # Immunizations
+
+def _add_immunizations(doc, patient, records):
     doc.add_heading("Immunization History", level=2)
-    if immunizations and len(immunizations) > 0:
+    if records.immunizations:
         immunization_table = doc.add_table(rows=1, cols=3)
         immunization_table.style = "Table Grid"
 
@@ -339,7 +322,7 @@ def generate_prep_sheet_doc(
         hdr_cells[1].text = "Date"
         hdr_cells[2].text = "Manufacturer"
 
-        for immunization in immunizations:
+        for immunization in records.immunizations:
             row_cells = immunization_table.add_row().cells
             row_cells[0].text = immunization.vaccine_name
             row_cells[1].text = (
@@ -351,14 +334,116 @@ def generate_prep_sheet_doc(
     else:
         doc.add_paragraph("No immunization records.")
 
-    # Notes section
+
+def _add_provider_notes(doc, patient, records):
     doc.add_heading("Provider Notes", level=2)
     for _ in range(5):
         doc.add_paragraph("____________________________________________________")
 
+
+# Section name -> builder, in document order
+PREP_DOC_SECTIONS = [
+    ("header", _add_header),
+    ("patient_information", _add_patient_information),
+    ("conditions", _add_conditions),
+    ("vitals", _add_vitals),
+    ("screenings", _add_screenings),
+    ("labs", _add_labs),
+    ("imaging", _add_imaging),
+    ("consults", _add_consults),
+    ("hospital_visits", _add_hospital_visits),
+    ("immunizations", _add_immunizations),
+    ("provider_notes", _add_provider_notes),
+]
+
+
+def generate_prep_sheet_doc(
+    patient,
+    conditions=None,
+    screenings=None,
+    vitals=None,
+    labs=None,
+    imaging=None,
+    consults=None,
+    hospital=None,
+    immunizations=None,
+    past_appointments=None,
+    last_visit_date=None,
+    generated_on=None,
+    timings=None,
+):
+    """
+    Generate a Word document prep sheet with the patient's information
+
+    Args:
+        patient: The patient object (needs full_name and age)
+        conditions: List of condition objects
+        screenings: List of screening objects
+        vitals: List of vital sign objects, most recent first
+        labs: List of lab result objects
+        imaging: List of imaging study objects
+        consults: List of consult report objects
+        hospital: List of hospital summary objects
+        immunizations: List of immunization objects
+        past_appointments: List of past appointments, most recent first
+        last_visit_date: Date of the last visit
+        generated_on: Date shown as the generation date (defaults to now)
+        timings: Optional dict that receives seconds spent per section and on saving
+
+    Returns:
+        bytes: The generated Word document as bytes
+    """
+    records = SimpleNamespace(
+        conditions=conditions,
+        screenings=screenings,
+        vitals=vitals,
+        labs=labs,
+        imaging=imaging,
+        consults=consults,
+        hospital=hospital,
+        immunizations=immunizations,
+        past_appointments=past_appointments,
+        last_visit_date=last_visit_date,
+        generated_on=generated_on or datetime.now(),
+    )
+    if timings is None:
+        timings = {}
+
+    started = time.perf_counter()
+    doc = Document(io.BytesIO(_base_template()))
+    timings["template"] = time.perf_counter() - started
+
+    for name, add_section in PREP_DOC_SECTIONS:
+        started = time.perf_counter()
+        add_section(doc, patient, records)
+        timings[name] = time.perf_counter() - started
+
     # Create a binary stream to save the document to
+    started = time.perf_counter()
     f = io.BytesIO()
     doc.save(f)
-    f.seek(0)
+    timings["save"] = time.perf_counter() - started
+
+    return f.getvalue()
+
 
-    return f.read()
+def render_prep_sheet_doc_job(job):
+    """
+    Process pool entry point: render one prep sheet from a picklable job
+
+    Args:
+        job: dict with patient_id, filename, patient (snapshot) and generate_prep_sheet_doc kwargs
+
+    Returns:
+        dict: patient_id, filename, content bytes, total seconds and per-section seconds
+    """
+    started = time.perf_counter()
+    timings = {}
+    content = generate_prep_sheet_doc(job["patient"], timings=timings, **job["records"])
+    return {
+        "patient_id": job["patient_id"],
+        "filename": job["filename"],
+        "content": content,
+        "seconds": time.perf_counter() - started,
+        "timings": timings,
+    }
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Bulk Prep Sheet Documents
+Renders the Word prep sheets of a day's appointments across a process pool and streams them
+back as one ZIP, each document written to the archive as soon as its worker finishes.
+
+Sheet data is loaded with one IN (...) query per source and handed to the workers as plain
+snapshots, so worker processes never touch the database. Each worker opens documents from a
+base template built once per process. Per-sheet and per-section render times are recorded in
+the profiler (as prep_sheet_doc.<section>) so slow sections show up among the slowest functions.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import func, select
+
+from app import db
+from models import (
+    Appointment, Condition, ConsultReport, HospitalSummary, ImagingStudy, Immunization, LabResult,
+    Patient, Screening, ScreeningType, Visit, Vital,
+)
+from prep_doc_utils import init_prep_doc_worker, render_prep_sheet_doc_job
+from profiler import profiler
+
+logger = logging.getLogger(__name__)
+
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Labs, imaging, consults and hospital visits on the sheet
+RECENT_DAYS = 180
+PAST_APPOINTMENT_LIMIT = 3
+
+
+def prep_sheet_doc_filename(patient, prep_date: date) -> str:
+    return f"PrepSheet_{patient.last_name}_{patient.first_name}_{prep_date.strftime('%Y%m%d')}.docx"
+
+
+def _snapshot(record, **extra) -> SimpleNamespace:
+    """Picklable copy of a record's column values"""
+    values = {attr.key: getattr(record, attr.key) for attr in record.__mapper__.column_attrs}
+    values.update(extra)
+    return SimpleNamespace(**values)
+
+
+def _snapshots_by_patient(records, patient_ids: List[int]) -> Dict[int, List[SimpleNamespace]]:
+    grouped = {patient_id: [] for patient_id in patient_ids}
+    for record in records:
+        grouped[record.patient_id].append(_snapshot(record))
+    return grouped
+
+
+def _latest_per_patient(model, patient_ids: List[int], order_by: tuple, limit: int, *filters):
+    """Each patient's first `limit` rows of model in order_by order"""
+    ranked = (
+        select(
+            model.id,
+            func.row_number().over(partition_by=model.patient_id, order_by=order_by).label("position"),
+        )
+        .where(model.patient_id.in_(patient_ids), *filters)
+        .subquery()
+    )
+    return (
+        model.query.join(ranked, ranked.c.id == model.id)
+        .filter(ranked.c.position <= limit)
+        .order_by(*order_by)
+        .all()
+    )
+
+
+def _recent(model, date_column, patient_ids: List[int], cutoff: datetime):
+    return (
+        model.query.filter(model.patient_id.in_(patient_ids), date_column >= cutoff)
+        .order_by(date_column.desc())
+        .all()
+    )
+
+
+def load_prep_doc_jobs(patient_ids: List[int], prep_date: date,
+                       as_of: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Render jobs for the download_prep_sheet document, with one IN (...) query per source"""
+    as_of = as_of or datetime.now()
+    patients = Patient.query.filter(Patient.id.in_(patient_ids)).all()
+    patient_ids = [patient.id for patient in patients]
+    if not patient_ids:
+        return []
+
+    recent_cutoff = as_of - timedelta(days=RECENT_DAYS)
+    last_visit_dates = dict(db.session.execute(
+        select(Visit.patient_id, func.max(Visit.visit_date))
+        .where(Visit.patient_id.in_(patient_ids))
+        .group_by(Visit.patient_id)
+    ).all())
+
+    sections = {
+        "conditions": Condition.query.filter(Condition.patient_id.in_(patient_ids)).all(),
+        "screenings": (
+            Screening.query.join(ScreeningType, Screening.screening_type_id == ScreeningType.id)
+            .filter(Screening.patient_id.in_(patient_ids), ScreeningType.is_active == True)
+            .all()
+        ),
+        # Only the most recent vitals are printed
+        "vitals": _latest_per_patient(Vital, patient_ids, (Vital.date.desc(), Vital.id.desc()), 1),
+        "labs": _recent(LabResult, LabResult.test_date, patient_ids, recent_cutoff),
+        "imaging": _recent(ImagingStudy, ImagingStudy.study_date, patient_ids, recent_cutoff),
+        "consults": _recent(ConsultReport, ConsultReport.report_date, patient_ids, recent_cutoff),
+        "hospital": _recent(HospitalSummary, HospitalSummary.admission_date, patient_ids, recent_cutoff),
+        "immunizations": (
+            Immunization.query.filter(Immunization.patient_id.in_(patient_ids))
+            .order_by(Immunization.administration_date.desc())
+            .all()
+        ),
+        "past_appointments": _latest_per_patient(
+            Appointment, patient_ids,
+            (Appointment.appointment_date.desc(), Appointment.appointment_time.desc(), Appointment.id.desc()),
+            PAST_APPOINTMENT_LIMIT,
+            Appointment.appointment_date < prep_date,
+        ),
+    }
+    grouped = {name: _snapshots_by_patient(records, patient_ids) for name, records in sections.items()}
+
+    jobs = []
+    for patient in patients:
+        records = {name: grouped[name][patient.id] for name in sections}
+        records["last_visit_date"] = last_visit_dates.get(patient.id)
+        records["generated_on"] = as_of
+        jobs.append({
+            "patient_id": patient.id,
+            "filename": prep_sheet_doc_filename(patient, prep_date),
+            "patient": _snapshot(patient, full_name=patient.full_name, age=patient.age),
+            "records": records,
+        })
+    return jobs
+
+
+class _ZipStream:
+    """Write-only sink for zipfile; drain() hands over what has been written since the last call"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _mp_context():
+    # Forked workers inherit the loaded modules instead of re-importing the app entry point
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+class PrepSheetDocRenderer:
+    """Renders prep sheet documents in a shared process pool"""
+
+    def __init__(self, max_workers: int = None, batch_size: int = None, slow_seconds: float = None):
+        self.max_workers = max_workers or int(
+            os.environ.get("PREP_SHEET_DOC_WORKERS", min(4, os.cpu_count() or 1))
+        )
+        # Patients loaded per round of queries, and the render time logged as slow
+        self.batch_size = batch_size or int(os.environ.get("PREP_SHEET_DOC_BATCH_SIZE", 25))
+        self.slow_seconds = slow_seconds if slow_seconds is not None else float(
+            os.environ.get("PREP_SHEET_DOC_SLOW_SECONDS", 2.0)
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=_mp_context(),
+                    initializer=init_prep_doc_worker,
+                )
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    @staticmethod
+    def patient_ids_for_date(prep_date: date) -> List[int]:
+        """Patients with an appointment on prep_date, in order of their first appointment"""
+        rows = db.session.execute(
+            select(Appointment.patient_id)
+            .where(Appointment.appointment_date == prep_date)
+            .group_by(Appointment.patient_id)
+            .order_by(func.min(Appointment.appointment_time), Appointment.patient_id)
+        )
+        return [patient_id for (patient_id,) in rows]
+
+    def iter_documents(self, patient_ids: List[int], prep_date: date) -> Iterator[Dict[str, Any]]:
+        """Rendered documents in completion order; workers start on the first batch while the next loads"""
+        start_time = time.time()
+        as_of = datetime.now()
+        pool = self._pool()
+        futures = []
+        stats = {
+            "prep_date": prep_date.isoformat(),
+            "patients": len(patient_ids),
+            "rendered": 0,
+            "failed": 0,
+            "render_seconds": 0.0,
+            "section_seconds": {},
+            "slowest": None,
+        }
+        try:
+            for start in range(0, len(patient_ids), self.batch_size):
+                chunk = patient_ids[start:start + self.batch_size]
+                for job in load_prep_doc_jobs(chunk, prep_date, as_of):
+                    futures.append(pool.submit(render_prep_sheet_doc_job, job))
+
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    self.shutdown()
+                    raise
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.error(f"Prep sheet document render failed: {str(e)}")
+                    continue
+                self._record(result, stats)
+                yield result
+        finally:
+            # Client disconnected or a batch failed to load: drop the renders not started yet
+            for future in futures:
+                future.cancel()
+            stats["duration_seconds"] = round(time.time() - start_time, 2)
+            self.last_run = stats
+            logger.info(
+                f"Prep sheet documents for {stats['prep_date']}: {stats['rendered']} rendered, "
+                f"{stats['failed']} failed in {stats['duration_seconds']}s"
+            )
+
+    def stream_zip(self, prep_date: date, patient_ids: Optional[List[int]] = None) -> Iterator[bytes]:
+        """ZIP of the day's prep sheets, yielding each document's bytes as soon as it is rendered"""
+        if patient_ids is None:
+            patient_ids = self.patient_ids_for_date(prep_date)
+        sink = _ZipStream()
+        filenames = set()
+        # Word documents are already deflated; storing them keeps the stream cheap
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            for result in self.iter_documents(patient_ids, prep_date):
+                filename = result["filename"]
+                if filename in filenames:
+                    filename = filename.replace(".docx", f"_{result['patient_id']}.docx")
+                filenames.add(filename)
+                archive.writestr(filename, result["content"])
+                yield sink.drain()
+        yield sink.drain()
+
+    def _record(self, result: Dict[str, Any], stats: Dict[str, Any]):
+        seconds = result["seconds"]
+        stats["rendered"] += 1
+        stats["render_seconds"] = round(stats["render_seconds"] + seconds, 3)
+        profiler.record_function("prep_sheet_doc.total", seconds * 1000)
+        for section, section_seconds in result["timings"].items():
+            profiler.record_function(f"prep_sheet_doc.{section}", section_seconds * 1000)
+            stats["section_seconds"][section] = round(
+                stats["section_seconds"].get(section, 0.0) + section_seconds, 3
+            )
+
+        slowest_section = max(result["timings"], key=result["timings"].get)
+        if stats["slowest"] is None or seconds > stats["slowest"]["seconds"]:
+            stats["slowest"] = {
+                "patient_id": result["patient_id"],
+                "seconds": round(seconds, 3),
+                "section": slowest_section,
+            }
+        if seconds >= self.slow_seconds:
+            logger.warning(
+                f"Slow prep sheet document for patient {result['patient_id']}: {seconds:.2f}s, "
+                f"{slowest_section} took {result['timings'][slowest_section]:.2f}s"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "pool_started": self._executor is not None,
+            "last_run": self.last_run,
+        }
+
+
+# Global instance
+prep_sheet_doc_renderer = PrepSheetDocRenderer()
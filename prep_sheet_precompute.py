@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Prep Sheet Precompute
+Batch loading, fingerprinted caching and day-ahead precomputation of patient prep sheets.
+
+Prep sheet data for a whole appointment list is loaded with one IN (...) query per source,
+and each sheet's content block is rendered and stored in prep_sheet_cache under a fingerprint
+of its inputs: the patient's chart_version (bumped by every write to the patient, their
+records or their screening document links), the screening rule set version, the checklist
+settings and the prep date. The prep_sheet route serves stored content while the fingerprint
+matches, and the scheduler re-renders only the sheets whose fingerprint changed. The page shell
+(navigation, CSRF token, flashed messages) is rendered per request and never stored.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from flask import has_request_context
+from sqlalchemy import and_, func, literal, select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.exc import IntegrityError
+
+from app import app, db
+from medical_data_parser import MedicalDataParser
+from models import (
+    Appointment, ChecklistSettings, Condition, Immunization, Patient, PrepSheetCache, Screening,
+    ScreeningRuleVersion, ScreeningType, Visit, Vital,
+)
+from utils import generate_prep_sheet
+
+logger = logging.getLogger(__name__)
+
+# Bump when prep_sheet.html's content block or the context below changes, so stored sheets re-render
+PREP_SHEET_RENDER_VERSION = 1
+PREP_SHEET_TEMPLATE = "prep_sheet.html"
+
+PAST_APPOINTMENT_LIMIT = 3
+SCREENING_LIMIT = 100
+
+
+@dataclass
+class PrepSheetInputs:
+    """Everything one patient's prep sheet is rendered from"""
+
+    patient: Patient
+    medical_data: MedicalDataParser
+    last_visit_date: Optional[datetime] = None
+    past_appointments: List[Appointment] = field(default_factory=list)
+    recent_vitals: List[Vital] = field(default_factory=list)
+    active_conditions: List[Condition] = field(default_factory=list)
+    screenings: List[Screening] = field(default_factory=list)
+    immunizations: List[Immunization] = field(default_factory=list)
+
+
+class StoredPrepSheet(NamedTuple):
+    patient: SimpleNamespace  # id and full_name, for the page shell
+    content: str
+    from_cache: bool
+
+
+def _group_by_patient(rows, patient_ids: List[int]) -> Dict[int, List]:
+    grouped = {patient_id: [] for patient_id in patient_ids}
+    for row in rows:
+        grouped[row.patient_id].append(row)
+    return grouped
+
+
+def load_prep_sheet_inputs(patient_ids: List[int], settings: ChecklistSettings,
+                           as_of: datetime) -> Dict[int, PrepSheetInputs]:
+    """Prep sheet inputs for many patients with one IN (...) query per source"""
+    patients = Patient.query.filter(Patient.id.in_(patient_ids)).all()
+    patient_ids = [patient.id for patient in patients]
+    if not patient_ids:
+        return {}
+
+    last_visits = (
+        select(Visit.patient_id, func.max(Visit.visit_date).label("last_visit_date"))
+        .where(Visit.patient_id.in_(patient_ids))
+        .group_by(Visit.patient_id)
+        .subquery()
+    )
+    last_visit_dates = dict(db.session.execute(select(last_visits)).all())
+
+    # Latest appointments up to and including the prep date
+    ranked_appointments = (
+        select(
+            Appointment.id,
+            func.row_number().over(
+                partition_by=Appointment.patient_id,
+                order_by=(Appointment.appointment_date.desc(), Appointment.id.desc()),
+            ).label("position"),
+        )
+        .where(Appointment.patient_id.in_(patient_ids), Appointment.appointment_date <= as_of.date())
+        .subquery()
+    )
+    past_appointments = _group_by_patient(
+        Appointment.query.join(ranked_appointments, ranked_appointments.c.id == Appointment.id)
+        .filter(ranked_appointments.c.position <= PAST_APPOINTMENT_LIMIT)
+        .order_by(Appointment.appointment_date.desc(), Appointment.id.desc())
+        .all(),
+        patient_ids,
+    )
+
+    # Vitals since the last visit, or the last 90 days without one
+    vitals = _group_by_patient(
+        Vital.query.outerjoin(last_visits, last_visits.c.patient_id == Vital.patient_id)
+        .filter(
+            Vital.patient_id.in_(patient_ids),
+            Vital.date > func.coalesce(last_visits.c.last_visit_date, literal(as_of - timedelta(days=90))),
+        )
+        .order_by(Vital.date.desc())
+        .all(),
+        patient_ids,
+    )
+
+    conditions = _group_by_patient(
+        Condition.query.filter(Condition.patient_id.in_(patient_ids), Condition.is_active == True).all(),
+        patient_ids,
+    )
+
+    # Same screenings, in the same order, as the /screenings page
+    screenings = _group_by_patient(
+        Screening.query.join(ScreeningType, Screening.screening_type == ScreeningType.name)
+        .filter(
+            Screening.patient_id.in_(patient_ids),
+            ScreeningType.is_active == True,
+            Screening.is_visible == True,
+        )
+        .options(joinedload(Screening.screening_type_obj), selectinload(Screening.documents))
+        .order_by(
+            db.case(
+                (Screening.status == 'Due', 1),
+                (Screening.status == 'Due Soon', 2),
+                (Screening.status == 'Incomplete', 3),
+                (Screening.status == 'Complete', 4),
+                else_=5
+            ),
+            Screening.due_date.asc().nullslast(),
+            Screening.id,
+        )
+        .all(),
+        patient_ids,
+    )
+
+    immunizations = _group_by_patient(
+        Immunization.query.filter(Immunization.patient_id.in_(patient_ids))
+        .order_by(Immunization.administration_date.desc())
+        .all(),
+        patient_ids,
+    )
+
+    medical_data = MedicalDataParser.load_batch(patient_ids, settings, as_of)
+
+    return {
+        patient.id: PrepSheetInputs(
+            patient=patient,
+            medical_data=medical_data[patient.id],
+            last_visit_date=last_visit_dates.get(patient.id),
+            past_appointments=past_appointments[patient.id],
+            recent_vitals=vitals[patient.id],
+            active_conditions=conditions[patient.id],
+            screenings=screenings[patient.id][:SCREENING_LIMIT],
+            immunizations=immunizations[patient.id],
+        )
+        for patient in patients
+    }
+
+
+def _screening_document_data(screenings: List[Screening]):
+    """Document match summary and per-screening match data used by the template"""
+    screening_document_matches = {}
+    document_screening_data = {
+        'screening_recommendations': [],
+        'summary': {
+            'total_matches': 0,
+            'unique_screenings': len(screenings),
+            'high_confidence_count': 0,
+            'medium_confidence_count': 0,
+            'low_confidence_count': 0
+        }
+    }
+
+    for screening in screenings:
+        matched_docs = screening.matched_documents
+        if not matched_docs:
+            continue
+
+        document_screening_data['screening_recommendations'].append({
+            'screening_name': screening.screening_type,
+            'status': screening.status,
+            'last_completed': getattr(screening, 'last_completed_date', None) or getattr(screening, 'last_completed', None),
+            'frequency': screening.frequency,
+            'notes': screening.notes,
+            'matched_documents': matched_docs,
+            'document_count': len(matched_docs)
+        })
+
+        best_doc = matched_docs[0]  # Use first document as "best match"
+        confidence = 0.85  # Default high confidence for automated matches
+        screening_document_matches[screening.screening_type] = {
+            'status_notes': f"Status: {screening.status}",
+            'confidence': confidence,
+            'confidence_percent': int(confidence * 100),
+            'document_name': best_doc.filename,
+            'document_id': best_doc.id,
+            'match_source': 'automated_screening_engine',
+            'recommendation_status': screening.status,
+            'matched_documents': matched_docs,
+            'all_documents': [
+                {
+                    'id': doc.id,
+                    'filename': doc.filename,
+                    'document_name': doc.document_name,
+                    'confidence': confidence
+                } for doc in matched_docs
+            ]
+        }
+
+        document_screening_data['summary']['total_matches'] += len(matched_docs)
+        document_screening_data['summary']['high_confidence_count'] += 1
+
+    return document_screening_data, screening_document_matches
+
+
+def build_prep_sheet_context(inputs: PrepSheetInputs, settings: ChecklistSettings,
+                             as_of: datetime) -> Dict[str, Any]:
+    """Template context of the prep sheet content block"""
+    filtered_medical_data = inputs.medical_data.get_all_filtered_data()
+    recent_labs = filtered_medical_data['labs']['data']
+    recent_imaging = filtered_medical_data['imaging']['data']
+    recent_consults = filtered_medical_data['consults']['data']
+    recent_hospital = filtered_medical_data['hospital_visits']['data']
+
+    prep_sheet_data = generate_prep_sheet(
+        inputs.patient,
+        inputs.recent_vitals,
+        recent_labs,
+        recent_imaging,
+        recent_consults,
+        recent_hospital,
+        inputs.active_conditions,
+        inputs.screenings,
+        inputs.last_visit_date,
+        inputs.past_appointments,
+        as_of=as_of,
+    )
+
+    try:
+        document_screening_data, screening_document_matches = _screening_document_data(inputs.screenings)
+    except Exception as e:
+        # Don't break the prep sheet if document matching fails
+        logger.error(f"Document matching error for patient {inputs.patient.id}: {str(e)}")
+        document_screening_data = {
+            'screening_recommendations': [],
+            'summary': {'total_matches': 0, 'unique_screenings': 0}
+        }
+        screening_document_matches = {}
+
+    return {
+        'patient': inputs.patient,
+        'prep_sheet': prep_sheet_data,
+        'recent_vitals': inputs.recent_vitals[0] if inputs.recent_vitals else None,
+        'recent_labs': recent_labs,
+        'recent_imaging': recent_imaging,
+        'recent_consults': recent_consults,
+        'recent_hospital': recent_hospital,
+        'settings': settings,
+        'checklist_settings': settings,
+        'active_conditions': inputs.active_conditions,
+        'screenings': inputs.screenings,
+        'immunizations': inputs.immunizations,
+        'last_visit_date': inputs.last_visit_date,
+        'past_appointments': inputs.past_appointments,
+        'today': as_of,
+        'document_screening_data': document_screening_data,
+        'screening_document_matches': screening_document_matches,
+        'filtered_medical_data': filtered_medical_data,
+    }
+
+
+def render_prep_sheet_content(context: Dict[str, Any]) -> str:
+    """Render only the template's content block (the shell carries per-user data)"""
+    template = app.jinja_env.get_template(PREP_SHEET_TEMPLATE)
+    app.update_template_context(context)
+    return "".join(template.blocks["content"](template.new_context(context)))
+
+
+def settings_stamp(settings: ChecklistSettings) -> str:
+    return repr(tuple(getattr(settings, column.key) for column in ChecklistSettings.__table__.columns))
+
+
+def prep_sheet_fingerprint(chart_version: int, rule_version: int, stamp: str, prep_date: date) -> str:
+    raw = f"{PREP_SHEET_RENDER_VERSION}|{prep_date.isoformat()}|{chart_version or 0}|{rule_version or 0}|{stamp}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _prep_time(prep_date: date) -> datetime:
+    """Time a sheet is prepared as of: now, or the start of a future prep date"""
+    if prep_date > date.today():
+        return datetime.combine(prep_date, dt_time.min)
+    return datetime.now()
+
+
+class PrepSheetPrecomputer:
+    """Serves stored prep sheets and precomputes them for a day's appointments"""
+
+    def __init__(self, batch_size: int = None, interval: float = None, day_ahead_hour: int = None):
+        self.batch_size = batch_size or int(os.environ.get('PREP_SHEET_PRECOMPUTE_BATCH_SIZE', 50))
+        # Seconds between scheduler runs, and the hour from which tomorrow's sheets are rendered
+        self.interval = interval if interval is not None else float(os.environ.get('PREP_SHEET_PRECOMPUTE_INTERVAL', 300))
+        self.day_ahead_hour = day_ahead_hour if day_ahead_hour is not None else int(
+            os.environ.get('PREP_SHEET_DAY_AHEAD_HOUR', 17)
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def get_sheet(self, patient_id: int, settings: ChecklistSettings,
+                  prep_date: Optional[date] = None) -> Optional[StoredPrepSheet]:
+        """Stored sheet if its inputs are unchanged, otherwise rendered now and stored; None if no patient"""
+        prep_date = prep_date or date.today()
+        row = db.session.execute(
+            self._versions_query([patient_id], prep_date).add_columns(
+                Patient.first_name, Patient.last_name, PrepSheetCache.content
+            )
+        ).first()
+        if row is None:
+            return None
+
+        patient = SimpleNamespace(id=patient_id, full_name=f"{row.first_name} {row.last_name}")
+        fingerprint = prep_sheet_fingerprint(row.chart_version, row.rule_version, settings_stamp(settings), prep_date)
+        if row.fingerprint == fingerprint:
+            self.hits += 1
+            return StoredPrepSheet(patient, row.content, True)
+
+        self.misses += 1
+        contents = self._render_batch([patient_id], settings, prep_date, {patient_id: fingerprint})
+        if patient_id not in contents:
+            return None
+        return StoredPrepSheet(patient, contents[patient_id], False)
+
+    def precompute(self, prep_date: Optional[date] = None) -> Dict[str, Any]:
+        """Render the sheets of prep_date's appointments whose inputs changed since they were stored"""
+        from checklist_routes import get_or_create_settings
+
+        start_time = time.time()
+        prep_date = prep_date or date.today()
+        settings = get_or_create_settings()
+        stamp = settings_stamp(settings)
+
+        patient_ids = [
+            patient_id for (patient_id,) in
+            db.session.query(Appointment.patient_id).filter(Appointment.appointment_date == prep_date).distinct()
+        ]
+        stale = {}
+        if patient_ids:
+            for row in db.session.execute(self._versions_query(patient_ids, prep_date)):
+                fingerprint = prep_sheet_fingerprint(row.chart_version, row.rule_version, stamp, prep_date)
+                if row.fingerprint != fingerprint:
+                    stale[row.id] = fingerprint
+
+        rendered = 0
+        stale_ids = sorted(stale)
+        for start in range(0, len(stale_ids), self.batch_size):
+            chunk = stale_ids[start:start + self.batch_size]
+            rendered += len(self._render_batch(chunk, settings, prep_date, stale))
+
+        pruned = PrepSheetCache.query.filter(PrepSheetCache.prep_date < date.today()).delete(synchronize_session=False)
+        db.session.commit()
+
+        stats = {
+            'prep_date': prep_date.isoformat(),
+            'patients': len(patient_ids),
+            'rendered': rendered,
+            'unchanged': len(patient_ids) - len(stale),
+            'pruned': pruned,
+            'duration_seconds': round(time.time() - start_time, 2),
+        }
+        self.last_run = stats
+        logger.info(f"Prep sheets for {stats['prep_date']}: {rendered} rendered, {stats['unchanged']} unchanged")
+        return stats
+
+    def start_scheduler(self) -> bool:
+        """Keep today's sheets current in a background thread; False if it is already running"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run_scheduler, name="prep-sheet-precompute", daemon=True)
+            self._thread.start()
+        logger.info(f"Started prep sheet precompute scheduler (every {self.interval}s)")
+        return True
+
+    def stop_scheduler(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'scheduler_running': bool(self._thread and self._thread.is_alive()),
+            'last_run': self.last_run,
+        }
+
+    @staticmethod
+    def _versions_query(patient_ids: List[int], prep_date: date):
+        """Current chart and rule versions with the stored fingerprint, in one query"""
+        rule_version = (
+            select(ScreeningRuleVersion.version).where(ScreeningRuleVersion.id == 1).scalar_subquery()
+        )
+        return (
+            select(Patient.id, Patient.chart_version, rule_version.label("rule_version"), PrepSheetCache.fingerprint)
+            .outerjoin(PrepSheetCache, and_(
+                PrepSheetCache.patient_id == Patient.id, PrepSheetCache.prep_date == prep_date
+            ))
+            .where(Patient.id.in_(patient_ids))
+        )
+
+    def _render_batch(self, patient_ids: List[int], settings: ChecklistSettings, prep_date: date,
+                      fingerprints: Dict[int, str]) -> Dict[int, str]:
+        """Render and store sheets under fingerprints taken before loading, so a concurrent write re-renders"""
+        as_of = _prep_time(prep_date)
+        contents = {}
+        for patient_id, inputs in load_prep_sheet_inputs(patient_ids, settings, as_of).items():
+            context = build_prep_sheet_context(inputs, settings, as_of)
+            if has_request_context():
+                contents[patient_id] = render_prep_sheet_content(context)
+            else:
+                # Links in the sheet return to the prep sheet page
+                with app.test_request_context(f"/patients/{patient_id}/prep_sheet"):
+                    contents[patient_id] = render_prep_sheet_content(context)
+        if not contents:
+            return contents
+
+        PrepSheetCache.query.filter(
+            PrepSheetCache.patient_id.in_(list(contents)), PrepSheetCache.prep_date == prep_date
+        ).delete(synchronize_session=False)
+        rendered_at = datetime.utcnow()
+        db.session.execute(PrepSheetCache.__table__.insert(), [
+            {
+                'patient_id': patient_id,
+                'prep_date': prep_date,
+                'fingerprint': fingerprints[patient_id],
+                'content': content,
+                'rendered_at': rendered_at,
+            }
+            for patient_id, content in contents.items()
+        ])
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker stored the same sheets first
+            db.session.rollback()
+        return contents
+
+    def _run_scheduler(self):
+        """Refresh today's sheets every interval and, from day_ahead_hour, tomorrow's"""
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.precompute(date.today())
+                    if datetime.now().hour >= self.day_ahead_hour:
+                        self.precompute(date.today() + timedelta(days=1))
+                except Exception as e:
+                    logger.error(f"Prep sheet precompute failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.interval)
+
+
+# Global instance
+prep_sheet_precomputer = PrepSheetPrecomputer()
+
+
+if __name__ == "__main__":
+    import sys
+
+    import demo_routes  # noqa: F401  Registers the endpoints the sheet links to
+
+    target_date = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date.today() + timedelta(days=1)
+    with app.app_context():
+        print(prep_sheet_precomputer.precompute(target_date))
@@ -91,23 +91,26 @@ class AppProfiler:
                     duration = (end_time - start_time) * 1000
 
                     name = func_name or f"{func.__module__}.{func.__name__}"
-
-                    with self.lock:
-                        self.function_stats[name].append(
-                            {
-                                "duration_ms": duration,
-                                "timestamp": datetime.now().isoformat(),
-                            }
-                        )
-
-                        # Keep only last 50 entries per function
-                        if len(self.function_stats[name]) > 50:
-                            self.function_stats[name] = self.function_stats[name][-50:]
+                    self.record_function(name, duration)
 
             return wrapper
 
         return decorator
 
+    def record_function(self, name, duration_ms):
+        """Record a timing measured outside a profiled function (e.g. in a worker process)"""
+        with self.lock:
+            self.function_stats[name].append(
+                {
+                    "duration_ms": duration_ms,
+                    "timestamp": datetime.now().isoformat(),
+                }
+            )
+
+            # Keep only last 50 entries per function
+            if len(self.function_stats[name]) > 50:
+                self.function_stats[name] = self.function_stats[name][-50:]
+
     def get_slowest_routes(self, limit=10):
         """Get the slowest routes by average execution time"""
         route_averages = []
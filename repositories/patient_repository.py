@@ -11,21 +11,10 @@ class PatientRepository:
 
     @staticmethod
     def search_patients(search_term, limit=50):
-        """Search patients by name, MRN, or email"""
-        search_pattern = f"%{search_term}%"
+        """Search patients by name, MRN, or email (best matches first)"""
+        import patient_search
 
-        return (
-            Patient.query.filter(
-                db.or_(
-                    Patient.first_name.ilike(search_pattern),
-                    Patient.last_name.ilike(search_pattern),
-                    Patient.mrn.ilike(search_pattern),
-                    Patient.email.ilike(search_pattern),
-                )
-            )
-            .limit(limit)
-            .all()
-        )
+        return patient_search.search_patients(search_term, limit=limit).patients
 
     @staticmethod
     def get_patients_with_conditions(condition_names):
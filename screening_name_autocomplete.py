@@ -4,9 +4,11 @@ Provides autocomplete functionality for common medical screening names
 """
 
 import json
-from typing import List, Dict, Any
+from typing import List, Any
 from flask import jsonify
 
+from term_search_index import TermSearchIndex
+
 class ScreeningNameAutocomplete:
     """Handles autocomplete for common medical screening names"""
     
@@ -133,58 +135,19 @@ class ScreeningNameAutocomplete:
         # Create search index for faster lookups
         self.search_index = self._build_search_index()
     
-    def _build_search_index(self) -> Dict[str, List[str]]:
-        """Build a search index for faster screening name lookups"""
-        index = {}
-        
-        for screening_name in self.screening_database:
-            # Add the exact screening name
-            words = screening_name.lower().split()
-            for word in words:
-                # Clean word of punctuation
-                clean_word = ''.join(c for c in word if c.isalnum())
-                if len(clean_word) > 1:  # Skip very short words
-                    if clean_word not in index:
-                        index[clean_word] = []
-                    if screening_name not in index[clean_word]:
-                        index[clean_word].append(screening_name)
-        
-        return index
+    def _build_search_index(self) -> TermSearchIndex:
+        """Build a prefix/trigram search index for faster screening name lookups"""
+        return TermSearchIndex((screening_name, screening_name) for screening_name in self.screening_database)
+    
+    def add_screening(self, screening_name: str):
+        """Add a screening name to the database and search index"""
+        if screening_name not in self.screening_database:
+            self.screening_database.append(screening_name)
+            self.search_index.add(screening_name, screening_name)
     
     def get_suggestions(self, query: str, limit: int = 10) -> List[str]:
         """Get screening name suggestions based on query"""
-        if not query or len(query.strip()) < 2:
-            return []
-        
-        query = query.lower().strip()
-        suggestions = set()
-        
-        # Exact name matches
-        for screening_name in self.screening_database:
-            if query in screening_name.lower():
-                suggestions.add(screening_name)
-        
-        # Word-based matches using search index
-        query_words = query.split()
-        for word in query_words:
-            clean_word = ''.join(c for c in word if c.isalnum())
-            if clean_word in self.search_index:
-                suggestions.update(self.search_index[clean_word])
-        
-        # Sort by relevance (exact matches first, then contains matches)
-        sorted_suggestions = []
-        
-        # Exact matches first
-        for screening in suggestions:
-            if screening.lower().startswith(query):
-                sorted_suggestions.append(screening)
-        
-        # Then other matches
-        for screening in suggestions:
-            if not screening.lower().startswith(query) and screening not in sorted_suggestions:
-                sorted_suggestions.append(screening)
-        
-        return sorted_suggestions[:limit]
+        return self.search_screenings(query.strip() if query else query, limit)
     
     def search_screenings(self, query: str, limit: int = 10) -> List[str]:
         """
@@ -195,44 +158,13 @@ class ScreeningNameAutocomplete:
             limit: Maximum number of results to return
             
         Returns:
-            List of matching screening names
+            List of matching screening names, ranked exact, prefix, word prefix,
+            substring, then fuzzy (trigram similarity) matches
         """
         if not query or len(query) < 2:
             return []
         
-        query = query.lower().strip()
-        matching_screenings = set()
-        
-        # Direct substring matches (prioritized)
-        for screening_name in self.screening_database:
-            if query in screening_name.lower():
-                matching_screenings.add(screening_name)
-        
-        # Word-based search using index
-        query_words = query.split()
-        for word in query_words:
-            clean_word = ''.join(c for c in word if c.isalnum())
-            if clean_word in self.search_index:
-                matching_screenings.update(self.search_index[clean_word])
-        
-        # Convert to list and sort by relevance (exact matches first)
-        results = list(matching_screenings)
-        
-        # Sort by relevance: exact matches first, then by length
-        def relevance_score(screening):
-            screening_lower = screening.lower()
-            if screening_lower == query:
-                return 0  # Exact match
-            elif screening_lower.startswith(query):
-                return 1  # Starts with query
-            elif query in screening_lower:
-                return 2  # Contains query
-            else:
-                return 3  # Word match
-        
-        results.sort(key=relevance_score)
-        
-        return results[:limit]
+        return [hit.key for hit in self.search_index.search(query, limit)]
 
 # Global instance
 screening_autocomplete_service = ScreeningNameAutocomplete()
\ No newline at end of file
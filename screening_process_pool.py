@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Screening Process Pool
+Worker-process side of the bulk screening engine's opt-in ProcessPoolExecutor mode.
+Each worker holds its own app context and compiled screening rule set snapshot, and turns patient snapshots (demographics, conditions, documents) into screening dicts
+so CPU-bound keyword matching runs outside the parent's GIL.
+"""
+
+import logging
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Per-process state populated by init_screening_worker
+_worker_state: Dict[str, Any] = {}
+
+
+class PatientSnapshot:
+    """Read-only patient snapshot with the attributes the screening engine uses"""
+
+    def __init__(self, patient: Dict[str, Any], conditions: List[Dict[str, Any]]):
+        self.id = patient['id']
+        self.first_name = patient.get('first_name')
+        self.last_name = patient.get('last_name')
+        self.mrn = patient.get('mrn')
+        self.date_of_birth = patient['date_of_birth']
+        self.sex = patient.get('sex')
+        # Plain list, like the ORM's lazy=True relationship
+        self.conditions = [SimpleNamespace(**condition) for condition in conditions]
+
+    @property
+    def age(self):
+        today = datetime.now().date()
+        born = self.date_of_birth
+        return (
+            today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+        )
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+def document_snapshot(document: Dict[str, Any]) -> SimpleNamespace:
+    """Document snapshot with the attributes used for matching and date calculations"""
+    return SimpleNamespace(
+        id=document['id'],
+        patient_id=document.get('patient_id'),
+        filename=document.get('filename'),
+        document_name=document.get('document_name'),
+        document_type=document.get('document_type'),
+        content=document.get('content'),
+        document_date=document.get('document_date'),
+        created_at=document.get('created_at'),
+        updated_at=document.get('updated_at'),
+    )
+
+
+def init_screening_worker():
+    """ProcessPoolExecutor initializer: app context, fresh DB connections, preloaded rules"""
+    from app import app, db
+
+    context = app.app_context()
+    context.push()
+    # Pooled connections inherited from the parent process must not be shared
+    db.engine.dispose()
+
+    from unified_screening_engine import UnifiedScreeningEngine
+
+    _worker_state['app_context'] = context
+    _worker_state['engine'] = UnifiedScreeningEngine()
+    _load_screening_types()
+
+
+def _load_screening_types(min_version: Optional[int] = None):
+    """Load the compiled screening rule set snapshot and build its keyword index"""
+    from app import db
+    from screening_rule_set import get_screening_rule_set
+
+    rule_set = get_screening_rule_set(min_version)
+    db.session.rollback()
+
+    _worker_state['screening_types'] = rule_set.rules
+    _worker_state['config_version'] = rule_set.version
+    rule_set.keyword_index(_worker_state['engine'].MIN_KEYWORD_CONFIDENCE)
+
+
+def generate_screenings_for_snapshots(snapshots: List[Dict[str, Any]],
+                                      config_version: Optional[int] = None) -> Dict[int, Optional[List[Dict]]]:
+    """
+    Generate screenings for a batch of patient snapshots inside a worker process
+
+    Args:
+            snapshots: [{'patient': {...}, 'conditions': [...], 'documents': [...]}]
+            config_version: Parent's screening rule set version; rules are reloaded when it differs
+
+    Returns:
+        {patient_id: screening dicts, or None if generation failed for that patient}
+    """
+    from app import db
+
+    if config_version is not None and config_version != _worker_state.get('config_version'):
+        _load_screening_types(config_version)
+
+    engine = _worker_state['engine']
+    screening_types = _worker_state['screening_types']
+
+    results = {}
+    try:
+        for snapshot in snapshots:
+            patient = PatientSnapshot(snapshot['patient'], snapshot.get('conditions', []))
+            documents = [document_snapshot(document) for document in snapshot.get('documents', [])]
+            try:
+                results[patient.id] = engine.generate_screenings_from_data(patient, screening_types, documents)
+            except Exception as e:
+                logger.error(f"❌ Worker failed generating screenings for patient {patient.id}: {e}")
+                results[patient.id] = None
+    finally:
+        # Don't leave the worker's session idle in a transaction between batches
+        db.session.rollback()
+
+    return results
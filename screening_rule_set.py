@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Screening Rule Set
+Immutable, precompiled snapshot of the active screening types: frequencies in days, age/sex
+predicates, trigger code sets and compiled keyword matchers. Engines read rules from the shared
+snapshot instead of re-parsing ScreeningType JSON columns on every eligibility or match check.
+
+Snapshots carry the screening_rule_version counter, which is bumped in the same transaction as
+any screening type edit. A process re-checks the counter at most every SCREENING_RULES_CHECK_SECONDS
+seconds, and immediately after one of its own screening type edits commits.
+"""
+
+import html
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from models import ScreeningRuleVersion, ScreeningType
+from compiled_keyword_matcher import ScreeningKeywordIndex, ScreeningKeywordMatcher, get_screening_keyword_matcher
+
+logger = logging.getLogger(__name__)
+
+# Approximate days per frequency unit (same multipliers as ScreeningType.frequency_in_days)
+FREQUENCY_UNIT_DAYS = {
+    'day': 1, 'days': 1, 'daily': 1,
+    'week': 7, 'weeks': 7, 'weekly': 7,
+    'month': 30, 'months': 30, 'monthly': 30,
+    'year': 365, 'years': 365, 'annually': 365,
+}
+
+# gender_specific values that mean any sex is eligible
+_ANY_SEX = {'', 'both', 'all'}
+
+
+def parse_trigger_conditions(raw) -> List[Dict]:
+    """Parse a trigger_conditions column (HTML entities unescaped); [] when empty or invalid"""
+    if not raw:
+        return []
+    try:
+        conditions = json.loads(html.unescape(raw))
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return [condition for condition in conditions if isinstance(condition, dict)] if isinstance(conditions, list) else []
+
+
+@dataclass(frozen=True, eq=False)
+class ScreeningRule:
+    """
+    Compiled rules of one screening type.
+
+    Exposes the ScreeningType attributes the engines read (id, name, description, frequency
+    fields, ages, gender_specific, formatted_frequency), so a rule can stand in for the ORM row.
+    """
+
+    id: int
+    name: str
+    description: Optional[str]
+    status: Optional[str]
+    frequency_number: Optional[int]
+    frequency_unit: Optional[str]
+    frequency_days: Optional[int]
+    formatted_frequency: str
+    min_age: Optional[int]
+    max_age: Optional[int]
+    gender_specific: Optional[str]
+    required_sex: Optional[str]  # Lowercased; None when any sex is eligible
+    trigger_conditions: Tuple[Dict, ...]
+    trigger_codes: FrozenSet[str]
+    trigger_displays: Tuple[str, ...]  # Lowercased
+    updated_at: Optional[datetime]
+    keyword_matcher: ScreeningKeywordMatcher = field(repr=False)
+
+    @classmethod
+    def from_screening_type(cls, screening_type) -> 'ScreeningRule':
+        """Compile a ScreeningType row"""
+        frequency_unit = (screening_type.frequency_unit or '').strip().lower() or None
+        frequency_days = None
+        if screening_type.frequency_number and frequency_unit in FREQUENCY_UNIT_DAYS:
+            frequency_days = int(screening_type.frequency_number) * FREQUENCY_UNIT_DAYS[frequency_unit]
+
+        required_sex = (screening_type.gender_specific or '').strip().lower()
+        trigger_conditions = parse_trigger_conditions(screening_type.trigger_conditions)
+        if screening_type.trigger_conditions and not trigger_conditions:
+            logger.warning(f"Invalid trigger conditions JSON for {screening_type.name}")
+
+        return cls(
+            id=screening_type.id,
+            name=screening_type.name,
+            description=screening_type.description,
+            status=screening_type.status,
+            frequency_number=screening_type.frequency_number,
+            frequency_unit=frequency_unit,
+            frequency_days=frequency_days,
+            formatted_frequency=screening_type.formatted_frequency,
+            min_age=screening_type.min_age,
+            max_age=screening_type.max_age,
+            gender_specific=screening_type.gender_specific,
+            required_sex=None if required_sex in _ANY_SEX else required_sex,
+            trigger_conditions=tuple(trigger_conditions),
+            trigger_codes=frozenset(str(t['code']) for t in trigger_conditions if t.get('code')),
+            trigger_displays=tuple(str(t['display']).lower() for t in trigger_conditions if t.get('display')),
+            updated_at=screening_type.updated_at,
+            keyword_matcher=get_screening_keyword_matcher(screening_type),
+        )
+
+    @property
+    def has_trigger_conditions(self) -> bool:
+        return bool(self.trigger_conditions)
+
+    def demographic_mismatch(self, age: Optional[int], sex: Optional[str]) -> Optional[str]:
+        """Reason the age/sex predicates reject a patient, or None when they pass"""
+        if self.min_age is not None and age is not None and age < self.min_age:
+            return f"Patient age {age} below minimum {self.min_age}"
+        if self.max_age is not None and age is not None and age > self.max_age:
+            return f"Patient age {age} above maximum {self.max_age}"
+        if self.required_sex is not None:
+            patient_sex = sex.lower() if sex else ""
+            if patient_sex != self.required_sex:
+                return f"Gender mismatch: requires {self.required_sex}, patient is {patient_sex}"
+        return None
+
+    def matches_conditions(self, conditions: Iterable) -> bool:
+        """Whether any condition matches a trigger by code (exact) or display (substring of its name)"""
+        for condition in conditions:
+            if self.trigger_codes and str(condition.code) in self.trigger_codes:
+                return True
+            if self.trigger_displays:
+                condition_name = (condition.name or '').lower()
+                if any(display in condition_name for display in self.trigger_displays):
+                    return True
+        return False
+
+
+class ScreeningRuleSet:
+    """Immutable snapshot of the compiled rules of every active screening type"""
+
+    def __init__(self, rules: Iterable[ScreeningRule], version: int):
+        self.version = version
+        self.rules: Tuple[ScreeningRule, ...] = tuple(rules)
+        self._by_id: Dict[int, ScreeningRule] = {rule.id: rule for rule in self.rules}
+        self._keyword_indexes: Dict[float, ScreeningKeywordIndex] = {}
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[ScreeningRule]:
+        return iter(self.rules)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def get(self, screening_type_id: int) -> Optional[ScreeningRule]:
+        return self._by_id.get(screening_type_id)
+
+    def rule_for(self, screening_type) -> ScreeningRule:
+        """
+        Compiled rule for a ScreeningType row (rules are returned as-is). Rows that are not in the
+        snapshot (inactive, or edited in the caller's uncommitted transaction) are compiled on the fly.
+        """
+        if isinstance(screening_type, ScreeningRule):
+            return screening_type
+        rule = self._by_id.get(screening_type.id)
+        if rule is not None and rule.updated_at == screening_type.updated_at:
+            return rule
+        return ScreeningRule.from_screening_type(screening_type)
+
+    def with_status(self, status: str = 'active') -> List[ScreeningRule]:
+        """Active rules whose status column also matches (the 'manage screening types' list)"""
+        return [rule for rule in self.rules if rule.status == status]
+
+    def keyword_index(self, min_confidence: float = 0.5) -> ScreeningKeywordIndex:
+        """Inverted keyword index over this snapshot, built once per confidence threshold"""
+        index = self._keyword_indexes.get(min_confidence)
+        if index is None:
+            with self._lock:
+                index = self._keyword_indexes.get(min_confidence)
+                if index is None:
+                    index = ScreeningKeywordIndex(self.rules, min_confidence)
+                    self._keyword_indexes[min_confidence] = index
+        return index
+
+
+class ScreeningRuleSetCache:
+    """Process-wide holder of the current ScreeningRuleSet"""
+
+    def __init__(self, check_interval: float = None):
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.environ.get('SCREENING_RULES_CHECK_SECONDS', 5)
+        )
+        self._rule_set: Optional[ScreeningRuleSet] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, min_version: Optional[int] = None) -> ScreeningRuleSet:
+        """
+        Current snapshot; the version counter is re-read when the check interval has passed,
+        after a local screening type edit, or when min_version is newer than the snapshot
+        """
+        rule_set = self._rule_set
+        if (rule_set is not None and time.monotonic() - self._checked_at < self.check_interval
+                and (min_version is None or rule_set.version >= min_version)):
+            return rule_set
+
+        with self._lock:
+            version = self._read_version()
+            if self._rule_set is None or self._rule_set.version != version:
+                self._rule_set = self._build(version)
+            self._checked_at = time.monotonic()
+            return self._rule_set
+
+    def expire(self):
+        """Re-read the version counter on the next get()"""
+        self._checked_at = 0.0
+
+    @staticmethod
+    def _read_version() -> int:
+        return db.session.query(ScreeningRuleVersion.version).filter(ScreeningRuleVersion.id == 1).scalar() or 0
+
+    @staticmethod
+    def _build(version: int) -> ScreeningRuleSet:
+        started = time.monotonic()
+        screening_types = ScreeningType.query.filter_by(is_active=True).order_by(ScreeningType.id).all()
+        rule_set = ScreeningRuleSet((ScreeningRule.from_screening_type(st) for st in screening_types), version)
+        logger.info(
+            f"Compiled screening rule set v{version}: {len(rule_set)} screening types "
+            f"in {(time.monotonic() - started) * 1000:.1f}ms"
+        )
+        return rule_set
+
+
+# Global instance
+screening_rule_cache = ScreeningRuleSetCache()
+
+
+def get_screening_rule_set(min_version: Optional[int] = None) -> ScreeningRuleSet:
+    """Current compiled snapshot of the active screening types"""
+    return screening_rule_cache.get(min_version)
+
+
+@event.listens_for(ScreeningType, "after_insert")
+@event.listens_for(ScreeningType, "after_update")
+@event.listens_for(ScreeningType, "after_delete")
+def _note_screening_type_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['screening_rules_changed'] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _expire_after_screening_type_commit(session):
+    if session.info.pop('screening_rules_changed', False):
+        screening_rule_cache.expire()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_screening_type_change(session, previous_transaction):
+    session.info.pop('screening_rules_changed', None)
@@ -11,7 +11,8 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 
 from app import db
-from models import ScreeningType, Patient, Screening, MedicalDocument
+from models import ScreeningType, Patient, Screening
+from document_search_index import changed_keywords, patients_matching_keywords
 
 
 class ChangeType(Enum):
@@ -169,22 +170,12 @@ class SelectiveScreeningRefreshManager:
         affected_patients = set()
         
         try:
-            # Combine old and new keywords to catch all potentially affected documents
-            all_keywords = set(old_keywords or []) | set(new_keywords or [])
+            # Only added or removed keywords can change a document's matches
+            keywords = changed_keywords(old_keywords, new_keywords)
             
-            if all_keywords:
-                # Query documents that contain any of these keywords
-                for keyword in all_keywords:
-                    if keyword and len(keyword.strip()) > 2:  # Avoid very short keywords
-                        keyword_pattern = f'%{keyword.lower()}%'
-                        documents = MedicalDocument.query.filter(
-                            db.or_(
-                                MedicalDocument.content.ilike(keyword_pattern),
-                                MedicalDocument.document_name.ilike(keyword_pattern)
-                            )
-                        ).all()
-                        
-                        affected_patients.update([doc.patient_id for doc in documents if doc.patient_id])
+            if keywords:
+                # One indexed query over document search text, returning patient ids only
+                affected_patients.update(patients_matching_keywords(keywords))
                         
         except Exception as e:
             print(f"⚠️ Error finding patients with document content: {e}")
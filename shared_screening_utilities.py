@@ -4,9 +4,7 @@ Shared Screening Utilities
 Consolidated base classes and utilities to eliminate duplicate logic across screening engines
 """
 
-import json
 import re
-import html
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Optional, Tuple, Set, Any, Union
 from abc import ABC, abstractmethod
@@ -14,6 +12,8 @@ import logging
 
 from app import app, db
 from models import Patient, ScreeningType, Screening, MedicalDocument, Condition
+from screening_rule_set import ScreeningRule, get_screening_rule_set
+from compiled_keyword_matcher import PreparedText
 
 logger = logging.getLogger(__name__)
 
@@ -24,56 +24,45 @@ class PatientDemographicsMixin:
     Single source of truth for all patient eligibility checks
     """
     
+    def get_screening_rule(self, screening_type: ScreeningType) -> ScreeningRule:
+        """Compiled rule for a screening type from the shared rule set snapshot"""
+        return get_screening_rule_set().rule_for(screening_type)
+    
     def is_patient_eligible(self, patient: Patient, screening_type: ScreeningType) -> Tuple[bool, str]:
         """
         Centralized demographic filtering - single source of truth
         
         Args:
             patient: Patient object
-            screening_type: ScreeningType object
+            screening_type: ScreeningType object (or compiled ScreeningRule)
             
         Returns:
             Tuple of (is_eligible, reason)
         """
-        # Age filtering
-        if screening_type.min_age is not None:
-            if patient.age < screening_type.min_age:
-                return False, f"Patient age {patient.age} below minimum {screening_type.min_age}"
-        
-        if screening_type.max_age is not None:
-            if patient.age > screening_type.max_age:
-                return False, f"Patient age {patient.age} above maximum {screening_type.max_age}"
+        rule = self.get_screening_rule(screening_type)
         
-        # Gender filtering
-        if screening_type.gender_specific and screening_type.gender_specific.strip():
-            expected_gender = screening_type.gender_specific.strip().lower()
-            patient_gender = patient.sex.lower() if patient.sex else ""
-            
-            if expected_gender not in ["", "both", "all"] and expected_gender != patient_gender:
-                return False, f"Gender mismatch: requires {expected_gender}, patient is {patient_gender}"
+        # Age and gender filtering
+        mismatch = rule.demographic_mismatch(patient.age, patient.sex)
+        if mismatch:
+            return False, mismatch
         
         # Trigger conditions (for variants)
-        trigger_conditions = self.get_trigger_conditions(screening_type)
-        if trigger_conditions:
-            has_conditions = self.patient_has_trigger_conditions(patient, trigger_conditions)
-            if not has_conditions:
-                return False, f"Patient lacks required trigger conditions: {[t.get('display', t.get('code', '')) for t in trigger_conditions]}"
+        if rule.has_trigger_conditions:
+            if not rule.matches_conditions(self._get_patient_conditions(patient)):
+                return False, f"Patient lacks required trigger conditions: {[t.get('display', t.get('code', '')) for t in rule.trigger_conditions]}"
         
         return True, "Eligible"
     
     def get_trigger_conditions(self, screening_type: ScreeningType) -> List[Dict]:
         """Get trigger conditions from screening type"""
-        if not screening_type.trigger_conditions:
-            return []
-        
-        try:
-            # Handle HTML entities in JSON
-            clean_json = html.unescape(screening_type.trigger_conditions)
-            conditions = json.loads(clean_json)
-            return conditions if isinstance(conditions, list) else []
-        except (json.JSONDecodeError, TypeError):
-            logger.warning(f"Invalid trigger conditions JSON for {screening_type.name}")
+        return list(self.get_screening_rule(screening_type).trigger_conditions)
+    
+    def _get_patient_conditions(self, patient: Patient) -> List:
+        """Patient conditions from the dynamic relationship, or a snapshot's plain list"""
+        conditions = getattr(patient, 'conditions', None)
+        if conditions is None:
             return []
+        return conditions.all() if hasattr(conditions, 'all') else list(conditions)
     
     def patient_has_trigger_conditions(self, patient: Patient, trigger_conditions: List[Dict]) -> bool:
         """
@@ -83,12 +72,7 @@ class PatientDemographicsMixin:
         if not trigger_conditions:
             return True
         
-        # Get patient conditions (handle RelationshipProperty correctly)
-        try:
-            patient_conditions = patient.conditions.all() if hasattr(patient, 'conditions') else []
-        except AttributeError:
-            # Fallback if conditions relationship doesn't exist
-            patient_conditions = []
+        patient_conditions = self._get_patient_conditions(patient)
         
         for trigger in trigger_conditions:
             trigger_code = trigger.get('code', '')
@@ -138,42 +122,36 @@ class DocumentMatchingMixin:
     
     def _check_filename_keywords(self, screening_type: ScreeningType, document: MedicalDocument) -> Tuple[bool, str]:
         """Check if document filename matches screening keywords"""
-        if not screening_type.filename_keywords:
+        keyword_set = get_screening_rule_set().rule_for(screening_type).keyword_matcher.content
+        if not keyword_set.keywords:
             return False, "No filename keywords defined"
         
-        keywords = [k.strip().lower() for k in screening_type.filename_keywords.split(',') if k.strip()]
-        filename = document.filename.lower() if document.filename else ""
-        
-        matched_keywords = [k for k in keywords if k in filename]
+        filename = document.filename or ""
+        matched_keywords = list(keyword_set.keyword_confidences(PreparedText(filename))) if filename else []
         if matched_keywords:
             return True, f"Filename matched keywords: {', '.join(matched_keywords)}"
         
-        return False, f"Filename '{filename}' didn't match keywords: {', '.join(keywords)}"
+        return False, f"Filename '{filename.lower()}' didn't match keywords: {', '.join(keyword_set.keywords)}"
     
     def _check_content_keywords(self, screening_type: ScreeningType, document: MedicalDocument) -> Tuple[bool, str]:
         """Check if document content matches screening keywords"""
-        if not screening_type.content_keywords:
+        keyword_set = get_screening_rule_set().rule_for(screening_type).keyword_matcher.content
+        if not keyword_set.keywords:
             return False, "No content keywords defined"
         
-        keywords = [k.strip().lower() for k in screening_type.content_keywords.split(',') if k.strip()]
         content = getattr(document, 'content', '') or getattr(document, 'extracted_text', '') or ""
-        content = content.lower()
-        
-        matched_keywords = [k for k in keywords if k in content]
+        matched_keywords = list(keyword_set.keyword_confidences(PreparedText(content))) if content.strip() else []
         if matched_keywords:
             return True, f"Content matched keywords: {', '.join(matched_keywords)}"
         
-        return False, f"Content didn't match keywords: {', '.join(keywords)}"
+        return False, f"Content didn't match keywords: {', '.join(keyword_set.keywords)}"
     
     def _check_section_keywords(self, screening_type: ScreeningType, document: MedicalDocument) -> Tuple[bool, str]:
-        """Check if document section matches screening keywords"""
-        # Check if screening type has section-based keywords
-        section_keywords = getattr(screening_type, 'section_keywords', None) or getattr(screening_type, 'keywords', None)
-        if not section_keywords:
+        """Check if document section matches screening document keywords"""
+        keyword_set = get_screening_rule_set().rule_for(screening_type).keyword_matcher.document
+        if not keyword_set.keywords:
             return False, "No section keywords defined"
         
-        keywords = [k.strip().lower() for k in section_keywords.split(',') if k.strip()]
-        
         # Check various document section fields
         section_fields = [
             getattr(document, 'section', ''),
@@ -183,12 +161,11 @@ class DocumentMatchingMixin:
         
         for field in section_fields:
             if field:
-                field_lower = field.lower()
-                matched_keywords = [k for k in keywords if k in field_lower]
+                matched_keywords = list(keyword_set.keyword_confidences(PreparedText(field)))
                 if matched_keywords:
                     return True, f"Section '{field}' matched keywords: {', '.join(matched_keywords)}"
         
-        return False, f"No section matches for keywords: {', '.join(keywords)}"
+        return False, f"No section matches for keywords: {', '.join(keyword_set.keywords)}"
 
 
 class ScreeningStatusMixin:
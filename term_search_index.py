@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Term Search Index
+Shared in-memory index over medical terms for autocomplete and terminology normalization.
+A prefix trie over every word start answers type-ahead queries, and a trigram inverted index
+finds fuzzy candidates so only terms that can reach the similarity threshold are scored.
+Terms can be added or removed at runtime; each term maps to a key (e.g. a condition name) so several
+aliases or display names can rank the same result.
+"""
+
+import heapq
+import re
+import threading
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set
+
+# Match tiers, best first
+TIER_EXACT = 0
+TIER_TERM_PREFIX = 1
+TIER_WORD_PREFIX = 2
+TIER_SUBSTRING = 3
+TIER_FUZZY = 4
+
+# Trie depth; longer queries are verified against the candidates found at this depth
+MAX_PREFIX_LENGTH = 32
+
+_WORD_START = re.compile(r'(?:^|(?<=[^a-z0-9]))[a-z0-9]')
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase and collapse whitespace"""
+    return ' '.join(text.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm-style trigrams: each word padded with two leading spaces and one trailing space"""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchHit(NamedTuple):
+    key: Hashable
+    term: str
+    tier: int
+    similarity: float
+
+
+class _TrieNode:
+    __slots__ = ('children', 'term_ids', 'word_ids')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.term_ids: Set[int] = set()  # Terms starting with the path
+        self.word_ids: Set[int] = set()  # Terms with a later word starting with the path
+
+
+class TermSearchIndex:
+    """Prefix trie + trigram inverted index over terms, each mapped to a result key"""
+
+    def __init__(self, terms: Optional[Iterable] = None):
+        self._terms: List[str] = []
+        self._keys: List[Hashable] = []
+        self._term_ids: Dict[tuple, int] = {}
+        self._ids_by_key: Dict[Hashable, List[int]] = {}
+        self._removed: Set[int] = set()
+        self._trigrams: List[Set[str]] = []
+        self._postings: Dict[str, Set[int]] = {}  # Padded word trigrams, for similarity
+        self._inner_postings: Dict[str, Set[int]] = {}  # Raw trigrams, for substring lookups
+        self._root = _TrieNode()
+        self._lock = threading.RLock()
+        for term, key in terms or ():
+            self.add(term, key)
+
+    def __len__(self) -> int:
+        return len(self._terms) - len(self._removed)
+
+    def add(self, term: str, key: Hashable) -> int:
+        """Index a term for a key (idempotent); returns the term id"""
+        term = normalize_term(term)
+        with self._lock:
+            existing = self._term_ids.get((term, key))
+            if existing is not None:
+                return existing
+
+            term_id = len(self._terms)
+            self._terms.append(term)
+            self._keys.append(key)
+            self._term_ids[(term, key)] = term_id
+            self._ids_by_key.setdefault(key, []).append(term_id)
+
+            grams = trigrams(term)
+            self._trigrams.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(term_id)
+            for i in range(len(term) - 2):
+                self._inner_postings.setdefault(term[i:i + 3], set()).add(term_id)
+
+            for match in _WORD_START.finditer(term):
+                start = match.start()
+                node = self._root
+                for char in term[start:start + MAX_PREFIX_LENGTH]:
+                    node = node.children.setdefault(char, _TrieNode())
+                    (node.term_ids if start == 0 else node.word_ids).add(term_id)
+            return term_id
+
+    def remove(self, key: Hashable):
+        """Drop every term of a key (postings are left in place and skipped at query time)"""
+        with self._lock:
+            for term_id in self._ids_by_key.pop(key, ()):
+                self._removed.add(term_id)
+                del self._term_ids[(self._terms[term_id], key)]
+
+    def _prefix_candidates(self, query: str) -> Optional[_TrieNode]:
+        node = self._root
+        for char in query[:MAX_PREFIX_LENGTH]:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _trigram_overlaps(self, grams: Set[str], min_overlap: int) -> Dict[int, int]:
+        """Term id -> shared trigram count, for terms sharing at least min_overlap trigrams"""
+        counts: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in self._postings.get(gram, ()):
+                counts[term_id] = counts.get(term_id, 0) + 1
+        return {term_id: count for term_id, count in counts.items() if count >= min_overlap}
+
+    def search(self, query: str, limit: int = 10, fuzzy_threshold: float = 0.3,
+               key_filter: Optional[Callable[[Hashable], bool]] = None) -> List[SearchHit]:
+        """
+        Ranked top-k keys for a query: exact, term prefix, word prefix, substring, then fuzzy
+        (trigram similarity >= fuzzy_threshold; 0 disables fuzzy matching)
+        """
+        query = normalize_term(query or '')
+        if not query:
+            return []
+
+        best: Dict[Hashable, tuple] = {}
+
+        def offer(term_id: int, tier: int, similarity: float):
+            if term_id in self._removed:
+                return
+            key = self._keys[term_id]
+            if key_filter is not None and not key_filter(key):
+                return
+            term = self._terms[term_id]
+            rank = (tier, -similarity, len(term), term)
+            if key not in best or rank < best[key][0]:
+                best[key] = (rank, SearchHit(key, term, tier, similarity))
+
+        with self._lock:
+            node = self._prefix_candidates(query)
+            if node is not None:
+                for term_id in node.term_ids:
+                    term = self._terms[term_id]
+                    if term.startswith(query):
+                        offer(term_id, TIER_EXACT if term == query else TIER_TERM_PREFIX, 1.0)
+                for term_id in node.word_ids:
+                    term = self._terms[term_id]
+                    if any(term.startswith(query, m.start()) for m in _WORD_START.finditer(term)):
+                        offer(term_id, TIER_WORD_PREFIX, 1.0)
+
+            # Substrings inside words: every trigram of the query must occur in the term
+            if len(best) < limit:
+                if len(query) >= 3:
+                    postings = sorted(
+                        (self._inner_postings.get(query[i:i + 3], set()) for i in range(len(query) - 2)), key=len
+                    )
+                    candidates = set(postings[0]).intersection(*postings[1:])
+                else:
+                    candidates = set()
+                    for gram, term_ids in self._inner_postings.items():
+                        if query in gram:
+                            candidates |= term_ids
+                for term_id in candidates:
+                    if query in self._terms[term_id]:
+                        offer(term_id, TIER_SUBSTRING, 1.0)
+
+            if fuzzy_threshold > 0 and len(best) < limit:
+                query_grams = trigrams(query)
+                if query_grams:
+                    # similarity <= overlap / |query trigrams|, so fewer shared trigrams can't qualify
+                    min_overlap = max(1, int(fuzzy_threshold * len(query_grams) + 0.999999))
+                    for term_id, overlap in self._trigram_overlaps(query_grams, min_overlap).items():
+                        similarity = overlap / (len(query_grams) + len(self._trigrams[term_id]) - overlap)
+                        if similarity >= fuzzy_threshold:
+                            offer(term_id, TIER_FUZZY, similarity)
+
+        return [hit for _, hit in heapq.nsmallest(limit, best.values(), key=lambda item: item[0])]
+
+    def best_match(self, query: str, min_ratio: float,
+                   key_filter: Optional[Callable[[Hashable], bool]] = None) -> Optional[SearchHit]:
+        """
+        Key of the term most similar to the query by SequenceMatcher ratio (>= min_ratio). Only
+        terms sharing a trigram and passing the length bound ratio <= 2*min(len)/(sum of lens)
+        are scored; ties go to the earliest added term.
+        """
+        query = normalize_term(query or '')
+        if not query:
+            return None
+
+        with self._lock:
+            candidates = set(self._trigram_overlaps(trigrams(query), 1))
+            best_hit, best_ratio = None, 0.0
+            for term_id in sorted(candidates - self._removed):
+                key = self._keys[term_id]
+                if key_filter is not None and not key_filter(key):
+                    continue
+                term = self._terms[term_id]
+                if 2 * min(len(term), len(query)) < min_ratio * (len(term) + len(query)):
+                    continue
+                ratio = SequenceMatcher(None, query, term).ratio()
+                if ratio > best_ratio and ratio >= min_ratio:
+                    best_hit, best_ratio = SearchHit(key, term, TIER_FUZZY, ratio), ratio
+            return best_hit
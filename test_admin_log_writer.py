@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test that admin log entries written through the admin log writer keep their details,
+both for queued (batched) entries and for synchronously written security events
+"""
+
+import sys
+import os
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from models import AdminLog
+from admin_log_writer import admin_log_writer
+
+
+def _logged_details(request_id):
+    db.session.expire_all()
+    entry = AdminLog.query.filter_by(request_id=request_id).one()
+    return entry.event_details_dict
+
+
+def test_queued_entry_keeps_details():
+    """Entries batched by the background writer are stored with their details"""
+    request_id = f"test-{uuid.uuid4().hex[:12]}"
+    with app.app_context():
+        db.create_all()
+        logged = AdminLog.log_event(
+            event_type='data_modification',
+            event_details={'action': 'edit', 'patient_id': 42},
+            request_id=request_id,
+        )
+        assert logged.event_details_dict == {'action': 'edit', 'patient_id': 42}
+        assert admin_log_writer.flush()
+
+        assert _logged_details(request_id) == {'action': 'edit', 'patient_id': 42}
+
+
+def test_security_event_written_synchronously_keeps_details():
+    """Security events are on disk, with their details, as soon as log_event returns"""
+    request_id = f"test-{uuid.uuid4().hex[:12]}"
+    with app.app_context():
+        db.create_all()
+        AdminLog.log_event(
+            event_type='login_fail',
+            event_details={'username': 'nobody', 'reason': 'bad password'},
+            request_id=request_id,
+        )
+
+        assert _logged_details(request_id) == {'username': 'nobody', 'reason': 'bad password'}
+
+
+if __name__ == "__main__":
+    test_queued_entry_keeps_details()
+    test_security_event_written_synchronously_keeps_details()
+    print("✓ Admin log writer tests passed")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test the bulk screening engine's set-based write path against PostgreSQL: the COPY + INSERT ...
+ON CONFLICT screening upsert and the screening_documents link diff, including the rows and round
+trips they report. Skipped on other databases (the write path uses COPY and ON CONFLICT).
+"""
+
+import sys
+import os
+import uuid
+import asyncio
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import app, db
+from models import Patient, ScreeningType, Screening, MedicalDocument, screening_documents
+from high_performance_bulk_screening_engine import HighPerformanceBulkScreeningEngine
+
+
+def _asyncpg_url():
+    """The app's database URL in the plain postgresql:// form asyncpg accepts"""
+    return db.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def chart():
+    """Two patients, two screening types and three documents, removed afterwards"""
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip("bulk screening write path requires PostgreSQL")
+        db.create_all()
+
+        suffix = uuid.uuid4().hex[:8]
+        patients = [
+            Patient(first_name='Bulk', last_name=f'Writer{n}', mrn=f'BW{n}{suffix}',
+                    date_of_birth=date(1970, 1, 1), sex='Female')
+            for n in range(2)
+        ]
+        screening_types = [ScreeningType(name=f'Bulk Writer {name} {suffix}', is_active=True)
+                           for name in ('A1C', 'Mammogram')]
+        db.session.add_all(patients + screening_types)
+        db.session.flush()
+        documents = [MedicalDocument(patient_id=patients[n].id, filename=f'doc{n}.txt', content='note')
+                     for n in (0, 0, 1)]
+        db.session.add_all(documents)
+        db.session.commit()
+
+        ids = {
+            'patients': [patient.id for patient in patients],
+            'screening_types': [screening_type.id for screening_type in screening_types],
+            'screening_type_names': [screening_type.name for screening_type in screening_types],
+            'documents': [document.id for document in documents],
+        }
+        try:
+            yield ids
+        finally:
+            db.session.rollback()
+            screening_ids = [screening_id for (screening_id,) in db.session.query(Screening.id).filter(
+                Screening.patient_id.in_(ids['patients'])
+            )]
+            db.session.execute(screening_documents.delete().where(
+                screening_documents.c.screening_id.in_(screening_ids)
+            ))
+            Screening.query.filter(Screening.id.in_(screening_ids)).delete(synchronize_session=False)
+            MedicalDocument.query.filter(MedicalDocument.id.in_(ids['documents'])).delete(synchronize_session=False)
+            ScreeningType.query.filter(ScreeningType.id.in_(ids['screening_types'])).delete(synchronize_session=False)
+            Patient.query.filter(Patient.id.in_(ids['patients'])).delete(synchronize_session=False)
+            db.session.commit()
+
+
+def _screening(chart, type_index, status, documents):
+    return {
+        'screening_type_id': chart['screening_types'][type_index],
+        'screening_type': chart['screening_type_names'][type_index],
+        'status': status,
+        'due_date': date(2027, 1, 1),
+        'last_completed': None,
+        'frequency': 'Every 1 year',
+        'matched_documents': documents,
+    }
+
+
+def _write(batch):
+    """Run one batch write; returns (result, rows written, round trips)"""
+    async def run():
+        engine = HighPerformanceBulkScreeningEngine(_asyncpg_url())
+        assert await engine.connection_pool.initialize()
+        try:
+            result = await engine._write_screenings_batch_async(batch)
+            return result, engine.metrics.rows_written, engine.metrics.database_round_trips
+        finally:
+            await engine.connection_pool.close()
+
+    return asyncio.run(run())
+
+
+def _stored(chart):
+    """{(patient_id, screening_type_id): (status, linked document ids)} and chart versions"""
+    db.session.expire_all()
+    screenings = Screening.query.filter(Screening.patient_id.in_(chart['patients'])).all()
+    links = db.session.execute(screening_documents.select().where(
+        screening_documents.c.screening_id.in_([screening.id for screening in screenings])
+    )).all()
+    stored = {
+        (screening.patient_id, screening.screening_type_id): (
+            screening.status,
+            sorted(link.document_id for link in links if link.screening_id == screening.id),
+        )
+        for screening in screenings
+    }
+    versions = [db.session.get(Patient, patient_id).chart_version for patient_id in chart['patients']]
+    return stored, versions
+
+
+def test_batch_upsert_and_link_diff(chart):
+    first, second = chart['patients']
+    a1c, mammogram = chart['screening_types']
+    doc1, doc2, doc3 = chart['documents']
+
+    with app.app_context():
+        _, versions_before = _stored(chart)
+
+        # Insert: two screenings, three links, in one transaction of six round trips
+        batch = {first: [_screening(chart, 0, 'Due', [doc1, doc2])], second: [_screening(chart, 1, 'Due', [doc3])]}
+        result, rows_written, round_trips = _write(batch)
+        assert result == {'screenings_updated': 2, 'documents_linked': 3}
+        assert (rows_written, round_trips) == (5, 6)
+        stored, versions = _stored(chart)
+        assert stored == {(first, a1c): ('Due', [doc1, doc2]), (second, mammogram): ('Due', [doc3])}
+        assert all(after > before for before, after in zip(versions_before, versions))
+
+        # Unchanged screenings and links are not rewritten and leave chart versions alone
+        result, rows_written, round_trips = _write(batch)
+        assert (rows_written, round_trips) == (0, 6)
+        assert _stored(chart) == (stored, versions)
+
+        # Changed status and links: doc1 unlinked, doc2 kept, a missing document id skipped
+        missing_document_id = max(chart['documents']) + 1000000
+        result, rows_written, _ = _write({first: [_screening(chart, 0, 'Complete', [doc2, missing_document_id])]})
+        assert result == {'screenings_updated': 1, 'documents_linked': 1}
+        assert rows_written == 2  # One screening updated, one link removed
+        stored_after, versions_after = _stored(chart)
+        assert stored_after == {(first, a1c): ('Complete', [doc2]), (second, mammogram): ('Due', [doc3])}
+        assert versions_after[0] > versions[0] and versions_after[1] == versions[1]
+
+
+def test_patients_written_in_batches(chart):
+    """Generated screenings are written per write batch, and patients without any are still counted"""
+    first, second = chart['patients']
+    generated = {first: [_screening(chart, 0, 'Due', chart['documents'][:2])], second: []}
+
+    async def run():
+        engine = HighPerformanceBulkScreeningEngine(_asyncpg_url())
+        assert await engine.connection_pool.initialize()
+        engine.write_batch_size = 1
+        engine._generate_patient_screenings_sync = generated.get
+        try:
+            await engine._process_patients_in_batches([{'id': first}, {'id': second}])
+            return engine.metrics
+        finally:
+            await engine.connection_pool.close()
+
+    with app.app_context():
+        metrics = asyncio.run(run())
+        assert (metrics.processed_patients, metrics.failed_patients) == (2, 0)
+        assert (metrics.total_screenings_updated, metrics.total_documents_linked) == (1, 2)
+        assert metrics.database_round_trips == 6  # Only the batch with screenings writes
+        assert _stored(chart)[0] == {(first, chart['screening_types'][0]): ('Due', chart['documents'][:2])}
+
+
+def test_screenings_without_type_id_are_skipped(chart):
+    first = chart['patients'][0]
+    screening = _screening(chart, 0, 'Due', [])
+    del screening['screening_type_id']
+
+    with app.app_context():
+        result, rows_written, round_trips = _write({first: [screening]})
+        assert result == {'screenings_updated': 0, 'documents_linked': 0}
+        assert (rows_written, round_trips) == (0, 0)
+        assert _stored(chart)[0] == {}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
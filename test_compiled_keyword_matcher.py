@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test the compiled keyword matcher's match semantics and confidences
+"""
+
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compiled_keyword_matcher import CompiledKeywordSet, ScreeningKeywordMatcher, ScreeningKeywordIndex
+
+
+def _screening_type(type_id, name, content_keywords, document_keywords=()):
+    return SimpleNamespace(
+        id=type_id, name=name, updated_at=datetime(2025, 1, 1),
+        get_content_keywords=lambda: list(content_keywords),
+        get_document_keywords=lambda: list(document_keywords),
+    )
+
+
+def _document(doc_id, content, filename='', document_type=''):
+    return SimpleNamespace(
+        id=doc_id, content=content, ocr_text=None, filename=filename,
+        document_name=None, document_type=document_type, updated_at=datetime(2025, 1, 2),
+    )
+
+
+def _confidences(keywords, text):
+    result = CompiledKeywordSet(keywords).match(text, 'content')
+    return {m['keyword']: m['confidence'] for m in result['matches']}
+
+
+def test_confidence_levels():
+    """Exact 0.95, phrase 0.9, case variant 0.8, character variant 0.7 and partial 0.6"""
+    cases = [
+        # Exact word, case-insensitive, bounded by any non-alphanumeric character
+        (['mammogram'], "Screening mammogram completed", 0.95),
+        (['a1c'], "2025_A1C-result.pdf", 0.95),
+        # Phrase words joined by whitespace, '-', '_', '.' or nothing
+        (['breast US'], "Follow-up breast_US recommended", 0.9),
+        (['bone density'], "BONE-DENSITY scan", 0.9),
+        (['bone density'], "bonedensity", 0.9),
+        # Keywords up to 4 characters: '1' may read as 'l' or 'I'
+        (['a1c'], "Hemoglobin Alc 6.1", 0.8),
+        (['hba1'], "hbal", 0.8),
+        # 3-character keywords: per-character variants ('a' as '@', 'o' as '0', 's' as '5', ...)
+        (['a1c'], "Hemoglobin @1c 6.1", 0.7),
+        (['pso'], "p50 noted", 0.7),
+        # Keywords over 3 characters also match inside longer words
+        (['mammogram'], "bilateral mammograms", 0.6),
+        (['dexa'], "xdexa", 0.6),
+    ]
+    for keywords, text, confidence in cases:
+        assert _confidences(keywords, text) == {keywords[0]: confidence}, (keywords, text)
+
+    # Nothing matches short keywords inside words, or variants the keyword length doesn't allow
+    for keywords, text in [(['a1c'], "ha1cx"), (['ct'], "octet"), (['pap'], "p@psmear"), (['dexa'], "d3xa")]:
+        assert _confidences(keywords, text) == {}, (keywords, text)
+
+
+def test_no_false_positive_abbreviations():
+    """Short keywords must not match inside longer words"""
+    negative_cases = [
+        "Patient has suspicious lesions identified",
+        "OUTPATIENT PROCEDURE SUMMARY",
+        "Status update provided to family",
+    ]
+    for text in negative_cases:
+        assert _confidences(['breast US', 'us'], text) == {}
+
+
+def test_overlapping_keywords_all_reported():
+    """Every keyword hit is reported, including overlapping phrases"""
+    keywords = ['colon cancer screening', 'cancer screening', 'colon']
+    result = CompiledKeywordSet(keywords).match("Colon cancer screening due", 'content')
+    assert [m['keyword'] for m in result['matches']] == keywords
+    assert result['confidence'] == (0.9 + 0.9 + 0.95) / 3
+
+
+def test_screening_keyword_matcher_sets():
+    """Content and document keyword sets are compiled separately"""
+    matcher = ScreeningKeywordMatcher(['dexa', ' '], ['radiology'])
+    assert matcher.has_keywords
+    assert matcher.content.match("DEXA scan", 'content')['matched']
+    assert not matcher.document.match("DEXA scan", 'document_type')['matched']
+    assert matcher.document.match("Radiology Report", 'document_type')['matched']
+    assert not ScreeningKeywordMatcher([], []).has_keywords
+
+
+def test_keyword_index_matches_per_type_scoring():
+    """One pass over the inverted index yields the same matches as scoring each screening type"""
+    screening_types = [
+        _screening_type(1, 'Mammogram', ['mammogram', 'breast US']),
+        _screening_type(2, 'A1C', ['a1c', 'hba1c']),
+        _screening_type(3, 'Colonoscopy', ['colonoscopy'], ['gastroenterology']),
+        _screening_type(4, 'No Keywords', []),
+    ]
+    index = ScreeningKeywordIndex(screening_types)
+    document = _document(10, "Hemoglobin Alc 6.1; breast-us normal", 'labs_2025.pdf', 'Gastroenterology')
+
+    results = index.match_document(document)
+    assert set(results) == {1, 2, 3}
+    for screening_type in screening_types[:3]:
+        matches, confidence = ScreeningKeywordMatcher.from_screening_type(screening_type).score_document(document)
+        assert results[screening_type.id]['confidence'] == confidence
+        assert results[screening_type.id]['matched_keywords'] == matches
+
+    # Memoized per (document id, updated_at, keyword config version)
+    assert index.match_document(document) is results
+
+
+if __name__ == "__main__":
+    test_confidence_levels()
+    test_no_false_positive_abbreviations()
+    test_overlapping_keywords_all_reported()
+    test_screening_keyword_matcher_sets()
+    test_keyword_index_matches_per_type_scoring()
+    print("✅ Compiled keyword matcher tests passed")
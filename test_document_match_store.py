@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test that the bulk screening engine resolves keyword matches through the persisted document
+match store: the first run stores a row per (document, screening type), later runs reuse them,
+and only a document whose text changed is rescanned. Runs against PostgreSQL (the bulk engine
+reads and writes with asyncpg); skipped on other databases.
+"""
+
+import sys
+import os
+import json
+import uuid
+import asyncio
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import app, db
+from models import (
+    Patient, ScreeningType, MedicalDocument, DocumentScreeningMatch, Screening, screening_documents,
+)
+from document_match_store import document_match_store
+from high_performance_bulk_screening_engine import HighPerformanceBulkScreeningEngine
+
+
+def _asyncpg_url():
+    """The app's database URL in the plain postgresql:// form asyncpg accepts"""
+    return db.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def patient():
+    """A patient with one document matching a new screening type's keyword and one that doesn't"""
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip("bulk screening engine requires PostgreSQL")
+        db.create_all()
+
+        suffix = uuid.uuid4().hex[:8]
+        keyword = f'colo{suffix}'
+        patient = Patient(first_name='Match', last_name='Store', mrn=f'MS{suffix}',
+                          date_of_birth=date(1960, 1, 1), sex='Male')
+        screening_type = ScreeningType(name=f'Match Store Colonoscopy {suffix}', is_active=True, status='active',
+                                       frequency_number=10, frequency_unit='years',
+                                       content_keywords=json.dumps([keyword]))
+        db.session.add_all([patient, screening_type])
+        db.session.flush()
+        documents = [
+            MedicalDocument(patient_id=patient.id, filename='gi.txt', content=f'{keyword} without findings',
+                            document_date=date(2025, 6, 1)),
+            MedicalDocument(patient_id=patient.id, filename='visit.txt', content='Routine visit',
+                            document_date=date(2025, 7, 1)),
+        ]
+        db.session.add_all(documents)
+        db.session.commit()
+
+        ids = {'patient': patient.id, 'screening_type': screening_type.id, 'keyword': keyword,
+               'documents': [document.id for document in documents]}
+        try:
+            yield ids
+        finally:
+            db.session.rollback()
+            screening_ids = [screening_id for (screening_id,) in
+                             db.session.query(Screening.id).filter_by(patient_id=ids['patient'])]
+            db.session.execute(screening_documents.delete().where(
+                screening_documents.c.screening_id.in_(screening_ids)
+            ))
+            Screening.query.filter(Screening.id.in_(screening_ids)).delete(synchronize_session=False)
+            DocumentScreeningMatch.query.filter(DocumentScreeningMatch.document_id.in_(ids['documents'])).delete(
+                synchronize_session=False
+            )
+            MedicalDocument.query.filter(MedicalDocument.id.in_(ids['documents'])).delete(synchronize_session=False)
+            ScreeningType.query.filter_by(id=ids['screening_type']).delete()
+            Patient.query.filter_by(id=ids['patient']).delete()
+            db.session.commit()
+
+
+def _bulk_run(patient_id):
+    """Process one patient through the bulk engine's default (thread) path; returns store stat deltas"""
+    async def run():
+        engine = HighPerformanceBulkScreeningEngine(_asyncpg_url())
+        assert await engine.connection_pool.initialize()
+        try:
+            await engine._process_patients_in_batches([{'id': patient_id}])
+            assert engine.metrics.failed_patients == 0
+        finally:
+            await engine.connection_pool.close()
+
+    before = document_match_store.get_stats()
+    asyncio.run(run())
+    after = document_match_store.get_stats()
+    return {key: after[key] - before[key] for key in after}
+
+
+def _stored_rows(patient):
+    db.session.expire_all()
+    return {
+        row.document_id: row
+        for row in DocumentScreeningMatch.query.filter(
+            DocumentScreeningMatch.document_id.in_(patient['documents']),
+            DocumentScreeningMatch.screening_type_id == patient['screening_type'],
+        )
+    }
+
+
+def test_bulk_path_persists_and_reuses_matches(patient):
+    matching, other = patient['documents']
+
+    with app.app_context():
+        # First run scans both documents and stores a row per screening type
+        stats = _bulk_run(patient['patient'])
+        assert stats['documents_scanned'] == 2
+        rows = _stored_rows(patient)
+        assert set(rows) == {matching, other}
+        assert rows[matching].confidence > 0 and patient['keyword'] in rows[matching].matched_keywords
+        assert rows[other].confidence == 0
+        screening = Screening.query.filter_by(patient_id=patient['patient'],
+                                              screening_type_id=patient['screening_type']).one()
+        assert [document.id for document in screening.documents] == [matching]
+
+        # Second run reuses every stored row without reading document text
+        stats = _bulk_run(patient['patient'])
+        assert stats['documents_scanned'] == 0 and stats['rows_recomputed'] == 0
+        assert stats['rows_reused'] >= 2
+
+        # Only the edited document is rescanned
+        db.session.get(MedicalDocument, other).content = f"Follow-up {patient['keyword']} scheduled"
+        db.session.commit()
+        stats = _bulk_run(patient['patient'])
+        assert stats['documents_scanned'] == 1
+        assert _stored_rows(patient)[other].confidence > 0
+        db.session.expire_all()
+        screening = Screening.query.filter_by(patient_id=patient['patient'],
+                                              screening_type_id=patient['screening_type']).one()
+        assert sorted(document.id for document in screening.documents) == sorted([matching, other])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
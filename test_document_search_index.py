@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test that the document search index finds every document the compiled keyword matcher matches,
+so a keyword change never leaves an affected patient unrefreshed
+"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compiled_keyword_matcher import CompiledKeywordSet
+from document_search_index import build_document_search_text, changed_keywords, keyword_search_terms
+
+
+def _index_hit(keyword, text):
+    """Whether the search terms for keyword find a document with this content"""
+    search_text = build_document_search_text(text, None, None, None)
+    substrings, words = keyword_search_terms([keyword])
+    return (any(substring in search_text for substring in substrings)
+            or any(f' {word} ' in search_text for word in words))
+
+
+def _matcher_hit(keyword, text):
+    return CompiledKeywordSet([keyword]).match(text, 'content')['matched']
+
+
+def _assert_superset(keywords, texts):
+    for keyword in keywords:
+        for text in texts:
+            if _matcher_hit(keyword, text):
+                assert _index_hit(keyword, text), f"index misses {keyword!r} in {text!r}"
+
+
+def test_matches_next_to_accented_letters():
+    """Accented letters are word boundaries to the matcher, so they are to the index"""
+    for keyword, text in [('pap', 'Papé smear done'), ('hpv', 'HPVé negative'), ('mammogram', 'mammogramé')]:
+        assert _matcher_hit(keyword, text)
+        assert _index_hit(keyword, text)
+
+
+def test_fuzzy_variants():
+    """The matcher's character variants, including '@' for 'a', are searched"""
+    for keyword, text in [('a1c', 'Result @1c 6.1'), ('a1c', 'alc 7.0'), ('pap', 'p@p smear'),
+                          ('cbc', 'CBC panel'), ('a1c', 'HbA1c'), ('dexa', 'de-xa'), ('hba1', 'hbal')]:
+        if _matcher_hit(keyword, text):
+            assert _index_hit(keyword, text), (keyword, text)
+    assert _index_hit('a1c', 'Result @1c 6.1')
+
+
+def test_phrases_with_any_separators():
+    """Phrase words may be joined by separators or by nothing"""
+    texts = ['bone density scan', 'bone-density_scan', 'bonedensity.scan', 'BONE densityscan', 'bone. density  scan']
+    for text in texts:
+        assert _matcher_hit('bone density scan', text)
+        assert _index_hit('bone density scan', text)
+
+
+def test_index_hits_are_superset_of_matcher_matches():
+    """Randomized texts and keywords: every matcher match is an index hit"""
+    rng = random.Random(25)
+    alphabet = 'aA@1lIiıoO0sS5ſc é-_.\t'
+    words = ['pap', 'a1c', 'hpv', 'ct', 'dexa', 'mammo', 'colon', 'x-ray', 'bone', 'density', 'fobt']
+    texts = []
+    for _ in range(300):
+        parts = [rng.choice(words) if rng.random() < 0.5 else
+                 ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                 for _ in range(rng.randint(1, 6))]
+        texts.append(''.join(rng.choice(['', ' ', '-', '.', 'é']) + part for part in parts))
+    keywords = words + ['bone density', 'x ray', 'a1c test', 'ſcan', 'ıs', 'a.c', '-', 'hba1', 'pap smear']
+    keywords += [''.join(rng.choice('a1cios') for _ in range(3)) for _ in range(20)]
+
+    _assert_superset(keywords, texts)
+
+
+def test_changed_keywords_is_symmetric_difference():
+    assert changed_keywords(['Mammogram', 'a1c'], ['mammogram', 'dexa ']) == ['a1c', 'dexa']
+    assert changed_keywords(None, ['CT']) == ['ct']
+
+
+if __name__ == "__main__":
+    test_matches_next_to_accented_letters()
+    test_fuzzy_variants()
+    test_phrases_with_any_separators()
+    test_index_hits_are_superset_of_matcher_matches()
+    test_changed_keywords_is_symmetric_difference()
+    print("✓ Document search index tests passed")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed OCR result cache: keys, round trips and LRU eviction
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ocr_result_cache import OCRResultCache
+
+
+def test_key_depends_on_content_config_and_version():
+    """Identical bytes share a key only under the same config and preprocessing version"""
+    key = OCRResultCache.make_key(b"scan", "--oem 1", "v2:medical:.pdf")
+    assert key == OCRResultCache.make_key(b"scan", "--oem 1", "v2:medical:.pdf")
+    assert key != OCRResultCache.make_key(b"scan2", "--oem 1", "v2:medical:.pdf")
+    assert key != OCRResultCache.make_key(b"scan", "--oem 3", "v2:medical:.pdf")
+    assert key != OCRResultCache.make_key(b"scan", "--oem 1", "v2:none:.pdf")
+
+
+def test_round_trip_and_stats():
+    """Stored results are returned unchanged and counted as hits"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = OCRResultCache(cache_dir=cache_dir, max_bytes=1024 * 1024)
+        key = cache.make_key(b"scan", "cfg", "v1")
+        assert cache.get(key) is None
+
+        cache.put(key, "Mammogram normal", 91.5, ["high_confidence"])
+        entry = cache.get(key)
+        assert entry['text'] == "Mammogram normal"
+        assert entry['confidence'] == 91.5
+        assert entry['quality_flags'] == ["high_confidence"]
+        stats = cache.get_stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1 and stats['writes'] == 1
+
+
+def test_least_recently_used_entries_evicted():
+    """Past the size limit the least recently used entries are removed first"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = OCRResultCache(cache_dir=cache_dir, max_bytes=1500)
+        keys = [cache.make_key(str(i).encode(), "cfg", "v1") for i in range(3)]
+
+        for key in keys[:2]:
+            cache.put(key, "x" * 500, 90.0, [])
+        # Age both entries, then read the first so the second is the least recently used
+        past = time.time() - 60
+        for key in keys[:2]:
+            os.utime(cache._path(key), (past, past))
+        assert cache.get(keys[0]) is not None
+
+        cache.put(keys[2], "x" * 500, 90.0, [])
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[2]) is not None
+        assert cache.get_stats()['evictions'] == 1
+
+
+if __name__ == "__main__":
+    test_key_depends_on_content_config_and_version()
+    test_round_trip_and_stats()
+    test_least_recently_used_entries_evicted()
+    print("✅ OCR result cache tests passed")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test the streaming PHI filter produces the same redactions as filter_text
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from phi_filter import PHIFilter
+
+SAMPLE_LINES = [
+    "Patient: John Smith",
+    "DOB: 03/15/1985",
+    "SSN: 123-45-6789 Phone: (555) 123-4567",
+    "Address: 123 Main Street, Anytown",
+    "MRN: 1234567 Insurance ID: ABC123456789",
+    "Glucose: 120 mg/dL Blood Pressure: 120/80",
+    "Maria Lopez 04/20/2025",
+    "Seen on March 3, 2024 by Dr. Ann Lee",
+    "lipid panel normal",
+    "100-20-100 and 555.123.4567",
+]
+
+
+def _filter():
+    phi = PHIFilter()
+    phi.detector._patient_names_cache = {"Maria Lopez", "Maria", "Lopez"}
+    phi.detector._cache_timestamp = time.time()
+    return phi
+
+
+def _document(line_count):
+    return "\n".join(SAMPLE_LINES[i % len(SAMPLE_LINES)] for i in range(line_count))
+
+
+def test_stream_matches_filter_text():
+    """Small windows and arbitrary input pieces still produce filter_text's output"""
+    text = _document(200)
+    expected = _filter().filter_text(text)['filtered_text']
+
+    for chunk_size in (64, 150, 1000):
+        assert ''.join(_filter().filter_text_stream(text, chunk_size=chunk_size, overlap=200)) == expected
+
+    pieces = [text[i:i + 37] for i in range(0, len(text), 37)]
+    assert ''.join(_filter().filter_text_stream(pieces, chunk_size=300, overlap=150)) == expected
+
+
+def test_repeated_ssns_all_redacted():
+    """Every occurrence of a repeated SSN is redacted, not only the first"""
+    result = _filter().filter_text("100-20-100 first\nthen 100-20-100 again")
+    assert "100-20-100" not in result['filtered_text']
+
+
+def test_stream_statistics_by_type():
+    """Streaming keeps per-type statistics"""
+    phi = _filter()
+    ''.join(phi.filter_text_stream(_document(50), chunk_size=100, overlap=200))
+    stats = phi.get_filter_statistics()['stats']
+    assert stats['documents_processed'] == 1
+    assert stats['phi_types_detected']['ssn'] > 0
+    assert stats['phi_types_detected']['rostered_patient_name'] > 0
+
+
+if __name__ == "__main__":
+    test_stream_matches_filter_text()
+    test_repeated_ssns_all_redacted()
+    test_stream_statistics_by_type()
+    print("✅ Streaming PHI filter tests passed")
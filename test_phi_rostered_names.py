@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test rostered patient name detection keeps the per-name regex semantics of the PHI filter
+"""
+
+import sys
+import os
+import re
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from phi_filter import PHIFilterConfig, PHIPatternDetector, RosteredNameIndex
+
+
+def _regex_matches(text, names):
+    """Reference: one word-boundary regex per name"""
+    matches = []
+    for name in names:
+        if len(name.strip()) < 3:
+            continue
+        for match in re.finditer(r'\b' + re.escape(name) + r'\b', text, re.IGNORECASE):
+            matches.append((name, match.start(), match.end()))
+    return sorted(matches)
+
+
+def _detector(names):
+    detector = PHIPatternDetector(PHIFilterConfig())
+    detector._patient_names_cache = set(names)
+    detector._cache_timestamp = time.time()
+    return detector
+
+
+def test_index_matches_regex_semantics():
+    """Case-insensitive whole-word matches, overlapping names all reported"""
+    names = {"John", "Smith", "John Smith", "Anne-Marie", "O'Neil", "Jo", "Lee", "José"}
+    text = "JOHN SMITH met anne-marie o'neil; Johnson, smithy and josé lee-lee. John  Smith"
+    index = RosteredNameIndex()
+    index.sync(names)
+    assert sorted(index.find(text)) == _regex_matches(text, names)
+
+
+def test_index_incremental_sync():
+    """Removed names stop matching and added names match without a rebuild"""
+    index = RosteredNameIndex()
+    index.sync({"Alice Brown", "Alice", "Brown"})
+    index.sync({"Alice", "Carol"})
+    text = "Alice Brown and Carol"
+    assert sorted(index.find(text)) == _regex_matches(text, {"Alice", "Carol"})
+
+
+def test_medical_term_context_preserved():
+    """Names near medical terms are not flagged"""
+    detector = _detector({"Lipid", "Maria Lopez"})
+    detections = detector._detect_rostered_patient_names("Maria Lopez was seen today.\n" + " " * 30 + "Lipid panel ordered")
+    assert [d['patient_name'] for d in detections] == ["Maria Lopez"]
+    assert detections[0]['text'] == "Maria Lopez"
+    assert (detections[0]['start'], detections[0]['end']) == (0, 11)
+
+
+if __name__ == "__main__":
+    test_index_matches_regex_semantics()
+    test_index_incremental_sync()
+    test_medical_term_context_preserved()
+    print("✅ Rostered name detection tests passed")
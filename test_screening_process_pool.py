@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test the bulk screening engine's opt-in process pool mode against PostgreSQL: the asyncpg
+snapshot queries, and screening generation from those snapshots in real worker processes
+started with init_screening_worker, which must agree with the in-process unified engine.
+"""
+
+import sys
+import os
+import json
+import uuid
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import app, db
+from models import (
+    Patient, Condition, ScreeningType, ScreeningRuleVersion, MedicalDocument, Screening, screening_documents,
+)
+from high_performance_bulk_screening_engine import HighPerformanceBulkScreeningEngine
+from screening_process_pool import init_screening_worker, generate_screenings_for_snapshots
+from unified_screening_engine import unified_engine
+
+
+def _asyncpg_url():
+    """The app's database URL in the plain postgresql:// form asyncpg accepts"""
+    return db.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def patients():
+    """A female patient with a matching mammogram report and a condition, and a male patient"""
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip("bulk screening snapshots are loaded with asyncpg and require PostgreSQL")
+        db.create_all()
+
+        suffix = uuid.uuid4().hex[:8]
+        female = Patient(first_name='Pool', last_name='Female', mrn=f'PPF{suffix}',
+                         date_of_birth=date(1970, 5, 1), sex='Female')
+        male = Patient(first_name='Pool', last_name='Male', mrn=f'PPM{suffix}',
+                       date_of_birth=date(1965, 3, 2), sex='Male')
+        screening_type = ScreeningType(
+            name=f'Pool Mammogram {suffix}', is_active=True, status='active', gender_specific='Female',
+            min_age=40, frequency_number=1, frequency_unit='years',
+            content_keywords=json.dumps([f'mammo{suffix}']),
+        )
+        db.session.add_all([female, male, screening_type])
+        db.session.flush()
+        condition = Condition(patient_id=female.id, name='Family history of breast cancer', code='Z80.3',
+                              is_active=True, diagnosed_date=date(2020, 1, 1))
+        document = MedicalDocument(patient_id=female.id, filename='screening.txt', document_name='Imaging',
+                                   content=f'Bilateral mammo{suffix} normal', document_date=date(2026, 2, 1))
+        db.session.add_all([condition, document])
+        db.session.commit()
+
+        ids = {'female': female.id, 'male': male.id, 'screening_type': screening_type.id,
+               'condition': condition.id, 'document': document.id}
+        try:
+            yield ids
+        finally:
+            db.session.rollback()
+            screening_ids = [screening_id for (screening_id,) in db.session.query(Screening.id).filter(
+                Screening.patient_id.in_([ids['female'], ids['male']])
+            )]
+            db.session.execute(screening_documents.delete().where(
+                screening_documents.c.screening_id.in_(screening_ids)
+            ))
+            Screening.query.filter(Screening.id.in_(screening_ids)).delete(synchronize_session=False)
+            MedicalDocument.query.filter_by(id=ids['document']).delete()
+            Condition.query.filter_by(id=ids['condition']).delete()
+            ScreeningType.query.filter_by(id=ids['screening_type']).delete()
+            Patient.query.filter(Patient.id.in_([ids['female'], ids['male']])).delete(synchronize_session=False)
+            db.session.commit()
+
+
+def _load(patient_ids):
+    """(snapshots, config version) through the engine's asyncpg queries"""
+    async def run():
+        engine = HighPerformanceBulkScreeningEngine(_asyncpg_url())
+        assert await engine.connection_pool.initialize()
+        try:
+            return await engine._load_patient_snapshots(patient_ids), await engine._get_screening_config_version()
+        finally:
+            await engine.connection_pool.close()
+
+    return asyncio.run(run())
+
+
+def test_snapshot_query_shapes(patients):
+    missing_patient_id = max(patients['female'], patients['male']) + 1000000
+
+    with app.app_context():
+        snapshots, config_version = _load([patients['male'], missing_patient_id, patients['female']])
+        expected_version = db.session.query(ScreeningRuleVersion.version).filter_by(id=1).scalar() or 0
+
+    assert config_version == expected_version
+    # Ordered by patient id; unknown ids are left out
+    assert [snapshot['patient']['id'] for snapshot in snapshots] == sorted([patients['female'], patients['male']])
+
+    female, male = sorted(snapshots, key=lambda snapshot: snapshot['patient']['id'] != patients['female'])
+    assert set(female) == {'patient', 'conditions', 'documents'}
+    assert set(female['patient']) == {'id', 'first_name', 'last_name', 'mrn', 'date_of_birth', 'sex'}
+    assert female['patient']['date_of_birth'] == date(1970, 5, 1)
+
+    assert [condition['id'] for condition in female['conditions']] == [patients['condition']]
+    assert set(female['conditions'][0]) == {'id', 'patient_id', 'name', 'code', 'is_active', 'diagnosed_date'}
+
+    assert [document['id'] for document in female['documents']] == [patients['document']]
+    assert set(female['documents'][0]) == {'id', 'patient_id', 'filename', 'document_name', 'document_type',
+                                           'content', 'document_date', 'created_at', 'updated_at'}
+    assert female['documents'][0]['content'].startswith('Bilateral mammo')
+
+    assert male['conditions'] == [] and male['documents'] == []
+
+
+def test_worker_processes_match_in_process_engine(patients):
+    patient_ids = [patients['female'], patients['male']]
+
+    with app.app_context():
+        snapshots, config_version = _load(patient_ids)
+        expected = {patient_id: unified_engine.generate_patient_screenings(patient_id) for patient_id in patient_ids}
+        # Worker processes get their own connections; nothing may be left open in this one
+        db.session.rollback()
+
+    with ProcessPoolExecutor(max_workers=2, initializer=init_screening_worker) as pool:
+        results = {}
+        for chunk_result in pool.map(generate_screenings_for_snapshots, [[snapshot] for snapshot in snapshots],
+                                     [config_version] * len(snapshots)):
+            results.update(chunk_result)
+
+    assert results == expected
+    mammograms = [screening for screening in results[patients['female']]
+                  if screening['screening_type_id'] == patients['screening_type']]
+    assert len(mammograms) == 1
+    assert mammograms[0]['matched_documents'] == [patients['document']]
+    assert not any(screening['screening_type_id'] == patients['screening_type'] for screening in results[patients['male']])
+
+
+def test_pool_mode_generates_and_writes(patients):
+    """_process_patients_with_pool snapshots, generates in workers and writes through the batch writer"""
+    patient_ids = [patients['female'], patients['male']]
+
+    async def run():
+        engine = HighPerformanceBulkScreeningEngine(_asyncpg_url())
+        assert await engine.connection_pool.initialize()
+        engine.process_pool_workers = 2
+        engine.process_batch_size = 1
+        try:
+            await engine._process_patients_with_pool([{'id': patient_id} for patient_id in patient_ids])
+            return engine.metrics
+        finally:
+            await engine.shutdown()
+
+    with app.app_context():
+        expected = {patient_id: unified_engine.generate_patient_screenings(patient_id) for patient_id in patient_ids}
+        db.session.rollback()
+
+        metrics = asyncio.run(run())
+        assert (metrics.processed_patients, metrics.failed_patients, metrics.circuit_breaker_trips) == (2, 0, 0)
+        assert metrics.total_screenings_updated == sum(len(screenings) for screenings in expected.values())
+
+        db.session.expire_all()
+        stored = Screening.query.filter(Screening.patient_id.in_(patient_ids)).all()
+        assert sorted((s.patient_id, s.screening_type_id) for s in stored) == sorted(
+            (patient_id, screening['screening_type_id'])
+            for patient_id, screenings in expected.items() for screening in screenings
+        )
+        mammogram = next(s for s in stored if s.screening_type_id == patients['screening_type'])
+        assert mammogram.patient_id == patients['female']
+        assert [document.id for document in mammogram.documents] == [patients['document']]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
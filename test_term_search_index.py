@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the term search index ranking, runtime updates and SequenceMatcher-compatible best match
+"""
+
+import sys
+import os
+from difflib import SequenceMatcher
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from term_search_index import TermSearchIndex, TIER_EXACT, TIER_TERM_PREFIX, TIER_WORD_PREFIX, TIER_SUBSTRING, TIER_FUZZY
+
+TERMS = [
+    ("Diabetes mellitus", "diabetes"),
+    ("Type 2 diabetes mellitus", "type 2 diabetes"),
+    ("Hypertension", "hypertension"),
+    ("High blood pressure", "hypertension"),
+    ("Hypercholesterolemia", "high cholesterol"),
+    ("Prediabetes", "prediabetes"),
+]
+
+
+def test_ranking_tiers():
+    """Exact before prefix before word prefix before substring before fuzzy"""
+    index = TermSearchIndex(TERMS)
+    hits = index.search("diabetes", 10)
+    assert [(hit.key, hit.tier) for hit in hits] == [
+        ("diabetes", TIER_TERM_PREFIX),
+        ("type 2 diabetes", TIER_WORD_PREFIX),
+        ("prediabetes", TIER_SUBSTRING),
+    ]
+    assert index.search("hypertension")[0].tier == TIER_EXACT
+    assert index.search("blood")[0].key == "hypertension"
+    fuzzy = index.search("hypertenshun")
+    assert fuzzy[0].key == "hypertension" and fuzzy[0].tier == TIER_FUZZY
+    assert index.search("xyzzy") == []
+
+
+def test_limit_and_key_filter():
+    index = TermSearchIndex(TERMS)
+    assert len(index.search("e", 2)) == 2
+    hits = index.search("diab", 10, key_filter=lambda key: key != "diabetes")
+    assert "diabetes" not in [hit.key for hit in hits]
+
+
+def test_runtime_add_and_remove():
+    index = TermSearchIndex(TERMS)
+    index.add("Post COVID-19 condition", "long covid")
+    assert index.search("post cov")[0].key == "long covid"
+    index.remove("long covid")
+    assert index.search("post cov") == []
+    index.add("Long COVID", "long covid")
+    assert index.search("long")[0].key == "long covid"
+
+
+def test_best_match_agrees_with_full_scan():
+    """Pruned scoring returns what a SequenceMatcher scan over every term would"""
+    index = TermSearchIndex(TERMS)
+    for query in ["diabetis mellitus", "hypertenshun", "hypercholesterolmia", "high blod pressure", "asthma"]:
+        expected_key, expected_ratio = None, 0.0
+        for term, key in TERMS:
+            ratio = SequenceMatcher(None, query, term.lower()).ratio()
+            if ratio > expected_ratio and ratio >= 0.7:
+                expected_key, expected_ratio = key, ratio
+        match = index.best_match(query, 0.7)
+        assert (match.key if match else None) == expected_key
+        if match:
+            assert match.similarity == expected_ratio
+
+
+if __name__ == "__main__":
+    test_ranking_tiers()
+    test_limit_and_key_filter()
+    test_runtime_add_and_remove()
+    test_best_match_agrees_with_full_scan()
+    print("✅ Term search index tests passed")
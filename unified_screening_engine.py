@@ -5,12 +5,15 @@ Consolidates all screening logic with proper keyword matching, demographic filte
 """
 
 import json
-import re
 import html
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional, Tuple, Set
+from typing import List, Dict, Optional, Tuple, Set, Any
 from app import app, db
 from models import Patient, ScreeningType, Screening, MedicalDocument
+from compiled_keyword_matcher import keyword_config_version, ScreeningKeywordIndex
+from screening_rule_set import get_screening_rule_set
+from document_match_store import document_match_store
+from sqlalchemy.orm import defer
 import logging
 
 # Import the shared utilities to eliminate duplicate logic
@@ -32,6 +35,7 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
     
     def __init__(self):
         super().__init__()  # Initialize the base class
+        self._keyword_index = None
     
     def process_patient_screenings(self, patient_id: int) -> List[Dict[str, Any]]:
         """
@@ -98,27 +102,60 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         if not patient:
             return []
         
-        # Get all active screening types
-        all_screening_types = ScreeningType.query.filter_by(is_active=True).all()
+        # Compiled rules of all active screening types (shared snapshot, no per-call query)
+        all_screening_types = get_screening_rule_set().rules
+        
+        # Load the patient's documents once (text deferred) and resolve their matches against every
+        # screening type from the persisted match store; only changed documents are rescanned
+        patient_documents = MedicalDocument.query.options(
+            defer(MedicalDocument.content), defer(MedicalDocument.binary_data)
+        ).filter_by(patient_id=patient.id).all()
+        
+        return self.generate_screenings_from_data(patient, all_screening_types, patient_documents)
+    
+    def generate_screenings_from_data(self, patient, screening_types: List[ScreeningType],
+                                      patient_documents: List) -> List[Dict]:
+        """
+        Generate screenings from preloaded patient, screening type and document data
+        
+        Used directly by worker processes that receive patient/document snapshots;
+        the only database access is the persisted document match store.
+        
+        Args:
+            patient: Patient object (or snapshot with the same attributes)
+            screening_types: Active screening types (ORM rows or compiled ScreeningRules)
+            patient_documents: The patient's documents (or snapshots)
+            
+        Returns:
+            List of screening dictionaries with status determinations
+        """
+        rule_set = get_screening_rule_set()
+        screening_types = [rule_set.rule_for(screening_type) for screening_type in screening_types]
+        keyword_index = self.get_keyword_index(screening_types)
+        document_matches = document_match_store.get_document_matches(patient_documents, keyword_index)
         
         # Generate eligible screenings with priority logic
         eligible_screenings = []
-        for screening_type in all_screening_types:
+        for screening_type in screening_types:
             # Check if patient is eligible for this screening type
             is_eligible, reason = self.is_patient_eligible(patient, screening_type)
             
             if is_eligible:
                 # Generate screening data
-                screening_data = self._generate_screening_data(patient, screening_type)
+                screening_data = self._generate_screening_data(
+                    patient, screening_type, patient_documents, document_matches
+                )
                 if screening_data:
                     eligible_screenings.append(screening_data)
         
         # Apply variant priority logic - trigger-conditioned screenings win over general variants
-        prioritized_screenings = self._apply_variant_priority_logic(eligible_screenings)
+        screening_types_by_id = {screening_type.id: screening_type for screening_type in screening_types}
+        prioritized_screenings = self._apply_variant_priority_logic(eligible_screenings, screening_types_by_id)
         
         return prioritized_screenings
     
-    def _apply_variant_priority_logic(self, eligible_screenings: List[Dict]) -> List[Dict]:
+    def _apply_variant_priority_logic(self, eligible_screenings: List[Dict],
+                                      screening_types_by_id: Optional[Dict[int, ScreeningType]] = None) -> List[Dict]:
         """
         Apply priority logic for screening variants:
         - Trigger-conditioned screenings take precedence over general variants
@@ -126,6 +163,7 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         
         Args:
             eligible_screenings: List of eligible screening data dictionaries
+            screening_types_by_id: Preloaded screening types (queried by id when omitted)
             
         Returns:
             List of screening data with variants prioritized correctly
@@ -154,13 +192,14 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
                 final_screenings.extend(screenings_group)
             else:
                 # Multiple variants - apply priority logic
-                prioritized_screening = self._select_highest_priority_variant(screenings_group)
+                prioritized_screening = self._select_highest_priority_variant(screenings_group, screening_types_by_id)
                 if prioritized_screening:
                     final_screenings.append(prioritized_screening)
         
         return final_screenings
     
-    def _select_highest_priority_variant(self, variant_screenings: List[Dict]) -> Optional[Dict]:
+    def _select_highest_priority_variant(self, variant_screenings: List[Dict],
+                                         screening_types_by_id: Optional[Dict[int, ScreeningType]] = None) -> Optional[Dict]:
         """
         Select the highest priority variant from a group of competing screenings
         
@@ -171,6 +210,7 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         
         Args:
             variant_screenings: List of screening data for the same base type
+            screening_types_by_id: Preloaded screening types (queried by id when omitted)
             
         Returns:
             The highest priority screening data dictionary
@@ -181,16 +221,19 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         # Get the actual ScreeningType objects to check trigger conditions
         enriched_variants = []
         for screening_data in variant_screenings:
-            screening_type = ScreeningType.query.filter_by(name=screening_data['screening_type']).first()
+            # Variants can share a name, so they are resolved by id
+            if screening_types_by_id is not None:
+                screening_type = screening_types_by_id.get(screening_data['screening_type_id'])
+            else:
+                screening_type = ScreeningType.query.get(screening_data['screening_type_id'])
             if screening_type:
-                trigger_conditions = self._get_trigger_conditions(screening_type)
-                has_trigger_conditions = bool(trigger_conditions)
+                rule = self.get_screening_rule(screening_type)
                 
                 enriched_variants.append({
                     'screening_data': screening_data,
                     'screening_type': screening_type,
-                    'has_trigger_conditions': has_trigger_conditions,
-                    'frequency_days': self._convert_frequency_to_days(screening_type)
+                    'has_trigger_conditions': rule.has_trigger_conditions,
+                    'frequency_days': self._convert_frequency_to_days(rule)
                 })
         
         if not enriched_variants:
@@ -214,39 +257,31 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         Convert screening frequency to days for comparison
         
         Args:
-            screening_type: ScreeningType object
+            screening_type: ScreeningType object (or compiled ScreeningRule)
             
         Returns:
             Frequency in days
         """
-        if not screening_type.frequency_number or not screening_type.frequency_unit:
-            return 999999  # Very large number for undefined frequencies
-        
-        multipliers = {
-            'days': 1,
-            'weeks': 7,
-            'months': 30,
-            'years': 365
-        }
-        
-        unit = screening_type.frequency_unit.lower()
-        multiplier = multipliers.get(unit, 365)  # Default to years if unknown
-        
-        return screening_type.frequency_number * multiplier
+        frequency_days = self.get_screening_rule(screening_type).frequency_days
+        return frequency_days if frequency_days is not None else 999999  # Very large number for undefined frequencies
     
-    def _generate_screening_data(self, patient: Patient, screening_type: ScreeningType) -> Optional[Dict]:
+    def _generate_screening_data(self, patient: Patient, screening_type: ScreeningType,
+                                 patient_documents: Optional[List[MedicalDocument]] = None,
+                                 document_matches: Optional[Dict[int, Dict[int, Dict]]] = None) -> Optional[Dict]:
         """
         Generate screening data for a patient and screening type
         
         Args:
             patient: Patient object
             screening_type: ScreeningType object
+            patient_documents: Preloaded patient documents (queried when omitted)
+            document_matches: Precomputed {document_id: {screening_type_id: match}} from the keyword index
             
         Returns:
             Dictionary with screening data
         """
         # Find matching documents
-        matching_documents = self._find_matching_documents(patient, screening_type)
+        matching_documents = self._find_matching_documents(patient, screening_type, patient_documents, document_matches)
         
         # Determine status based on documents and timing
         status = self._determine_status_from_documents(matching_documents, screening_type)
@@ -259,6 +294,7 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         
         return {
             'screening_type': screening_type.name,
+            'screening_type_id': screening_type.id,
             'patient_id': patient.id,
             'status': status,
             'due_date': due_date,
@@ -647,59 +683,17 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         if not document or not screening_type:
             return self._no_match_result("Invalid input")
         
-        # Get configured keywords only - no auto-generation or fallbacks
-        keywords_config = self._get_configured_keywords(screening_type)
+        # Get the compiled matcher for the configured keywords only - no auto-generation or fallbacks
+        keyword_matcher = self.get_screening_rule(screening_type).keyword_matcher
         
         # If no keywords are configured, do not match
-        if not any(keywords_config.values()):
+        if not keyword_matcher.has_keywords:
             return self._no_match_result("No keywords configured - intentional non-match")
         
-        # Perform keyword matching
-        matches = []
-        match_types_confidence = []
+        # Perform keyword matching over content + OCR text, filename and document type
+        matches, avg_confidence = keyword_matcher.score_document(document)
         
-        # Content keyword matching (include both regular content and OCR text)
-        content_text = ""
-        if document.content:
-            content_text += document.content + " "
-        if hasattr(document, 'ocr_text') and document.ocr_text:
-            content_text += document.ocr_text
-            
-        if keywords_config['content'] and content_text.strip():
-            content_match = self._match_keywords_in_text(
-                content_text, 
-                keywords_config['content'], 
-                'content'
-            )
-            if content_match['matched']:
-                matches.extend(content_match['matches'])
-                match_types_confidence.append(content_match['confidence'])
-        
-        # Filename keyword matching (also check document_name)
-        filename_text = document.filename or document.document_name or ""
-        if keywords_config['filename'] and filename_text:
-            filename_match = self._match_keywords_in_text(
-                filename_text, 
-                keywords_config['filename'], 
-                'filename'
-            )
-            if filename_match['matched']:
-                matches.extend(filename_match['matches'])
-                match_types_confidence.append(filename_match['confidence'])
-        
-        # Document type keyword matching
-        if keywords_config['document'] and document.document_type:
-            doc_type_match = self._match_keywords_in_text(
-                document.document_type, 
-                keywords_config['document'], 
-                'document_type'
-            )
-            if doc_type_match['matched']:
-                matches.extend(doc_type_match['matches'])
-                match_types_confidence.append(doc_type_match['confidence'])
-        
-        # Determine overall match - use the highest confidence from any match type
-        avg_confidence = max(match_types_confidence) if match_types_confidence else 0.0
+        # Overall match uses the highest confidence from any match type
         is_match = avg_confidence >= self.MIN_KEYWORD_CONFIDENCE
         
         if is_match:
@@ -714,161 +708,33 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
         else:
             return self._no_match_result(f"Confidence {avg_confidence:.2f} below threshold {self.MIN_KEYWORD_CONFIDENCE}")
     
-    def _get_configured_keywords(self, screening_type: ScreeningType) -> Dict[str, List[str]]:
+    def get_keyword_index(self, screening_types: List[ScreeningType]) -> ScreeningKeywordIndex:
         """
-        Get only explicitly configured keywords using proper model methods
+        Get the cross-screening inverted keyword index, rebuilt only when the
+        keyword configuration version (screening type ids + updated_at) changes
         """
-        keywords = {
-            'content': [],
-            'filename': [],
-            'document': []
-        }
+        rule_set = get_screening_rule_set()
+        if list(screening_types) == list(rule_set.rules):
+            # The shared snapshot's index is built once per rule set version
+            return rule_set.keyword_index(self.MIN_KEYWORD_CONFIDENCE)
         
-        # Use proper getter methods that handle JSON parsing and HTML unescaping
-        try:
-            # Content keywords (unified with filename for the new system)
-            content_keywords = screening_type.get_content_keywords()
-            if content_keywords:
-                keywords['content'] = [kw.strip() for kw in content_keywords if kw.strip()]
-                # For backward compatibility, also populate filename keywords
-                keywords['filename'] = keywords['content']
-                
-            # Document type keywords
-            document_keywords = screening_type.get_document_keywords()
-            if document_keywords:
-                keywords['document'] = [kw.strip() for kw in document_keywords if kw.strip()]
-                
-        except Exception as e:
-            logger.warning(f"Error getting keywords for {screening_type.name}: {e}")
-        
-        return keywords
+        version = keyword_config_version(screening_types)
+        if self._keyword_index is None or self._keyword_index.version != version:
+            self._keyword_index = ScreeningKeywordIndex(screening_types, self.MIN_KEYWORD_CONFIDENCE)
+        return self._keyword_index
     
-    def _match_keywords_in_text(self, text: str, keywords: List[str], match_type: str) -> Dict:
+    def match_document_to_screenings(self, document: MedicalDocument,
+                                     screening_types: Optional[List[ScreeningType]] = None) -> Dict[int, Dict]:
         """
-        Match keywords in text with proper phrase and word boundary handling
-        """
-        if not text or not keywords:
-            return {'matched': False, 'matches': [], 'confidence': 0.0}
-        
-        text_lower = text.lower()
-        matches = []
+        Match one document against all (active) screening types in a single pass
         
-        for keyword in keywords:
-            keyword_lower = keyword.lower().strip()
-            if not keyword_lower:
-                continue
-            
-            # Multi-word phrase matching
-            if ' ' in keyword_lower:
-                if self._match_phrase_in_text(text_lower, keyword_lower):
-                    matches.append({
-                        'keyword': keyword,
-                        'type': match_type,
-                        'match_method': 'phrase',
-                        'confidence': 0.9  # High confidence for phrase matches
-                    })
-            else:
-                # For medical abbreviations like "a1c", use flexible matching
-                match_confidence = self._match_word_flexible(text_lower, keyword_lower)
-                if match_confidence > 0:
-                    matches.append({
-                        'keyword': keyword,
-                        'type': match_type,
-                        'match_method': 'word_flexible',
-                        'confidence': match_confidence
-                    })
-        
-        # Calculate overall confidence
-        confidence = sum(m['confidence'] for m in matches) / len(matches) if matches else 0.0
-        
-        return {
-            'matched': len(matches) > 0,
-            'matches': matches,
-            'confidence': confidence
-        }
-    
-    def _match_phrase_in_text(self, text: str, phrase: str) -> bool:
-        """Match multi-word phrases with flexible spacing"""
-        words = phrase.split()
-        pattern_parts = []
-        
-        for i, word in enumerate(words):
-            escaped_word = re.escape(word)
-            pattern_parts.append(escaped_word)
-            
-            if i < len(words) - 1:
-                pattern_parts.append(r'[\s\-_\.]*')  # Flexible separators
-        
-        pattern = r'(?<![a-zA-Z0-9])' + ''.join(pattern_parts) + r'(?![a-zA-Z0-9])'
-        return bool(re.search(pattern, text, re.IGNORECASE))
-    
-    def _match_word_in_text(self, text: str, word: str) -> bool:
-        """Match single words with flexible boundaries for filenames with underscores/hyphens"""
-        # Use flexible word boundaries that work with underscores, hyphens, dots in filenames
-        pattern = r'(?<![a-zA-Z0-9])' + re.escape(word) + r'(?![a-zA-Z0-9])'
-        return bool(re.search(pattern, text, re.IGNORECASE))
-    
-    def _match_word_flexible(self, text: str, word: str) -> float:
-        """
-        Flexible matching for medical abbreviations like 'a1c' 
-        Returns confidence score (0.0 = no match, 1.0 = perfect match)
+        Returns:
+            {screening_type_id: match result} for matching screening types only
         """
-        if not text or not word:
-            return 0.0
-        
-        word_lower = word.lower().strip()
-        text_lower = text.lower()
-        
-        # First try exact match (highest confidence)
-        if self._match_word_in_text(text_lower, word_lower):
-            return 0.95
-        
-        # For medical abbreviations, try fuzzy matching
-        # This handles cases like "Alc", "alc", "ailc" matching "a1c"
-        if len(word_lower) <= 4:  # Only for short abbreviations
-            # Look for character variations
-            word_chars = list(word_lower)
-            
-            # Create regex pattern allowing single character substitutions
-            patterns = []
-            
-            # Pattern 1: Allow case variations and similar characters
-            case_pattern = re.escape(word_lower).replace('a', '[aA]').replace('1', '[1lI]').replace('c', '[cC]')
-            patterns.append(r'(?<![a-zA-Z0-9])' + case_pattern + r'(?![a-zA-Z0-9])')
-            
-            # Pattern 2: Allow single character substitutions for abbreviations
-            if len(word_lower) == 3:  # For 3-char abbreviations like "a1c"
-                char_variants = {
-                    'a': '[aA@]',
-                    '1': '[1lI]', 
-                    'c': '[cC]',
-                    'o': '[o0O]',
-                    'i': '[iI1l]',
-                    's': '[sS5]'
-                }
-                
-                pattern_chars = []
-                for char in word_lower:
-                    if char in char_variants:
-                        pattern_chars.append(char_variants[char])
-                    else:
-                        pattern_chars.append(re.escape(char))
-                
-                fuzzy_pattern = r'(?<![a-zA-Z0-9])' + ''.join(pattern_chars) + r'(?![a-zA-Z0-9])'
-                patterns.append(fuzzy_pattern)
-            
-            # Test each pattern
-            for i, pattern in enumerate(patterns):
-                if re.search(pattern, text_lower):
-                    # Return decreasing confidence for less exact matches
-                    return 0.8 - (i * 0.1)
-        
-        # Try partial matching for longer words (lower confidence)
-        if len(word_lower) > 3 and word_lower in text_lower:
-            return 0.6
-        
-        return 0.0
-
+        if screening_types is None:
+            return get_screening_rule_set().keyword_index(self.MIN_KEYWORD_CONFIDENCE).match_document(document)
+        return self.get_keyword_index(screening_types).match_document(document)
+    
     def _no_match_result(self, reason: str) -> Dict:
         """Standard no-match result"""
         return {
@@ -942,12 +808,19 @@ class UnifiedScreeningEngine(BaseScreeningEngine):
             'matching_documents': matching_documents
         }
     
-    def _find_matching_documents(self, patient: Patient, screening_type: ScreeningType) -> List[MedicalDocument]:
+    def _find_matching_documents(self, patient: Patient, screening_type: ScreeningType,
+                                 patient_documents: Optional[List[MedicalDocument]] = None,
+                                 document_matches: Optional[Dict[int, Dict[int, Dict]]] = None) -> List[MedicalDocument]:
         """Find documents that match this screening type for the patient"""
-        patient_documents = MedicalDocument.query.filter_by(patient_id=patient.id).all()
+        if patient_documents is None:
+            patient_documents = MedicalDocument.query.filter_by(patient_id=patient.id).all()
         matching_docs = []
         
         for document in patient_documents:
+            if document_matches is not None and document.id in document_matches:
+                if screening_type.id in document_matches[document.id]:
+                    matching_docs.append(document)
+                continue
             match_result = self.match_document_to_screening(document, screening_type)
             if match_result['is_match']:
                 matching_docs.append(document)
@@ -27,6 +27,7 @@ class UniversalDocumentViewer:
             'image/tiff', 'image/bmp', 'image/gif'
         }
         self.supported_text_types = {'text/plain', 'text/html'}
+        self.tesseract_config = '--oem 3 --psm 6'
         
     def get_document_display_info(self, document_id: int) -> Dict[str, Any]:
         """Get comprehensive document display information"""
@@ -42,9 +43,9 @@ class UniversalDocumentViewer:
                 'mime_type': document.mime_type,
                 'is_binary': document.is_binary,
                 'has_content': bool(document.content),
-                'has_binary': bool(document.binary_content),
+                'has_binary': document.has_binary_content,
                 'content_length': len(document.content) if document.content else 0,
-                'binary_length': len(document.binary_content) if document.binary_content else 0,
+                'binary_length': document.binary_size,
                 'ocr_processed': document.ocr_processed,
                 'ocr_confidence': document.ocr_confidence,
                 'ocr_text_length': document.ocr_text_length,
@@ -67,7 +68,7 @@ class UniversalDocumentViewer:
             return 'text_display'
         
         # If document has binary content but no text, needs OCR
-        if document.binary_content and len(document.binary_content) > 0:
+        if document.has_binary_content:
             if document.mime_type in self.supported_pdf_types:
                 return 'pdf_with_ocr'
             elif document.mime_type in self.supported_image_types:
@@ -83,7 +84,7 @@ class UniversalDocumentViewer:
         if document.ocr_processed:
             return False
             
-        if not document.binary_content or len(document.binary_content) == 0:
+        if not document.has_binary_content:
             return False
             
         return (document.mime_type in self.supported_pdf_types or 
@@ -97,7 +98,7 @@ class UniversalDocumentViewer:
             return True
             
         # Binary content with supported types can be displayed
-        if document.binary_content and len(document.binary_content) > 0:
+        if document.has_binary_content:
             return (document.mime_type in self.supported_pdf_types or 
                    document.mime_type in self.supported_image_types)
         
@@ -134,49 +135,21 @@ class UniversalDocumentViewer:
     def _process_with_ocr(self, document: MedicalDocument) -> Dict[str, Any]:
         """Process document with OCR"""
         try:
-            import pytesseract
-            from pdf2image import convert_from_bytes
-            from PIL import Image
-            import io
+            from ocr_result_cache import ocr_result_cache
             
-            extracted_text = ''
-            total_confidence = 0
-            page_count = 0
-            
-            # Handle PDF files
-            if document.mime_type == 'application/pdf':
-                images = convert_from_bytes(document.binary_content, dpi=300)
-                logger.info(f"Converted PDF to {len(images)} images")
-                
-                for i, image in enumerate(images):
-                    # Get OCR data with confidence
-                    ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-                    page_text = pytesseract.image_to_string(image, config='--oem 3 --psm 6')
-                    
-                    if page_text.strip():
-                        extracted_text += page_text + '\n'
-                        
-                        # Calculate confidence
-                        confidences = [int(conf) for conf in ocr_data['conf'] if int(conf) > 0]
-                        if confidences:
-                            page_confidence = sum(confidences) / len(confidences)
-                            total_confidence += page_confidence
-                            page_count += 1
-            
-            # Handle image files  
-            elif document.mime_type in self.supported_image_types:
-                image = Image.open(io.BytesIO(document.binary_content))
-                ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-                extracted_text = pytesseract.image_to_string(image, config='--oem 3 --psm 6')
-                
-                confidences = [int(conf) for conf in ocr_data['conf'] if int(conf) > 0]
-                if confidences:
-                    total_confidence = sum(confidences) / len(confidences)
-                    page_count = 1
+            cache_key = ocr_result_cache.make_key(
+                document.binary_content, self.tesseract_config, f"universal_viewer:v1:{document.mime_type}"
+            )
+            cached = ocr_result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"OCR cache hit for document {document.id}")
+                extracted_text, avg_confidence = cached['text'], cached['confidence']
+            else:
+                extracted_text, avg_confidence = self._run_ocr(document)
+                if extracted_text.strip():
+                    ocr_result_cache.put(cache_key, extracted_text, avg_confidence, ['universal_viewer_ocr'])
             
             if extracted_text.strip():
-                avg_confidence = total_confidence / page_count if page_count > 0 else 0
-                
                 # Update document with OCR results
                 document.content = extracted_text
                 document.is_binary = False  # Make it displayable as text
@@ -201,6 +174,51 @@ class UniversalDocumentViewer:
         except Exception as e:
             logger.error(f"OCR processing error: {e}")
             return {'ocr_success': False, 'error': str(e)}
+    
+    def _run_ocr(self, document: MedicalDocument) -> Tuple[str, float]:
+        """Run Tesseract over a PDF or image document: (text, average confidence)"""
+        import pytesseract
+        from pdf2image import convert_from_bytes
+        from PIL import Image
+        import io
+        
+        extracted_text = ''
+        total_confidence = 0
+        page_count = 0
+        
+        # Handle PDF files
+        if document.mime_type == 'application/pdf':
+            images = convert_from_bytes(document.binary_content, dpi=300)
+            logger.info(f"Converted PDF to {len(images)} images")
+            
+            for i, image in enumerate(images):
+                # Get OCR data with confidence
+                ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+                page_text = pytesseract.image_to_string(image, config=self.tesseract_config)
+                
+                if page_text.strip():
+                    extracted_text += page_text + '\n'
+                    
+                    # Calculate confidence
+                    confidences = [int(conf) for conf in ocr_data['conf'] if int(conf) > 0]
+                    if confidences:
+                        page_confidence = sum(confidences) / len(confidences)
+                        total_confidence += page_confidence
+                        page_count += 1
+        
+        # Handle image files  
+        elif document.mime_type in self.supported_image_types:
+            image = Image.open(io.BytesIO(document.binary_content))
+            ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+            extracted_text = pytesseract.image_to_string(image, config=self.tesseract_config)
+            
+            confidences = [int(conf) for conf in ocr_data['conf'] if int(conf) > 0]
+            if confidences:
+                total_confidence = sum(confidences) / len(confidences)
+                page_count = 1
+        
+        avg_confidence = total_confidence / page_count if page_count > 0 else 0
+        return extracted_text, avg_confidence
 
 
 # Global instance
@@ -417,6 +417,11 @@ class PatientPrepData:
         self.screenings = []
         self.last_visit_date = None
         self.past_appointments = []
+        self.as_of = None  # Time the sheet is prepared for (now unless rendered ahead)
+
+    @property
+    def today(self):
+        return (self.as_of or datetime.now()).date()
 
     @classmethod
     def from_patient_id(cls, patient_id):
@@ -518,7 +523,7 @@ class PrepSheetGenerator:
 
         # Add last visit information
         if prep_data.last_visit_date:
-            days_since = (datetime.now().date() - prep_data.last_visit_date.date()).days
+            days_since = (prep_data.today - prep_data.last_visit_date.date()).days
             summary += f" Last visit was {days_since} days ago on {prep_data.last_visit_date.strftime('%Y-%m-%d')}."
 
         return summary
@@ -572,7 +577,7 @@ class PrepSheetGenerator:
     def _generate_screening_alerts(self, prep_data):
         """Generate alerts for overdue screenings"""
         alerts = []
-        today = datetime.now().date()
+        today = prep_data.today
 
         for screening in prep_data.screenings:
             if screening.due_date and screening.due_date < today:
@@ -589,7 +594,7 @@ class PrepSheetGenerator:
     def _generate_screening_actions(self, prep_data):
         """Generate action items for due screenings"""
         actions = []
-        today = datetime.now().date()
+        today = prep_data.today
 
         for screening in prep_data.screenings:
             if screening.due_date and screening.due_date <= today + timedelta(days=90):
@@ -669,6 +674,7 @@ def generate_prep_sheet(
     last_visit_date=None,
     past_appointments=None,
     include_full_data=False,
+    as_of=None,
 ):
     """
     Generate a preparation sheet summary for a patient
@@ -708,6 +714,7 @@ def generate_prep_sheet(
         if not include_full_data
         else (past_appointments or [])
     )
+    prep_data.as_of = as_of
 
     return _prep_sheet_generator.generate(prep_data)
     # Initialize prep sheet data
@@ -6,7 +6,6 @@ import logging
 from functools import wraps
 from flask import request, session
 from models import AdminLog, User
-from app import db
 import uuid
 from datetime import datetime
 import json
@@ -165,7 +164,7 @@ class ValidationLogger:
             }
 
             # Create admin log entry
-            admin_log = AdminLog(
+            AdminLog.log_event(
                 user_id=user.id if user else None,
                 event_type="validation_error",
                 event_details=str(details),
@@ -173,9 +172,6 @@ class ValidationLogger:
                 ip_address=request.remote_addr if request else "Unknown",
             )
 
-            db.session.add(admin_log)
-            db.session.commit()
-
             # Log to application logger as well
             structured_logger = get_structured_logger("validation")
             structured_logger.log_event(